@@ -0,0 +1,82 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""Índices parciales sobre partidos finalizados.
+
+Las consultas calientes solo miran partidos finalizados:
+
+- Clasificación y estadísticas de la liga: liga_id AND finalizado.
+- Historial, badges y stats de un equipo: finalizado AND un OR sobre los
+  cinco roles (local, visitante, árbitro, grada local, grada visitante).
+
+Se crea `(liga_id) WHERE finalizado` con las columnas de la clasificación
+incluidas (index-only scan en Postgres) y un índice parcial por rol, que
+el planner combina con BitmapOr. Migración ADITIVA: solo crea índices.
+
+Revision ID: 031_partidos_finalizados_indexes
+Revises: 030_add_mundo_criterios
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '031_partidos_finalizados_indexes'
+down_revision: Union[str, None] = '030_add_mundo_criterios'
+branch_labels = None
+depends_on = None
+
+COLUMNAS_CLASIFICACION = [
+    'equipo_local_id',
+    'equipo_visitante_id',
+    'arbitro_id',
+    'tutor_grada_local_id',
+    'tutor_grada_visitante_id',
+    'puntos_local',
+    'puntos_visitante',
+    'resultado',
+    'puntos_juego_limpio_local',
+    'puntos_juego_limpio_visitante',
+    'puntos_arbitro',
+    'puntos_grada_local',
+    'puntos_grada_visitante',
+]
+
+INDICES_POR_ROL = {
+    'ix_partidos_local_finalizados': 'equipo_local_id',
+    'ix_partidos_visitante_finalizados': 'equipo_visitante_id',
+    'ix_partidos_arbitro_finalizados': 'arbitro_id',
+    'ix_partidos_grada_local_finalizados': 'tutor_grada_local_id',
+    'ix_partidos_grada_visitante_finalizados': 'tutor_grada_visitante_id',
+}
+
+
+def _solo_finalizados() -> dict:
+    return {
+        'postgresql_where': sa.text('finalizado'),
+        'sqlite_where': sa.text('finalizado = 1'),
+    }
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_partidos_liga_finalizados',
+        'partidos',
+        ['liga_id'],
+        unique=False,
+        postgresql_include=COLUMNAS_CLASIFICACION,
+        **_solo_finalizados(),
+    )
+    for nombre, columna in INDICES_POR_ROL.items():
+        op.create_index(nombre, 'partidos', [columna], unique=False, **_solo_finalizados())
+
+
+def downgrade() -> None:
+    for nombre in reversed(list(INDICES_POR_ROL)):
+        op.drop_index(nombre, table_name='partidos')
+    op.drop_index('ix_partidos_liga_finalizados', table_name='partidos')
@@ -0,0 +1,83 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""Proyección partido_participaciones: una fila por (partido, rol).
+
+Las vistas por equipo buscan por equipo_id en esta tabla en lugar de hacer
+OR sobre las cinco columnas de rol de partidos. La aplicación la mantiene
+tras cada flush (app/models/partido_participacion.py); aquí se crea y se
+rellena con los partidos existentes.
+
+Migración ADITIVA: tabla nueva, sin tocar partidos.
+
+Revision ID: 032_add_partido_participaciones
+Revises: 031_partidos_finalizados_indexes
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '032_add_partido_participaciones'
+down_revision: Union[str, None] = '031_partidos_finalizados_indexes'
+branch_labels = None
+depends_on = None
+
+# (rol, columna del equipo, resultado, puntos, juego limpio, árbitro, grada)
+ROLES = [
+    ('local', 'equipo_local_id', 'resultado',
+     'COALESCE(puntos_local, 0)', 'COALESCE(puntos_juego_limpio_local, 0)', '0', '0'),
+    ('visitante', 'equipo_visitante_id',
+     "CASE resultado WHEN 'V' THEN 'D' WHEN 'D' THEN 'V' ELSE resultado END",
+     'COALESCE(puntos_visitante, 0)', 'COALESCE(puntos_juego_limpio_visitante, 0)', '0', '0'),
+    ('arbitro', 'arbitro_id', 'NULL', '0', '0', 'COALESCE(puntos_arbitro, 0)', '0'),
+    ('grada_local', 'tutor_grada_local_id', 'NULL', '0', '0', '0', 'COALESCE(puntos_grada_local, 0)'),
+    ('grada_visitante', 'tutor_grada_visitante_id', 'NULL', '0', '0', '0', 'COALESCE(puntos_grada_visitante, 0)'),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'partido_participaciones',
+        sa.Column(
+            'partido_id',
+            sa.Integer(),
+            sa.ForeignKey('partidos.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        # local | visitante | arbitro | grada_local | grada_visitante
+        sa.Column('rol', sa.String(16), primary_key=True),
+        sa.Column('equipo_id', sa.Integer(), sa.ForeignKey('equipos.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('liga_id', sa.Integer(), sa.ForeignKey('ligas.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('finalizado', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('resultado', sa.String(10), nullable=True),
+        sa.Column('puntos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('puntos_juego_limpio', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('puntos_arbitro', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('puntos_grada', sa.Float(), nullable=False, server_default='0'),
+    )
+    op.create_index(
+        'ix_partido_participaciones_equipo', 'partido_participaciones', ['equipo_id', 'finalizado'], unique=False
+    )
+    op.create_index(
+        'ix_partido_participaciones_liga', 'partido_participaciones', ['liga_id', 'finalizado'], unique=False
+    )
+
+    for rol, columna, resultado, puntos, juego_limpio, arbitro, grada in ROLES:
+        op.execute(
+            "INSERT INTO partido_participaciones (partido_id, rol, equipo_id, liga_id, finalizado, "
+            "resultado, puntos, puntos_juego_limpio, puntos_arbitro, puntos_grada) "
+            f"SELECT id, '{rol}', {columna}, liga_id, finalizado, {resultado}, {puntos}, "
+            f"{juego_limpio}, {arbitro}, {grada} FROM partidos WHERE {columna} IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_partido_participaciones_liga', table_name='partido_participaciones')
+    op.drop_index('ix_partido_participaciones_equipo', table_name='partido_participaciones')
+    op.drop_table('partido_participaciones')
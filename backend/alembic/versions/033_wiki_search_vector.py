@@ -0,0 +1,91 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""Búsqueda de texto completo en la Wiki de Juegos.
+
+PostgreSQL: extensión unaccent, configuración de búsqueda `wiki_es`
+(copia de `spanish` con unaccent delante del stemmer, así "balón" y
+"balon" coinciden), columna tsvector `game_submissions.search_vector`
+sobre título (A), materiales (B) y reglas (C), índice GIN y relleno de
+las fichas ya publicadas. La aplicación la mantiene al publicar
+(app/models/game_submission.py).
+
+Otros motores: la columna guarda el texto normalizado (minúsculas, sin
+tildes) que usa la búsqueda de respaldo con LIKE.
+
+Migración ADITIVA: columna e índice nuevos.
+
+Revision ID: 033_wiki_search_vector
+Revises: 032_add_partido_participaciones
+Create Date: 2026-10-18
+"""
+import unicodedata
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '033_wiki_search_vector'
+down_revision: Union[str, None] = '032_add_partido_participaciones'
+branch_labels = None
+depends_on = None
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    return ' '.join(texto.lower().split())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.add_column('game_submissions', sa.Column('search_vector', sa.Text(), nullable=True))
+        fichas = bind.execute(sa.text(
+            "SELECT id, title, materiales, reglas FROM game_submissions WHERE is_public"
+        )).all()
+        for id_, title, materiales, reglas in fichas:
+            bind.execute(
+                sa.text("UPDATE game_submissions SET search_vector = :texto WHERE id = :id"),
+                {"texto": "\n".join(_normalizar(t) for t in (title, materiales, reglas)), "id": id_},
+            )
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'wiki_es') THEN
+                CREATE TEXT SEARCH CONFIGURATION wiki_es (COPY = spanish);
+                ALTER TEXT SEARCH CONFIGURATION wiki_es
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+            END IF;
+        END
+        $$
+    """)
+    op.add_column('game_submissions', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute("""
+        UPDATE game_submissions SET search_vector =
+            setweight(to_tsvector('wiki_es', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('wiki_es', coalesce(materiales, '')), 'B') ||
+            setweight(to_tsvector('wiki_es', coalesce(reglas, '')), 'C')
+        WHERE is_public
+    """)
+    op.create_index(
+        'ix_game_submissions_search_vector',
+        'game_submissions',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_game_submissions_search_vector', table_name='game_submissions')
+    op.drop_column('game_submissions', 'search_vector')
@@ -30,9 +30,11 @@ from pathlib import Path
 from app.database import get_db
 from app.models import Equipo, Liga, User
 from app.schemas import EquipoCreate, EquipoUpdate, EquipoResponse
-from app.models import Partido, Jornada
+from app.models import Partido, PartidoParticipacion, Jornada
 from app.api.deps import get_current_user
 from app.config import settings
+from app.services.clasificacion_service import ClasificacionService
+from app.services import cache_service, live_events
 
 router = APIRouter()
 
@@ -140,6 +142,9 @@ async def create_equipo(
     db.add(nuevo_equipo)
     await db.commit()
     await db.refresh(nuevo_equipo)
+
+    # La clasificación guardada no tiene fila para el equipo nuevo
+    await ClasificacionService.invalidar_cache(nuevo_equipo.liga_id)
     
     return nuevo_equipo
 
@@ -216,6 +221,9 @@ async def update_equipo(
     
     await db.commit()
     await db.refresh(equipo)
+
+    if equipo_data.nombre is not None:
+        await ClasificacionService.invalidar_cache(equipo.liga_id)
     
     return equipo
 
@@ -257,6 +265,8 @@ async def delete_equipo(
     await db.delete(equipo)
     await db.commit()
 
+    await ClasificacionService.invalidar_cache(liga.id)
+
 @router.post("/{equipo_id}/logo")
 async def upload_logo(
     equipo_id: int,
@@ -296,14 +306,15 @@ async def upload_logo(
     
     # Superuser can apply directly
     if current_user.is_superuser:
-        # Delete old logo if exists
-        if equipo.logo_url:
+        # Delete old logo if exists (same upload -> same content-hash name)
+        if equipo.logo_url and equipo.logo_url != logo_url:
             ImageService.delete_team_logo(equipo.logo_url)
         
         equipo.logo_url = logo_url
         equipo.logo_filename = logo_url.replace("/static/uploads/", "") if logo_url else None
         await db.commit()
         await db.refresh(equipo)
+        await ClasificacionService.invalidar_cache(equipo.liga_id)
         
         return {
             "logo_url": logo_url,
@@ -327,6 +338,7 @@ async def upload_logo(
     )
     db.add(pending)
     await db.commit()
+    await live_events.publicar_pendientes(liga.usuario_id, liga.id, +1)
     
     return {
         "logo_url": logo_url,
@@ -398,23 +410,37 @@ async def get_equipo_stats_history(
             detail="No tienes permisos"
         )
 
-    # Consulta de partidos finalizados donde participa el equipo
-    query = select(Partido, Jornada).join(Jornada).where(
-        (Partido.liga_id == liga.id) &
-        (Partido.finalizado == True) &
-        ((Partido.equipo_local_id == equipo_id) | 
-         (Partido.equipo_visitante_id == equipo_id) |
-         (Partido.arbitro_id == equipo_id) |
-         (Partido.tutor_grada_local_id == equipo_id) |
-         (Partido.tutor_grada_visitante_id == equipo_id))
-    ).order_by(Jornada.numero)
-    
-    result = await db.execute(query)
+    return await cache_service.obtener_o_calcular(
+        liga.id, "stats_history", lambda: _historial_equipo(liga.id, equipo_id, db), clave=equipo_id
+    )
+
+
+def _query_historial(liga_id: int, equipo_id: int):
+    """
+    Partidos finalizados donde participa el equipo (en cualquier rol), con
+    su rol y jornada: búsqueda por equipo_id en las participaciones.
+    """
+    return (
+        select(PartidoParticipacion.rol, Partido, Jornada)
+        .join(Partido, Partido.id == PartidoParticipacion.partido_id)
+        .join(Jornada, Jornada.id == Partido.jornada_id)
+        .where(
+            PartidoParticipacion.equipo_id == equipo_id,
+            PartidoParticipacion.liga_id == liga_id,
+            PartidoParticipacion.finalizado == True,
+        )
+        .order_by(Jornada.numero)
+    )
+
+
+async def _historial_equipo(liga_id: int, equipo_id: int, db: AsyncSession) -> list[dict]:
+    """Estadísticas partido a partido de un equipo (se guardan en caché)."""
+    result = await db.execute(_query_historial(liga_id, equipo_id))
     rows = result.all()
     
     history = []
     
-    for partido, jornada in rows:
+    for rol, partido, jornada in rows:
         stats = {
             "jornada": f"J{jornada.numero}",
             "jornada_numero": jornada.numero,
@@ -422,30 +448,25 @@ async def get_equipo_stats_history(
             "juego_limpio": 0,
             "arbitraje": 0.0, # Promedio si fue árbitro, o 0 si no
             "grada": 0.0,
-            "rol": "jugador"
+            "rol": rol
         }
         
-        if partido.equipo_local_id == equipo_id:
+        if rol == "local":
             stats["juego_limpio"] = partido.puntos_juego_limpio_local
             stats["grada"] = partido.puntos_grada_local
-            stats["rol"] = "local"
-        elif partido.equipo_visitante_id == equipo_id:
+        elif rol == "visitante":
             stats["juego_limpio"] = partido.puntos_juego_limpio_visitante
             stats["grada"] = partido.puntos_grada_visitante
-            stats["rol"] = "visitante"
-        elif partido.arbitro_id == equipo_id:
+        elif rol == "arbitro":
             # Calcular promedio de arbitraje
             c = partido.arbitro_conocimiento or 0
             g = partido.arbitro_gestion or 0
             a = partido.arbitro_apoyo or 0
             stats["arbitraje"] = round((c + g + a) / 3, 2)
-            stats["rol"] = "arbitro"
-        elif partido.tutor_grada_local_id == equipo_id:
+        elif rol == "grada_local":
             stats["grada"] = partido.puntos_grada_local
-            stats["rol"] = "grada_local"
-        elif partido.tutor_grada_visitante_id == equipo_id:
+        elif rol == "grada_visitante":
             stats["grada"] = partido.puntos_grada_visitante
-            stats["rol"] = "grada_visitante"
             
         history.append(stats)
         
@@ -515,5 +536,6 @@ async def get_equipo_badges(
             detail="No tienes permisos"
         )
         
-    badges = await BadgesService.calculate_badges(equipo_id, db)
-    return badges
+    return await cache_service.obtener_o_calcular(
+        liga.id, "badges", lambda: BadgesService.calculate_badges(equipo_id, db), clave=equipo_id
+    )
@@ -16,6 +16,7 @@ from app.database import get_db
 from app.models import Liga, Equipo, Partido, TipoDeporte
 from app.models.fase_final import FaseFinal, CruceFase
 from app.api.v1.auth import get_current_user
+from app.services import cache_service
 from app.models.user import User
 from app.schemas.fase_final import (
     FaseFinalCreate,
@@ -234,6 +235,7 @@ async def generar_cruces(
             db.add(partido)
 
     await db.commit()
+    await cache_service.invalidar_liga(liga_id)
     fase = await _load_fase(fase_id, db)
     return _fase_to_response(fase)
 
@@ -299,3 +301,4 @@ async def delete_fase_final(
         raise HTTPException(status_code=404, detail="Fase no encontrada")
     await db.delete(fase)
     await db.commit()
+    await cache_service.invalidar_liga(liga_id)
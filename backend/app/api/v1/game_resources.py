@@ -19,18 +19,31 @@ from sqlalchemy import select, func, or_
 from typing import List, Optional
 from datetime import datetime, timezone
 from io import BytesIO
+from collections import deque
+import asyncio
+import logging
 import os
 
+from app.config import settings
 from app.database import get_db
 from app.api.deps import get_current_superuser, get_current_active_user
 from app.models.game_submission import GameSubmission
 from app.models.liga import Liga
 from app.models.tipo_deporte import TipoDeporte
 from app.models.user import User
-from app.services.pdf_generator import generate_wiki_pdf, generate_game_sheet_pdf, fetch_pictograms_bulk
+from app.services import cache_service, pdf_render_service, wiki_search
+from app.services.pdf_generator import (
+    MAX_PICTOS_SECCION,
+    fetch_pictograms_bulk,
+    generate_game_sheet_pdf,
+    generate_wiki_pdf,
+)
 from app.services.publish_pages import error_page as _error_page, success_page as _success_page
+from app.services.query_shapes import FICHA_EXPORTACION, FICHA_LISTADO
+from app.utils.zip_stream import StreamingZipWriter
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -363,6 +376,8 @@ async def confirm_publish(
         db.add(relation)
     
     await db.commit()
+    # El total de resultados de la Wiki está cacheado
+    await cache_service.invalidar_wiki()
     
     # Mensaje de éxito con info de taxonomías
     tax_count = len(taxonomia_ids)
@@ -388,6 +403,7 @@ async def list_repository_games(db: AsyncSession = Depends(get_db)):
     """
     query = (
         select(GameSubmission)
+        .options(*FICHA_LISTADO)
         .where(GameSubmission.is_public == True)
         .order_by(
             GameSubmission.published_at.desc().nullslast(),
@@ -415,72 +431,81 @@ async def list_wiki_games(
     sport_id: Optional[int] = Query(None, description="Filtrar por deporte"),
     categoria: Optional[str] = Query(None, description="Filtrar por categoría: alternativo, popular, tradicional, convencional"),
     taxonomia_id: Optional[int] = Query(None, description="Filtrar por taxonomía pedagógica"),
-    search: Optional[str] = Query(None, description="Buscar en título"),
-    page: int = Query(1, ge=1),
+    search: Optional[str] = Query(None, max_length=200, description="Buscar en título, materiales y reglas"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor)"),
+    page: int = Query(1, ge=1, description="Paginación por desplazamiento; se ignora si hay cursor"),
     limit: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Lista las fichas de juego públicas con filtros y paginación.
+
+    Con `search`, los resultados van ordenados por relevancia
+    (app/services/wiki_search.py). La paginación recomendada es por cursor:
+    cada respuesta trae `next_cursor` para pedir la siguiente página.
+    `total` se cachea hasta la próxima publicación.
     """
     from app.models.taxonomia_pedagogica import GameSubmissionTaxonomia
     
-    # Base query
-    query = select(GameSubmission).where(GameSubmission.is_public == True)
+    dialecto = db.bind.dialect.name
+    filtros = [GameSubmission.is_public == True]
     
     # Filtro por deporte
     if sport_id:
-        query = query.where(GameSubmission.sport_id == sport_id)
+        filtros.append(GameSubmission.sport_id == sport_id)
     
-    # Filtro por categoría (requiere join con TipoDeporte)
+    # Filtro por categoría (subconsulta sobre TipoDeporte)
     if categoria:
-        query = query.join(TipoDeporte, GameSubmission.sport_id == TipoDeporte.id)
-        query = query.where(TipoDeporte.categoria == categoria)
+        filtros.append(GameSubmission.sport_id.in_(
+            select(TipoDeporte.id).where(TipoDeporte.categoria == categoria)
+        ))
     
     # Filtro por taxonomía pedagógica
     if taxonomia_id:
-        query = query.join(
-            GameSubmissionTaxonomia,
-            GameSubmission.id == GameSubmissionTaxonomia.game_submission_id
-        ).where(GameSubmissionTaxonomia.taxonomia_id == taxonomia_id)
+        filtros.append(GameSubmission.id.in_(
+            select(GameSubmissionTaxonomia.game_submission_id)
+            .where(GameSubmissionTaxonomia.taxonomia_id == taxonomia_id)
+        ))
     
-    # Filtro por búsqueda en título
-    if search:
-        query = query.where(GameSubmission.title.ilike(f"%{search}%"))
+    # Búsqueda de texto completo
+    coincide, relevancia = wiki_search.criterio_busqueda(dialecto, search or "")
+    if coincide is not None:
+        filtros.append(coincide)
+    claves = wiki_search.claves_orden(dialecto, relevancia)
     
-    # Ordenar por fecha de publicación
-    query = query.order_by(GameSubmission.published_at.desc())
+    async def _contar() -> int:
+        result = await db.execute(select(func.count(GameSubmission.id)).where(*filtros))
+        return result.scalar() or 0
     
-    # Contar total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    clave_total = f"{sport_id or ''}:{categoria or ''}:{taxonomia_id or ''}:{' '.join(wiki_search.terminos(search or ''))}"
+    total = await cache_service.obtener_o_calcular_wiki("wiki_total", _contar, clave=clave_total)
     
-    # Paginación
-    offset = (page - 1) * limit
-    query = query.offset(offset).limit(limit)
+    query = (
+        select(GameSubmission, *claves)
+        .where(*filtros)
+        .order_by(*(clave.desc() for clave in claves))
+        .limit(limit)
+        .options(*FICHA_LISTADO)
+    )
+    if cursor:
+        try:
+            query = query.where(wiki_search.despues_del_cursor(claves, cursor))
+        except wiki_search.CursorInvalido as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    else:
+        query = query.offset((page - 1) * limit)
     
-    result = await db.execute(query)
-    submissions = result.scalars().all()
+    filas = (await db.execute(query)).all()
     
-    # Formatear respuesta
+    # Formatear respuesta (el deporte llega en el mismo SELECT)
     items = []
-    for sub in submissions:
-        # Obtener nombre del deporte
-        sport_name = None
-        sport_categoria = None
-        if sub.sport_id:
-            sport = await db.get(TipoDeporte, sub.sport_id)
-            if sport:
-                sport_name = sport.nombre
-                sport_categoria = sport.categoria
-        
+    for sub, *_ in filas:
         items.append({
             "id": sub.id,
             "title": sub.title,
             "sport_id": sub.sport_id,
-            "sport_name": sport_name,
-            "sport_categoria": sport_categoria,
+            "sport_name": sub.sport.nombre if sub.sport else None,
+            "sport_categoria": sub.sport.categoria if sub.sport else None,
             "docente_nombre": sub.docente_nombre,
             "has_graphics": bool(sub.representacion_grafica),
             "has_pictograms": bool(sub.pictogramas_materiales or sub.pictogramas_reglas),
@@ -492,7 +517,8 @@ async def list_wiki_games(
         "total": total,
         "page": page,
         "limit": limit,
-        "pages": (total + limit - 1) // limit
+        "pages": (total + limit - 1) // limit,
+        "next_cursor": wiki_search.codificar_cursor(filas[-1][1:]) if len(filas) == limit else None,
     }
 
 
@@ -701,7 +727,7 @@ async def list_fichas_by_liga(
     total = (await db.execute(count_q)).scalar() or 0
 
     offset = (page - 1) * limit
-    result = await db.execute(query.offset(offset).limit(limit))
+    result = await db.execute(query.options(*FICHA_LISTADO).offset(offset).limit(limit))
     submissions = result.scalars().all()
 
     items = []
@@ -872,6 +898,114 @@ async def resend_ficha_email(
 # EXPORTACIÓN MASIVA — ZIP de todos los PDFs de una liga
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Reintentos de una ficha si el pool de PDFs se llena a mitad de exportación
+# (ya no se puede responder 503: el ZIP está en camino)
+EXPORT_ZIP_REINTENTOS = 5
+EXPORT_ZIP_ESPERA_SEGUNDOS = 1.0
+
+
+def _safe_zip_name(s: str) -> str:
+    for ch in r'/\:*?"<>|':
+        s = s.replace(ch, "_")
+    return s.strip()[:60]
+
+
+def _leer_grafico(ruta: Optional[str]) -> Optional[bytes]:
+    if not ruta or not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "rb") as img_f:
+            return img_f.read()
+    except OSError:
+        return None
+
+
+async def _pdf_ficha_zip(ficha: dict, liga_nombre: str, picto_cache: dict) -> Optional[bytes]:
+    """PDF anónimo de una ficha para el ZIP; None si no se pudo generar."""
+    graphics_content = await asyncio.to_thread(_leer_grafico, ficha["grafico"])
+    for _ in range(EXPORT_ZIP_REINTENTOS):
+        try:
+            return await generate_game_sheet_pdf(
+                title=ficha["title"],
+                student_name=None,
+                sport_name=ficha["sport_name"],
+                liga_name=liga_nombre,
+                materiales=ficha["materiales"],
+                reglas=ficha["reglas"],
+                graphics_content=graphics_content,
+                pictos_materiales=ficha["pictos_materiales"],
+                pictos_reglas=ficha["pictos_reglas"],
+                is_anonymous=True,
+                language="es",
+                picto_cache=picto_cache,
+            )
+        except HTTPException as exc:
+            if exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                await asyncio.sleep(EXPORT_ZIP_ESPERA_SEGUNDOS)
+                continue
+            logger.warning("[export-zip] Error generando PDF para submission %s: %s", ficha["id"], exc.detail)
+            return None
+        except Exception as exc:
+            logger.warning(
+                "[export-zip] Error generando PDF para submission %s: %s", ficha["id"], exc, exc_info=True
+            )
+            return None
+    logger.warning("[export-zip] PDF no generado para submission %s: pool de PDFs saturado", ficha["id"])
+    return None
+
+
+async def _stream_zip_fichas(fichas: list[dict], liga_nombre: str, picto_cache: dict):
+    """
+    Emite el ZIP entrada a entrada, en el orden de las fichas. Como mucho
+    hay tantos PDFs en vuelo como procesos de render: la memoria no crece
+    con el número de fichas y el primer byte sale tras el primer PDF.
+    """
+    liga_folder = _safe_zip_name(liga_nombre)
+    zip_writer = StreamingZipWriter()
+    paralelo = max(settings.PDF_RENDER_PROCESSES, 1)
+    pendientes: deque = deque()
+    restantes = iter(fichas)
+    seen_names: dict[str, int] = {}
+    fallidas: list[str] = []
+
+    def rellenar() -> None:
+        while len(pendientes) < paralelo:
+            ficha = next(restantes, None)
+            if ficha is None:
+                return
+            pendientes.append((ficha, asyncio.create_task(_pdf_ficha_zip(ficha, liga_nombre, picto_cache))))
+
+    try:
+        rellenar()
+        while pendientes:
+            ficha, tarea = pendientes.popleft()
+            pdf_bytes = await tarea
+            rellenar()
+            if pdf_bytes is None:
+                fallidas.append(ficha["title"])
+                continue
+
+            # Nombre de archivo único dentro del ZIP
+            base_name = _safe_zip_name(ficha["title"]) or f"ficha_{ficha['id']}"
+            if base_name in seen_names:
+                seen_names[base_name] += 1
+                file_name = f"{base_name}_{seen_names[base_name]}.pdf"
+            else:
+                seen_names[base_name] = 1
+                file_name = f"{base_name}.pdf"
+
+            yield await asyncio.to_thread(zip_writer.add, f"{liga_folder}/{file_name}", pdf_bytes)
+
+        if fallidas:
+            aviso = "No se pudieron generar estas fichas:\n" + "\n".join(f"- {t}" for t in fallidas)
+            yield zip_writer.add(f"{liga_folder}/errores.txt", aviso.encode("utf-8"))
+        yield zip_writer.close()
+    finally:
+        # Cliente desconectado: no seguir renderizando para nadie
+        for _, tarea in pendientes:
+            tarea.cancel()
+
+
 @router.get("/ligas/{liga_id}/fichas/export-zip")
 async def export_fichas_zip(
     liga_id: int,
@@ -879,11 +1013,10 @@ async def export_fichas_zip(
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Genera y descarga un ZIP con todos los PDFs de las fichas de la liga.
-    Organizado en carpetas por liga. Optimizado con caché de pictogramas.
+    Descarga un ZIP con todos los PDFs de las fichas de la liga.
+    Organizado en carpetas por liga. Los PDFs se generan en paralelo en el
+    pool de render y el ZIP se envía en streaming según van saliendo.
     """
-    import zipfile
-    import asyncio
     from datetime import date
 
     liga = await db.get(Liga, liga_id)
@@ -894,6 +1027,7 @@ async def export_fichas_zip(
 
     result = await db.execute(
         select(GameSubmission)
+        .options(*FICHA_LISTADO)
         .where(GameSubmission.liga_id == liga_id)
         .order_by(GameSubmission.created_at.asc())
     )
@@ -902,81 +1036,40 @@ async def export_fichas_zip(
     if not submissions:
         raise HTTPException(status_code=404, detail="Esta liga no tiene fichas aún.")
 
-    # ── 1. Recopilar todos los IDs de pictogramas únicos ──────────────────────
-    all_picto_ids: set[int] = set()
-    for sub in submissions:
-        if sub.pictogramas_materiales:
-            all_picto_ids.update(sub.pictogramas_materiales[:6])
-        if sub.pictogramas_reglas:
-            all_picto_ids.update(sub.pictogramas_reglas[:6])
+    # Con el pool lleno se avisa ahora, mientras aún se puede responder 503
+    pdf_render_service.comprobar_hueco("ficha_juego")
+
+    # ── 1. Datos planos: el streaming sigue tras cerrar la sesión de BD ───────
+    fichas = [
+        {
+            "id": sub.id,
+            "title": sub.title,
+            "sport_name": sub.sport.nombre if sub.sport else None,
+            "materiales": sub.materiales or "",
+            "reglas": sub.reglas or "",
+            "pictos_materiales": sub.pictogramas_materiales,
+            "pictos_reglas": sub.pictogramas_reglas,
+            "grafico": sub.representacion_grafica,
+        }
+        for sub in submissions
+    ]
 
     # ── 2. Descargar todos los pictogramas en paralelo (1 sola vez) ───────────
+    all_picto_ids: set[int] = set()
+    for ficha in fichas:
+        if ficha["pictos_materiales"]:
+            all_picto_ids.update(ficha["pictos_materiales"][:MAX_PICTOS_SECCION])
+        if ficha["pictos_reglas"]:
+            all_picto_ids.update(ficha["pictos_reglas"][:MAX_PICTOS_SECCION])
+
     picto_cache: dict[int, bytes] = {}
     if all_picto_ids:
         picto_cache = await fetch_pictograms_bulk(list(all_picto_ids))
 
-    # ── 3. Nombre seguro para rutas ZIP ───────────────────────────────────────
-    def safe_name(s: str) -> str:
-        for ch in r'/\:*?"<>|':
-            s = s.replace(ch, "_")
-        return s.strip()[:60]
-
-    liga_folder = safe_name(liga.nombre)
-    today = date.today().isoformat()
-
-    # ── 4. Generar PDFs y empaquetar en ZIP ───────────────────────────────────
-    zip_buffer = BytesIO()
-    seen_names: dict[str, int] = {}
-
-    with zipfile.ZipFile(zip_buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for sub in submissions:
-            sport_name = sub.sport.nombre if sub.sport else None
-
-            # Leer imagen desde disco si existe
-            graphics_content = None
-            if sub.representacion_grafica and os.path.exists(sub.representacion_grafica):
-                try:
-                    with open(sub.representacion_grafica, "rb") as img_f:
-                        graphics_content = img_f.read()
-                except Exception:
-                    pass
-
-            try:
-                pdf_bytes = await generate_game_sheet_pdf(
-                    title=sub.title,
-                    student_name=None,
-                    sport_name=sport_name,
-                    liga_name=liga.nombre,
-                    materiales=sub.materiales or "",
-                    reglas=sub.reglas or "",
-                    graphics_content=graphics_content,
-                    pictos_materiales=sub.pictogramas_materiales,
-                    pictos_reglas=sub.pictogramas_reglas,
-                    is_anonymous=True,
-                    language="es",
-                    picto_cache=picto_cache,
-                )
-            except Exception as exc:
-                print(f"[export-zip] Error generando PDF para submission {sub.id}: {exc}")
-                continue
-
-            # Nombre de archivo único dentro del ZIP
-            base_name = safe_name(sub.title) or f"ficha_{sub.id}"
-            if base_name in seen_names:
-                seen_names[base_name] += 1
-                file_name = f"{base_name}_{seen_names[base_name]}.pdf"
-            else:
-                seen_names[base_name] = 1
-                file_name = f"{base_name}.pdf"
-
-            zip_path = f"{liga_folder}/{file_name}"
-            zf.writestr(zip_path, pdf_bytes)
-
-    zip_buffer.seek(0)
-    zip_filename = f"Fichas_{liga_folder}_{today}.zip"
-
+    # ── 3. PDFs en paralelo, ZIP en streaming ─────────────────────────────────
+    zip_filename = f"Fichas_{_safe_zip_name(liga.nombre)}_{date.today().isoformat()}.zip"
     return StreamingResponse(
-        zip_buffer,
+        _stream_zip_fichas(fichas, liga.nombre, picto_cache),
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'},
     )
@@ -996,7 +1089,6 @@ async def export_games_csv(
     Exporta las fichas de juego en formato CSV para importar en actividad Base de Datos de Moodle.
     Campos: titulo, autor, deporte, liga, materiales, reglas, fecha_creacion, pdf_url
     """
-    from app.models.liga import Liga
     import csv
     from io import StringIO
 
@@ -1012,7 +1104,7 @@ async def export_games_csv(
     # Ordenar por fecha
     query = query.order_by(GameSubmission.created_at.desc())
     
-    result = await db.execute(query)
+    result = await db.execute(query.options(*FICHA_EXPORTACION))
     submissions = result.scalars().all()
     
     # Preparar CSV
@@ -1034,18 +1126,9 @@ async def export_games_csv(
     api_url = os.getenv("API_URL", "https://liga.edumind.es/api/v1")
     
     for sub in submissions:
-        # Obtener nombres relacionados
-        sport_name = ""
-        if sub.sport_id:
-            sport = await db.get(TipoDeporte, sub.sport_id)
-            if sport:
-                sport_name = sport.nombre
-                
-        liga_name = ""
-        if sub.liga_id:
-            liga = await db.get(Liga, sub.liga_id)
-            if liga:
-                liga_name = liga.nombre
+        # Deporte y liga llegan en el mismo SELECT
+        sport_name = sub.sport.nombre if sub.sport else ""
+        liga_name = sub.liga.nombre if sub.liga else ""
                 
         # Link al PDF público
         pdf_url = f"{api_url}/game-resources/wiki/{sub.id}/pdf"
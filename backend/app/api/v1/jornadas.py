@@ -28,7 +28,10 @@ from app.database import get_db
 from app.models import Jornada, Liga, User, Partido, Equipo
 from app.schemas import JornadaCreate, JornadaUpdate, JornadaResponse, JornadaWithStats
 from app.api.deps import get_current_user
+from app.services import cache_service
+from app.services.clasificacion_service import ClasificacionService
 from app.services.match_role_schema_service import force_lock_schema
+from app.services.query_shapes import total_por
 
 router = APIRouter()
 
@@ -49,20 +52,17 @@ async def list_jornadas_by_liga(
             detail="Liga no encontrada"
         )
     
-    # Obtener jornadas
+    # Obtener jornadas con su total de partidos (una sola consulta)
+    totales = total_por(Partido.jornada_id, Partido.liga_id == liga_id)
     result = await db.execute(
-        select(Jornada).where(Jornada.liga_id == liga_id).order_by(Jornada.numero, Jornada.created_at)
+        select(Jornada, func.coalesce(totales.c.total, 0))
+        .outerjoin(totales, totales.c.clave == Jornada.id)
+        .where(Jornada.liga_id == liga_id)
+        .order_by(Jornada.numero, Jornada.created_at)
     )
-    jornadas = result.scalars().all()
     
-    # Añadir stats (total partidos)
     jornadas_with_stats = []
-    for jornada in jornadas:
-        result_partidos = await db.execute(
-            select(Partido).where(Partido.jornada_id == jornada.id)
-        )
-        total_partidos = len(result_partidos.scalars().all())
-        
+    for jornada, total_partidos in result.all():
         jornada_dict = {
             "id": jornada.id,
             "nombre": jornada.nombre,
@@ -112,6 +112,7 @@ async def create_jornada(
     db.add(nueva_jornada)
     await db.commit()
     await db.refresh(nueva_jornada)
+    await cache_service.invalidar_liga(nueva_jornada.liga_id)
     
     return nueva_jornada
 
@@ -180,6 +181,7 @@ async def update_jornada(
     
     await db.commit()
     await db.refresh(jornada)
+    await cache_service.invalidar_liga(jornada.liga_id)
     
     return jornada
 
@@ -222,6 +224,9 @@ async def delete_jornada(
     await db.delete(jornada)
     await db.commit()
 
+    # Borrado en bloque de partidos (posiblemente finalizados)
+    await ClasificacionService.invalidar_cache(liga.id)
+
 
 @router.post("/{jornada_id}/generar-calendario")
 async def generar_calendario(
@@ -311,6 +316,9 @@ async def generar_calendario(
             modo_usado = "Round-Robin tradicional (único deporte)"
         
         await db.commit()
+
+        # El generador sustituye los partidos de la jornada en bloque
+        await ClasificacionService.invalidar_cache(liga.id)
         
         return {
             "message": f"Calendario generado exitosamente",
@@ -22,7 +22,7 @@ API endpoints for Ligas (Leagues).
 from collections import defaultdict
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -32,6 +32,7 @@ from app.database import get_db
 from app.models import Liga, User, Equipo, Jornada, Partido
 from app.models.league_teacher_membership import LeagueTeacherMembership
 from app.models.league_match_role_schema import LeagueMatchRoleSchema
+from app.models.partido_participacion import partidos_de_equipo
 from app.schemas import (
     LigaCreate,
     LigaUpdate,
@@ -44,9 +45,11 @@ from app.schemas import (
     MatchRoleSchemaResponse,
 )
 from app.api.deps import get_current_user
+from app.services import cache_service, pdf_render_service
 from app.services.clasificacion_service import ClasificacionService
 # CalendarGenerator deprecated - use /jornadas/{id}/generar-calendario instead
 from app.services.public_pin_service import generate_unique_public_pin
+from app.services.query_shapes import contar_por
 from app.services.league_entitlement_service import ensure_can_create_league, get_league_capacity
 from app.services.match_role_schema_service import (
     get_or_create_match_role_schema,
@@ -127,13 +130,8 @@ async def _load_liga_stats(
         (Jornada, "total_jornadas"),
         (Partido, "total_partidos"),
     ):
-        result = await db.execute(
-            select(model.liga_id, func.count())
-            .where(model.liga_id.in_(liga_ids))
-            .group_by(model.liga_id)
-        )
-        for liga_id, count in result.all():
-            stats[int(liga_id)][key] = int(count or 0)
+        for liga_id, count in (await contar_por(db, model.liga_id, liga_ids)).items():
+            stats[liga_id][key] = count
 
     return dict(stats)
 
@@ -152,17 +150,9 @@ async def _commit_liga_changes(db: AsyncSession) -> None:
         raise
 
 
-async def _serialize_liga(
-    db: AsyncSession,
-    liga: Liga,
-    *,
-    include_stats: bool = False,
-    schema: LeagueMatchRoleSchema | None = None,
-    stats: dict[str, int] | None = None,
-) -> dict:
-    if schema is None:
-        schema = await get_or_create_match_role_schema(db, liga, create_if_missing=False)
-    payload = {
+def _liga_payload(liga: Liga, schema: LeagueMatchRoleSchema | None) -> dict:
+    """Serialización sin consultas: el esquema ya viene cargado (o None)."""
+    return {
         "id": liga.id,
         "nombre": liga.nombre,
         "descripcion": liga.descripcion,
@@ -180,6 +170,19 @@ async def _serialize_liga(
         "created_at": liga.created_at,
         "updated_at": liga.updated_at,
     }
+
+
+async def _serialize_liga(
+    db: AsyncSession,
+    liga: Liga,
+    *,
+    include_stats: bool = False,
+    schema: LeagueMatchRoleSchema | None = None,
+    stats: dict[str, int] | None = None,
+) -> dict:
+    if schema is None:
+        schema = await get_or_create_match_role_schema(db, liga, create_if_missing=False)
+    payload = _liga_payload(liga, schema)
     if not include_stats:
         return payload
 
@@ -232,11 +235,9 @@ async def list_ligas(
     result = await db.execute(query)
     ligas = result.scalars().all()
     liga_ids = [liga.id for liga in ligas]
+    # Esquemas de todas las ligas en una consulta; sin esquema -> None
     schemas_by_liga = await _load_match_role_schemas_for_ligas(db, liga_ids)
-    return [
-        await _serialize_liga(db, liga, schema=schemas_by_liga.get(liga.id))
-        for liga in ligas
-    ]
+    return [_liga_payload(liga, schemas_by_liga.get(liga.id)) for liga in ligas]
 
 
 @router.get("/capacity", response_model=LeagueCapacityResponse)
@@ -382,6 +383,7 @@ async def update_liga(
     
     await _commit_liga_changes(db)
     await db.refresh(liga)
+    await cache_service.invalidar_liga(liga.id)
     
     return await _serialize_liga(db, liga)
 
@@ -700,6 +702,7 @@ async def delete_liga(
     )
     await db.delete(liga)
     await db.commit()
+    await cache_service.invalidar_liga(liga_id)
 
 @router.get("/{liga_id}/clasificacion")
 async def get_clasificacion(
@@ -793,7 +796,9 @@ async def export_clasificacion_pdf(
     from app.services.report_service import ReportService
     from fastapi.responses import Response
     
-    pdf_content = ReportService.generate_clasificacion_pdf(liga.nombre, clasificacion)
+    pdf_content = await pdf_render_service.renderizar(
+        "clasificacion", ReportService.generate_clasificacion_pdf, liga.nombre, clasificacion
+    )
     
     return Response(
         content=pdf_content,
@@ -835,10 +840,7 @@ async def export_estadisticas(
     if jornada_id:
         query = query.where(Partido.jornada_id == jornada_id)
     if equipo_id:
-        from sqlalchemy import or_
-        query = query.where(
-            or_(Partido.equipo_local_id == equipo_id, Partido.equipo_visitante_id == equipo_id)
-        )
+        query = query.where(Partido.id.in_(partidos_de_equipo(equipo_id)))
 
     result = await db.execute(query)
     partidos = result.scalars().all()
@@ -875,7 +877,9 @@ async def export_estadisticas(
     safe_nombre = liga.nombre.lower().replace(" ", "_")
 
     if formato.lower() == "pdf":
-        content = ReportService.generate_estadisticas_pdf(liga.nombre, partidos_data)
+        content = await pdf_render_service.renderizar(
+            "estadisticas", ReportService.generate_estadisticas_pdf, liga.nombre, partidos_data
+        )
         filename = f"estadisticas_{safe_nombre}.pdf"
         return Response(
             content=content,
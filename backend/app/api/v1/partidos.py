@@ -25,12 +25,13 @@ from fastapi.responses import Response
 from app.core.rate_limit import limiter
 from fastapi.responses import JSONResponse  # Response ya importado arriba
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
+from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
 from app.models import Partido, Liga, Equipo, TipoDeporte, Jornada, User
 from app.models.partido_nota import PartidoNota
+from app.models.partido_participacion import partidos_de_equipo
 from app.models.evaluacion_personalizada import EvaluacionPersonalizada
 from app.models.criterio_evaluacion import CriterioEvaluacion
 from app.schemas.partido import (
@@ -43,7 +44,9 @@ from app.schemas.partido import (
 )
 from app.schemas.criterio_evaluacion import EvaluacionPersonalizadaCreate
 from app.api.v1.auth import get_current_user
+from app.services import cache_service, live_events, pdf_render_service
 from app.services.clasificacion_service import ClasificacionService
+from app.services.clasificacion_incremental import contribucion_partido
 from app.services.evaluacion_clasica import aplicar_evaluacion_clasica, es_evaluacion_clasica_completa
 from app.services.evaluacion_personalizada import (
     aplicar_puntos_personalizados,
@@ -150,6 +153,7 @@ async def create_partido(
     db.add(db_partido)
     await db.commit()
     await db.refresh(db_partido)
+    await cache_service.invalidar_liga(db_partido.liga_id)
     
     return db_partido
 
@@ -188,12 +192,7 @@ async def read_partidos(
         query = query.filter(Partido.jornada_id == jornada_id)
 
     if equipo_id:
-        query = query.filter(
-            or_(
-                Partido.equipo_local_id == equipo_id,
-                Partido.equipo_visitante_id == equipo_id
-            )
-        )
+        query = query.filter(Partido.id.in_(partidos_de_equipo(equipo_id)))
 
     query = query.offset(skip).limit(limit)
     result = await db.execute(query)
@@ -300,6 +299,8 @@ async def update_marcador(
             },
         )
         
+    contribucion_previa = contribucion_partido(partido)
+
     # Actualizar marcador
     partido.marcador = marcador_update.marcador
     # NO marcar como finalizado automáticamente - el usuario debe usar /finalizar
@@ -309,17 +310,19 @@ async def update_marcador(
     
     await db.commit()
     await db.refresh(partido)
+
+    contribucion_nueva = contribucion_partido(partido)
+    await ClasificacionService.aplicar_cambio_partido(
+        partido.liga_id, contribucion_previa, contribucion_nueva
+    )
+    await live_events.publicar_partido(
+        partido, "marcador", clasificacion=contribucion_nueva != contribucion_previa
+    )
     
     # Actualizar estadísticas de equipos (throttled)
     await ClasificacionService.schedule_stats_updates(
-        [
-            partido.equipo_local_id,
-            partido.equipo_visitante_id,
-            partido.arbitro_id,
-            partido.tutor_grada_local_id,
-            partido.tutor_grada_visitante_id,
-        ],
-        throttle_seconds=5
+        partido.liga_id,
+        throttle_seconds=5,
     )
     
     return partido
@@ -335,7 +338,8 @@ async def update_evaluacion(
     Actualizar evaluación educativa (juego limpio, árbitro, grada).
     """
     query = select(Partido).filter(Partido.id == partido_id).options(
-        selectinload(Partido.liga)
+        selectinload(Partido.liga),
+        selectinload(Partido.tipo_deporte)
     )
     result = await db.execute(query)
     partido = result.scalar_one_or_none()
@@ -399,23 +403,26 @@ async def update_evaluacion(
                 },
             },
         )
+    contribucion_previa = contribucion_partido(partido)
     _aplicar_evaluacion_clasica(partido, update_data)
 
     partido.evaluacion_completa = _is_classic_evaluacion_completa(partido)
 
     await db.commit()
     await db.refresh(partido)
+
+    contribucion_nueva = contribucion_partido(partido)
+    await ClasificacionService.aplicar_cambio_partido(
+        partido.liga_id, contribucion_previa, contribucion_nueva
+    )
+    await live_events.publicar_partido(
+        partido, "evaluacion", clasificacion=contribucion_nueva != contribucion_previa
+    )
     
     # Actualizar estadísticas de equipos (throttled)
     await ClasificacionService.schedule_stats_updates(
-        [
-            partido.equipo_local_id,
-            partido.equipo_visitante_id,
-            partido.arbitro_id,
-            partido.tutor_grada_local_id,
-            partido.tutor_grada_visitante_id,
-        ],
-        throttle_seconds=5
+        partido.liga_id,
+        throttle_seconds=5,
     )
     
     return partido
@@ -458,6 +465,8 @@ async def finalizar_partido(
             detail="No se puede finalizar el partido sin completar la evaluación educativa."
         )
         
+    contribucion_previa = contribucion_partido(partido)
+
     # Marcar como finalizado
     partido.finalizado = True
     
@@ -466,17 +475,16 @@ async def finalizar_partido(
     
     await db.commit()
     await db.refresh(partido)
+
+    await ClasificacionService.aplicar_cambio_partido(
+        partido.liga_id, contribucion_previa, contribucion_partido(partido)
+    )
+    await live_events.publicar_partido(partido, "finalizado", clasificacion=True)
     
     # Actualizar estadísticas de equipos (force)
     await ClasificacionService.schedule_stats_updates(
-        [
-            partido.equipo_local_id,
-            partido.equipo_visitante_id,
-            partido.arbitro_id,
-            partido.tutor_grada_local_id,
-            partido.tutor_grada_visitante_id,
-        ],
-        force=True
+        partido.liga_id,
+        force=True,
     )
     
     return partido
@@ -548,6 +556,8 @@ async def registrar_acta_completa(
             },
         )
 
+    contribucion_previa = contribucion_partido(partido)
+
     # 1. Marcador y puntos deportivos
     partido.marcador = marcador
     partido.calcular_puntos_desde_marcador()
@@ -568,15 +578,14 @@ async def registrar_acta_completa(
     await db.commit()
     await db.refresh(partido)
 
+    await ClasificacionService.aplicar_cambio_partido(
+        partido.liga_id, contribucion_previa, contribucion_partido(partido)
+    )
+    await live_events.publicar_partido(partido, "finalizado", clasificacion=True)
+
     await ClasificacionService.schedule_stats_updates(
-        [
-            partido.equipo_local_id,
-            partido.equipo_visitante_id,
-            partido.arbitro_id,
-            partido.tutor_grada_local_id,
-            partido.tutor_grada_visitante_id,
-        ],
-        force=True
+        partido.liga_id,
+        force=True,
     )
 
     return partido
@@ -596,6 +605,7 @@ async def delete_partido(
         selectinload(Partido.liga),
         selectinload(Partido.equipo_local),
         selectinload(Partido.equipo_visitante),
+        selectinload(Partido.tipo_deporte),
     )
     result = await db.execute(query)
     partido = result.scalar_one_or_none()
@@ -617,9 +627,13 @@ async def delete_partido(
         ip_address=request.client.host if request.client else None,
         details={"liga_id": partido.liga_id, "finalizado": partido.finalizado},
     )
+    contribucion_previa = contribucion_partido(partido)
     await db.delete(partido)
     await db.commit()
 
+    await ClasificacionService.aplicar_cambio_partido(partido.liga_id, contribucion_previa, {})
+    await live_events.publicar_partido(partido, "eliminado", clasificacion=bool(contribucion_previa))
+
 @router.get("/{partido_id}/export/acta")
 async def export_acta_pdf(
     partido_id: int,
@@ -712,7 +726,9 @@ async def export_acta_pdf(
         "evaluacion_personalizada": evaluacion_personalizada,
     }
     
-    pdf_content = ReportService.generate_acta_partido_pdf(partido_dict)
+    pdf_content = await pdf_render_service.renderizar(
+        "acta_partido", ReportService.generate_acta_partido_pdf, partido_dict
+    )
     
     return Response(
         content=pdf_content,
@@ -776,6 +792,7 @@ async def update_evaluacion_personalizada(
     # Obtener partido con liga
     query = select(Partido).filter(Partido.id == partido_id).options(
         selectinload(Partido.liga),
+        selectinload(Partido.tipo_deporte),
         selectinload(Partido.evaluaciones_personalizadas)
     )
     result = await db.execute(query)
@@ -850,6 +867,8 @@ async def update_evaluacion_personalizada(
                 detail=f"El valor {e.valor} está fuera del rango {criterio.escala_min}-{criterio.escala_max} para {criterio.nombre}"
             )
     
+    contribucion_previa = contribucion_partido(partido)
+
     # Upsert evaluaciones
     for e in evaluaciones:
         # Buscar evaluación existente
@@ -901,19 +920,19 @@ async def update_evaluacion_personalizada(
     await db.refresh(partido)
     await db.refresh(partido, attribute_names=["evaluaciones_personalizadas"])
 
+    await ClasificacionService.aplicar_cambio_partido(
+        partido.liga_id, contribucion_previa, contribucion_partido(partido)
+    )
+    # Los criterios personalizados puntúan fuera de la contribución incremental
+    await live_events.publicar_partido(partido, "evaluacion", clasificacion=True)
+
     nueva_version = _evaluacion_personalizada_version([e for e, _ in datos_evaluacion])
     criterios_con_valores = await _build_criterios_con_valores(partido, db)
     
     # Actualizar estadísticas de equipos (throttled)
     await ClasificacionService.schedule_stats_updates(
-        [
-            partido.equipo_local_id,
-            partido.equipo_visitante_id,
-            partido.arbitro_id,
-            partido.tutor_grada_local_id,
-            partido.tutor_grada_visitante_id,
-        ],
-        throttle_seconds=5
+        partido.liga_id,
+        throttle_seconds=5,
     )
     
     return {
@@ -1077,7 +1096,9 @@ async def export_pines_calendario(
         )
 
     # PDF por defecto
-    pdf_content = ReportService.generate_pines_pdf(liga.nombre, partidos_data)
+    pdf_content = await pdf_render_service.renderizar(
+        "pines", ReportService.generate_pines_pdf, liga.nombre, partidos_data
+    )
     filename = f"pines_{liga.nombre.lower().replace(' ', '_')}.pdf"
     return Response(
         content=pdf_content,
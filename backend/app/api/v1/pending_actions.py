@@ -23,6 +23,8 @@ from app.models.liga import Liga
 from app.models.partido import Partido
 from app.api.deps import get_current_user
 from app.models.user import User
+from app.services import live_events
+from app.services.clasificacion_incremental import contribucion_partido
 from app.services.evaluacion_clasica import aplicar_evaluacion_clasica, es_evaluacion_clasica_completa
 
 router = APIRouter(prefix="/pending-actions", tags=["Pending Actions"])
@@ -122,6 +124,7 @@ async def create_pending_action(
     db.add(pending)
     await db.commit()
     await db.refresh(pending)
+    await live_events.publicar_pendientes(liga.usuario_id, liga.id, +1)
     
     return {
         **pending.__dict__,
@@ -200,49 +203,66 @@ async def count_pending_actions(
     return {"count": count}
 
 
-# Cadencia del stream de pendientes (segundos entre comprobaciones)
-STREAM_INTERVALO = 10
-
-
 @router.get("/stream")
 async def stream_pending_actions(
     liga_id: Optional[int] = None,
     current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     SSE: emite el contador de pendientes solo cuando cambia. Sustituye el
     polling HTTP de 15s del frontend por una única conexión persistente
     (el frontend degrada a polling si el stream no está disponible).
+
+    El contador se mantiene con los deltas que publican los endpoints que
+    crean o revisan gestiones (live_events.publicar_pendientes), repartidos
+    por la suscripción única del proceso. Solo se vuelve a contar en BD al
+    conectar y tras un `resync` (reconexión a Redis o cliente retrasado).
     """
     user_id = current_user.id
+    # La sesión de la petición (usada por get_current_user) no debe
+    # retener una conexión del pool durante la vida del stream
+    await db.close()
+
+    async def recontar() -> Optional[int]:
+        try:
+            async with AsyncSessionLocal() as session:
+                return await _contar_pendientes(session, user_id, liga_id)
+        except Exception:
+            return None
+
+    def evento(count: int) -> str:
+        return f"event: pendientes\ndata: {json.dumps({'count': count})}\n\n"
 
     async def eventos():
-        ultimo: Optional[int] = None
-        # Primer valor inmediato; después, comprobación cada STREAM_INTERVALO
-        while True:
-            try:
-                # Sesión corta por consulta: no retener conexiones del pool
-                # durante la vida (larga) del stream
-                async with AsyncSessionLocal() as session:
-                    count = await _contar_pendientes(session, user_id, liga_id)
-            except Exception:
-                count = ultimo
-            if count is not None and count != ultimo:
-                ultimo = count
-                yield f"event: pendientes\ndata: {json.dumps({'count': count})}\n\n"
-            else:
-                # Comentario SSE como latido: mantiene viva la conexión a
-                # través de proxies sin generar eventos en el cliente
-                yield ": ping\n\n"
-            await asyncio.sleep(STREAM_INTERVALO)
+        # Suscrito antes de contar: ningún cambio queda entre medias
+        async with live_events.difusor.suscribir(live_events.canal_pendientes(user_id)) as cola:
+            ultimo = await recontar()
+            if ultimo is not None:
+                yield evento(ultimo)
+            while True:
+                try:
+                    datos, _ = await asyncio.wait_for(cola.get(), live_events.LATIDO_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    # Comentario SSE como latido: mantiene viva la conexión a
+                    # través de proxies sin generar eventos en el cliente
+                    yield ": ping\n\n"
+                    continue
+
+                if datos["evento"] == "resync" or ultimo is None:
+                    count = await recontar()
+                elif liga_id is None or datos.get("liga_id") == liga_id:
+                    count = max(0, ultimo + int(datos.get("delta", 0)))
+                else:
+                    continue
+                if count is not None and count != ultimo:
+                    ultimo = count
+                    yield evento(count)
 
     return StreamingResponse(
         eventos(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",  # nginx: desactiva buffering para SSE
-        },
+        headers=live_events.SSE_HEADERS,
     )
 
 
@@ -273,6 +293,8 @@ async def approve_pending_action(
     
     # Apply the action based on type
     _approved_partido = None
+    _contribucion_previa = {}
+    _liga_equipos_cambiados = None
 
     if action.action_type == "logo":
         # Update team logo
@@ -289,6 +311,7 @@ async def approve_pending_action(
             if logo_url:
                 team.logo_url = str(logo_url)
                 team.logo_filename = str(logo_filename or Path(str(logo_url)).name)
+                _liga_equipos_cambiados = team.liga_id
 
     elif action.action_type == "marcador_partido":
         # Aplicar marcador propuesto por alumnos al partido
@@ -303,6 +326,7 @@ async def approve_pending_action(
         )
         partido = partido_result.scalar_one_or_none()
         if partido and action.data_json:
+            _contribucion_previa = contribucion_partido(partido)
             marcador = action.data_json.get("marcador")
             if marcador and isinstance(marcador, dict):
                 partido.marcador = marcador
@@ -323,17 +347,22 @@ async def approve_pending_action(
     
     await db.commit()
     await db.refresh(action)
+    await live_events.publicar_pendientes(current_user.id, action.liga_id, -1)
+
+    if _liga_equipos_cambiados is not None:
+        from app.services.clasificacion_service import ClasificacionService
+        await ClasificacionService.invalidar_cache(_liga_equipos_cambiados)
 
     if _approved_partido is not None:
         from app.services.clasificacion_service import ClasificacionService
+        await ClasificacionService.aplicar_cambio_partido(
+            _approved_partido.liga_id,
+            _contribucion_previa,
+            contribucion_partido(_approved_partido),
+        )
+        await live_events.publicar_partido(_approved_partido, "finalizado", clasificacion=True)
         await ClasificacionService.schedule_stats_updates(
-            [
-                _approved_partido.equipo_local_id,
-                _approved_partido.equipo_visitante_id,
-                _approved_partido.arbitro_id,
-                _approved_partido.tutor_grada_local_id,
-                _approved_partido.tutor_grada_visitante_id,
-            ],
+            _approved_partido.liga_id,
             force=True,
         )
 
@@ -377,6 +406,7 @@ async def reject_pending_action(
     
     await db.commit()
     await db.refresh(action)
+    await live_events.publicar_pendientes(current_user.id, action.liga_id, -1)
     
     return {
         **action.__dict__,
@@ -19,11 +19,12 @@
 """
 API endpoints for Public Access (QR/PIN).
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func, select, and_
+from sqlalchemy.orm import joinedload, selectinload
 from jose import jwt, JWTError
 from datetime import datetime, timezone
 from datetime import timedelta
@@ -36,7 +37,9 @@ from app.models.pending_action import PendingAction
 from app.models.partido_nota import PartidoNota
 from app.schemas import PublicLogin, Token, LigaPublicResponse
 from app.utils.security import create_access_token
+from app.utils.versioning import etag_matches, strong_etag
 from app.config import settings
+from app.services import cache_service, live_events
 from app.services.clasificacion_service import ClasificacionService
 from app.core.rate_limit import limiter
 
@@ -45,7 +48,15 @@ PUBLIC_PIN_LENGTH = 6
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/public/login")
 
+# Vistas sondeadas por proyectores y móviles: nginx puede micro-cachearlas
+# unos segundos (Vary: Authorization) y el cliente revalida siempre con ETag
+PUBLIC_CACHE_CONTROL = "public, max-age=0, s-maxage=5, must-revalidate"
+
 async def get_public_token_payload(token: str = Depends(oauth2_scheme)):
+    return _decode_public_token(token)
+
+
+def _decode_public_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         if payload.get("scope") != "public":
@@ -63,6 +74,33 @@ async def get_public_token_payload(token: str = Depends(oauth2_scheme)):
         )
 
 
+async def _respuesta_no_modificada(
+    request: Request, response: Response, liga_id: int, vista: str
+) -> Response | None:
+    """
+    ETag fuerte a partir de la versión de datos de la liga (generación en
+    Redis, sin tocar la BD). Devuelve un 304 si el cliente ya tiene esta
+    versión; si no, deja las cabeceras en `response` y devuelve None.
+    Sin Redis no hay ETag: respuesta completa.
+
+    La versión se lee antes de construir el payload: si la liga cambia
+    entre medias, el ETag queda viejo y el siguiente sondeo recibe un 200.
+    """
+    version = await cache_service.version_liga(liga_id)
+    if version is None:
+        return None
+    etag = strong_etag("public", vista, liga_id, version)
+    cabeceras = {
+        "ETag": etag,
+        "Cache-Control": PUBLIC_CACHE_CONTROL,
+        "Vary": "Authorization",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+    response.headers.update(cabeceras)
+    return None
+
+
 def _normalize_pin(pin: str | None) -> str | None:
     if not pin:
         return None
@@ -132,6 +170,8 @@ async def find_league_by_pin(
 @router.get("/ligas/{liga_id}", response_model=LigaPublicResponse)
 async def get_public_liga(
     liga_id: int,
+    request: Request,
+    response: Response,
     payload: dict = Depends(get_public_token_payload),
     db: AsyncSession = Depends(get_db)
 ):
@@ -140,16 +180,27 @@ async def get_public_liga(
     """
     if payload.get("liga_id") != liga_id:
         raise HTTPException(status_code=403, detail="Token no válido para esta liga")
-        
-    liga = await db.get(Liga, liga_id)
-    if not liga:
+
+    no_modificada = await _respuesta_no_modificada(request, response, liga_id, "liga")
+    if no_modificada is not None:
+        return no_modificada
+
+    async def _datos_liga():
+        liga = await db.get(Liga, liga_id)
+        if not liga:
+            return None
+        return LigaPublicResponse.model_validate(liga).model_dump(mode="json")
+
+    datos = await cache_service.obtener_o_calcular(liga_id, "liga_publica", _datos_liga)
+    if datos is None:
         raise HTTPException(status_code=404, detail="Liga no encontrada")
-        
-    return liga
+    return datos
 
 @router.get("/ligas/{liga_id}/clasificacion")
 async def get_public_clasificacion(
     liga_id: int,
+    request: Request,
+    response: Response,
     payload: dict = Depends(get_public_token_payload),
     db: AsyncSession = Depends(get_db)
 ):
@@ -159,63 +210,165 @@ async def get_public_clasificacion(
     if payload.get("liga_id") != liga_id:
         raise HTTPException(status_code=403, detail="Token no válido para esta liga")
         
+    no_modificada = await _respuesta_no_modificada(request, response, liga_id, "clasificacion")
+    if no_modificada is not None:
+        return no_modificada
+
     clasificacion = await ClasificacionService.calcular_clasificacion(liga_id, db)
     return {"clasificacion": clasificacion}
 
 @router.get("/ligas/{liga_id}/jornadas")
 async def get_public_jornadas(
     liga_id: int,
+    request: Request,
+    response: Response,
+    desde: Optional[int] = Query(None, ge=1, description="Primera jornada (número, incluida)"),
+    hasta: Optional[int] = Query(None, ge=1, description="Última jornada (número, incluida)"),
+    alrededor: Optional[int] = Query(
+        None, ge=0, le=20, description="Jornadas a cada lado de la jornada en curso (sustituye a desde/hasta)"
+    ),
+    skip: int = Query(0, ge=0, description="Jornadas a saltar"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Máximo de jornadas"),
     payload: dict = Depends(get_public_token_payload),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener jornadas y partidos (vista pública).
+
+    Sin filtros devuelve la temporada completa. Con `desde`/`hasta` y
+    `skip`/`limit` (paginación por jornadas) los móviles piden solo el
+    tramo que muestran; X-Total-Count lleva el total de jornadas del rango.
+    `alrededor=N` pide la jornada en curso (la primera con partidos sin
+    finalizar, o la última si no queda ninguno) y N a cada lado.
     """
     if payload.get("liga_id") != liga_id:
         raise HTTPException(status_code=403, detail="Token no válido para esta liga")
-        
-    # Obtener jornadas
-    result = await db.execute(
-        select(Jornada).where(Jornada.liga_id == liga_id).order_by(Jornada.numero)
+
+    variante = f"{desde or ''}-{hasta or ''}-{'' if alrededor is None else alrededor}-{skip}-{limit or ''}"
+    no_modificada = await _respuesta_no_modificada(request, response, liga_id, f"jornadas:{variante}")
+    if no_modificada is not None:
+        return no_modificada
+
+    datos = await cache_service.obtener_o_calcular(
+        liga_id,
+        "jornadas_publicas",
+        lambda: _jornadas_publicas(
+            liga_id, db, desde=desde, hasta=hasta, alrededor=alrededor, skip=skip, limit=limit
+        ),
+        clave=variante,
     )
-    jornadas = result.scalars().all()
-    
-    # Obtener partidos (podría optimizarse con join)
-    result_partidos = await db.execute(
-        select(Partido)
-        .where(Partido.liga_id == liga_id)
-        .options(selectinload(Partido.tipo_deporte))
+    response.headers["X-Total-Count"] = str(datos["total"])
+    return datos["jornadas"]
+
+
+async def _jornadas_publicas(
+    liga_id: int,
+    db: AsyncSession,
+    *,
+    desde: Optional[int] = None,
+    hasta: Optional[int] = None,
+    alrededor: Optional[int] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Jornadas con sus partidos, ya serializables (se guardan en caché).
+
+    Una sola consulta ordenada (jornada, partido) con el deporte unido,
+    agrupada en una pasada. `total` es el número de jornadas del rango.
+    """
+    if alrededor is not None:
+        actual = await db.scalar(
+            select(func.min(Jornada.numero))
+            .join(Partido, Partido.jornada_id == Jornada.id)
+            .where(Jornada.liga_id == liga_id, Partido.finalizado == False)
+        )
+        if actual is None:
+            actual = await db.scalar(select(func.max(Jornada.numero)).where(Jornada.liga_id == liga_id))
+        if actual is not None:
+            desde, hasta = max(1, actual - alrededor), actual + alrededor
+
+    en_rango = [Jornada.liga_id == liga_id]
+    if desde is not None:
+        en_rango.append(Jornada.numero >= desde)
+    if hasta is not None:
+        en_rango.append(Jornada.numero <= hasta)
+
+    query = (
+        select(Jornada, Partido)
+        .outerjoin(Partido, Partido.jornada_id == Jornada.id)
+        .options(joinedload(Partido.tipo_deporte))
+        .where(*en_rango)
+        .order_by(Jornada.numero, Jornada.id, Partido.id)
     )
-    partidos = result_partidos.scalars().all()
-    
-    # Estructurar respuesta
+    paginada = skip > 0 or limit is not None
+    if paginada:
+        pagina = select(Jornada.id).where(*en_rango).order_by(Jornada.numero, Jornada.id).offset(skip)
+        if limit is not None:
+            pagina = pagina.limit(limit)
+        query = query.where(Jornada.id.in_(pagina))
+
+    result = await db.execute(query)
+
+    # Estructurar respuesta: las filas llegan agrupadas por jornada
     jornadas_data = []
-    for jornada in jornadas:
-        j_partidos = [p for p in partidos if p.jornada_id == jornada.id]
-        partidos_data = []
-        for partido in j_partidos:
-            marcador_local, marcador_visitante = partido.extraer_marcador_deportivo()
-            partidos_data.append({
-                "id": partido.id,
-                "jornada_id": partido.jornada_id,
-                "equipo_local_id": partido.equipo_local_id,
-                "equipo_visitante_id": partido.equipo_visitante_id,
-                "finalizado": partido.finalizado,
-                "puntos_local": partido.puntos_local,
-                "puntos_visitante": partido.puntos_visitante,
-                "marcador_local": marcador_local,
-                "marcador_visitante": marcador_visitante,
-            })
-
-        jornadas_data.append({
-            "id": jornada.id,
-            "nombre": jornada.nombre,
-            "numero": jornada.numero,
-            "fecha_inicio": jornada.fecha_inicio,
-            "partidos": partidos_data
+    actual = None
+    for jornada, partido in result.all():
+        if actual is None or actual["id"] != jornada.id:
+            actual = {
+                "id": jornada.id,
+                "nombre": jornada.nombre,
+                "numero": jornada.numero,
+                "fecha_inicio": jornada.fecha_inicio.isoformat() if jornada.fecha_inicio else None,
+                "partidos": []
+            }
+            jornadas_data.append(actual)
+        if partido is None:
+            continue
+        marcador_local, marcador_visitante = partido.extraer_marcador_deportivo()
+        actual["partidos"].append({
+            "id": partido.id,
+            "jornada_id": partido.jornada_id,
+            "equipo_local_id": partido.equipo_local_id,
+            "equipo_visitante_id": partido.equipo_visitante_id,
+            "finalizado": partido.finalizado,
+            "puntos_local": partido.puntos_local,
+            "puntos_visitante": partido.puntos_visitante,
+            "marcador_local": marcador_local,
+            "marcador_visitante": marcador_visitante,
         })
 
-    return jornadas_data
+    total = len(jornadas_data)
+    if paginada:
+        total = await db.scalar(select(func.count()).select_from(Jornada).where(*en_rango)) or 0
+    return {"total": total, "jornadas": jornadas_data}
+
+
+@router.get("/ligas/{liga_id}/stream")
+async def stream_public_liga(
+    liga_id: int,
+    request: Request,
+    token: Optional[str] = None,
+):
+    """
+    SSE de la liga en directo: marcadores, clasificación y propuestas.
+    EventSource no permite cabeceras, así que el token público puede ir
+    en la query (?token=) además de en Authorization.
+    """
+    if not token:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    payload = _decode_public_token(token)
+    if payload.get("liga_id") != liga_id:
+        raise HTTPException(status_code=403, detail="Token no válido para esta liga")
+
+    return StreamingResponse(
+        live_events.stream_sse(live_events.canal_liga(liga_id)),
+        media_type="text/event-stream",
+        headers=live_events.SSE_HEADERS,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -394,6 +547,47 @@ async def get_partido_by_pin(
     }
 
 
+@router.get("/partido/{pin}/stream")
+@limiter.limit("30/minute")
+async def stream_partido_by_pin(
+    request: Request,
+    pin: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    SSE del partido en directo (marcador y propuestas). Mismo acceso que
+    GET /partido/{pin}.
+    """
+    normalized = _normalize_pin(pin)
+    if not normalized:
+        raise HTTPException(status_code=400, detail="PIN inválido (debe tener 6 dígitos)")
+
+    result = await db.execute(
+        select(Partido.id, Partido.liga_id, Partido.finalizado, Partido.pin_valid_until)
+        .where(Partido.pin == normalized)
+    )
+    partido = result.one_or_none()
+    # El stream puede durar toda la clase: no retener la conexión del pool
+    await db.close()
+
+    if not partido:
+        raise HTTPException(status_code=404, detail="Partido no encontrado")
+    if partido.pin_valid_until and datetime.now(timezone.utc) > partido.pin_valid_until:
+        raise HTTPException(status_code=410, detail="El acceso a este partido ha expirado")
+    if partido.finalizado:
+        raise HTTPException(status_code=400, detail="Este partido ya está finalizado")
+
+    partido_id = partido.id
+    return StreamingResponse(
+        live_events.stream_sse(
+            live_events.canal_liga(partido.liga_id),
+            filtro=lambda evento: evento.get("partido_id") == partido_id,
+        ),
+        media_type="text/event-stream",
+        headers=live_events.SSE_HEADERS,
+    )
+
+
 @router.post("/partido/{pin}/marcador", status_code=status.HTTP_202_ACCEPTED)
 @limiter.limit("10/minute")
 async def submit_marcador_via_pin(
@@ -502,6 +696,13 @@ async def submit_marcador_via_pin(
         await db.commit()
         await db.refresh(pending)
         pending_id = pending.id
+        await live_events.publicar_pendientes(partido.liga.usuario_id, partido.liga_id, +1)
+
+    await live_events.publicar(
+        live_events.canal_liga(partido.liga_id),
+        "propuesta",
+        {"partido_id": partido.id, "pending_id": pending_id},
+    )
 
     return {
         "message": "Marcador enviado correctamente. El/la docente verificará el resultado.",
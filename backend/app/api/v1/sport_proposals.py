@@ -30,6 +30,7 @@ from app.schemas.tipo_deporte import TipoDeporteResponse
 from app.api.deps import get_current_superuser, get_current_user
 from app.models.user import User
 from app.services.sport_integration import integrar_propuesta
+from app.services.submission_policy_service import analyze_text_for_policy
 from app.config import settings
 from app.core.rate_limit import limiter
 import httpx
@@ -92,6 +93,22 @@ async def create_sport_proposal(
     """
     Submit a new sport proposal.
     """
+    # Mismo filtro de lenguaje que las fichas de juego (matcher compilado y cacheado)
+    text_policy = analyze_text_for_policy(
+        proposal.nombre,
+        proposal.descripcion or "",
+        proposal.caracteristicas_adicionales or "",
+        custom_blocklist=settings.SUBMISSION_BLOCKLIST_TERMS,
+    )
+    if text_policy.blocked:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                "POLICY_BLOCKED_LANGUAGE: El texto contiene lenguaje no permitido para un entorno "
+                "educativo. Revísalo y vuelve a intentarlo."
+            ),
+        )
+
     db_proposal = SportProposal(
         nombre=proposal.nombre,
         tipo_marcador=proposal.tipo_marcador,
@@ -20,6 +20,7 @@ from typing import List, Optional
 from app.database import get_db
 from app.models import Equipo, Liga
 from app.models.pending_action import PendingAction
+from app.services import live_events
 from app.services.image_service import ImageService
 from app.services.email_service import send_email
 from app.services.team_contract_pdf import generate_team_contract_pdf
@@ -84,7 +85,7 @@ async def submit_team_logo_proposal(
             detail="La edición de logo no está habilitada para esta liga",
         )
 
-    logo_url = ImageService.save_team_logo_data_url(logo_data_url, equipo.id)
+    logo_url = await ImageService.save_team_logo_data_url(logo_data_url, equipo.id)
     pending = PendingAction(
         action_type="logo",
         status="pending",
@@ -102,6 +103,7 @@ async def submit_team_logo_proposal(
     db.add(pending)
     await db.commit()
     await db.refresh(pending)
+    await live_events.publicar_pendientes(liga.usuario_id, liga.id, +1)
 
     return {
         "message": "Propuesta de logo enviada correctamente. El profesorado la revisará.",
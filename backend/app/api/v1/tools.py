@@ -12,13 +12,17 @@
 API de herramientas auxiliares - Generador de Fichas de Juegos
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Depends, Request, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Depends, Request, Response
 from typing import Optional
+import asyncio
+import io
 import secrets
 import os
 import json
 import logging
 
+from PIL import Image
+
 _tools_logger = logging.getLogger(__name__)
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -28,16 +32,12 @@ from app.database import get_db
 from app.models.liga import Liga
 from app.models.game_submission import GameSubmission
 from app.models.tipo_deporte import TipoDeporte
-from app.services.email_service import send_email
-from app.services.pdf_generator import generate_game_sheet_pdf
-from app.services.nextcloud_service import nextcloud_service, NextcloudService
+from app.services import game_sheet_jobs
 from app.services.submission_policy_service import (
-    analyze_drawing_for_policy,
     analyze_text_for_policy,
     build_daily_fingerprint,
     resolve_client_ip,
 )
-from app.core.cryptography import crypto
 from app.core.rate_limit import limiter
 from app.config import settings
 from app.utils.upload_validation import validate_upload_file
@@ -57,51 +57,33 @@ GRAPHICS_EXTENSION_MAP = {
 }
 
 
-def _normalize_identity(value: str | None) -> str:
-    return (value or "").strip().lower()
-
-
-def _load_allowed_nextcloud_identities() -> set[str]:
-    allowed: set[str] = set()
+def _verificar_imagen(content: bytes) -> bool:
+    """Comprobación rápida de que el dibujo se decodifica (el análisis va en el job)."""
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
 
-    # `NEXTCLOUD_ALLOWED_EMAIL` is kept for backward compatibility.
-    raw_values = [
-        settings.NEXTCLOUD_ALLOWED_IDENTITIES,
-        settings.NEXTCLOUD_ALLOWED_EMAIL,
-        settings.NEXTCLOUD_USERNAME,  # Useful when owner code matches legacy admin username.
-    ]
 
-    for raw in raw_values:
-        if not raw:
-            continue
-        for token in raw.split(","):
-            normalized = _normalize_identity(token)
-            if normalized:
-                allowed.add(normalized)
+def _guardar_grafico(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
 
-    return allowed
 
+def _detectar_idioma(text: str) -> str:
+    from langdetect import detect
 
-def _can_use_global_nextcloud(liga: Liga) -> bool:
-    allowed_identities = _load_allowed_nextcloud_identities()
-    if not allowed_identities:
-        return False
-
-    owner = liga.usuario
-    candidate_identities = {
-        _normalize_identity(liga.email_fichas),
-        _normalize_identity(getattr(owner, "email", None)),
-        _normalize_identity(getattr(owner, "codigo", None)),
-    }
-
-    return any(candidate and candidate in allowed_identities for candidate in candidate_identities)
+    return detect(text)
 
 
 @router.post("/send-game-sheet", status_code=status.HTTP_202_ACCEPTED)
 @limiter.limit("5/minute")  # Maximum 5 requests per minute per IP
 async def send_game_sheet(
     request: Request,
-    background_tasks: BackgroundTasks,
+    response: Response,
     # Datos estructurados
     liga_id: int = Form(...),
     student_name: str = Form(...),      # Solo para PDF del docente, NO se almacena
@@ -186,14 +168,13 @@ async def send_game_sheet(
 
     if required_lang and required_lang != "all":
         try:
-            from langdetect import detect
-            
             # Combinar texto para mejor detección
             text_to_analyze = f"{game_name} {reglas} {materiales}"
             
             # Solo verificar si hay suficiente texto para ser fiable (> 50 chars)
             if len(text_to_analyze) > 50:
-                detected = detect(text_to_analyze)
+                # langdetect es CPU puro: fuera del bucle de eventos
+                detected = await asyncio.to_thread(_detectar_idioma, text_to_analyze)
                 
                 # Mapeo de códigos de idioma si es necesario
                 # langdetect usa ISO 639-1 (en, es, gl, etc.)
@@ -234,10 +215,8 @@ async def send_game_sheet(
     # ═══════════════════════════════════════════════════════════════════
     # 2. PROCESAR REPRESENTACIÓN GRÁFICA (imagen del canvas)
     # ═══════════════════════════════════════════════════════════════════
+    # Aquí solo se valida y se guarda; el análisis de moderación va en el job
     graphics_path = None
-    graphics_content = None
-    moderation_required = False
-    moderation_flags: dict[str, object] = {}
     
     if representacion_grafica:
         validate_upload_file(
@@ -248,36 +227,23 @@ async def send_game_sheet(
         )
         content = await representacion_grafica.read()
 
-        # Crear directorio si no existe
-        os.makedirs(GRAPHICS_PATH, exist_ok=True)
-        
+        if not await asyncio.to_thread(_verificar_imagen, content):
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    "El archivo de dibujo no pudo procesarse. Intenta crear de nuevo el dibujo "
+                    "y vuelve a enviarlo."
+                ),
+            )
+
         # Generar nombre único
         token_graphics = secrets.token_urlsafe(16)
         ext = GRAPHICS_EXTENSION_MAP.get(representacion_grafica.content_type or "", "png")
         graphics_filename = f"{token_graphics}.{ext}"
         graphics_path = os.path.join(GRAPHICS_PATH, graphics_filename)
         
-        # Guardar imagen
-        with open(graphics_path, "wb") as f:
-            f.write(content)
-        
-        graphics_content = content  # Para incluir en PDF
-
-        drawing_policy = analyze_drawing_for_policy(content)
-        if drawing_policy.flagged:
-            if "image_decode_error" in drawing_policy.reasons:
-                raise HTTPException(
-                    status_code=400,
-                    detail=(
-                        "El archivo de dibujo no pudo procesarse. Intenta crear de nuevo el dibujo "
-                        "y vuelve a enviarlo."
-                    ),
-                )
-            moderation_required = True
-            moderation_flags["drawing"] = {
-                "reasons": drawing_policy.reasons,
-                "metrics": drawing_policy.metrics,
-            }
+        # Guardar imagen (el worker la lee del volumen compartido)
+        await asyncio.to_thread(_guardar_grafico, graphics_path, content)
     
     # ═══════════════════════════════════════════════════════════════════
     # 3. PARSEAR PICTOGRAMAS
@@ -327,8 +293,8 @@ async def send_game_sheet(
         policy_notice_version=notice_version,
         policy_notice_accepted=policy_notice_accepted,
         community_guidelines_accepted=community_guidelines_accepted,
-        moderation_required=moderation_required,
-        moderation_flags=moderation_flags or None,
+        moderation_required=False,  # lo decide el job de moderación
+        moderation_flags=None,
         content_fingerprint=content_fingerprint,
         is_public=False,
         aviso_enviado=False
@@ -339,129 +305,70 @@ async def send_game_sheet(
     await db.refresh(new_submission)
     
     # ═══════════════════════════════════════════════════════════════════
-    # 5. GENERAR PDF FIRMADO (para el docente, con nombre alumno)
+    # 5. ENCOLAR MODERACIÓN, PDF Y EMAIL (jobs arq)
     # ═══════════════════════════════════════════════════════════════════
     # Determinar idioma del PDF basado en configuración de la liga
     pdf_language = required_lang if required_lang and required_lang != "all" else "es"
 
-    pdf_content = await generate_game_sheet_pdf(
-        title=game_name,
-        student_name=student_name,  # Solo en versión del docente
-        sport_name=sport_name,
-        liga_name=liga.nombre,
-        materiales=materiales,
-        reglas=reglas,
-        graphics_content=graphics_content,
-        pictos_materiales=pictos_materiales,
-        pictos_reglas=pictos_reglas,
-        is_anonymous=False,
-        language=pdf_language
-    )
-    
-    # ═══════════════════════════════════════════════════════════════════
-    # 6. PREPARAR Y ENVIAR EMAIL
-    # ═══════════════════════════════════════════════════════════════════
-    api_url = os.getenv("API_URL", "https://liga.edumind.es/api/v1")
-    publish_link = f"{api_url}/game-resources/publish/{token_hash}"
-    
-    subject = f"🎮 Ficha de Juego: {game_name} - {student_name}"
-    moderation_note = ""
-    if moderation_required:
-        drawing_reasons = moderation_flags.get("drawing", {})
-        reasons_text = ", ".join(drawing_reasons.get("reasons", [])) if isinstance(drawing_reasons, dict) else ""
-        moderation_note = (
-            "\n"
-            "⚠️ REVISIÓN AUTOMÁTICA:\n"
-            "Se ha detectado contenido visual potencialmente sensible. "
-            f"Motivos: {reasons_text or 'revisión manual recomendada'}.\n"
-        )
-
-    body = f"""
-    Hola Docente,
-    
-    Un alumno/a ha creado una ficha de juego a través de Liga EDUmind.
-    
-    📝 DATOS DE LA FICHA:
-    • Alumno/a: {student_name}
-    • Juego: {game_name}
-    • Liga: {liga.nombre}
-    {f'• Deporte: {sport_name}' if sport_name else ''}
-    {moderation_note}
-    
-    Adjunto encontrarás el PDF con la ficha completa.
-    
-    ════════════════════════════════════════════════════
-    🌐 WIKI DE JUEGOS (OPCIÓN PÚBLICA)
-    
-    Si consideras que este juego es de calidad y quieres compartirlo
-    en la Wiki de Juegos de Liga EDUmind, haz clic en el siguiente enlace.
-    
-    La versión publicada será completamente ANÓNIMA (sin datos del alumno).
-    Podrás elegir si incluir tu nombre como docente contribuidor.
-    
-    👉 PUBLICAR EN WIKI: {publish_link}
-    
-    ⚠️ Este enlace caducará en 45 días si no se activa.
-    ════════════════════════════════════════════════════
-    
-    Gracias por usar Liga EDUmind.
-    """
-    
-    filename = f"Ficha_{game_name.replace(' ', '_')}.pdf"
-
-    # Encolar email (el worker arq registra el resultado en la ficha)
-    await send_email(
-        to_email=liga.email_fichas,
-        subject=subject,
-        body=body,
-        attachments=[(pdf_content, filename)],
-        submission_id=new_submission.id,
-    )
-    
-    # Subir a Nextcloud Xunta (evidencias) en background
-    # Subir a Nextcloud Xunta (evidencias) en background
-    # Lógica de soporte Multi-usuario
-    nextcloud_target = None
-    
-    # 1. Intentar usar configuración PERSONAL del docente
-    if liga.usuario and liga.usuario.nextcloud_url:
-        try:
-            plain_pass = crypto.decrypt(liga.usuario.nextcloud_password_enc)
-            if plain_pass:
-                # Instanciar cliente específico
-                personal_service = NextcloudService(
-                    username=liga.usuario.nextcloud_user,
-                    password=plain_pass,
-                    url=liga.usuario.nextcloud_url
-                )
-                if personal_service.is_configured:
-                    nextcloud_target = personal_service
-                    # print(f"Using Personal Nextcloud for User {liga.usuario.id}")
-        except Exception as e:
-            print(f"Error preparing Personal Nextcloud: {e}")
-
-    # 2. Si no hay personal, intentar GLOBAL (Legacy/Admin) - Solo si cumple restricción de seguridad
-    if not nextcloud_target and nextcloud_service.is_configured:
-        if _can_use_global_nextcloud(liga):
-            nextcloud_target = nextcloud_service
-            # print("Using Global Nextcloud (Email match)")
-
-    # 3. Ejecutar subida
-    if nextcloud_target:
-        background_tasks.add_task(
-            nextcloud_target.upload_evidence,
-            pdf_content=pdf_content,
-            liga_name=liga.nombre,
-            student_name=student_name,
-            game_name=game_name
-        )
-    
-    base_message = "Ficha enviada correctamente. El docente recibirá el enlace para publicarla en la Wiki."
-    if moderation_required:
-        base_message += " La ficha quedó marcada para revisión preventiva del profesorado."
+    job_id = secrets.token_urlsafe(16)
+    datos = {
+        "submission_id": new_submission.id,
+        "liga_id": liga.id,
+        "liga_nombre": liga.nombre,
+        "email_fichas": liga.email_fichas,
+        "token_hash": token_hash,
+        "student_name": student_name,  # Solo viaja en el job, NO se almacena
+        "game_name": game_name,
+        "sport_name": sport_name,
+        "materiales": materiales,
+        "reglas": reglas,
+        "graphics_path": graphics_path,
+        "pictos_materiales": pictos_materiales,
+        "pictos_reglas": pictos_reglas,
+        "language": pdf_language,
+    }
+    if not await game_sheet_jobs.encolar_ficha(job_id, datos):
+        # Sin cola: se procesa aquí y se responde ya con el estado final
+        estado = await game_sheet_jobs.procesar_en_proceso(datos)
+        response.status_code = status.HTTP_200_OK
+        return {
+            "message": "Ficha recibida. El docente la recibirá por email en unos instantes.",
+            "job_id": None,
+            "status_url": None,
+            **estado,
+        }
 
     return {
-        "message": base_message,
+        "message": "Ficha recibida. El docente la recibirá por email en unos instantes.",
         "submission_id": new_submission.id,
-        "moderation_required": moderation_required,
+        "job_id": job_id,
+        "estado": game_sheet_jobs.EN_COLA,
+        "status_url": f"/api/v1/tools/send-game-sheet/{job_id}",
     }
+
+
+@router.get("/send-game-sheet/{job_id}")
+@limiter.limit("60/minute")
+async def send_game_sheet_status(
+    request: Request,
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Progreso de un envío: en_cola → moderando → generando_pdf →
+    email_en_cola → completado (o error). El último paso lo registra el
+    worker de emails en la ficha.
+    """
+    estado = await game_sheet_jobs.leer_estado(job_id)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Envío no encontrado o caducado.")
+
+    if estado["estado"] == game_sheet_jobs.EMAIL_EN_COLA and estado["submission_id"]:
+        submission = await db.get(GameSubmission, estado["submission_id"])
+        if submission and submission.email_enviado:
+            estado["estado"] = game_sheet_jobs.COMPLETADO
+        elif submission and submission.email_error:
+            estado["estado"] = game_sheet_jobs.ERROR
+            estado["error"] = "No se pudo enviar el email al docente."
+
+    return {"job_id": job_id, **estado}
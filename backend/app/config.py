@@ -71,6 +71,27 @@ class Settings(BaseSettings):
     # Cola de emails (arq). DB /2 para no chocar con el rate limit (/1)
     # ni con el pool general (/0)
     EMAIL_QUEUE_REDIS_URL: str = "redis://localhost:6379/2"
+
+    # Cola de recálculo de estadísticas (arq). Misma DB que los emails,
+    # cola propia (arq:stats) y worker propio (app/workers/stats_worker.py)
+    STATS_QUEUE_REDIS_URL: str = "redis://localhost:6379/2"
+
+    # Cola de fichas de juego (arq:fichas): moderación, PDF y email de
+    # /tools/send-game-sheet (app/workers/game_sheet_worker.py)
+    GAME_SHEET_QUEUE_REDIS_URL: str = "redis://localhost:6379/2"
+
+    # Render de PDFs (app/services/pdf_render_service.py): procesos del pool
+    # (0 = en un hilo, tests/desarrollo) y documentos en espera antes de 503
+    PDF_RENDER_PROCESSES: int = 2
+    PDF_RENDER_QUEUE_MAX: int = 8
+
+    # Sentencias SQL a partir de estos ms van al log de consultas lentas
+    # (app/core/sql_instrumentation.py); 0 lo desactiva
+    SLOW_QUERY_MS: int = 250
+
+    # Bucle de eventos bloqueado al menos estos ms: aviso en el log con la
+    # pila del hilo del bucle (app/services/runtime_health.py); 0 lo desactiva
+    LOOP_BLOCK_WARN_MS: int = 200
     
     # Frontend
     FRONTEND_URL: str = "https://liga.edumind.es"
@@ -87,6 +108,8 @@ class Settings(BaseSettings):
     
     # Storage
     UPLOAD_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "uploads")
+    # Pictogramas ARASAAC ya comprimidos (app/services/pictogram_cache.py)
+    PICTOGRAM_CACHE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "pictogramas")
     MAX_UPLOAD_SIZE_MB: int = 5
     MAX_REQUEST_SIZE_MB: int = 8
     SUBMISSION_POLICY_NOTICE_VERSION: str = "2026-04-02"
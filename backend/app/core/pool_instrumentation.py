@@ -0,0 +1,70 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Pool de conexiones de BD instrumentado.
+
+El pool (4 workers × (5 + 5) conexiones, pool_timeout=30, ver
+app/database.py) es el principal límite de escala: cuando se agota, las
+peticiones esperan una conexión hasta pool_timeout. PoolInstrumentado es
+el AsyncAdaptedQueuePool de siempre con contadores de esa espera:
+corrutinas esperando ahora mismo, histograma del tiempo hasta obtener la
+conexión y timeouts. Solo cuenta como esperando el checkout que llega
+con el pool agotado: abrir una conexión nueva o tomar una libre no es
+esperar. Lo expone app/services/runtime_health.py.
+"""
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Límites superiores (s) del histograma de espera; +Inf implícito
+BUCKETS_ESPERA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class EstadisticasEspera:
+    """Espera para obtener conexión del pool (acumulada desde el arranque)."""
+
+    def __init__(self):
+        self.esperando = 0
+        self.timeouts = 0
+        self.buckets = [0] * (len(BUCKETS_ESPERA) + 1)
+        self.suma = 0.0
+
+    def observar(self, segundos: float) -> None:
+        indice = next((i for i, limite in enumerate(BUCKETS_ESPERA) if segundos <= limite), len(BUCKETS_ESPERA))
+        self.buckets[indice] += 1
+        self.suma += segundos
+
+
+class PoolInstrumentado(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que mide la espera de cada checkout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.espera = EstadisticasEspera()
+
+    def _agotado(self) -> bool:
+        # max_overflow=-1: sin límite, nunca se espera
+        return self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+
+    def _do_get(self):
+        # Solo espera quien no encuentra conexión libre ni hueco para abrir
+        # otra; el histograma sí recoge todos los checkouts
+        espera = self._agotado()
+        if espera:
+            self.espera.esperando += 1
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.espera.timeouts += 1
+            raise
+        finally:
+            if espera:
+                self.espera.esperando -= 1
+            self.espera.observar(time.perf_counter() - inicio)
@@ -0,0 +1,128 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Instrumentación de las sentencias SQL por petición.
+
+Los hooks del engine (registrados en app/database.py) atribuyen cada
+sentencia a la petición en curso a través de una ContextVar que abre
+MetricsMiddleware (app/services/metrics_service.py). Con el número de
+sentencias y el tiempo en BD de cada petición:
+
+- en DEBUG, cabeceras X-DB-Query-Count y X-DB-Time-Ms en la respuesta;
+- histogramas por ruta en /api/metrics/prometheus;
+- log de sentencias lentas (SLOW_QUERY_MS) con el SQL normalizado y la
+  forma de los parámetros: tipos, nunca valores (pueden ser datos de
+  alumnos).
+
+Fuera de una petición (workers arq, scripts) solo aplica el log de
+sentencias lentas.
+"""
+import logging
+import re
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConsultasPeticion:
+    """Sentencias SQL ejecutadas durante una petición."""
+    sentencias: int = 0
+    segundos: float = 0.0
+
+
+_peticion_actual: ContextVar[Optional[ConsultasPeticion]] = ContextVar("consultas_peticion", default=None)
+
+
+def iniciar_peticion() -> tuple[ConsultasPeticion, Token]:
+    """Abre el contador de la petición en curso (cerrar con terminar_peticion)."""
+    consultas = ConsultasPeticion()
+    return consultas, _peticion_actual.set(consultas)
+
+
+def terminar_peticion(token: Token) -> None:
+    _peticion_actual.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Normalización para el log
+# ---------------------------------------------------------------------------
+
+# Marcadores de parámetro de los drivers: ? (sqlite), $1 (asyncpg), %(x)s / %s
+_MARCADOR = r"(?:\?|\$\d+|%\(\w+\)s|%s)"
+_MARCADORES = re.compile(_MARCADOR)
+# IN (?, ?, ?, ...) expandidos: su longitud varía con los datos
+_LISTA_MARCADORES = re.compile(rf"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql: str) -> str:
+    """SQL en una línea, con literales y marcadores como ? y las listas IN colapsadas."""
+    sql = _ESPACIOS.sub(" ", sql).strip()
+    sql = _MARCADORES.sub("?", sql)
+    sql = _LITERALES.sub("?", sql)
+    return _LISTA_MARCADORES.sub("(?, ...)", sql)
+
+
+def _tipo(valor: Any) -> str:
+    return "None" if valor is None else type(valor).__name__
+
+
+def forma_parametros(parametros: Any, executemany: bool = False) -> str:
+    """Tipos de los parámetros ligados, sin sus valores."""
+    if executemany and parametros:
+        return f"{len(parametros)} x {forma_parametros(parametros[0])}"
+    if isinstance(parametros, dict):
+        return "{" + ", ".join(f"{nombre}: {_tipo(valor)}" for nombre, valor in parametros.items()) + "}"
+    if isinstance(parametros, (list, tuple)):
+        return "(" + ", ".join(_tipo(valor) for valor in parametros) + ")"
+    return _tipo(parametros)
+
+
+# ---------------------------------------------------------------------------
+# Hooks del engine
+# ---------------------------------------------------------------------------
+
+def _antes(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._inicio_sql = time.perf_counter()
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany) -> None:
+    inicio = getattr(context, "_inicio_sql", None)
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+
+    consultas = _peticion_actual.get()
+    if consultas is not None:
+        consultas.sentencias += 1
+        consultas.segundos += segundos
+
+    if settings.SLOW_QUERY_MS and segundos * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "Consulta lenta (%.1f ms): %s | parámetros: %s",
+            segundos * 1000,
+            normalizar_sql(statement),
+            forma_parametros(parameters, executemany),
+        )
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Registra los hooks en el engine síncrono (el de un AsyncEngine: engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
@@ -19,6 +19,8 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
+from app.core.pool_instrumentation import PoolInstrumentado
+from app.core.sql_instrumentation import instrumentar_engine
 import redis.asyncio as aioredis
 
 # SQLAlchemy Base
@@ -41,6 +43,8 @@ if settings.DATABASE_URL.startswith("postgresql"):
         pool_pre_ping=True,    # detecta conexiones muertas tras reinicios de Postgres
         pool_recycle=1800,     # recicla conexiones cada 30 min (evita cierres por idle)
         pool_timeout=30,
+        # Mide checkouts en espera y su duración (app/services/runtime_health.py)
+        poolclass=PoolInstrumentado,
     )
 
 engine = create_async_engine(
@@ -49,6 +53,8 @@ engine = create_async_engine(
     future=True,
     **_pool_opts,
 )
+# Sentencias y tiempo de BD por petición, log de consultas lentas
+instrumentar_engine(engine.sync_engine)
 
 # Session maker
 AsyncSessionLocal = async_sessionmaker(
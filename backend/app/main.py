@@ -48,7 +48,19 @@ async def lifespan(app: FastAPI):
             "el ciclo de vida del cifrado del secreto JWT.",
             level="warning",
         )
-    yield
+    from app.services import pdf_render_service, pictogram_cache, runtime_health
+    from app.services.metrics_service import metrics
+
+    pdf_render_service.iniciar()
+    metrics.start()
+    runtime_health.start()
+    try:
+        yield
+    finally:
+        await runtime_health.stop()
+        await metrics.stop()
+        pdf_render_service.cerrar()
+        await pictogram_cache.cerrar()
 
 
 # Create FastAPI app
@@ -190,6 +202,10 @@ app.add_middleware(
     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
 )
 
+# Métricas HTTP por plantilla de ruta: el más externo, mide toda la pila
+from app.services.metrics_service import MetricsMiddleware
+app.add_middleware(MetricsMiddleware)
+
 # Ensure upload directory exists
 logger = logging.getLogger(__name__)
 logger.info("UPLOAD_DIR: %s", settings.UPLOAD_DIR)
@@ -242,14 +258,21 @@ async def get_metrics(request: Request):
     """Get application metrics."""
     _assert_metrics_access(request)
     from app.services.metrics_service import metrics
-    return metrics.get_metrics()
+    return await metrics.get_metrics()
 
 @app.get("/api/metrics/prometheus")
 async def get_prometheus_metrics(request: Request):
     """Get Prometheus metrics."""
     _assert_metrics_access(request)
     from app.services.metrics_service import metrics
-    return PlainTextResponse(metrics.get_prometheus_metrics())
+    from app.services import cache_service, pdf_render_service, pictogram_cache, runtime_health, stats_jobs
+    lineas = [await metrics.get_prometheus_metrics()]
+    lineas += stats_jobs.lineas_prometheus(await stats_jobs.metricas_cola())
+    lineas += cache_service.lineas_prometheus()
+    lineas += pdf_render_service.lineas_prometheus()
+    lineas += pictogram_cache.lineas_prometheus()
+    lineas += await runtime_health.lineas_prometheus()
+    return PlainTextResponse("\n".join(lineas))
 
 if __name__ == "__main__":
     import uvicorn
@@ -37,6 +37,7 @@ from app.models.fase_final import FaseFinal, CruceFase
 from app.models.audit_log import AuditLog
 from app.models.league_teacher_membership import LeagueTeacherMembership
 from app.models.partido_nota import PartidoNota
+from app.models.partido_participacion import PartidoParticipacion
 
 __all__ = [
     "User",
@@ -59,4 +60,5 @@ __all__ = [
     "AuditLog",
     "LeagueTeacherMembership",
     "PartidoNota",
+    "PartidoParticipacion",
 ]
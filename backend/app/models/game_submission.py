@@ -12,10 +12,18 @@
 Modelo GameSubmission - Fichas de juego estructuradas para Wiki de Juegos.
 Almacena datos anónimos pendientes de validación docente.
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Index, event, inspect
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
+from app.utils.text import normalize_search_text
+
+# Configuración de búsqueda de texto de PostgreSQL (español + unaccent),
+# creada en la migración 033
+CONFIG_BUSQUEDA = "wiki_es"
+# Campos indexados para la búsqueda y su peso en la relevancia (A > B > C)
+CAMPOS_BUSQUEDA = (("title", "A"), ("materiales", "B"), ("reglas", "C"))
 
 
 class GameSubmission(Base):
@@ -78,6 +86,17 @@ class GameSubmission(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     published_at = Column(DateTime(timezone=True), nullable=True)  # Cuando docente activa
+
+    # Índice de búsqueda de la Wiki: tsvector en PostgreSQL, texto
+    # normalizado en otros motores. Solo en fichas públicas; se mantiene
+    # al publicar (ver _actualizar_search_vector)
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
+
+    __table_args__ = (
+        Index(
+            "ix_game_submissions_search_vector", "search_vector", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
     
     # Relaciones
     sport = relationship("TipoDeporte", backref="fichas_juego", lazy="joined")
@@ -103,3 +122,29 @@ class GameSubmission(Base):
         now = datetime.now(timezone.utc)
         delta = now - self.created_at.replace(tzinfo=timezone.utc)
         return delta.days
+
+
+def vector_busqueda(dialecto: str, ficha: GameSubmission):
+    """
+    Valor de search_vector para `ficha`: expresión tsvector con pesos en
+    PostgreSQL; en otros motores, los campos normalizados uno por línea
+    (el título en la primera, que el fallback usa para la relevancia).
+    """
+    textos = [(getattr(ficha, campo) or "", peso) for campo, peso in CAMPOS_BUSQUEDA]
+    if dialecto != "postgresql":
+        return "\n".join(normalize_search_text(texto) for texto, _ in textos)
+    vector = None
+    for texto, peso in textos:
+        parte = func.setweight(func.to_tsvector(CONFIG_BUSQUEDA, texto), peso)
+        vector = parte if vector is None else vector.op("||")(parte)
+    return vector
+
+
+@event.listens_for(GameSubmission, "before_insert")
+@event.listens_for(GameSubmission, "before_update")
+def _actualizar_search_vector(mapper, connection, ficha: GameSubmission) -> None:
+    """Recalcula search_vector al publicar o editar el texto de una ficha."""
+    attrs = inspect(ficha).attrs
+    if not any(attrs[campo].history.has_changes() for campo in ("is_public", *dict(CAMPOS_BUSQUEDA))):
+        return
+    ficha.search_vector = vector_busqueda(connection.dialect.name, ficha) if ficha.is_public else None
@@ -37,7 +37,7 @@ class Jornada(Base):
     fecha_fin = Column(DateTime(timezone=True), nullable=True)
     
     # Liga a la que pertenece
-    liga_id = Column(Integer, ForeignKey("ligas.id"), nullable=False)
+    liga_id = Column(Integer, ForeignKey("ligas.id"), nullable=False, index=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
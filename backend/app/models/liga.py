@@ -57,7 +57,7 @@ class Liga(Base):
     team_commitments = Column(JSON, nullable=True, server_default='''{"Capitán/a": ["Liderar con respeto", "Dar ejemplo", "Comunicar con el profesorado"], "Entrenador/a": ["Gestionar alineaciones", "Decidir cambios", "Organizar táctica"], "Árbitro/a": ["Ser imparcial", "Conocer las reglas", "Gestionar conflictos con calma"], "Tutor/a de grada": ["Asegurar que el equipo anime con respeto y deportividad", "Evitar insultos", "Celebrar sin humillar"], "Preparador/a físico/a": ["Ayudar en calentamiento", "Prevenir lesiones", "Motivar al equipo"]}''')
     
     # Usuario propietario
-    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
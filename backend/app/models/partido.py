@@ -20,29 +20,80 @@
 Modelo Partido - Partid multi-deporte con marcador flexible.
 """
 from typing import Tuple
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Float, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 from app.utils.versioning import stable_hash
 
+# Columnas que lee la clasificación (UNION ALL de roles): van incluidas en el
+# índice de partidos finalizados por liga para que Postgres la resuelva con
+# un index-only scan
+COLUMNAS_CLASIFICACION = (
+    "equipo_local_id",
+    "equipo_visitante_id",
+    "arbitro_id",
+    "tutor_grada_local_id",
+    "tutor_grada_visitante_id",
+    "puntos_local",
+    "puntos_visitante",
+    "resultado",
+    "puntos_juego_limpio_local",
+    "puntos_juego_limpio_visitante",
+    "puntos_arbitro",
+    "puntos_grada_local",
+    "puntos_grada_visitante",
+)
+
+
+def _indice_finalizados(nombre: str, columna: str, **kwargs) -> Index:
+    """Índice parcial sobre los partidos finalizados (los únicos que puntúan)."""
+    return Index(
+        nombre,
+        columna,
+        postgresql_where=text("finalizado"),
+        sqlite_where=text("finalizado = 1"),
+        **kwargs,
+    )
+
+
 class Partido(Base):
     """Partido entre dos equipos (multi-deporte)."""
     __tablename__ = "partidos"
+    __table_args__ = (
+        Index(
+            "uq_partidos_pin_not_null",
+            "pin",
+            unique=True,
+            postgresql_where=text("pin IS NOT NULL"),
+            sqlite_where=text("pin IS NOT NULL"),
+        ),
+        # Clasificación y estadísticas: (liga_id) WHERE finalizado
+        _indice_finalizados(
+            "ix_partidos_liga_finalizados", "liga_id", postgresql_include=list(COLUMNAS_CLASIFICACION)
+        ),
+        # Partidos de un equipo en cualquier rol (OR de cinco columnas):
+        # un índice parcial por rol para que el planner combine con BitmapOr
+        _indice_finalizados("ix_partidos_local_finalizados", "equipo_local_id"),
+        _indice_finalizados("ix_partidos_visitante_finalizados", "equipo_visitante_id"),
+        _indice_finalizados("ix_partidos_arbitro_finalizados", "arbitro_id"),
+        _indice_finalizados("ix_partidos_grada_local_finalizados", "tutor_grada_local_id"),
+        _indice_finalizados("ix_partidos_grada_visitante_finalizados", "tutor_grada_visitante_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     liga_id = Column(Integer, ForeignKey("ligas.id"), nullable=False, index=True)
     jornada_id = Column(Integer, ForeignKey("jornadas.id"), nullable=True, index=True)
-    tipo_deporte_id = Column(Integer, ForeignKey("tipos_deporte.id"), nullable=False)
+    tipo_deporte_id = Column(Integer, ForeignKey("tipos_deporte.id"), nullable=False, index=True)
     
     # Equipos participantes
     equipo_local_id = Column(Integer, ForeignKey("equipos.id"), nullable=False, index=True)
     equipo_visitante_id = Column(Integer, ForeignKey("equipos.id"), nullable=False, index=True)
     
     # Roles especiales
-    arbitro_id = Column(Integer, ForeignKey("equipos.id"), nullable=True)
-    tutor_grada_local_id = Column(Integer, ForeignKey("equipos.id"), nullable=True)
-    tutor_grada_visitante_id = Column(Integer, ForeignKey("equipos.id"), nullable=True)
+    arbitro_id = Column(Integer, ForeignKey("equipos.id"), nullable=True, index=True)
+    tutor_grada_local_id = Column(Integer, ForeignKey("equipos.id"), nullable=True, index=True)
+    tutor_grada_visitante_id = Column(Integer, ForeignKey("equipos.id"), nullable=True, index=True)
     
     # Marcador específico del deporte (JSON flexible)
     marcador = Column(JSON, nullable=False, server_default='{}')
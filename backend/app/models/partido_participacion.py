@@ -0,0 +1,164 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Modelo PartidoParticipacion — proyección normalizada de los roles de cada
+partido: una fila por (partido, rol) con el equipo que lo ocupa y los
+puntos que ese rol aporta a la clasificación.
+
+Las vistas por equipo (historial, medallas, clasificación) buscan por
+`equipo_id` con un índice en lugar de hacer OR sobre las cinco columnas de
+rol de `partidos`, y las sumas por rol son un GROUP BY.
+
+La tabla se mantiene sola: tras cada flush del ORM se regeneran las filas
+de los partidos creados, borrados o con cambios en las columnas
+proyectadas. Quien borre o inserte partidos con SQL en bloque
+(`delete(Partido)`, `insert(Partido)`) debe llamar a
+`borrar_participaciones` / `proyectar_participaciones`.
+"""
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    case,
+    delete,
+    event,
+    func,
+    inspect,
+    literal,
+    null,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.partido import COLUMNAS_CLASIFICACION, Partido
+
+LOCAL = "local"
+VISITANTE = "visitante"
+ARBITRO = "arbitro"
+GRADA_LOCAL = "grada_local"
+GRADA_VISITANTE = "grada_visitante"
+
+# Columnas de `partidos` cuyo cambio obliga a regenerar la proyección
+COLUMNAS_PROYECTADAS = ("liga_id", "finalizado", *COLUMNAS_CLASIFICACION)
+
+
+class PartidoParticipacion(Base):
+    """Rol de un equipo en un partido y los puntos que le aporta."""
+    __tablename__ = "partido_participaciones"
+
+    partido_id = Column(Integer, ForeignKey("partidos.id", ondelete="CASCADE"), primary_key=True)
+    rol = Column(String(16), primary_key=True)  # local | visitante | arbitro | grada_local | grada_visitante
+    equipo_id = Column(Integer, ForeignKey("equipos.id", ondelete="CASCADE"), nullable=False)
+    liga_id = Column(Integer, ForeignKey("ligas.id", ondelete="CASCADE"), nullable=False)
+    finalizado = Column(Boolean, nullable=False, default=False)
+
+    # Resultado desde el punto de vista del equipo (V/E/D); solo local y visitante
+    resultado = Column(String(10), nullable=True)
+    puntos = Column(Integer, nullable=False, default=0)
+    puntos_juego_limpio = Column(Integer, nullable=False, default=0)
+    puntos_arbitro = Column(Integer, nullable=False, default=0)
+    puntos_grada = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_partido_participaciones_equipo", "equipo_id", "finalizado"),
+        Index("ix_partido_participaciones_liga", "liga_id", "finalizado"),
+    )
+
+
+def _select_participaciones(*criterios):
+    """SELECT con las filas de participación de los partidos que cumplen `criterios`."""
+    cero = literal(0)
+    resultado_visitante = case(
+        (Partido.resultado == "V", literal("D")),
+        (Partido.resultado == "D", literal("V")),
+        else_=Partido.resultado,
+    )
+
+    def rol(nombre, columna, resultado, puntos, juego_limpio, arbitro, grada):
+        return select(
+            Partido.id,
+            literal(nombre),
+            columna,
+            Partido.liga_id,
+            Partido.finalizado,
+            resultado,
+            puntos,
+            juego_limpio,
+            arbitro,
+            grada,
+        ).where(*criterios, columna.isnot(None))
+
+    return union_all(
+        rol(LOCAL, Partido.equipo_local_id, Partido.resultado,
+            func.coalesce(Partido.puntos_local, 0), func.coalesce(Partido.puntos_juego_limpio_local, 0), cero, cero),
+        rol(VISITANTE, Partido.equipo_visitante_id, resultado_visitante,
+            func.coalesce(Partido.puntos_visitante, 0), func.coalesce(Partido.puntos_juego_limpio_visitante, 0), cero, cero),
+        rol(ARBITRO, Partido.arbitro_id, null(),
+            cero, cero, func.coalesce(Partido.puntos_arbitro, 0), cero),
+        rol(GRADA_LOCAL, Partido.tutor_grada_local_id, null(),
+            cero, cero, cero, func.coalesce(Partido.puntos_grada_local, 0)),
+        rol(GRADA_VISITANTE, Partido.tutor_grada_visitante_id, null(),
+            cero, cero, cero, func.coalesce(Partido.puntos_grada_visitante, 0)),
+    )
+
+
+def proyectar_participaciones(*criterios):
+    """INSERT ... SELECT de las participaciones de los partidos que cumplen `criterios`."""
+    t = PartidoParticipacion.__table__
+    return t.insert().from_select(
+        [
+            t.c.partido_id, t.c.rol, t.c.equipo_id, t.c.liga_id, t.c.finalizado,
+            t.c.resultado, t.c.puntos, t.c.puntos_juego_limpio, t.c.puntos_arbitro, t.c.puntos_grada,
+        ],
+        _select_participaciones(*criterios),
+    )
+
+
+def borrar_participaciones(*criterios):
+    """DELETE de las participaciones de los partidos que cumplen `criterios`."""
+    return delete(PartidoParticipacion).where(
+        PartidoParticipacion.partido_id.in_(select(Partido.id).where(*criterios))
+    )
+
+
+def partidos_de_equipo(equipo_id: int, roles=(LOCAL, VISITANTE)):
+    """Subconsulta con los id de los partidos en los que `equipo_id` ocupa alguno de `roles`."""
+    return select(PartidoParticipacion.partido_id).where(
+        PartidoParticipacion.equipo_id == equipo_id,
+        PartidoParticipacion.rol.in_(roles),
+    )
+
+
+def _cambia_proyeccion(partido: Partido) -> bool:
+    attrs = inspect(partido).attrs
+    return any(attrs[columna].history.has_changes() for columna in COLUMNAS_PROYECTADAS)
+
+
+@event.listens_for(Session, "after_flush")
+def _sincronizar_participaciones(session: Session, flush_context) -> None:
+    """Regenera la proyección de los partidos tocados en este flush."""
+    cambiados = {obj.id for obj in session.new if isinstance(obj, Partido)}
+    cambiados.update(
+        obj.id for obj in session.dirty if isinstance(obj, Partido) and _cambia_proyeccion(obj)
+    )
+    borrados = {obj.id for obj in session.deleted if isinstance(obj, Partido)}
+    if not cambiados and not borrados:
+        return
+
+    conn = session.connection()
+    conn.execute(
+        delete(PartidoParticipacion).where(PartidoParticipacion.partido_id.in_(cambiados | borrados))
+    )
+    if cambiados:
+        conn.execute(proyectar_participaciones(Partido.id.in_(cambiados)))
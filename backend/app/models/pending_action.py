@@ -9,7 +9,7 @@
 Modelo PendingAction - Acciones pendientes de validación.
 Tipos: logo, match_data, contract, game_submission
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum, Index
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -33,6 +33,10 @@ class ActionStatus(str, enum.Enum):
 class PendingAction(Base):
     """Acción pendiente de aprobación docente."""
     __tablename__ = "pending_actions"
+    __table_args__ = (
+        # Contador de pendientes por tipo (badge del panel docente)
+        Index("ix_pending_actions_type_status", "action_type", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -49,7 +53,7 @@ class PendingAction(Base):
     liga_id = Column(Integer, ForeignKey("ligas.id"), nullable=False, index=True)
     
     # ID del objeto destino (equipo_id, partido_id, etc.)
-    target_id = Column(Integer, nullable=False)
+    target_id = Column(Integer, nullable=False, index=True)
     
     # Datos de la solicitud en JSON (logo dataUrl, datos de partido, etc.)
     data_json = Column(JSON, nullable=True)
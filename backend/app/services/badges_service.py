@@ -17,84 +17,99 @@
 #
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import Partido, Jornada, Equipo
+from sqlalchemy import case, func, select
+from app.models import Partido, PartidoParticipacion
+from app.models.partido_participacion import ARBITRO, LOCAL, VISITANTE
 
 class BadgesService:
+    @staticmethod
+    def _query_badges(equipo_id: int):
+        """
+        Sumas por rol de los partidos finalizados del equipo (local,
+        visitante, árbitro): búsqueda por equipo_id en las participaciones
+        y GROUP BY, sin recorrer los partidos en Python.
+        """
+        pp = PartidoParticipacion
+        grada = case(
+            (pp.rol == LOCAL, func.coalesce(Partido.puntos_grada_local, 0)),
+            else_=func.coalesce(Partido.puntos_grada_visitante, 0),
+        )
+        arbitraje = (
+            func.coalesce(Partido.arbitro_conocimiento, 0)
+            + func.coalesce(Partido.arbitro_gestion, 0)
+            + func.coalesce(Partido.arbitro_apoyo, 0)
+        ) / 3.0
+        return (
+            select(
+                pp.rol,
+                func.count(),
+                func.sum(pp.puntos_juego_limpio),
+                func.min(pp.puntos_juego_limpio),
+                func.sum(grada),
+                func.sum(arbitraje),
+            )
+            .join(Partido, Partido.id == pp.partido_id)
+            .where(
+                pp.equipo_id == equipo_id,
+                pp.finalizado == True,
+                pp.rol.in_((LOCAL, VISITANTE, ARBITRO)),
+            )
+            .group_by(pp.rol)
+        )
+
     @staticmethod
     async def calculate_badges(equipo_id: int, db: AsyncSession):
         badges = []
-        
-        # Obtener todos los partidos finalizados
-        query = select(Partido).where(
-            (Partido.finalizado == True) &
-            ((Partido.equipo_local_id == equipo_id) | 
-             (Partido.equipo_visitante_id == equipo_id) |
-             (Partido.arbitro_id == equipo_id))
-        )
-        result = await db.execute(query)
-        partidos = result.scalars().all()
-        
-        if not partidos:
+
+        result = await db.execute(BadgesService._query_badges(equipo_id))
+        filas = result.all()
+        if not filas:
             return []
 
-        # Stats
-        juego_limpio_vals = []
-        grada_vals = []
-        arbitraje_vals = []
-        
-        for p in partidos:
-            if p.equipo_local_id == equipo_id:
-                juego_limpio_vals.append(p.puntos_juego_limpio_local)
-                grada_vals.append(p.puntos_grada_local)
-            elif p.equipo_visitante_id == equipo_id:
-                juego_limpio_vals.append(p.puntos_juego_limpio_visitante)
-                grada_vals.append(p.puntos_grada_visitante)
-            elif p.arbitro_id == equipo_id:
-                # Promedio arbitraje
-                c = p.arbitro_conocimiento or 0
-                g = p.arbitro_gestion or 0
-                a = p.arbitro_apoyo or 0
-                arbitraje_vals.append((c + g + a) / 3)
+        # Stats: como jugador (local o visitante) y como árbitro
+        jugados = suma_jl = suma_grada = 0
+        min_jl = avg_arb = None
+        for rol, n, jl, jl_min, grada, arbitraje in filas:
+            if rol == ARBITRO:
+                avg_arb = float(arbitraje) / n
+                continue
+            jugados += n
+            suma_jl += jl
+            suma_grada += float(grada)
+            min_jl = jl_min if min_jl is None else min(min_jl, jl_min)
 
         # 1. Escudo de Oro (Juego Limpio > 4.5 en promedio)
-        if juego_limpio_vals:
-            avg_jl = sum(juego_limpio_vals) / len(juego_limpio_vals)
-            if avg_jl >= 4.5:
-                badges.append({
-                    "id": "fair_play_gold",
-                    "name": "Escudo de Oro",
-                    "description": "Excelencia en Juego Limpio (>4.5)",
-                    "icon": "ShieldCheck",
-                    "color": "text-yellow-500"
-                })
+        if jugados and suma_jl / jugados >= 4.5:
+            badges.append({
+                "id": "fair_play_gold",
+                "name": "Escudo de Oro",
+                "description": "Excelencia en Juego Limpio (>4.5)",
+                "icon": "ShieldCheck",
+                "color": "text-yellow-500"
+            })
 
         # 2. Hinchada Ejemplar (Grada > 3.5 en promedio)
-        if grada_vals:
-            avg_grada = sum(grada_vals) / len(grada_vals)
-            if avg_grada >= 3.5:
-                badges.append({
-                    "id": "best_fans",
-                    "name": "Hinchada Ejemplar",
-                    "description": "Grada siempre respetuosa y animada (>3.5)",
-                    "icon": "Megaphone",
-                    "color": "text-green-500"
-                })
+        if jugados and suma_grada / jugados >= 3.5:
+            badges.append({
+                "id": "best_fans",
+                "name": "Hinchada Ejemplar",
+                "description": "Grada siempre respetuosa y animada (>3.5)",
+                "icon": "Megaphone",
+                "color": "text-green-500"
+            })
 
         # 3. Silbato Maestro (Arbitraje > 8.0 en promedio)
-        if arbitraje_vals:
-            avg_arb = sum(arbitraje_vals) / len(arbitraje_vals)
-            if avg_arb >= 8.0:
-                badges.append({
-                    "id": "master_referee",
-                    "name": "Silbato Maestro",
-                    "description": "Excelente desempeño arbitral (>8.0)",
-                    "icon": "Whistle", # Lucide icon name, might need mapping in frontend
-                    "color": "text-blue-500"
-                })
+        if avg_arb is not None and avg_arb >= 8.0:
+            badges.append({
+                "id": "master_referee",
+                "name": "Silbato Maestro",
+                "description": "Excelente desempeño arbitral (>8.0)",
+                "icon": "Whistle", # Lucide icon name, might need mapping in frontend
+                "color": "text-blue-500"
+            })
         
         # 4. Espíritu Deportivo (Nunca menos de 3 en JL)
-        if juego_limpio_vals and all(v >= 3 for v in juego_limpio_vals) and len(juego_limpio_vals) >= 3:
+        if min_jl is not None and min_jl >= 3 and jugados >= 3:
              badges.append({
                 "id": "sportsmanship",
                 "name": "Espíritu Deportivo",
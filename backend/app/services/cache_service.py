@@ -0,0 +1,371 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Caché compartida en Redis para las vistas de lectura de una liga.
+
+Cada liga tiene un contador de generación: las claves de sus vistas
+(jornadas públicas, datos públicos, medallas, historial...) lo incluyen,
+así que un solo INCR (`invalidar_liga`) deja obsoletas todas a la vez y
+las viejas caducan solas por TTL. La Wiki de Juegos usa el mismo
+mecanismo con un ámbito propio (obtener_o_calcular_wiki / invalidar_wiki).
+
+Contra las estampidas (toda una clase abriendo la clasificación a la vez):
+
+- single-flight: en un fallo solo un cálculo por clave, tanto dentro del
+  proceso (futuro compartido) como entre workers (lock SET NX en Redis);
+  el resto espera al valor recién guardado.
+- refresco anticipado probabilístico (XFetch): antes de caducar, alguna
+  petición aislada recalcula mientras las demás siguen sirviendo la copia.
+
+Valores serializados con orjson. Si Redis no está disponible, todo
+degrada a calcular sin caché.
+"""
+import asyncio
+import logging
+import math
+import random
+import secrets
+import time
+from collections import defaultdict
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+import redis.asyncio as aioredis
+
+from app.database import redis_pool
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SEGUNDOS = 5 * 60
+
+# Lock entre workers: lo que puede tardar un cálculo como mucho
+LOCK_TTL_MS = 10_000
+# Espera máxima al valor que calcula otro worker antes de calcularlo aquí
+ESPERA_MAX_SEGUNDOS = 2.0
+ESPERA_SONDEO_SEGUNDOS = 0.05
+
+# XFetch: >1 adelanta más el refresco, <1 lo retrasa
+BETA_REFRESCO = 1.0
+
+Calculo = Callable[[], Awaitable[Any]]
+
+
+# Ámbito de las vistas globales de la Wiki de Juegos (no dependen de una liga)
+AMBITO_WIKI = "wiki"
+
+
+def _ambito_liga(liga_id: int) -> str:
+    return f"liga:{liga_id}"
+
+
+def _clave_generacion_ambito(ambito: str) -> str:
+    return f"cache:{ambito}:generacion"
+
+
+def clave_generacion(liga_id: int) -> str:
+    return _clave_generacion_ambito(_ambito_liga(liga_id))
+
+
+def _clave_vista_ambito(ambito: str, generacion: int, vista: str, clave: str) -> str:
+    return f"cache:{ambito}:g{generacion}:{vista}:{clave}"
+
+
+def _clave_vista(liga_id: int, generacion: int, vista: str, clave: str) -> str:
+    return _clave_vista_ambito(_ambito_liga(liga_id), generacion, vista, clave)
+
+
+def serializar(valor: Any) -> bytes:
+    return orjson.dumps(valor, option=orjson.OPT_NON_STR_KEYS)
+
+
+def deserializar(datos: Any) -> Any:
+    return orjson.loads(datos)
+
+
+# ---------------------------------------------------------------------------
+# Contadores (por proceso)
+# ---------------------------------------------------------------------------
+
+_contadores: dict[str, dict[str, int]] = defaultdict(
+    lambda: {"hits": 0, "misses": 0, "refrescos": 0, "errores": 0}
+)
+
+
+def registrar(vista: str, evento: str) -> None:
+    _contadores[vista][evento] += 1
+
+
+def estadisticas() -> dict[str, dict[str, int]]:
+    """Aciertos, fallos, refrescos anticipados y errores por vista."""
+    return {vista: dict(valores) for vista, valores in _contadores.items()}
+
+
+def lineas_prometheus() -> list[str]:
+    """Exposición Prometheus de estadisticas() (contadores del proceso)."""
+    nombres = {
+        "hits": "liga_cache_hits_total",
+        "misses": "liga_cache_misses_total",
+        "refrescos": "liga_cache_early_refresh_total",
+        "errores": "liga_cache_errors_total",
+    }
+    lineas = []
+    for vista, valores in sorted(estadisticas().items()):
+        for evento, nombre in nombres.items():
+            lineas.append(f'{nombre}{{view="{vista}"}} {valores[evento]}')
+    return lineas
+
+
+# ---------------------------------------------------------------------------
+# Generaciones
+# ---------------------------------------------------------------------------
+
+async def generacion_liga(liga_id: int) -> Optional[int]:
+    """Generación actual de la liga (0 si nunca cambió; None sin Redis)."""
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+        try:
+            valor = await redis.get(clave_generacion(liga_id))
+        finally:
+            await redis.aclose()
+    except Exception:
+        logger.debug("Redis no disponible al leer generacion de liga", exc_info=True)
+        return None
+    return int(valor or 0)
+
+
+# Identifica la instancia de datos de Redis: si se vacía (FLUSH, contenedor
+# nuevo), las generaciones vuelven a 0 y las versiones no deben repetirse
+CLAVE_EPOCA = "cache:epoca"
+
+
+async def version_liga(liga_id: int) -> Optional[str]:
+    """
+    Versión de los datos de la liga, "<época>.<generación>", para ETags.
+    Cambia con cada invalidar_liga (y cada delta de clasificación). None
+    sin Redis: el llamante no debe emitir ETag.
+    """
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(CLAVE_EPOCA, secrets.token_hex(4), nx=True)
+                pipe.get(CLAVE_EPOCA)
+                pipe.get(clave_generacion(liga_id))
+                _, epoca, generacion = await pipe.execute()
+        finally:
+            await redis.aclose()
+    except Exception:
+        logger.debug("Redis no disponible al leer version de liga", exc_info=True)
+        return None
+    return f"{epoca}.{int(generacion or 0)}"
+
+
+async def _invalidar(ambito: str) -> None:
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+        try:
+            await redis.incr(_clave_generacion_ambito(ambito))
+        finally:
+            await redis.aclose()
+    except Exception:
+        logger.debug("Redis no disponible al invalidar %s", ambito, exc_info=True)
+
+
+async def invalidar_liga(liga_id: int) -> None:
+    """Invalida todas las vistas cacheadas de la liga (fallo de Redis = no-op)."""
+    await _invalidar(_ambito_liga(liga_id))
+
+
+async def invalidar_wiki() -> None:
+    """Invalida las vistas cacheadas de la Wiki de Juegos (al publicar una ficha)."""
+    await _invalidar(AMBITO_WIKI)
+
+
+# ---------------------------------------------------------------------------
+# Single-flight
+# ---------------------------------------------------------------------------
+
+# Cálculos en curso en este proceso, por clave
+_en_vuelo: dict[str, asyncio.Future] = {}
+
+
+async def _esperar_valor(redis, clave: str) -> Any:
+    """Sondea la clave mientras otro worker la calcula. None si no llega."""
+    limite = time.monotonic() + ESPERA_MAX_SEGUNDOS
+    while time.monotonic() < limite:
+        await asyncio.sleep(ESPERA_SONDEO_SEGUNDOS)
+        datos = await redis.get(clave)
+        if datos is not None:
+            return datos
+    return None
+
+
+async def calcular_una_vez(
+    redis,
+    clave: str,
+    calcular: Calculo,
+    leer: Callable[[Any], Any],
+    guardar: Callable[[Any, float], Awaitable[None]],
+) -> Any:
+    """
+    Calcula `clave` una sola vez aunque la pidan muchas peticiones a la vez.
+
+    - `calcular()` produce el valor (consulta a BD).
+    - `leer(datos)` convierte lo guardado en Redis en el valor servido.
+    - `guardar(valor, coste_segundos)` lo deja en Redis.
+
+    Los que esperan a otro worker y no ven el valor a tiempo calculan por
+    su cuenta: el lock evita la estampida, no bloquea la respuesta.
+    """
+    en_curso = _en_vuelo.get(clave)
+    if en_curso is not None:
+        try:
+            return await asyncio.shield(en_curso)
+        except Exception:
+            return await calcular()
+
+    futuro = asyncio.get_running_loop().create_future()
+    # Evita el aviso de "exception was never retrieved" si nadie esperaba
+    futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _en_vuelo[clave] = futuro
+    try:
+        valor = await _calcular_con_lock(redis, clave, calcular, leer, guardar)
+        futuro.set_result(valor)
+        return valor
+    except BaseException as exc:
+        futuro.set_exception(
+            exc if isinstance(exc, Exception) else RuntimeError("calculo interrumpido")
+        )
+        raise
+    finally:
+        _en_vuelo.pop(clave, None)
+
+
+async def _calcular_con_lock(redis, clave, calcular, leer, guardar) -> Any:
+    clave_lock = f"{clave}:lock"
+    token = secrets.token_hex(8)
+    try:
+        adquirido = await redis.set(clave_lock, token, nx=True, px=LOCK_TTL_MS)
+    except Exception:
+        logger.debug("Redis no disponible para el lock de %s", clave, exc_info=True)
+        return await calcular()
+
+    if not adquirido:
+        try:
+            datos = await _esperar_valor(redis, clave)
+        except Exception:
+            datos = None
+        if datos is not None:
+            return leer(datos)
+
+    try:
+        inicio = time.perf_counter()
+        valor = await calcular()
+        try:
+            await guardar(valor, time.perf_counter() - inicio)
+        except Exception:
+            logger.debug("Redis no disponible al guardar %s", clave, exc_info=True)
+        return valor
+    finally:
+        if adquirido:
+            with suppress(Exception):
+                # Solo se libera el lock propio (pudo caducar y tomarlo otro)
+                if await redis.get(clave_lock) == token:
+                    await redis.delete(clave_lock)
+
+
+# ---------------------------------------------------------------------------
+# Vistas de liga
+# ---------------------------------------------------------------------------
+
+def _toca_refrescar(sobre: dict) -> bool:
+    """XFetch: probabilidad de recalcular creciente al acercarse la caducidad."""
+    coste = sobre.get("c", 0.0)
+    if coste <= 0:
+        return False
+    return time.time() - coste * BETA_REFRESCO * math.log(random.random() or 1e-12) >= sobre["e"]
+
+
+async def obtener_o_calcular(
+    liga_id: int,
+    vista: str,
+    calcular: Calculo,
+    clave: Any = "",
+    ttl: int = CACHE_TTL_SEGUNDOS,
+) -> Any:
+    """
+    Devuelve la vista cacheada de la liga o la calcula con `calcular()`.
+
+    `vista` agrupa contadores y claves (p. ej. "jornadas_publicas");
+    `clave` distingue variantes dentro de la vista (equipo, página...).
+    El valor debe ser serializable con orjson.
+    """
+    return await _obtener_o_calcular(_ambito_liga(liga_id), vista, calcular, clave, ttl)
+
+
+async def obtener_o_calcular_wiki(
+    vista: str,
+    calcular: Calculo,
+    clave: Any = "",
+    ttl: int = CACHE_TTL_SEGUNDOS,
+) -> Any:
+    """Como obtener_o_calcular, para vistas de la Wiki (invalidar_wiki)."""
+    return await _obtener_o_calcular(AMBITO_WIKI, vista, calcular, clave, ttl)
+
+
+async def _obtener_o_calcular(ambito: str, vista: str, calcular: Calculo, clave: Any, ttl: int) -> Any:
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+    except Exception:
+        registrar(vista, "errores")
+        return await calcular()
+
+    try:
+        try:
+            generacion = int(await redis.get(_clave_generacion_ambito(ambito)) or 0)
+            clave_redis = _clave_vista_ambito(ambito, generacion, vista, str(clave))
+            datos = await redis.get(clave_redis)
+        except Exception:
+            logger.debug("Redis no disponible al leer vista %s", vista, exc_info=True)
+            registrar(vista, "errores")
+            return await calcular()
+
+        async def guardar(valor: Any, coste: float) -> None:
+            sobre = {"v": valor, "e": time.time() + ttl, "c": coste}
+            await redis.set(clave_redis, serializar(sobre), ex=ttl)
+
+        def leer(datos_guardados: Any) -> Any:
+            return deserializar(datos_guardados)["v"]
+
+        if datos is not None:
+            sobre = deserializar(datos)
+            if not _toca_refrescar(sobre):
+                registrar(vista, "hits")
+                return sobre["v"]
+            # Refresco anticipado: solo quien consiga el lock recalcula
+            registrar(vista, "refrescos")
+            try:
+                adquirido = await redis.set(f"{clave_redis}:lock", "1", nx=True, px=LOCK_TTL_MS)
+            except Exception:
+                adquirido = False
+            if not adquirido:
+                return sobre["v"]
+            try:
+                inicio = time.perf_counter()
+                valor = await calcular()
+                await guardar(valor, time.perf_counter() - inicio)
+                return valor
+            finally:
+                with suppress(Exception):
+                    await redis.delete(f"{clave_redis}:lock")
+
+        registrar(vista, "misses")
+        return await calcular_una_vez(redis, clave_redis, calcular, leer, guardar)
+    finally:
+        await redis.aclose()
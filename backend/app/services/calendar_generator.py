@@ -28,6 +28,7 @@ from sqlalchemy import select, delete
 from app.models.partido import Partido
 from app.models.equipo import Equipo
 from app.models.jornada import Jornada
+from app.models.partido_participacion import borrar_participaciones
 from datetime import datetime
 
 
@@ -145,7 +146,9 @@ async def generar_calendario_all_vs_all(
         for equipo in equipos
     }
     
-    # Delete existing partidos for this jornada
+    # Delete existing partidos for this jornada (bulk DELETE: the ORM hook
+    # does not see it, so drop their participation rows explicitly)
+    await db.execute(borrar_participaciones(Partido.jornada_id == jornada_id))
     await db.execute(
         delete(Partido).where(Partido.jornada_id == jornada_id)
     )
@@ -299,6 +302,7 @@ async def generar_calendario_jornada(
             uso_roles[p.tutor_grada_visitante_id]["grada"] += 1
     
     # Delete existing partidos for this jornada before generating new ones
+    await db.execute(borrar_participaciones(Partido.jornada_id == jornada_id))
     await db.execute(
         delete(Partido).where(Partido.jornada_id == jornada_id)
     )
@@ -0,0 +1,196 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Motor incremental de la clasificación.
+
+La clasificación es una suma de contribuciones independientes: cada partido
+finalizado aporta puntos a (como mucho) cinco equipos. Este módulo define
+esa contribución como única fuente de verdad, de modo que:
+
+- la reconstrucción completa (ClasificacionService.reconstruir_clasificacion)
+  suma las contribuciones de todos los partidos finalizados, y
+- un cambio en un partido se aplica como delta (contribución nueva menos la
+  anterior) sobre las filas ya calculadas, recolocando solo los equipos
+  afectados.
+
+Funciones puras, sin BD ni Redis: el almacenamiento del estado vive en
+ClasificacionService.
+"""
+from bisect import insort
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.mundos import (
+    MUNDOS,
+    MUNDO_DEPORTIVO,
+    MUNDO_ARBITRO,
+    MUNDO_GRADA,
+    MUNDO_JUEGO_LIMPIO,
+)
+
+# Agregados por equipo que se suman partido a partido
+CAMPOS_AGREGADOS = (
+    "puntos_deportivos",
+    "partidos_jugados",
+    "ganados",
+    "empatados",
+    "perdidos",
+    "puntos_juego_limpio",
+    "puntos_arbitro",
+    "puntos_grada",
+)
+
+Contribucion = Dict[int, Dict[str, float]]
+
+
+def _sumar(contribucion: Contribucion, equipo_id: Optional[int], campo: str, valor) -> None:
+    if equipo_id is None or not valor:
+        return
+    por_equipo = contribucion.setdefault(equipo_id, {})
+    por_equipo[campo] = por_equipo.get(campo, 0) + valor
+
+
+def contribucion_partido(partido) -> Contribucion:
+    """
+    Puntos que un partido aporta a cada equipo según su rol.
+    Un partido no finalizado no aporta nada.
+    """
+    contribucion: Contribucion = {}
+    if not partido.finalizado:
+        return contribucion
+
+    # Equipo local - puntos deportivos y juego limpio
+    local = partido.equipo_local_id
+    _sumar(contribucion, local, "puntos_deportivos", partido.puntos_local or 0)
+    _sumar(contribucion, local, "partidos_jugados", 1)
+    _sumar(contribucion, local, "ganados", 1 if partido.resultado == "V" else 0)
+    _sumar(contribucion, local, "empatados", 1 if partido.resultado == "E" else 0)
+    _sumar(contribucion, local, "perdidos", 1 if partido.resultado == "D" else 0)
+    _sumar(contribucion, local, "puntos_juego_limpio", partido.puntos_juego_limpio_local or 0)
+
+    # Equipo visitante - puntos deportivos y juego limpio
+    visitante = partido.equipo_visitante_id
+    _sumar(contribucion, visitante, "puntos_deportivos", partido.puntos_visitante or 0)
+    _sumar(contribucion, visitante, "partidos_jugados", 1)
+    _sumar(contribucion, visitante, "ganados", 1 if partido.resultado == "D" else 0)
+    _sumar(contribucion, visitante, "empatados", 1 if partido.resultado == "E" else 0)
+    _sumar(contribucion, visitante, "perdidos", 1 if partido.resultado == "V" else 0)
+    _sumar(contribucion, visitante, "puntos_juego_limpio", partido.puntos_juego_limpio_visitante or 0)
+
+    # Roles educativos independientes (por equipo asignado al rol)
+    _sumar(contribucion, partido.arbitro_id, "puntos_arbitro", partido.puntos_arbitro or 0)
+    _sumar(contribucion, partido.tutor_grada_local_id, "puntos_grada", partido.puntos_grada_local or 0)
+    _sumar(contribucion, partido.tutor_grada_visitante_id, "puntos_grada", partido.puntos_grada_visitante or 0)
+    return contribucion
+
+
+def diferencia(antes: Contribucion, despues: Contribucion) -> Contribucion:
+    """Delta por equipo entre dos contribuciones (omite los campos sin cambio)."""
+    delta: Contribucion = {}
+    for equipo_id in set(antes) | set(despues):
+        previo = antes.get(equipo_id, {})
+        nuevo = despues.get(equipo_id, {})
+        for campo in set(previo) | set(nuevo):
+            _sumar(delta, equipo_id, campo, nuevo.get(campo, 0) - previo.get(campo, 0))
+    return delta
+
+
+def fila_inicial(equipo_id: int, nombre: str, logo_filename: Optional[str]) -> Dict[str, Any]:
+    """Fila de clasificación de un equipo sin partidos."""
+    fila: Dict[str, Any] = {
+        "equipo_id": equipo_id,
+        "equipo_nombre": nombre,
+        "logo_filename": logo_filename,
+    }
+    for campo in CAMPOS_AGREGADOS:
+        fila[campo] = 0
+    return completar_fila(fila)
+
+
+def completar_fila(fila: Dict[str, Any]) -> Dict[str, Any]:
+    """Recalcula los campos derivados: totales y perfil por mundos."""
+    fila["puntos_educativos_total"] = (
+        fila["puntos_juego_limpio"] +
+        fila["puntos_arbitro"] +
+        fila["puntos_grada"]
+    )
+    fila["puntos_totales"] = fila["puntos_deportivos"] + fila["puntos_educativos_total"]
+    # Mapeo pedagógico definido en app/core/mundos.py
+    mundos = {m: 0.0 for m in MUNDOS}
+    mundos[MUNDO_DEPORTIVO] += fila["puntos_deportivos"]
+    mundos[MUNDO_ARBITRO] += fila["puntos_arbitro"]
+    mundos[MUNDO_GRADA] += fila["puntos_grada"]
+    mundos[MUNDO_JUEGO_LIMPIO] += fila["puntos_juego_limpio"]
+    fila["mundos"] = mundos
+    return fila
+
+
+def clave_orden(fila: Dict[str, Any]) -> tuple:
+    """
+    Orden ascendente equivalente a:
+    1. Puntos totales (desc)
+    2. Puntos deportivos (desc)
+    3. Diferencia ganados-perdidos (desc)
+    4. Puntos educativos (desc)
+    5. id de equipo (asc), para que el orden sea estable entre recálculos
+    """
+    return (
+        -fila["puntos_totales"],
+        -fila["puntos_deportivos"],
+        -(fila["ganados"] - fila["perdidos"]),
+        -fila["puntos_educativos_total"],
+        fila["equipo_id"],
+    )
+
+
+def _numerar(filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for i, fila in enumerate(filas, start=1):
+        fila["posicion"] = i
+    return filas
+
+
+def construir_clasificacion(equipos: Iterable, partidos: Iterable) -> List[Dict[str, Any]]:
+    """Reconstrucción completa: suma la contribución de cada partido."""
+    filas = {
+        equipo.id: fila_inicial(equipo.id, equipo.nombre, equipo.logo_filename)
+        for equipo in equipos
+    }
+    for partido in partidos:
+        for equipo_id, campos in contribucion_partido(partido).items():
+            fila = filas.get(equipo_id)
+            if fila is None:
+                continue
+            for campo, valor in campos.items():
+                fila[campo] += valor
+    for fila in filas.values():
+        completar_fila(fila)
+    return _numerar(sorted(filas.values(), key=clave_orden))
+
+
+def aplicar_delta(
+    clasificacion: List[Dict[str, Any]], delta: Contribucion
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Aplica un delta sobre una clasificación ya ordenada y recoloca solo las
+    filas afectadas (inserción binaria). Coste O(equipos).
+
+    Devuelve None si el delta menciona un equipo que no está en la
+    clasificación: el estado guardado ya no es fiable y hay que reconstruir.
+    """
+    if not delta:
+        return clasificacion
+    por_id = {fila["equipo_id"]: fila for fila in clasificacion}
+    if any(equipo_id not in por_id for equipo_id in delta):
+        return None
+
+    restantes = [fila for fila in clasificacion if fila["equipo_id"] not in delta]
+    for equipo_id, campos in delta.items():
+        fila = por_id[equipo_id]
+        for campo, valor in campos.items():
+            fila[campo] += valor
+        insort(restantes, completar_fila(fila), key=clave_orden)
+    return _numerar(restantes)
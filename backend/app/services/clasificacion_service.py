@@ -19,26 +19,36 @@
 """
 Servicio de clasificación para ligas.
 Acumula puntos deportivos + puntos educativos (MRPS, arbitraje, grada).
-La clasificación calculada se cachea en Redis (TTL corto + invalidación
-al actualizar estadísticas) para no recalcularla en cada petición.
+
+La clasificación se mantiene de forma incremental en Redis: cada cambio en
+un partido finalizado se aplica como delta sobre las filas guardadas
+(app/services/clasificacion_incremental.py), así que una lectura cuesta
+O(equipos) sin importar cuántos partidos se hayan jugado. La
+reconstrucción completa desde BD queda como reconciliación: se usa cuando
+no hay estado guardado (TTL, Redis reiniciado, equipos nuevos) y la puede
+lanzar un job periódico.
+
+Cada cambio incrementa además la generación de la liga en la caché
+compartida (app/services/cache_service.py), que invalida el resto de
+vistas derivadas: jornadas públicas, medallas, historial...
 """
 import asyncio
-import json
 import os
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Dict, Any, Iterable
-from app.models import Liga, Equipo, Partido
+from sqlalchemy import case, func, literal_column, select, update
+from typing import List, Dict, Any
+from app.models import Liga, Equipo, Partido, PartidoParticipacion
 from app.database import AsyncSessionLocal, redis_pool
-from app.core.mundos import (
-    MUNDOS,
-    MUNDO_DEPORTIVO,
-    MUNDO_ARBITRO,
-    MUNDO_GRADA,
-    MUNDO_JUEGO_LIMPIO,
+from app.services import cache_service, stats_jobs
+from app.services.clasificacion_incremental import (
+    Contribucion,
+    aplicar_delta,
+    construir_clasificacion,
+    diferencia,
 )
 import redis.asyncio as aioredis
+from redis.exceptions import WatchError
 
 logger = logging.getLogger(__name__)
 
@@ -48,25 +58,145 @@ class ClasificacionService:
         max(1, int(os.getenv("STATS_UPDATE_MAX_CONCURRENCY", "8")))
     )
 
-    # TTL corto: la caché se invalida además explícitamente al actualizar stats
-    CACHE_TTL_SEGUNDOS = 60
+    # El estado se mantiene con deltas; el TTL solo acota cuánto puede
+    # sobrevivir un estado desviado (p. ej. un delta perdido con Redis caído)
+    CACHE_TTL_SEGUNDOS = 15 * 60
+
+    # Reintentos de la transacción optimista (WATCH) al aplicar un delta
+    DELTA_MAX_REINTENTOS = 5
 
     @staticmethod
     def _cache_key(liga_id: int) -> str:
         return f"clasificacion:liga:{liga_id}"
 
+    @staticmethod
+    def _version_key(liga_id: int) -> str:
+        # Generación de la liga (compartida con el resto de vistas cacheadas):
+        # una reconstrucción que empezó antes de un delta no debe sobrescribir
+        # el estado con datos viejos
+        return cache_service.clave_generacion(liga_id)
+
     @staticmethod
     async def invalidar_cache(liga_id: int) -> None:
-        """Borra la clasificación cacheada de una liga (fallo de Redis = no-op)."""
+        """
+        Descarta la clasificación guardada de una liga y el resto de sus
+        vistas cacheadas; la próxima lectura la reconstruye (fallo de
+        Redis = no-op). Para cambios que no son deltas de un partido:
+        equipos, calendario, borrados en bloque.
+        """
         try:
             redis = aioredis.Redis(connection_pool=redis_pool)
             try:
-                await redis.delete(ClasificacionService._cache_key(liga_id))
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(ClasificacionService._cache_key(liga_id))
+                    pipe.incr(ClasificacionService._version_key(liga_id))
+                    await pipe.execute()
             finally:
-                await redis.close()
+                await redis.aclose()
         except Exception:
             logger.debug("Redis no disponible al invalidar clasificacion", exc_info=True)
 
+    @staticmethod
+    async def aplicar_cambio_partido(
+        liga_id: int, antes: Contribucion, despues: Contribucion
+    ) -> None:
+        """
+        Aplica a la clasificación guardada el cambio de un partido, dado como
+        su contribución antes y después (clasificacion_incremental.contribucion_partido).
+        Llamar tras el commit, también para cambios sin efecto en la
+        clasificación (p. ej. marcador de un partido en juego): invalida
+        igualmente las vistas cacheadas de la liga. Si no hay estado
+        guardado, la próxima lectura reconstruirá desde BD.
+        """
+        delta = diferencia(antes, despues)
+        if not delta:
+            await cache_service.invalidar_liga(liga_id)
+            return
+        cache_key = ClasificacionService._cache_key(liga_id)
+        version_key = ClasificacionService._version_key(liga_id)
+        try:
+            redis = aioredis.Redis(connection_pool=redis_pool)
+            try:
+                for _ in range(ClasificacionService.DELTA_MAX_REINTENTOS):
+                    try:
+                        async with redis.pipeline(transaction=True) as pipe:
+                            await pipe.watch(cache_key)
+                            guardada = await pipe.get(cache_key)
+                            nueva = aplicar_delta(cache_service.deserializar(guardada), delta) if guardada else None
+                            pipe.multi()
+                            if nueva is None:
+                                pipe.delete(cache_key)
+                            else:
+                                pipe.set(
+                                    cache_key,
+                                    cache_service.serializar(nueva),
+                                    ex=ClasificacionService.CACHE_TTL_SEGUNDOS,
+                                )
+                            pipe.incr(version_key)
+                            await pipe.execute()
+                        return
+                    except WatchError:
+                        continue
+                # Contención persistente: mejor reconstruir que dejar un delta sin aplicar
+                await ClasificacionService.invalidar_cache(liga_id)
+            finally:
+                await redis.aclose()
+        except Exception:
+            logger.debug("Redis no disponible al aplicar delta de clasificacion", exc_info=True)
+
+    @staticmethod
+    async def reconstruir_clasificacion(
+        liga_id: int, db: AsyncSession, guardar: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Reconstrucción completa desde BD (reconciliación). Si guardar=True,
+        deja el resultado como estado de la liga salvo que haya llegado un
+        delta mientras se leía la BD.
+        """
+        redis = None
+        pipe = None
+        if guardar:
+            try:
+                redis = aioredis.Redis(connection_pool=redis_pool)
+                pipe = redis.pipeline(transaction=True)
+                await pipe.watch(ClasificacionService._version_key(liga_id))
+            except Exception:
+                logger.debug("Redis no disponible al reconstruir clasificacion", exc_info=True)
+                pipe = None
+
+        try:
+            result = await db.execute(
+                select(Equipo).where(Equipo.liga_id == liga_id).order_by(Equipo.id)
+            )
+            equipos = result.scalars().all()
+            result = await db.execute(
+                select(Partido).where(
+                    Partido.liga_id == liga_id,
+                    Partido.finalizado == True
+                )
+            )
+            clasificacion = construir_clasificacion(equipos, result.scalars().all())
+
+            if pipe is not None:
+                try:
+                    pipe.multi()
+                    pipe.set(
+                        ClasificacionService._cache_key(liga_id),
+                        cache_service.serializar(clasificacion),
+                        ex=ClasificacionService.CACHE_TTL_SEGUNDOS,
+                    )
+                    await pipe.execute()
+                except WatchError:
+                    logger.debug("Clasificacion %s cambiada durante la reconstruccion; no se guarda", liga_id)
+                except Exception:
+                    logger.debug("Redis no disponible al guardar clasificacion", exc_info=True)
+            return clasificacion
+        finally:
+            if pipe is not None:
+                await pipe.reset()
+            if redis is not None:
+                await redis.aclose()
+
     @staticmethod
     async def calcular_clasificacion(
         liga_id: int, db: AsyncSession, use_cache: bool = True
@@ -81,276 +211,155 @@ class ClasificacionService:
         Returns:
             Lista de equipos ordenados por puntos totales
         """
-        # Intentar servir desde caché (fallo de Redis = calcular normal)
-        if use_cache:
+        if not use_cache:
+            return await ClasificacionService.reconstruir_clasificacion(liga_id, db, guardar=False)
+
+        # Servir el estado incremental (fallo de Redis = calcular normal)
+        cache_key = ClasificacionService._cache_key(liga_id)
+        try:
+            redis = aioredis.Redis(connection_pool=redis_pool)
+        except Exception:
+            cache_service.registrar("clasificacion", "errores")
+            return await ClasificacionService.reconstruir_clasificacion(liga_id, db)
+        try:
             try:
-                redis = aioredis.Redis(connection_pool=redis_pool)
-                try:
-                    cacheada = await redis.get(ClasificacionService._cache_key(liga_id))
-                finally:
-                    await redis.close()
-                if cacheada:
-                    return json.loads(cacheada)
+                guardada = await redis.get(cache_key)
             except Exception:
                 logger.debug("Redis no disponible al leer clasificacion", exc_info=True)
+                cache_service.registrar("clasificacion", "errores")
+                return await ClasificacionService.reconstruir_clasificacion(liga_id, db)
+            if guardada:
+                cache_service.registrar("clasificacion", "hits")
+                return cache_service.deserializar(guardada)
 
-        # Obtener todos los equipos de la liga
-        result = await db.execute(
-            select(Equipo).where(Equipo.liga_id == liga_id)
-        )
-        equipos = result.scalars().all()
-        
-        # Obtener todos los partidos finalizados
-        result = await db.execute(
-            select(Partido).where(
-                Partido.liga_id == liga_id,
-                Partido.finalizado == True
-            )
-        )
-        partidos = result.scalars().all()
-        
-        # Inicializar clasificación
-        clasificacion = {}
-        for equipo in equipos:
-            clasificacion[equipo.id] = {
-                "equipo_id": equipo.id,
-                "equipo_nombre": equipo.nombre,
-                "logo_filename": equipo.logo_filename,
-                # Puntos deportivos
-                "puntos_deportivos": 0,
-                "partidos_jugados": 0,
-                "ganados": 0,
-                "empatados": 0,
-                "perdidos": 0,
-                # Puntos educativos
-                "puntos_juego_limpio": 0,
-                "puntos_arbitro": 0,
-                "puntos_grada": 0,
-                "puntos_educativos_total": 0,
-                # Total
-                "puntos_totales": 0,
-            }
-        
-        # Procesar partidos
-        for partido in partidos:
-            # Equipo local - puntos deportivos y juego limpio
-            if partido.equipo_local_id in clasificacion:
-                cl = clasificacion[partido.equipo_local_id]
-                cl["puntos_deportivos"] += partido.puntos_local
-                cl["partidos_jugados"] += 1
+            # Sin estado: una sola reconstrucción aunque entre media clase a la vez
+            # (reconstruir_clasificacion ya guarda el resultado)
+            cache_service.registrar("clasificacion", "misses")
 
-                if partido.resultado == "V":
-                    cl["ganados"] += 1
-                elif partido.resultado == "E":
-                    cl["empatados"] += 1
-                elif partido.resultado == "D":
-                    cl["perdidos"] += 1
+            async def _sin_guardar(valor, coste):
+                return None
 
-                cl["puntos_juego_limpio"] += partido.puntos_juego_limpio_local
-
-            # Equipo visitante - puntos deportivos y juego limpio
-            if partido.equipo_visitante_id in clasificacion:
-                cv = clasificacion[partido.equipo_visitante_id]
-                cv["puntos_deportivos"] += partido.puntos_visitante
-                cv["partidos_jugados"] += 1
-
-                if partido.resultado == "D":
-                    cv["ganados"] += 1
-                elif partido.resultado == "E":
-                    cv["empatados"] += 1
-                elif partido.resultado == "V":
-                    cv["perdidos"] += 1
-
-                cv["puntos_juego_limpio"] += partido.puntos_juego_limpio_visitante
-
-            # Roles educativos independientes (por equipo asignado al rol)
-            if partido.arbitro_id and partido.arbitro_id in clasificacion:
-                clasificacion[partido.arbitro_id]["puntos_arbitro"] += partido.puntos_arbitro or 0
-            if partido.tutor_grada_local_id and partido.tutor_grada_local_id in clasificacion:
-                clasificacion[partido.tutor_grada_local_id]["puntos_grada"] += partido.puntos_grada_local or 0
-            if partido.tutor_grada_visitante_id and partido.tutor_grada_visitante_id in clasificacion:
-                clasificacion[partido.tutor_grada_visitante_id]["puntos_grada"] += partido.puntos_grada_visitante or 0
-        
-        # Calcular totales y perfil por mundos (Los Cinco Mundos EDUfis)
-        for equipo_id, datos in clasificacion.items():
-            datos["puntos_educativos_total"] = (
-                datos["puntos_juego_limpio"] +
-                datos["puntos_arbitro"] +
-                datos["puntos_grada"]
-            )
-            datos["puntos_totales"] = (
-                datos["puntos_deportivos"] +
-                datos["puntos_educativos_total"]
+            return await cache_service.calcular_una_vez(
+                redis,
+                cache_key,
+                lambda: ClasificacionService.reconstruir_clasificacion(liga_id, db),
+                cache_service.deserializar,
+                _sin_guardar,
             )
-            # Mapeo pedagógico definido en app/core/mundos.py
-            mundos = {m: 0.0 for m in MUNDOS}
-            mundos[MUNDO_DEPORTIVO] += datos["puntos_deportivos"]
-            mundos[MUNDO_ARBITRO] += datos["puntos_arbitro"]
-            mundos[MUNDO_GRADA] += datos["puntos_grada"]
-            mundos[MUNDO_JUEGO_LIMPIO] += datos["puntos_juego_limpio"]
-            datos["mundos"] = mundos
-        
-        # Ordenar por:
-        # 1. Puntos totales (desc)
-        # 2. Puntos deportivos (desc)
-        # 3. Diferencia ganados-perdidos (desc)
-        # 4. Puntos educativos (desc)
-        clasificacion_ordenada = sorted(
-            clasificacion.values(),
-            key=lambda x: (
-                x["puntos_totales"],
-                x["puntos_deportivos"],
-                x["ganados"] - x["perdidos"],
-                x["puntos_educativos_total"]
-            ),
-            reverse=True
-        )
-        
-        # Añadir posición
-        for i, equipo in enumerate(clasificacion_ordenada, start=1):
-            equipo["posicion"] = i
-
-        # Guardar en caché (fallo de Redis = no-op)
-        if use_cache:
-            try:
-                redis = aioredis.Redis(connection_pool=redis_pool)
-                try:
-                    await redis.set(
-                        ClasificacionService._cache_key(liga_id),
-                        json.dumps(clasificacion_ordenada),
-                        ex=ClasificacionService.CACHE_TTL_SEGUNDOS,
-                    )
-                finally:
-                    await redis.close()
-            except Exception:
-                logger.debug("Redis no disponible al guardar clasificacion", exc_info=True)
-
-        return clasificacion_ordenada
+        finally:
+            await redis.aclose()
     
     @staticmethod
-    async def actualizar_stats_equipo(equipo_id: int, db: AsyncSession):
+    def _query_stats_liga(liga_id: int):
         """
-        Actualiza las estadísticas denormalizadas de un equipo.
-        Se llama después de finalizar un partido.
+        Una sola consulta con las estadísticas denormalizadas de todos los
+        equipos de la liga: GROUP BY por equipo sobre las participaciones de
+        los partidos finalizados (una fila por rol, ver
+        app/models/partido_participacion.py), unido a equipos (los equipos
+        sin partidos salen a cero).
         """
-        equipo = await db.get(Equipo, equipo_id)
-        if not equipo:
-            return
-        
-        # Obtener TODOS los partidos finalizados donde el equipo participó en CUALQUIER rol
-        result = await db.execute(
-            select(Partido).where(
-                Partido.finalizado == True,
-                (
-                    (Partido.equipo_local_id == equipo_id) |
-                    (Partido.equipo_visitante_id == equipo_id) |
-                    (Partido.arbitro_id == equipo_id) |
-                    (Partido.tutor_grada_local_id == equipo_id) |
-                    (Partido.tutor_grada_visitante_id == equipo_id)
-                )
+        pp = PartidoParticipacion
+        uno, cero = literal_column("1"), literal_column("0")
+        agregados = (
+            select(
+                pp.equipo_id,
+                func.sum(pp.puntos).label("puntos"),
+                func.sum(case((pp.resultado == "V", uno), else_=cero)).label("ganados"),
+                func.sum(case((pp.resultado == "E", uno), else_=cero)).label("empatados"),
+                func.sum(case((pp.resultado == "D", uno), else_=cero)).label("perdidos"),
+                func.sum(pp.puntos_juego_limpio).label("juego_limpio"),
+                func.sum(pp.puntos_arbitro).label("arbitro"),
+                func.sum(pp.puntos_grada).label("grada"),
             )
+            .where(pp.liga_id == liga_id, pp.finalizado == True)
+            .group_by(pp.equipo_id)
+            .subquery()
         )
-        partidos = result.scalars().all()
-        
-        # Resetear stats
-        equipo.puntos_totales = 0
-        equipo.ganados = 0
-        equipo.empatados = 0
-        equipo.perdidos = 0
-        equipo.puntos_juego_limpio = 0
-        equipo.puntos_arbitro = 0
-        equipo.puntos_grada = 0
-        
-        # Acumular puntos de TODOS los roles
-        for partido in partidos:
-            # ROL 1: Equipo Local
-            if partido.equipo_local_id == equipo_id:
-                equipo.puntos_totales += partido.puntos_local
-                if partido.resultado == "V":
-                    equipo.ganados += 1
-                elif partido.resultado == "E":
-                    equipo.empatados += 1
-                elif partido.resultado == "D":
-                    equipo.perdidos += 1
-                
-                equipo.puntos_juego_limpio += partido.puntos_juego_limpio_local
-            
-            # ROL 2: Equipo Visitante
-            elif partido.equipo_visitante_id == equipo_id:
-                equipo.puntos_totales += partido.puntos_visitante
-                if partido.resultado == "D":
-                    equipo.ganados += 1
-                elif partido.resultado == "E":
-                    equipo.empatados += 1
-                elif partido.resultado == "V":
-                    equipo.perdidos += 1
-                
-                equipo.puntos_juego_limpio += partido.puntos_juego_limpio_visitante
-            
-            # ROL 3: Árbitro
-            if partido.arbitro_id == equipo_id:
-                equipo.puntos_arbitro += partido.puntos_arbitro or 0
-            
-            # ROL 4: Grada Local
-            if partido.tutor_grada_local_id == equipo_id:
-                equipo.puntos_grada += partido.puntos_grada_local or 0
-            
-            # ROL 5: Grada Visitante
-            if partido.tutor_grada_visitante_id == equipo_id:
-                equipo.puntos_grada += partido.puntos_grada_visitante or 0
-        
-        # Sumar puntos educativos al total
-        equipo.puntos_totales += (
-            equipo.puntos_juego_limpio +
-            equipo.puntos_arbitro +
-            equipo.puntos_grada
+        return (
+            select(
+                Equipo.id,
+                func.coalesce(agregados.c.puntos, 0),
+                func.coalesce(agregados.c.ganados, 0),
+                func.coalesce(agregados.c.empatados, 0),
+                func.coalesce(agregados.c.perdidos, 0),
+                func.coalesce(agregados.c.juego_limpio, 0),
+                func.coalesce(agregados.c.arbitro, 0),
+                func.coalesce(agregados.c.grada, 0),
+            )
+            .outerjoin(agregados, agregados.c.equipo_id == Equipo.id)
+            .where(Equipo.liga_id == liga_id)
         )
 
+    @staticmethod
+    async def actualizar_stats_liga(liga_id: int, db: AsyncSession) -> int:
+        """
+        Actualiza las estadísticas denormalizadas de todos los equipos de una
+        liga: una consulta agregada y un único UPDATE en bloque (executemany
+        por clave primaria). Devuelve el número de equipos actualizados.
+        """
+        result = await db.execute(ClasificacionService._query_stats_liga(liga_id))
+        filas = []
+        for equipo_id, puntos, ganados, empatados, perdidos, juego_limpio, arbitro, grada in result.all():
+            filas.append({
+                "id": equipo_id,
+                # Sumar puntos educativos al total
+                "puntos_totales": puntos + juego_limpio + arbitro + grada,
+                "ganados": ganados,
+                "empatados": empatados,
+                "perdidos": perdidos,
+                "puntos_juego_limpio": juego_limpio,
+                "puntos_arbitro": arbitro,
+                "puntos_grada": grada,
+            })
+        if filas:
+            await db.execute(update(Equipo), filas)
         await db.commit()
+        return len(filas)
 
-        # La clasificación cacheada de la liga queda obsoleta
-        await ClasificacionService.invalidar_cache(equipo.liga_id)
+    # Modo degradado (sin cola): ligas con recálculo ya programado en este proceso
+    _ligas_programadas: set = set()
 
     @staticmethod
-    async def _run_update(equipo_id: int) -> None:
+    async def _run_update(liga_id: int, espera_segundos: float) -> None:
+        # Ventana de agregación: los cambios que lleguen mientras tanto los
+        # cubre esta misma ejecución
+        if espera_segundos > 0:
+            await asyncio.sleep(espera_segundos)
+        # A partir de aquí un cambio nuevo necesita otra ejecución
+        ClasificacionService._ligas_programadas.discard(liga_id)
         async with ClasificacionService._stats_update_semaphore:
             try:
                 async with AsyncSessionLocal() as session:
-                    await ClasificacionService.actualizar_stats_equipo(equipo_id, session)
+                    await ClasificacionService.actualizar_stats_liga(liga_id, session)
             except Exception:
-                logger.exception("Error actualizando estadisticas de equipo", extra={"equipo_id": equipo_id})
+                logger.exception("Error actualizando estadisticas de liga", extra={"liga_id": liga_id})
 
     @staticmethod
     async def schedule_stats_updates(
-        equipo_ids: Iterable[int],
+        liga_id: int | None,
         throttle_seconds: int = 5,
         force: bool = False
     ) -> None:
         """
-        Schedule stats updates for teams with optional throttling using Redis.
-        This avoids recalculating on every single marcador/evaluacion change.
+        Programa el recálculo en bloque de las estadísticas de una liga en
+        el worker arq (app/workers/stats_worker.py). Los cambios se agregan
+        por liga durante throttle_seconds: una ráfaga de ediciones de
+        marcador produce un único job. force=True lo programa sin espera
+        (si ya había uno programado, ese mismo cubre el cambio).
+
+        Degradación: si la cola no está disponible, recalcula en este
+        proceso con la misma agregación por liga.
         """
         if os.getenv("DISABLE_STATS_UPDATES") == "1":
             return
-        ids = {eid for eid in equipo_ids if eid is not None}
-        if not ids:
+        if liga_id is None:
             return
 
-        if force:
-            for equipo_id in ids:
-                asyncio.create_task(ClasificacionService._run_update(equipo_id))
+        espera = 0 if force else throttle_seconds
+        if await stats_jobs.encolar_recalculo_liga(liga_id, espera):
             return
 
-        redis = aioredis.Redis(connection_pool=redis_pool)
-        try:
-            for equipo_id in ids:
-                key = f"clasificacion:update:{equipo_id}"
-                should_run = await redis.set(key, "1", ex=throttle_seconds, nx=True)
-                if should_run:
-                    asyncio.create_task(ClasificacionService._run_update(equipo_id))
-        except Exception:
-            logger.warning("Fallo Redis en throttle de clasificacion; se ejecuta fallback local")
-            for equipo_id in ids:
-                asyncio.create_task(ClasificacionService._run_update(equipo_id))
-        finally:
-            await redis.close()
+        if liga_id in ClasificacionService._ligas_programadas:
+            return
+        ClasificacionService._ligas_programadas.add(liga_id)
+        asyncio.create_task(ClasificacionService._run_update(liga_id, espera))
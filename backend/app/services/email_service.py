@@ -138,6 +138,7 @@ async def send_email(
     body: str,
     attachments: list[Adjunto] | None = None,
     submission_id: int | None = None,
+    job_id: str | None = None,
 ) -> bool:
     """
     API pública: encola el email en la cola arq y devuelve enseguida.
@@ -145,6 +146,9 @@ async def send_email(
     - attachments: lista de (bytes, nombre de archivo).
     - submission_id: si se indica, el worker registrará el resultado final
       en la ficha (email_enviado / email_error).
+    - job_id: job_id arq fijo para que encolar dos veces el mismo email no
+      lo duplique (arq ignora el segundo mientras el job esté en cola, en
+      curso o con su resultado guardado, una hora por defecto).
 
     Degradación: si Redis no está disponible se envía directo con
     aiosmtplib (sin reintentos). Devuelve False solo si tampoco pudo
@@ -160,6 +164,7 @@ async def send_email(
             body,
             attachments=attachments,
             submission_id=submission_id,
+            _job_id=job_id,
         )
         return True
     except Exception:
@@ -0,0 +1,396 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Pipeline asíncrono de fichas de juego (/tools/send-game-sheet).
+
+La petición solo valida, guarda la ficha y devuelve 202 con un job_id. El
+trabajo pesado va por etapas en jobs arq (app/workers/game_sheet_worker.py):
+
+1. `moderar_ficha`: análisis del dibujo; marca la ficha para revisión.
+2. `generar_ficha`: PDF firmado para el docente, email con el adjunto
+   (cola de emails, que registra email_enviado en la ficha) y copia en
+   Nextcloud si procede.
+
+El estado de cada envío vive en Redis (`clave_estado`, un día) y lo sirve
+GET /tools/send-game-sheet/{job_id}. El nombre del alumno solo viaja en
+los argumentos de los jobs: no se guarda en BD ni en el estado.
+
+Si la cola no está disponible se degrada a ejecutar las mismas etapas
+dentro de la propia petición, que devuelve ya el estado final: no queda
+nada que consultar después (con varios workers uvicorn la consulta podría
+llegar a otro proceso).
+
+El email va en un job de la cola de emails con job_id fijo por ficha
+(`job_id_email`): si la etapa 2 se reintenta después de encolarlo, el
+segundo encolado no hace nada y el docente no recibe duplicados.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Optional
+
+from arq import create_pool
+from arq.connections import RedisSettings
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.config import settings
+from app.core.cryptography import crypto
+from app.database import AsyncSessionLocal
+from app.models.game_submission import GameSubmission
+from app.models.liga import Liga
+from app.services.email_service import send_email
+from app.services.nextcloud_service import NextcloudService, nextcloud_service
+from app.services.pdf_generator import generate_game_sheet_pdf
+from app.services.submission_policy_service import analyze_drawing_for_policy
+
+logger = logging.getLogger(__name__)
+
+FICHAS_QUEUE_NAME = "arq:fichas"
+ESTADO_TTL_SEGUNDOS = 24 * 3600
+
+# Estados de un envío
+EN_COLA = "en_cola"
+MODERANDO = "moderando"
+GENERANDO_PDF = "generando_pdf"
+EMAIL_EN_COLA = "email_en_cola"   # el resultado final lo registra el worker de emails
+COMPLETADO = "completado"
+ERROR = "error"
+
+
+def clave_estado(job_id: str) -> str:
+    return f"arq:fichas:estado:{job_id}"
+
+
+def job_id_etapa(job_id: str, etapa: str) -> str:
+    return f"ficha:{job_id}:{etapa}"
+
+
+def job_id_email(submission_id: int) -> str:
+    return f"ficha-email:{submission_id}"
+
+
+# Pool de conexión a la cola arq, perezoso y compartido por proceso
+_arq_pool = None
+
+
+async def _get_arq_pool():
+    global _arq_pool
+    if _arq_pool is None:
+        redis_settings = RedisSettings.from_dsn(settings.GAME_SHEET_QUEUE_REDIS_URL)
+        # Se llama desde el camino de la petición: sin reintentos de conexión,
+        # el llamante ya degrada a procesar en el proceso
+        redis_settings.conn_retries = 0
+        _arq_pool = await create_pool(redis_settings, default_queue_name=FICHAS_QUEUE_NAME)
+    return _arq_pool
+
+
+# ---------------------------------------------------------------------------
+# Estado
+# ---------------------------------------------------------------------------
+
+def _codificar(valor: Any) -> str:
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    return "" if valor is None else str(valor)
+
+
+async def guardar_estado(redis, job_id: str, **campos: Any) -> None:
+    """Actualiza el estado del envío. Un fallo de Redis no para el pipeline."""
+    campos["actualizado"] = int(time.time())
+    try:
+        clave = clave_estado(job_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(clave, mapping={campo: _codificar(valor) for campo, valor in campos.items()})
+            pipe.expire(clave, ESTADO_TTL_SEGUNDOS)
+            await pipe.execute()
+    except Exception:
+        logger.warning("No se pudo guardar el estado del envio %s", job_id, exc_info=True)
+
+
+async def leer_estado(job_id: str) -> Optional[dict[str, Any]]:
+    """Estado del envío (None si no existe o caducó)."""
+    global _arq_pool
+    try:
+        pool = await _get_arq_pool()
+        crudo = await pool.hgetall(clave_estado(job_id))
+    except Exception:
+        logger.debug("Cola de fichas no disponible al leer estado", exc_info=True)
+        _arq_pool = None
+        return None
+    if not crudo:
+        return None
+    estado = {
+        (campo.decode() if isinstance(campo, bytes) else campo): (valor.decode() if isinstance(valor, bytes) else valor)
+        for campo, valor in crudo.items()
+    }
+    moderacion = estado.get("moderation_required")
+    return {
+        "estado": estado.get("estado"),
+        "submission_id": int(estado["submission_id"]) if estado.get("submission_id") else None,
+        "moderation_required": None if moderacion in (None, "") else moderacion == "1",
+        "error": estado.get("error") or None,
+        "actualizado": int(estado.get("actualizado") or 0),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Encolado
+# ---------------------------------------------------------------------------
+
+async def encolar_ficha(job_id: str, datos: dict[str, Any]) -> bool:
+    """Encola la primera etapa. Devuelve False si la cola no está disponible."""
+    global _arq_pool
+    try:
+        pool = await _get_arq_pool()
+        await guardar_estado(pool, job_id, estado=EN_COLA, submission_id=datos["submission_id"])
+        await pool.enqueue_job(
+            "moderar_ficha",
+            job_id,
+            datos,
+            _job_id=job_id_etapa(job_id, "moderacion"),
+            _queue_name=FICHAS_QUEUE_NAME,
+        )
+        return True
+    except Exception:
+        logger.warning("Cola de fichas no disponible; se procesa en el proceso", exc_info=True)
+        _arq_pool = None  # forzar reconexión en el próximo envío
+        return False
+
+
+async def procesar_en_proceso(datos: dict[str, Any]) -> dict[str, Any]:
+    """
+    Modo degradado: las mismas etapas dentro de la petición. Devuelve el
+    estado final con los campos de `leer_estado`.
+    """
+    moderation_required = None
+    try:
+        datos = await moderar(datos)
+        moderation_required = datos["moderation_required"]
+        await generar_y_entregar(datos)
+        estado, error = EMAIL_EN_COLA, None
+    except Exception as exc:
+        logger.exception("Error procesando la ficha %s en el proceso", datos.get("submission_id"))
+        estado, error = ERROR, str(exc)[:200]
+    return {
+        "estado": estado,
+        "submission_id": datos["submission_id"],
+        "moderation_required": moderation_required,
+        "error": error,
+        "actualizado": int(time.time()),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Etapas
+# ---------------------------------------------------------------------------
+
+def _leer_grafico(ruta: Optional[str]) -> Optional[bytes]:
+    if not ruta or not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _analizar_dibujo(ruta: Optional[str]) -> dict[str, Any]:
+    contenido = _leer_grafico(ruta)
+    if not contenido:
+        return {}
+    drawing_policy = analyze_drawing_for_policy(contenido)
+    if not drawing_policy.flagged:
+        return {}
+    return {"drawing": {"reasons": drawing_policy.reasons, "metrics": drawing_policy.metrics}}
+
+
+async def moderar(datos: dict[str, Any]) -> dict[str, Any]:
+    """
+    Etapa 1: moderación del dibujo. Guarda el resultado en la ficha y lo
+    añade a `datos` para la etapa siguiente (aviso en el email).
+    """
+    moderation_flags = await asyncio.to_thread(_analizar_dibujo, datos.get("graphics_path"))
+    if moderation_flags:
+        async with AsyncSessionLocal() as session:
+            submission = await session.get(GameSubmission, datos["submission_id"])
+            if submission:
+                submission.moderation_required = True
+                submission.moderation_flags = moderation_flags
+                await session.commit()
+    return {**datos, "moderation_required": bool(moderation_flags), "moderation_flags": moderation_flags}
+
+
+def _cuerpo_email(datos: dict[str, Any]) -> str:
+    api_url = os.getenv("API_URL", "https://liga.edumind.es/api/v1")
+    publish_link = f"{api_url}/game-resources/publish/{datos['token_hash']}"
+    student_name = datos["student_name"]
+    game_name = datos["game_name"]
+    sport_name = datos.get("sport_name")
+
+    moderation_note = ""
+    if datos.get("moderation_required"):
+        drawing_reasons = (datos.get("moderation_flags") or {}).get("drawing", {})
+        reasons_text = ", ".join(drawing_reasons.get("reasons", [])) if isinstance(drawing_reasons, dict) else ""
+        moderation_note = (
+            "\n"
+            "⚠️ REVISIÓN AUTOMÁTICA:\n"
+            "Se ha detectado contenido visual potencialmente sensible. "
+            f"Motivos: {reasons_text or 'revisión manual recomendada'}.\n"
+        )
+
+    return f"""
+    Hola Docente,
+
+    Un alumno/a ha creado una ficha de juego a través de Liga EDUmind.
+
+    📝 DATOS DE LA FICHA:
+    • Alumno/a: {student_name}
+    • Juego: {game_name}
+    • Liga: {datos['liga_nombre']}
+    {f'• Deporte: {sport_name}' if sport_name else ''}
+    {moderation_note}
+
+    Adjunto encontrarás el PDF con la ficha completa.
+
+    ════════════════════════════════════════════════════
+    🌐 WIKI DE JUEGOS (OPCIÓN PÚBLICA)
+
+    Si consideras que este juego es de calidad y quieres compartirlo
+    en la Wiki de Juegos de Liga EDUmind, haz clic en el siguiente enlace.
+
+    La versión publicada será completamente ANÓNIMA (sin datos del alumno).
+    Podrás elegir si incluir tu nombre como docente contribuidor.
+
+    👉 PUBLICAR EN WIKI: {publish_link}
+
+    ⚠️ Este enlace caducará en 45 días si no se activa.
+    ════════════════════════════════════════════════════
+
+    Gracias por usar Liga EDUmind.
+    """
+
+
+async def generar_y_entregar(datos: dict[str, Any]) -> None:
+    """Etapa 2: PDF firmado para el docente, email con adjunto y evidencia en Nextcloud."""
+    graphics_content = await asyncio.to_thread(_leer_grafico, datos.get("graphics_path"))
+    pdf_content = await generate_game_sheet_pdf(
+        title=datos["game_name"],
+        student_name=datos["student_name"],  # Solo en versión del docente
+        sport_name=datos.get("sport_name"),
+        liga_name=datos["liga_nombre"],
+        materiales=datos.get("materiales"),
+        reglas=datos.get("reglas"),
+        graphics_content=graphics_content,
+        pictos_materiales=datos.get("pictos_materiales"),
+        pictos_reglas=datos.get("pictos_reglas"),
+        is_anonymous=False,
+        language=datos.get("language") or "es",
+    )
+
+    # Encolar email (el worker arq registra el resultado en la ficha). El
+    # job_id fijo hace idempotente el encolado si esta etapa se reintenta
+    await send_email(
+        to_email=datos["email_fichas"],
+        subject=f"🎮 Ficha de Juego: {datos['game_name']} - {datos['student_name']}",
+        body=_cuerpo_email(datos),
+        attachments=[(pdf_content, f"Ficha_{datos['game_name'].replace(' ', '_')}.pdf")],
+        submission_id=datos["submission_id"],
+        job_id=job_id_email(datos["submission_id"]),
+    )
+
+    await _subir_evidencia(datos, pdf_content)
+
+
+# ---------------------------------------------------------------------------
+# Nextcloud (evidencias)
+# ---------------------------------------------------------------------------
+
+def _normalize_identity(value: str | None) -> str:
+    return (value or "").strip().lower()
+
+
+def _load_allowed_nextcloud_identities() -> set[str]:
+    allowed: set[str] = set()
+
+    # `NEXTCLOUD_ALLOWED_EMAIL` is kept for backward compatibility.
+    raw_values = [
+        settings.NEXTCLOUD_ALLOWED_IDENTITIES,
+        settings.NEXTCLOUD_ALLOWED_EMAIL,
+        settings.NEXTCLOUD_USERNAME,  # Useful when owner code matches legacy admin username.
+    ]
+
+    for raw in raw_values:
+        if not raw:
+            continue
+        for token in raw.split(","):
+            normalized = _normalize_identity(token)
+            if normalized:
+                allowed.add(normalized)
+
+    return allowed
+
+
+def _can_use_global_nextcloud(liga: Liga) -> bool:
+    allowed_identities = _load_allowed_nextcloud_identities()
+    if not allowed_identities:
+        return False
+
+    owner = liga.usuario
+    candidate_identities = {
+        _normalize_identity(liga.email_fichas),
+        _normalize_identity(getattr(owner, "email", None)),
+        _normalize_identity(getattr(owner, "codigo", None)),
+    }
+
+    return any(candidate and candidate in allowed_identities for candidate in candidate_identities)
+
+
+def _destino_nextcloud(liga: Liga):
+    """Soporte multi-usuario: Nextcloud personal del docente o, si no, el global."""
+    # 1. Intentar usar configuración PERSONAL del docente
+    if liga.usuario and liga.usuario.nextcloud_url:
+        try:
+            plain_pass = crypto.decrypt(liga.usuario.nextcloud_password_enc)
+            if plain_pass:
+                personal_service = NextcloudService(
+                    username=liga.usuario.nextcloud_user,
+                    password=plain_pass,
+                    url=liga.usuario.nextcloud_url
+                )
+                if personal_service.is_configured:
+                    return personal_service
+        except Exception as e:
+            logger.warning("Error preparando Nextcloud personal: %s", e)
+
+    # 2. Si no hay personal, GLOBAL (Legacy/Admin) - Solo si cumple restricción de seguridad
+    if nextcloud_service.is_configured and _can_use_global_nextcloud(liga):
+        return nextcloud_service
+    return None
+
+
+async def _subir_evidencia(datos: dict[str, Any], pdf_content: bytes) -> None:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Liga).options(selectinload(Liga.usuario)).where(Liga.id == datos["liga_id"])
+        )
+        liga = result.scalar_one_or_none()
+    destino = _destino_nextcloud(liga) if liga else None
+    if destino is None:
+        return
+    # El email ya está encolado: un fallo aquí no debe repetir la etapa
+    try:
+        await destino.upload_evidence(
+            pdf_content=pdf_content,
+            liga_name=datos["liga_nombre"],
+            student_name=datos["student_name"],
+            game_name=datos["game_name"],
+        )
+    except Exception:
+        logger.warning("No se pudo subir la evidencia de la ficha %s a Nextcloud", datos["submission_id"], exc_info=True)
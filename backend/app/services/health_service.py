@@ -8,6 +8,7 @@ import redis.asyncio as aioredis
 from sqlalchemy import text
 
 from app.database import engine, redis_pool
+from app.services import runtime_health
 
 
 def _iso_timestamp() -> str:
@@ -93,6 +94,8 @@ async def build_readiness_payload() -> tuple[dict[str, object], bool]:
             "postgres": db_check,
             "redis": redis_check,
         },
+        # Informational: pool usage and event-loop lag of the worker that answered
+        "runtime": runtime_health.readiness_summary(),
     }
 
     return payload, ready
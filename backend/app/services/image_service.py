@@ -19,14 +19,35 @@
 """
 Image processing service for team logos and other uploads.
 Handles image optimization, resizing, and format conversion.
+
+A team logo is decoded once and stored as a small set of derivatives that
+share a content-hash base name (``team_<id>_<hash>``):
+
+- ``<base>.webp``: 200 px, the canonical ``logo_url``.
+- ``<base>_96.webp`` / ``<base>_48.webp``: list and badge sizes.
+- ``<base>_print.png``: print-ready PNG used by the PDF builders.
+
+Encoding runs in a worker thread so the event loop keeps serving requests.
 """
-import os
-import uuid
+import asyncio
 import base64
+import hashlib
+import io
+import os
+import secrets
 from pathlib import Path
+from typing import Optional
+
 from PIL import Image
 from fastapi import UploadFile, HTTPException
-import io
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write via a temp file + rename: readers never see half a file."""
+    tmp = path.with_name(f"{path.name}.{secrets.token_hex(4)}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
 
 class ImageService:
     """Service for processing and optimizing images."""
@@ -35,12 +56,56 @@ class ImageService:
     MAX_SIZE_MB = 5
     MAX_SIZE_BYTES = MAX_SIZE_MB * 1024 * 1024
     LOGO_SIZE = (200, 200)
+    # Smaller WebP derivatives next to the canonical 200 px logo
+    LOGO_VARIANT_SIZES = (96, 48)
+    # Longest side of the print PNG: ~300 dpi for the 25 mm PDF header boxes
+    PRINT_LOGO_PX = 300
     WEBP_QUALITY = 85
     ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
 
+    @classmethod
+    def _square_canvas(cls, image: Image.Image, size: int) -> Image.Image:
+        """Thumbnail `image` into a centered size x size canvas."""
+        thumb = image.copy()
+        thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+        canvas = Image.new(
+            image.mode,
+            (size, size),
+            (255, 255, 255, 0) if image.mode == 'RGBA' else (255, 255, 255),
+        )
+        canvas.paste(thumb, ((size - thumb.width) // 2, (size - thumb.height) // 2))
+        return canvas
+
+    @classmethod
+    def _encode(cls, image: Image.Image, fmt: str) -> bytes:
+        buffer = io.BytesIO()
+        if fmt == 'WEBP':
+            # method=4: the size gain of method=6 is negligible at these sizes
+            image.save(buffer, format='WEBP', quality=cls.WEBP_QUALITY, method=4)
+        else:
+            image.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
+    @classmethod
+    def _render_logo_derivatives(cls, contents: bytes) -> dict[str, bytes]:
+        """Decode once and encode every derivative. Keys are filename suffixes."""
+        with Image.open(io.BytesIO(contents)) as source:
+            image = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        # Work from one intermediate at print size instead of the full upload
+        image.thumbnail((cls.PRINT_LOGO_PX, cls.PRINT_LOGO_PX), Image.Resampling.LANCZOS)
+
+        derivatives = {
+            ".webp": cls._encode(cls._square_canvas(image, cls.LOGO_SIZE[0]), 'WEBP'),
+            "_print.png": cls._encode(image, 'PNG'),
+        }
+        for size in cls.LOGO_VARIANT_SIZES:
+            derivatives[f"_{size}.webp"] = cls._encode(cls._square_canvas(image, size), 'WEBP')
+        return derivatives
+
     @classmethod
     def _process_and_save_logo(cls, contents: bytes, content_type: str, equipo_id: int) -> str:
-        """Validate, optimize and persist a logo image."""
+        """Validate, optimize and persist a logo image with its derivatives."""
         if content_type not in cls.ALLOWED_MIME_TYPES:
             raise HTTPException(
                 status_code=400,
@@ -54,37 +119,16 @@ class ImageService:
             )
 
         try:
-            image = Image.open(io.BytesIO(contents))
+            derivatives = cls._render_logo_derivatives(contents)
 
-            if image.mode in ('RGBA', 'LA', 'P'):
-                image = image.convert('RGBA')
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
-
-            image.thumbnail(cls.LOGO_SIZE, Image.Resampling.LANCZOS)
-
-            final_image = Image.new(
-                'RGBA' if image.mode == 'RGBA' else 'RGB',
-                cls.LOGO_SIZE,
-                (255, 255, 255, 0) if image.mode == 'RGBA' else (255, 255, 255),
-            )
-
-            x = (cls.LOGO_SIZE[0] - image.width) // 2
-            y = (cls.LOGO_SIZE[1] - image.height) // 2
-            final_image.paste(image, (x, y))
-
-            filename = f"team_{equipo_id}_{uuid.uuid4().hex[:12]}.webp"
-            filepath = cls.UPLOAD_DIR / filename
+            # Same upload for the same team -> same files (no duplicates on retries)
+            digest = hashlib.sha256(contents).hexdigest()[:16]
+            base = f"team_{equipo_id}_{digest}"
             cls.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            for suffix, data in derivatives.items():
+                _write_atomic(cls.UPLOAD_DIR / f"{base}{suffix}", data)
 
-            final_image.save(
-                filepath,
-                format='WEBP',
-                quality=cls.WEBP_QUALITY,
-                method=6,
-            )
-
-            return f"/static/uploads/team_logos/{filename}"
+            return f"/static/uploads/team_logos/{base}.webp"
         except HTTPException:
             raise
         except Exception as exc:
@@ -111,10 +155,10 @@ class ImageService:
         # Read file content
         contents = await file.read()
         content_type = file.content_type or "application/octet-stream"
-        return cls._process_and_save_logo(contents, content_type, equipo_id)
+        return await asyncio.to_thread(cls._process_and_save_logo, contents, content_type, equipo_id)
 
     @classmethod
-    def save_team_logo_data_url(cls, data_url: str, equipo_id: int) -> str:
+    async def save_team_logo_data_url(cls, data_url: str, equipo_id: int) -> str:
         """
         Persist a PNG/JPEG/WebP data URL generated in the public logo designer.
         """
@@ -134,12 +178,45 @@ class ImageService:
                 detail="No se pudo procesar la imagen del logo",
             ) from exc
 
-        return cls._process_and_save_logo(contents, mime_match, equipo_id)
+        return await asyncio.to_thread(cls._process_and_save_logo, contents, mime_match, equipo_id)
+
+    @staticmethod
+    def _derivative_path(path: str | Path, suffix: str) -> Path:
+        path = Path(path)
+        return path.with_name(f"{path.stem}{suffix}")
+
+    @classmethod
+    def print_logo(cls, path: str) -> Optional[tuple[str, int, int]]:
+        """
+        (path, width, height) of the print PNG for the image at `path`.
+
+        Uploaded team logos already have one. For any other image (the static
+        brand logos) it is rendered on first use and kept next to the
+        original, and re-rendered if the original changes. Returns None if it
+        cannot be produced, so the caller can fall back to the original.
+        """
+        print_path = cls._derivative_path(path, "_print.png")
+        try:
+            stale = not print_path.exists() or print_path.stat().st_mtime < os.stat(path).st_mtime
+            if stale:
+                try:
+                    with Image.open(path) as source:
+                        image = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+                    image.thumbnail((cls.PRINT_LOGO_PX, cls.PRINT_LOGO_PX), Image.Resampling.LANCZOS)
+                    _write_atomic(print_path, cls._encode(image, 'PNG'))
+                except OSError:
+                    # Read-only static dir: an older derivative still beats none
+                    if not print_path.exists():
+                        return None
+            with Image.open(print_path) as printed:  # header only
+                return str(print_path), printed.width, printed.height
+        except Exception:
+            return None
     
     @classmethod
     def delete_team_logo(cls, logo_url: str) -> None:
         """
-        Delete a team logo file from disk.
+        Delete a team logo and its derivatives from disk.
         
         Args:
             logo_url: URL path of the logo to delete
@@ -147,14 +224,12 @@ class ImageService:
         if not logo_url:
             return
         
-        try:
-            # Extract filename from URL
-            filename = Path(logo_url).name
-            filepath = cls.UPLOAD_DIR / filename
-            
-            # Delete file if it exists
-            if filepath.exists():
-                filepath.unlink()
-        except Exception:
-            # Silently fail - don't crash if file doesn't exist
-            pass
+        # Extract filename from URL
+        filepath = cls.UPLOAD_DIR / Path(logo_url).name
+        suffixes = ["_print.png"] + [f"_{size}.webp" for size in cls.LOGO_VARIANT_SIZES]
+        for target in [filepath] + [cls._derivative_path(filepath, suffix) for suffix in suffixes]:
+            try:
+                target.unlink(missing_ok=True)
+            except Exception:
+                # Silently fail - don't crash if file doesn't exist
+                pass
@@ -0,0 +1,228 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Eventos en directo (SSE) sobre Redis pub/sub.
+
+Los endpoints que cambian algo visible en directo publican un evento en el
+canal de la liga (`publicar`). Cada proceso uvicorn mantiene UNA sola
+suscripción a Redis (`difusor`) que reparte los eventos a las colas locales
+de los streams abiertos: 500 espectadores de una liga cuestan una
+suscripción por proceso, no 500 bucles de polling.
+
+Los eventos son avisos pequeños; los datos completos se siguen leyendo por
+REST (con caché y ETag). Si Redis se cae o un cliente va muy retrasado, se
+le envía `resync` para que recargue. Sin Redis no hay directo y el
+frontend mantiene su polling.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Optional
+
+import orjson
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.database import redis_pool
+
+logger = logging.getLogger(__name__)
+
+CANAL_PREFIJO = "live:"
+
+# Eventos por conexión sin leer antes de dar el cliente por retrasado
+COLA_MAX = 64
+# Latido SSE: mantiene viva la conexión a través de proxies
+LATIDO_SEGUNDOS = 15
+# Reconexión de la suscripción: espera inicial y máxima
+RECONEXION_MIN_SEGUNDOS = 1
+RECONEXION_MAX_SEGUNDOS = 30
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx: desactiva buffering para SSE
+}
+
+
+def canal_liga(liga_id: int) -> str:
+    return f"{CANAL_PREFIJO}liga:{liga_id}"
+
+
+def canal_pendientes(usuario_id: int) -> str:
+    return f"{CANAL_PREFIJO}pendientes:{usuario_id}"
+
+
+def formatear_sse(evento: str, datos: dict[str, Any]) -> str:
+    return f"event: {evento}\ndata: {orjson.dumps(datos).decode()}\n\n"
+
+
+EVENTO_RESYNC = ({"evento": "resync"}, formatear_sse("resync", {}))
+
+
+async def publicar(canal: str, evento: str, datos: dict[str, Any]) -> None:
+    """Publica un evento (fallo de Redis = no-op: los clientes siguen con polling)."""
+    mensaje = orjson.dumps({"evento": evento, **datos})
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+        try:
+            await redis.publish(canal, mensaje)
+        finally:
+            await redis.aclose()
+    except Exception:
+        logger.debug("Redis no disponible al publicar %s en %s", evento, canal, exc_info=True)
+
+
+async def publicar_partido(partido, evento: str, clasificacion: bool = False) -> None:
+    """
+    Aviso de cambio de un partido en el canal de su liga. Con
+    clasificacion=True avisa además de que la clasificación ha cambiado.
+    """
+    marcador_local, marcador_visitante = partido.extraer_marcador_deportivo()
+    await publicar(
+        canal_liga(partido.liga_id),
+        evento,
+        {
+            "partido_id": partido.id,
+            "jornada_id": partido.jornada_id,
+            "finalizado": bool(partido.finalizado),
+            "marcador_local": marcador_local,
+            "marcador_visitante": marcador_visitante,
+        },
+    )
+    if clasificacion:
+        await publicar(canal_liga(partido.liga_id), "clasificacion", {"liga_id": partido.liga_id})
+
+
+async def publicar_pendientes(usuario_id: int, liga_id: int, delta: int) -> None:
+    """Cambio del contador de gestiones pendientes del docente propietario de la liga."""
+    await publicar(canal_pendientes(usuario_id), "pendientes", {"liga_id": liga_id, "delta": delta})
+
+
+class Difusor:
+    """
+    Suscripción única por proceso (PSUBSCRIBE live:*) repartida a colas
+    locales por canal. Arranca con el primer stream y se detiene cuando no
+    queda ninguno.
+    """
+
+    def __init__(self) -> None:
+        self._colas: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._tarea: Optional[asyncio.Task] = None
+
+    @property
+    def conexiones(self) -> int:
+        return sum(len(colas) for colas in self._colas.values())
+
+    @asynccontextmanager
+    async def suscribir(self, canal: str) -> AsyncIterator[asyncio.Queue]:
+        """Cola local con los eventos del canal mientras dure el bloque."""
+        cola: asyncio.Queue = asyncio.Queue(maxsize=COLA_MAX)
+        self._colas[canal].add(cola)
+        self._arrancar()
+        try:
+            yield cola
+        finally:
+            colas = self._colas.get(canal)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._colas[canal]
+
+    def _arrancar(self) -> None:
+        bucle = asyncio.get_running_loop()
+        # Una tarea de otro bucle (tests, recarga) no sirve: se relanza
+        if self._tarea is None or self._tarea.done() or self._tarea.get_loop() is not bucle:
+            self._tarea = bucle.create_task(self._escuchar())
+
+    async def _escuchar(self) -> None:
+        espera = RECONEXION_MIN_SEGUNDOS
+        reconexion = False
+        while self._colas:
+            redis = None
+            pubsub = None
+            try:
+                redis = aioredis.Redis.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=True,
+                    socket_connect_timeout=2,
+                    health_check_interval=30,
+                )
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.psubscribe(f"{CANAL_PREFIJO}*")
+                espera = RECONEXION_MIN_SEGUNDOS
+                if reconexion:
+                    # Lo publicado durante el corte se ha perdido
+                    self._repartir_a_todos(EVENTO_RESYNC)
+                while self._colas:
+                    mensaje = await pubsub.get_message(timeout=1.0)
+                    if mensaje is not None:
+                        self._repartir(mensaje["channel"], mensaje["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Suscripcion de eventos en directo caida; reintento en %ss", espera, exc_info=True)
+                reconexion = True
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, RECONEXION_MAX_SEGUNDOS)
+            finally:
+                with suppress(Exception):
+                    if pubsub is not None:
+                        await pubsub.aclose()
+                    if redis is not None:
+                        await redis.aclose()
+
+    def _repartir(self, canal: str, datos: str) -> None:
+        colas = self._colas.get(canal)
+        if not colas:
+            return
+        try:
+            evento = orjson.loads(datos)
+        except orjson.JSONDecodeError:
+            logger.debug("Evento en directo malformado en %s", canal)
+            return
+        # Se formatea una vez por proceso, no una por conexión
+        nombre = evento.pop("evento", "mensaje")
+        entrada = ({"evento": nombre, **evento}, formatear_sse(nombre, evento))
+        for cola in list(colas):
+            self._encolar(cola, entrada)
+
+    def _repartir_a_todos(self, entrada) -> None:
+        for colas in list(self._colas.values()):
+            for cola in list(colas):
+                self._encolar(cola, entrada)
+
+    @staticmethod
+    def _encolar(cola: asyncio.Queue, entrada) -> None:
+        try:
+            cola.put_nowait(entrada)
+        except asyncio.QueueFull:
+            # Cliente retrasado: se descarta lo pendiente y se pide recarga
+            while not cola.empty():
+                cola.get_nowait()
+            cola.put_nowait(EVENTO_RESYNC)
+
+
+difusor = Difusor()
+
+
+async def stream_sse(canal: str, filtro=None) -> AsyncIterator[str]:
+    """
+    Generador SSE para StreamingResponse: evento `conectado` inicial,
+    eventos del canal (opcionalmente filtrados) y latidos.
+    """
+    async with difusor.suscribir(canal) as cola:
+        yield formatear_sse("conectado", {})
+        while True:
+            try:
+                datos, texto = await asyncio.wait_for(cola.get(), LATIDO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if filtro is None or datos["evento"] == "resync" or filtro(datos):
+                yield texto
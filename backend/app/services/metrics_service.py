@@ -6,21 +6,179 @@
 """
 Metrics Service - Application metrics for monitoring (Liga EDUmind).
 Provides Prometheus-compatible metrics and status.
+
+HTTP metrics are recorded by MetricsMiddleware and keyed by route
+template ("/api/v1/ligas/{liga_id}"), never by raw path:
+
+- latency histogram per method + route (LATENCY_BUCKETS, seconds);
+- SQL statements and DB time per request, per method + route
+  (app/core/sql_instrumentation.py);
+- request counters per method + route + status class (2xx, 4xx...);
+- in-flight requests per method.
+
+Production runs several uvicorn workers, each with its own collector.
+Every worker flushes its deltas to a Redis hash every
+FLUSH_INTERVAL_SECONDS (HINCRBY, so workers never overwrite each other)
+and publishes its in-flight gauge under a per-worker key with a short
+TTL. Live workers are listed in a registry sorted set (WORKERS_KEY,
+scored by last flush), so a scrape reads a handful of known keys instead
+of scanning the shared keyspace. The Prometheus endpoint renders the sum
+over all workers; without Redis each worker reports only its own numbers.
 """
+import asyncio
+import logging
+import os
+import socket
 import time
+from contextlib import suppress
 from datetime import datetime
-from functools import wraps
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from collections import defaultdict
 import threading
 
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core import sql_instrumentation
+from app.database import redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Histograms per (method, route), exposed as liga_http_request_<name>
+DURATION = "duration_seconds"
+DB_QUERIES = "db_queries"
+DB_SECONDS = "db_seconds"
+HISTOGRAMS = {
+    DURATION: LATENCY_BUCKETS,
+    DB_QUERIES: QUERY_COUNT_BUCKETS,
+    DB_SECONDS: LATENCY_BUCKETS,
+}
+
+FLUSH_INTERVAL_SECONDS = 5
+REDIS_KEY = "metrics:http"
+IN_FLIGHT_KEY_PREFIX = "metrics:http:in_flight:"
+# Registry of live workers: worker_id -> time of its last flush
+WORKERS_KEY = "metrics:http:workers"
+# A dead worker's in-flight gauge disappears after this long
+IN_FLIGHT_TTL_SECONDS = 3 * FLUSH_INTERVAL_SECONDS
+
+# Route label for requests that matched no route (404s): keeps cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+def register_worker(pipe, registry_key: str, worker: str, ttl: int) -> None:
+    """Queue a heartbeat for `worker` in a registry sorted set and drop stale members."""
+    now = time.time()
+    pipe.zadd(registry_key, {worker: now})
+    pipe.zremrangebyscore(registry_key, "-inf", now - ttl)
+    pipe.expire(registry_key, ttl)
+
+
+async def live_workers(redis, registry_key: str, ttl: int) -> list:
+    """Workers whose last heartbeat in the registry is younger than `ttl`."""
+    return await redis.zrangebyscore(registry_key, time.time() - ttl, "+inf")
+
+
+class HttpSeries:
+    """Histograms (HISTOGRAMS) and status counters per (method, route)."""
+
+    def __init__(self):
+        # (histogram, method, route) -> counts per bucket, +Inf last
+        self.buckets: Dict[tuple, list] = {}
+        self.sums: Dict[tuple, float] = defaultdict(float)
+        self.statuses: Dict[tuple, int] = defaultdict(int)
+
+    def _counts(self, key: tuple) -> list:
+        counts = self.buckets.get(key)
+        if counts is None:
+            counts = self.buckets[key] = [0] * (len(HISTOGRAMS[key[0]]) + 1)
+        return counts
+
+    def observe(self, method: str, route: str, status_code: int, values: Dict[str, float]) -> None:
+        for name, value in values.items():
+            bounds = HISTOGRAMS[name]
+            index = next((i for i, bound in enumerate(bounds) if value <= bound), len(bounds))
+            self._counts((name, method, route))[index] += 1
+            self.sums[(name, method, route)] += value
+        self.statuses[(method, route, _status_class(status_code))] += 1
+
+    def merge(self, other: "HttpSeries") -> None:
+        for key, counts in other.buckets.items():
+            own = self._counts(key)
+            for i, count in enumerate(counts):
+                own[i] += count
+        for key, total in other.sums.items():
+            self.sums[key] += total
+        for key, count in other.statuses.items():
+            self.statuses[key] += count
+
+    def to_fields(self) -> Dict[str, Any]:
+        """Flat Redis hash fields: b|name|method|route|bucket, s|name|method|route, c|method|route|class."""
+        fields: Dict[str, Any] = {}
+        for (name, method, route), counts in self.buckets.items():
+            for i, count in enumerate(counts):
+                if count:
+                    fields[f"b|{name}|{method}|{route}|{i}"] = count
+        for (name, method, route), total in self.sums.items():
+            fields[f"s|{name}|{method}|{route}"] = float(total)
+        for (method, route, status_class), count in self.statuses.items():
+            fields[f"c|{method}|{route}|{status_class}"] = count
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> "HttpSeries":
+        series = cls()
+        for field, value in fields.items():
+            kind, rest = field.split("|", 1)
+            if kind == "c":
+                method, rest = rest.split("|", 1)
+                route, status_class = rest.rsplit("|", 1)
+                series.statuses[(method, route, status_class)] += int(value)
+                continue
+            name, method, rest = rest.split("|", 2)
+            if name not in HISTOGRAMS:
+                continue
+            if kind == "s":
+                series.sums[(name, method, rest)] += float(value)
+            elif kind == "b":
+                route, index = rest.rsplit("|", 1)
+                if index.isdigit() and int(index) <= len(HISTOGRAMS[name]):
+                    series._counts((name, method, route))[int(index)] += int(value)
+        return series
+
+    def quantile(self, key: tuple, q: float) -> Optional[float]:
+        """Estimated quantile of histogram `key` (linear within the bucket, like histogram_quantile)."""
+        counts = self.buckets.get(key)
+        total = sum(counts) if counts else 0
+        if not total:
+            return None
+        bounds = HISTOGRAMS[key[0]]
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(bounds):
+                    return bounds[-1]
+                lower = bounds[i - 1] if i else 0.0
+                return lower + (bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return bounds[-1]
+
 
 class MetricsCollector:
     """Simple in-memory metrics collector."""
-    
+
     _instance = None
     _lock = threading.Lock()
-    
+
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
@@ -28,37 +186,234 @@ class MetricsCollector:
                     cls._instance = super().__new__(cls)
                     cls._instance._initialized = False
         return cls._instance
-    
+
     def __init__(self):
         if self._initialized:
             return
-        
+
         self._initialized = True
         self._start_time = datetime.utcnow()
-        self.request_counts: Dict[str, int] = defaultdict(int)
-        self.error_counts: Dict[str, int] = defaultdict(int)
-        self.request_times: Dict[str, list] = defaultdict(list)
-        
-    def record_request(self, endpoint: str, duration_ms: float, status_code: int):
-        self.request_counts[endpoint] += 1
-        if status_code >= 400:
-            self.error_counts[endpoint] += 1
-            
-    def get_metrics(self) -> Dict[str, Any]:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Everything this worker has seen, and what is not yet in Redis
+        self.http = HttpSeries()
+        self._pending = HttpSeries()
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def request_started(self, method: str) -> None:
+        self.in_flight[method] += 1
+
+    def request_finished(self, method: str) -> None:
+        self.in_flight[method] -= 1
+
+    def record_request(
+        self,
+        endpoint: str,
+        duration_ms: float,
+        status_code: int,
+        method: str = "GET",
+        db_queries: Optional[int] = None,
+        db_seconds: Optional[float] = None,
+    ):
+        values = {DURATION: duration_ms / 1000}
+        if db_queries is not None:
+            values[DB_QUERIES] = db_queries
+            values[DB_SECONDS] = db_seconds or 0.0
+        self.http.observe(method, endpoint, status_code, values)
+        self._pending.observe(method, endpoint, status_code, values)
+
+    # ------------------------------------------------------------------
+    # Cross-worker aggregation (Redis)
+    # ------------------------------------------------------------------
+
+    async def flush(self) -> bool:
+        """Push this worker's deltas and in-flight gauge to Redis. False without Redis."""
+        pending, self._pending = self._pending, HttpSeries()
+        in_flight_key = f"{IN_FLIGHT_KEY_PREFIX}{self.worker_id}"
+        try:
+            redis = aioredis.Redis(connection_pool=redis_pool)
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for field, value in pending.to_fields().items():
+                        if isinstance(value, float):
+                            pipe.hincrbyfloat(REDIS_KEY, field, value)
+                        else:
+                            pipe.hincrby(REDIS_KEY, field, value)
+                    pipe.hset(in_flight_key, mapping=dict(self.in_flight) or {"GET": 0})
+                    pipe.expire(in_flight_key, IN_FLIGHT_TTL_SECONDS)
+                    register_worker(pipe, WORKERS_KEY, self.worker_id, IN_FLIGHT_TTL_SECONDS)
+                    await pipe.execute()
+            finally:
+                await redis.aclose()
+        except Exception:
+            logger.debug("Redis unavailable while flushing HTTP metrics", exc_info=True)
+            # Kept for the next flush
+            pending.merge(self._pending)
+            self._pending = pending
+            return False
+        return True
+
+    async def collect(self) -> tuple:
+        """(series, in-flight per method, workers): all workers, or this one without Redis."""
+        if not await self.flush():
+            return self.http, dict(self.in_flight), 1
+        try:
+            redis = aioredis.Redis(connection_pool=redis_pool)
+            try:
+                series = HttpSeries.from_fields(await redis.hgetall(REDIS_KEY))
+                workers = await live_workers(redis, WORKERS_KEY, IN_FLIGHT_TTL_SECONDS)
+                async with redis.pipeline(transaction=False) as pipe:
+                    for worker in workers:
+                        pipe.hgetall(f"{IN_FLIGHT_KEY_PREFIX}{worker}")
+                    gauges = await pipe.execute()
+                in_flight: Dict[str, int] = defaultdict(int)
+                for gauge in gauges:
+                    for method, value in gauge.items():
+                        in_flight[method] += int(value)
+            finally:
+                await redis.aclose()
+        except Exception:
+            logger.debug("Redis unavailable while reading HTTP metrics", exc_info=True)
+            return self.http, dict(self.in_flight), 1
+        return series, dict(in_flight), len(workers)
+
+    def start(self) -> None:
+        """Start the periodic flush (app lifespan)."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+
+    async def get_metrics(self) -> Dict[str, Any]:
         uptime = datetime.utcnow() - self._start_time
+        series, in_flight, workers = await self.collect()
+        requests: Dict[str, int] = defaultdict(int)
+        errors: Dict[str, int] = defaultdict(int)
+        for (method, route, status_class), count in series.statuses.items():
+            requests[f"{method} {route}"] += count
+            if status_class in ("4xx", "5xx"):
+                errors[f"{method} {route}"] += count
+        latency_ms = {}
+        for name, method, route in sorted(series.buckets):
+            if name == DURATION:
+                latency_ms[f"{method} {route}"] = {
+                    label: round(series.quantile((name, method, route), q) * 1000, 1)
+                    for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+                }
         return {
             "uptime_seconds": int(uptime.total_seconds()),
-            "requests": dict(self.request_counts),
-            "errors": dict(self.error_counts)
+            "workers": workers,
+            "in_flight": in_flight,
+            "requests": dict(requests),
+            "errors": dict(errors),
+            "latency_ms": latency_ms,
         }
-    
-    def get_prometheus_metrics(self) -> str:
+
+    async def get_prometheus_metrics(self) -> str:
+        series, in_flight, workers = await self.collect()
         lines = []
         lines.append(f'liga_uptime_seconds {int((datetime.utcnow() - self._start_time).total_seconds())}')
-        for endpoint, count in self.request_counts.items():
-            safe_ep = endpoint.replace("/", "_").replace("-", "_")
-            lines.append(f'liga_requests_total{{endpoint="{safe_ep}"}} {count}')
+        lines.append(f'liga_http_workers {workers}')
+        for name, bounds in HISTOGRAMS.items():
+            metric = f"liga_http_request_{name}"
+            lines.append(f'# TYPE {metric} histogram')
+            for key in sorted(k for k in series.buckets if k[0] == name):
+                labels = f'method="{key[1]}",route="{key[2]}"'
+                cumulative = 0
+                for bound, count in zip((*bounds, "+Inf"), series.buckets[key]):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{labels}}} {series.sums[key]:.6f}')
+                lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+        lines.append('# TYPE liga_http_requests_total counter')
+        for (method, route, status_class), count in sorted(series.statuses.items()):
+            lines.append(
+                f'liga_http_requests_total{{method="{method}",route="{route}",status="{status_class}"}} {count}'
+            )
+        lines.append('# TYPE liga_http_requests_in_flight gauge')
+        for method, count in sorted(in_flight.items()):
+            lines.append(f'liga_http_requests_in_flight{{method="{method}"}} {count}')
         return "\n".join(lines)
 
 
 metrics = MetricsCollector()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware feeding `metrics`: latency until the last body chunk
+    is sent and the SQL it ran, labelled with the route template the
+    router matched. In DEBUG the SQL totals also go out as
+    X-DB-Query-Count / X-DB-Time-Ms response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        status_code = 500
+        start = time.perf_counter()
+
+        queries, token = sql_instrumentation.iniciar_peticion()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.DEBUG:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-query-count", str(queries.sentencias).encode()),
+                        (b"x-db-time-ms", f"{queries.segundos * 1000:.1f}".encode()),
+                    ]
+            await send(message)
+
+        metrics.request_started(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sql_instrumentation.terminar_peticion(token)
+            metrics.request_finished(method)
+            metrics.record_request(
+                _route_template(scope, root_path),
+                (time.perf_counter() - start) * 1000,
+                status_code,
+                method,
+                db_queries=queries.sentencias,
+                db_seconds=queries.segundos,
+            )
+
+
+def _route_template(scope, root_path: str) -> str:
+    # FastAPI keeps included routers nested: scope["route"].path is relative
+    # to its router, the effective route context has the full template
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    template = getattr(context, "path_format", None) or getattr(scope.get("route"), "path_format", None)
+    if template:
+        return template
+    # Mounts (/static) extend root_path instead of setting a route
+    mounted = scope.get("root_path", "")
+    if mounted != root_path and mounted.startswith(root_path):
+        return f"{mounted[len(root_path):]}/{{path}}"
+    return UNMATCHED_ROUTE
@@ -0,0 +1,108 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Caché de logos para los PDFs (fichas, contratos e informes).
+
+Cada logo se prepara una sola vez por (ruta, mtime, caja de destino): PNG
+ya escalado + tamaño de dibujo. Los bytes quedan en una LRU acotada del
+proceso y cada llamada devuelve un `Image` de ReportLab nuevo, porque los
+flowables guardan estado de maquetación y no se pueden compartir entre
+documentos. Los procesos del pool de render viven entre PDFs, así que un
+informe de 30 equipos no vuelve a codificar los mismos logos 30 veces.
+
+Cambiar el fichero (mtime) invalida su entrada sin reiniciar nada.
+"""
+import logging
+import os
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image as PILImage
+from reportlab.platypus import Image
+
+from app.services.image_service import ImageService
+
+logger = logging.getLogger(__name__)
+
+# Entradas en la LRU (PNG de ~300 px: decenas de KB cada una)
+LRU_MAX = 32
+# Píxeles por punto al escalar: ~300 ppp para impresión (300 / 72 ≈ 4.16)
+DPI_FACTOR = 4.2
+
+Clave = tuple[str, int, float, float]
+# PNG escalado y tamaño de dibujo (puntos)
+Entrada = tuple[bytes, float, float]
+
+_lru: "OrderedDict[Clave, Entrada]" = OrderedDict()
+_contadores = {"aciertos": 0, "fallos": 0}
+
+
+def _tamano_dibujo(aspect: float, max_w: float, max_h: float) -> tuple[float, float]:
+    if aspect > max_w / max_h:
+        return max_w, max_w / aspect
+    return max_h * aspect, max_h
+
+
+def _preparar(path: str, max_w: float, max_h: float) -> Entrada:
+    """PNG listo para ReportLab: el derivado de impresión o, si no hay, el original reducido."""
+    derivado = ImageService.print_logo(path)
+    if derivado:
+        print_path, w_px, h_px = derivado
+        with open(print_path, "rb") as f:
+            return (f.read(), *_tamano_dibujo(w_px / h_px, max_w, max_h))
+
+    with PILImage.open(path) as pil_img:
+        aspect = pil_img.width / pil_img.height
+        w_pt, h_pt = _tamano_dibujo(aspect, max_w, max_h)
+        w_px, h_px = int(w_pt * DPI_FACTOR), int(h_pt * DPI_FACTOR)
+        # Redimensionar solo si la original es más grande
+        if pil_img.width > w_px or pil_img.height > h_px:
+            if pil_img.mode not in ("RGB", "RGBA"):
+                pil_img = pil_img.convert("RGBA")
+            pil_img = pil_img.resize((w_px, h_px), PILImage.Resampling.LANCZOS)
+        buffer = BytesIO()
+        # PNG para preservar transparencia de logos
+        pil_img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue(), w_pt, h_pt
+
+
+def logo_flowable(path: str, max_w: float, max_h: float) -> Optional[Image]:
+    """
+    `Image` de ReportLab para el logo en `path`, escalado proporcionalmente
+    dentro de max_w x max_h puntos. None si no existe o no se puede leer.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    clave = (path, mtime, float(max_w), float(max_h))
+    entrada = _lru.get(clave)
+    if entrada is not None:
+        _lru.move_to_end(clave)
+        _contadores["aciertos"] += 1
+    else:
+        try:
+            entrada = _preparar(path, max_w, max_h)
+        except Exception as exc:
+            logger.warning("Error cargando logo %s: %s", path, exc)
+            return None
+        _contadores["fallos"] += 1
+        _lru[clave] = entrada
+        while len(_lru) > LRU_MAX:
+            _lru.popitem(last=False)
+
+    contenido, w_pt, h_pt = entrada
+    img = Image(BytesIO(contenido))
+    img.drawWidth, img.drawHeight = w_pt, h_pt
+    return img
+
+
+def estadisticas() -> dict[str, int]:
+    return {**_contadores, "entradas": len(_lru)}
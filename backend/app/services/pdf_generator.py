@@ -16,7 +16,6 @@ Soporta múltiples idiomas (Castellano, Galego, Inglés).
 
 from io import BytesIO
 from typing import Optional, List
-import httpx
 import os
 from PIL import Image as PILImage
 from reportlab.lib.pagesizes import A4
@@ -26,9 +25,12 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 from reportlab.lib import colors
 
+from app.services import pictogram_cache
+from app.services.pdf_assets import logo_flowable
 
-# URL base para pictogramas ARASAAC
-ARASAAC_BASE_URL = "https://static.arasaac.org/pictograms"
+
+# Pictogramas que se dibujan por sección (materiales, reglas)
+MAX_PICTOS_SECCION = 6
 
 # Rutas de logos
 # Determinar ruta base relativa al archivo actual (backend/app/services/pdf_generator.py)
@@ -102,17 +104,8 @@ def get_translations(lang: str = "es") -> dict:
 
 
 async def fetch_pictogram_image(picto_id: int) -> Optional[bytes]:
-    """Descarga una imagen de pictograma de ARASAAC y la comprime."""
-    url = f"{ARASAAC_BASE_URL}/{picto_id}/{picto_id}_500.png"
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            if response.status_code == 200:
-                # Comprimir pictograma
-                return compress_image(response.content, max_size=150, quality=70)
-    except Exception:
-        pass
-    return None
+    """Pictograma de ARASAAC comprimido, desde el almacén local (pictogram_cache)."""
+    return await pictogram_cache.obtener(picto_id)
 
 
 def compress_image(image_bytes: bytes, max_size: int = 800, quality: int = 75) -> bytes:
@@ -159,89 +152,21 @@ def compress_image(image_bytes: bytes, max_size: int = 800, quality: int = 75) -
 
 def _load_logo_image(path: str, max_width: float, max_height: float) -> Optional[Image]:
     """
-    Carga una imagen de logo, la redimensiona y la escala proporcionalmente.
-    Reducir el tamaño de la imagen ANTES de pasarla a ReportLab reduce drásticamente
-    el tamaño del PDF final.
+    Logo escalado proporcionalmente para ReportLab. El PNG reducido se
+    prepara una vez y se reutiliza entre PDFs (ver app/services/pdf_assets.py).
     """
-    if not os.path.exists(path):
-        return None
-    try:
-        # Abrir con PIL para manipular
-        with PILImage.open(path) as pil_img:
-            # Calcular tamaño objetivo en píxeles (asumiendo 300 DPI para impresión)
-            # 1 punto = 1/72 pulgada. DPI = 300.
-            # Factor de conversión: 300 / 72 ≈ 4.16
-            dpi_factor = 4.2
-            target_w_px = int(max_width * dpi_factor)
-            target_h_px = int(max_height * dpi_factor)
-
-            # Mantener aspecto original
-            img_aspect = pil_img.width / pil_img.height
-            target_aspect = target_w_px / target_h_px
-
-            if img_aspect > target_aspect:
-                # La imagen es más ancha, limitar por ancho
-                final_w_px = target_w_px
-                final_h_px = int(target_w_px / img_aspect)
-            else:
-                # La imagen es más alta, limitar por alto
-                final_h_px = target_h_px
-                final_w_px = int(target_h_px * img_aspect)
-
-            # Redimensionar solo si la original es más grande
-            if pil_img.width > final_w_px or pil_img.height > final_h_px:
-                # Convertir a modo compatible si es necesario (mantener transparencia)
-                if pil_img.mode not in ('RGB', 'RGBA'):
-                    pil_img = pil_img.convert('RGBA')
-                
-                pil_img = pil_img.resize((final_w_px, final_h_px), PILImage.Resampling.LANCZOS)
-
-            # Guardar en buffer optimizado
-            img_buffer = BytesIO()
-            # Usar PNG para preservar transparencia de logos
-            pil_img.save(img_buffer, format='PNG', optimize=True)
-            img_buffer.seek(0)
-
-            # Crear imagen de ReportLab desde el buffer
-            img = Image(img_buffer)
-            
-            # Configurar dimensiones de dibujo (tamaño físico en el PDF)
-            # Esto es independiente de los píxeles reales de la imagen
-            if img_aspect > target_aspect:
-                img.drawWidth = max_width
-                img.drawHeight = max_width / img_aspect
-            else:
-                img.drawHeight = max_height
-                img.drawWidth = max_height * img_aspect
-
-            return img
-    except Exception as e:
-        print(f"Error cargando logo {path}: {e}")
-        return None
+    return logo_flowable(path, max_width, max_height)
 
 
 async def fetch_pictograms_bulk(ids: List[int]) -> dict:
     """
-    Descarga en paralelo todos los pictogramas de la lista y devuelve
+    Obtiene en paralelo todos los pictogramas de la lista y devuelve
     un diccionario {id: bytes}. Útil para exportaciones masivas.
     """
-    import asyncio
+    return await pictogram_cache.obtener_varios(ids)
 
-    async def fetch_one(picto_id: int) -> tuple[int, Optional[bytes]]:
-        data = await fetch_pictogram_image(picto_id)
-        return picto_id, data
 
-    results = await asyncio.gather(*[fetch_one(pid) for pid in ids], return_exceptions=True)
-    cache: dict[int, bytes] = {}
-    for result in results:
-        if isinstance(result, tuple):
-            pid, data = result
-            if data:
-                cache[pid] = data
-    return cache
-
-
-async def generate_game_sheet_pdf(
+def render_game_sheet_pdf(
     title: str,
     student_name: Optional[str] = None,
     sport_name: Optional[str] = None,
@@ -253,10 +178,14 @@ async def generate_game_sheet_pdf(
     pictos_reglas: Optional[List[int]] = None,
     is_anonymous: bool = False,
     language: str = "es",
-    picto_cache: Optional[dict] = None,  # {id: bytes} — evita re-descargar en exportaciones masivas
+    picto_cache: Optional[dict] = None,  # {id: bytes} ya descargados
 ) -> bytes:
     """
-    Genera un PDF estructurado de ficha de juego.
+    Genera un PDF estructurado de ficha de juego (síncrono, CPU).
+
+    No descarga nada: los pictogramas llegan ya en `picto_cache` y los que
+    falten se omiten. Se ejecuta en el pool de PDFs a través de
+    generate_game_sheet_pdf.
 
     Args:
         title: Nombre del juego
@@ -270,6 +199,7 @@ async def generate_game_sheet_pdf(
         pictos_reglas: Lista de IDs de pictogramas para reglas
         is_anonymous: Si es True, omite el nombre del alumno
         language: Código de idioma (es, gl, en)
+        picto_cache: Pictogramas descargados {id: bytes}
 
     Returns:
         bytes: Contenido del PDF generado
@@ -432,8 +362,8 @@ async def generate_game_sheet_pdf(
         if pictos_materiales and len(pictos_materiales) > 0:
             story.append(Spacer(1, 3*mm))
             picto_images = []
-            for picto_id in pictos_materiales[:6]:  # Máximo 6 pictogramas
-                img_bytes = (picto_cache or {}).get(picto_id) or await fetch_pictogram_image(picto_id)
+            for picto_id in pictos_materiales[:MAX_PICTOS_SECCION]:
+                img_bytes = (picto_cache or {}).get(picto_id)
                 if img_bytes:
                     try:
                         img_buffer = BytesIO(img_bytes)
@@ -471,8 +401,8 @@ async def generate_game_sheet_pdf(
         if pictos_reglas and len(pictos_reglas) > 0:
             story.append(Spacer(1, 3*mm))
             picto_images = []
-            for picto_id in pictos_reglas[:6]:  # Máximo 6 pictogramas
-                img_bytes = (picto_cache or {}).get(picto_id) or await fetch_pictogram_image(picto_id)
+            for picto_id in pictos_reglas[:MAX_PICTOS_SECCION]:
+                img_bytes = (picto_cache or {}).get(picto_id)
                 if img_bytes:
                     try:
                         img_buffer = BytesIO(img_bytes)
@@ -577,6 +507,56 @@ async def generate_game_sheet_pdf(
     return buffer.getvalue()
 
 
+async def generate_game_sheet_pdf(
+    title: str,
+    student_name: Optional[str] = None,
+    sport_name: Optional[str] = None,
+    liga_name: Optional[str] = None,
+    materiales: Optional[str] = None,
+    reglas: Optional[str] = None,
+    graphics_content: Optional[bytes] = None,
+    pictos_materiales: Optional[List[int]] = None,
+    pictos_reglas: Optional[List[int]] = None,
+    is_anonymous: bool = False,
+    language: str = "es",
+    picto_cache: Optional[dict] = None,  # {id: bytes} — evita re-descargar en exportaciones masivas
+) -> bytes:
+    """
+    Genera el PDF de ficha de juego: descarga aquí (en paralelo) los
+    pictogramas que no vengan en `picto_cache` y renderiza en el pool de
+    PDFs. Mismos argumentos que render_game_sheet_pdf.
+    """
+    usados = []
+    if materiales:
+        usados += (pictos_materiales or [])[:MAX_PICTOS_SECCION]
+    if reglas:
+        usados += (pictos_reglas or [])[:MAX_PICTOS_SECCION]
+    cache = picto_cache or {}
+    pictos = {pid: cache[pid] for pid in usados if cache.get(pid)}
+    faltan = [pid for pid in dict.fromkeys(usados) if pid not in pictos]
+    if faltan:
+        pictos.update(await fetch_pictograms_bulk(faltan))
+
+    from app.services import pdf_render_service
+
+    return await pdf_render_service.renderizar(
+        "ficha_juego",
+        render_game_sheet_pdf,
+        title=title,
+        student_name=student_name,
+        sport_name=sport_name,
+        liga_name=liga_name,
+        materiales=materiales,
+        reglas=reglas,
+        graphics_content=graphics_content,
+        pictos_materiales=pictos_materiales,
+        pictos_reglas=pictos_reglas,
+        is_anonymous=is_anonymous,
+        language=language,
+        picto_cache=pictos,
+    )
+
+
 async def generate_wiki_pdf(submission, language: str = "es") -> bytes:
     """
     Genera PDF desde un objeto GameSubmission para descarga en Wiki.
@@ -0,0 +1,204 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Renderizado de PDFs fuera del bucle de eventos.
+
+ReportLab es CPU puro y síncrono: un acta o una ficha con pictogramas
+tarda cientos de milisegundos y, ejecutado en el endpoint, congela todas
+las peticiones del worker uvicorn. Todos los PDFs pasan por `renderizar`:
+
+- pool de procesos acotado (PDF_RENDER_PROCESSES) cuyos workers arrancan
+  con ReportLab ya importado, fuentes y hojas de estilo cargadas;
+- cola acotada (PDF_RENDER_QUEUE_MAX): con el pool lleno y la cola llena
+  se responde 503 con Retry-After en vez de acumular peticiones;
+- métricas por tipo de documento: espera en cola y tiempo de render.
+
+Las funciones que se envían al pool deben ser síncronas, de módulo (o
+staticmethods) y recibir datos planos: todo viaja serializado con pickle.
+Con PDF_RENDER_PROCESSES=0 (tests, desarrollo) se renderiza en un hilo,
+con la misma cola acotada y las mismas métricas.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Segundos sugeridos al cliente cuando el pool está saturado
+REINTENTO_SEGUNDOS = 5
+
+_pool: Optional[ProcessPoolExecutor] = None
+_en_curso = 0
+
+_metricas: dict[str, dict[str, float]] = defaultdict(
+    lambda: {"total": 0, "errores": 0, "rechazados": 0, "render_segundos": 0.0, "espera_segundos": 0.0}
+)
+
+
+# ---------------------------------------------------------------------------
+# Lado worker (se ejecuta en los procesos del pool)
+# ---------------------------------------------------------------------------
+
+def _calentar_worker() -> None:
+    """Inicializador del proceso: paga una sola vez imports, fuentes, estilos y logos."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+
+    from app.services import pdf_generator, report_service
+    from app.services import team_contract_pdf  # noqa: F401
+    from app.services.pdf_assets import logo_flowable
+
+    getSampleStyleSheet()
+    for fuente in ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Helvetica-BoldOblique"):
+        pdfmetrics.getFont(fuente)
+    # Logos de cabecera en la caché del proceso (cajas de 25 mm y 20 mm)
+    for ruta in (pdf_generator.EDUMIND_LOGO_PATH, pdf_generator.LIGA_LOGO_PATH):
+        logo_flowable(ruta, 25 * mm, 25 * mm)
+    for ruta in (report_service._EDUMIND_LOGO_PATH, report_service._LIGA_LOGO_PATH):
+        logo_flowable(ruta, 20 * mm, 20 * mm)
+
+
+def _ejecutar(funcion: Callable[..., bytes], args: tuple, kwargs: dict) -> tuple[bytes, float]:
+    """Renderiza y devuelve también lo que tardó el render en sí (sin la cola)."""
+    inicio = time.perf_counter()
+    contenido = funcion(*args, **kwargs)
+    return contenido, time.perf_counter() - inicio
+
+
+def _ping() -> None:
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+def capacidad() -> int:
+    """Documentos admitidos a la vez: los que se renderizan más los que esperan."""
+    return max(settings.PDF_RENDER_PROCESSES, 1) + settings.PDF_RENDER_QUEUE_MAX
+
+
+def comprobar_hueco(documento: str) -> None:
+    """503 con Retry-After si el pool no admite más documentos ahora mismo."""
+    if _en_curso < capacidad():
+        return
+    _metricas[documento]["rechazados"] += 1
+    logger.warning("Pool de PDFs saturado (%s en curso); rechazado %s", _en_curso, documento)
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="El generador de PDFs está ocupado. Inténtalo de nuevo en unos segundos.",
+        headers={"Retry-After": str(REINTENTO_SEGUNDOS)},
+    )
+
+
+def _obtener_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if settings.PDF_RENDER_PROCESSES <= 0:
+        return None
+    if _pool is None:
+        # spawn: no se hereda el estado del bucle, sockets ni hilos del proceso uvicorn
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_RENDER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_calentar_worker,
+        )
+    return _pool
+
+
+def iniciar() -> None:
+    """Crea el pool y arranca sus workers ya, para no pagarlo en el primer PDF."""
+    pool = _obtener_pool()
+    if pool is None:
+        return
+    for _ in range(settings.PDF_RENDER_PROCESSES):
+        pool.submit(_ping)
+
+
+def cerrar() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def renderizar(documento: str, funcion: Callable[..., bytes], *args: Any, **kwargs: Any) -> bytes:
+    """
+    Renderiza `funcion(*args, **kwargs)` en el pool y devuelve los bytes.
+
+    `documento` identifica el tipo en las métricas ("clasificacion",
+    "acta_partido", "ficha_juego"...). Lanza 503 si el pool está saturado.
+    """
+    global _en_curso
+    comprobar_hueco(documento)
+    metricas = _metricas[documento]
+    _en_curso += 1
+    inicio = time.perf_counter()
+    try:
+        pool = _obtener_pool()
+        if pool is None:
+            contenido, duracion = await asyncio.to_thread(_ejecutar, funcion, args, kwargs)
+        else:
+            contenido, duracion = await asyncio.wrap_future(pool.submit(_ejecutar, funcion, args, kwargs))
+    except BrokenProcessPool:
+        # Un worker murió (OOM, señal): el pool no se recupera solo
+        metricas["errores"] += 1
+        logger.error("Pool de PDFs roto al renderizar %s; se recrea", documento)
+        cerrar()
+        raise
+    except Exception:
+        metricas["errores"] += 1
+        raise
+    finally:
+        _en_curso -= 1
+
+    total = time.perf_counter() - inicio
+    metricas["total"] += 1
+    metricas["render_segundos"] += duracion
+    metricas["espera_segundos"] += max(total - duracion, 0.0)
+    return contenido
+
+
+# ---------------------------------------------------------------------------
+# Métricas
+# ---------------------------------------------------------------------------
+
+def estadisticas() -> dict[str, Any]:
+    return {
+        "en_curso": _en_curso,
+        "capacidad": capacidad(),
+        "documentos": {documento: dict(valores) for documento, valores in _metricas.items()},
+    }
+
+
+def lineas_prometheus() -> list[str]:
+    """Exposición Prometheus de estadisticas() (contadores del proceso)."""
+    datos = estadisticas()
+    lineas = [
+        f"liga_pdf_render_in_flight {datos['en_curso']}",
+        f"liga_pdf_render_capacity {datos['capacidad']}",
+    ]
+    for documento, valores in sorted(datos["documentos"].items()):
+        etiqueta = f'{{document="{documento}"}}'
+        lineas += [
+            f"liga_pdf_render_seconds_sum{etiqueta} {valores['render_segundos']:.6f}",
+            f"liga_pdf_render_seconds_count{etiqueta} {int(valores['total'])}",
+            f"liga_pdf_render_wait_seconds_sum{etiqueta} {valores['espera_segundos']:.6f}",
+            f"liga_pdf_render_errors_total{etiqueta} {int(valores['errores'])}",
+            f"liga_pdf_render_rejected_total{etiqueta} {int(valores['rechazados'])}",
+        ]
+    return lineas
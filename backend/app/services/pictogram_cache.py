@@ -0,0 +1,260 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Almacén local de pictogramas ARASAAC para las fichas de juego.
+
+Un pictograma se descarga y se recomprime (PNG 500px -> JPEG pequeño) una
+sola vez: el JPEG queda en disco (PICTOGRAM_CACHE_DIR) con nombre
+`<id>_<tamaño>.jpg` y delante hay una LRU en memoria del proceso. Una
+ficha que se vuelve a descargar no hace ninguna petición de red ni
+vuelve a codificar nada.
+
+- Cliente HTTP compartido (keep-alive) con descargas simultáneas acotadas.
+- Single-flight: el mismo pictograma pedido a la vez se descarga una vez.
+- Caché negativa: los ids que ARASAAC responde con 404 se recuerdan
+  (fichero `.404`) durante NEGATIVO_TTL_SEGUNDOS. Los errores de red o 5xx
+  no se recuerdan: se reintentará en la siguiente petición.
+
+Para precargar los pictogramas usados en las fichas existentes:
+`PYTHONPATH=. python scripts/warm_pictogram_cache.py` (desde backend/).
+"""
+import asyncio
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ARASAAC_BASE_URL = "https://static.arasaac.org/pictograms"
+
+# JPEG guardado: lado máximo en píxeles y calidad (lo que dibuja la ficha)
+PICTO_TAMANO = 150
+PICTO_CALIDAD = 70
+
+# Entradas en la LRU del proceso (~5 KB cada una)
+LRU_MAX = 512
+NEGATIVO_TTL_SEGUNDOS = 24 * 3600
+DESCARGAS_SIMULTANEAS = 8
+TIMEOUT_SEGUNDOS = 10.0
+
+Clave = tuple[int, int]
+
+_lru: "OrderedDict[Clave, bytes]" = OrderedDict()
+# Ids inexistentes -> instante (time.time) en que deja de valer el 404
+_negativos: dict[Clave, float] = {}
+_en_vuelo: dict[Clave, asyncio.Future] = {}
+
+_cliente: Optional[httpx.AsyncClient] = None
+_semaforo: Optional[asyncio.Semaphore] = None
+_bucle: Optional[asyncio.AbstractEventLoop] = None
+
+_contadores = {"memoria": 0, "disco": 0, "descargas": 0, "negativos": 0, "errores": 0}
+
+
+# ---------------------------------------------------------------------------
+# Disco
+# ---------------------------------------------------------------------------
+
+def _ruta(clave: Clave, extension: str) -> Path:
+    picto_id, tamano = clave
+    return Path(settings.PICTOGRAM_CACHE_DIR) / f"{picto_id}_{tamano}.{extension}"
+
+
+def _leer_disco(clave: Clave) -> tuple[Optional[bytes], Optional[float]]:
+    """(JPEG, None) si está guardado; (None, caducidad) si hay un 404 vigente."""
+    try:
+        return _ruta(clave, "jpg").read_bytes(), None
+    except FileNotFoundError:
+        pass
+    marca = _ruta(clave, "404")
+    try:
+        caduca = marca.stat().st_mtime + NEGATIVO_TTL_SEGUNDOS
+    except FileNotFoundError:
+        return None, None
+    if caduca > time.time():
+        return None, caduca
+    marca.unlink(missing_ok=True)
+    return None, None
+
+
+def _escribir_disco(ruta: Path, datos: bytes) -> None:
+    """Escritura atómica: nunca se lee un JPEG a medias (varios workers)."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f"{ruta.name}.{secrets.token_hex(4)}.tmp")
+    temporal.write_bytes(datos)
+    os.replace(temporal, ruta)
+
+
+def _comprimir(contenido: bytes, tamano: int) -> bytes:
+    from app.services.pdf_generator import compress_image
+
+    return compress_image(contenido, max_size=tamano, quality=PICTO_CALIDAD)
+
+
+# ---------------------------------------------------------------------------
+# Red
+# ---------------------------------------------------------------------------
+
+def _cliente_http() -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    global _cliente, _semaforo, _bucle
+    bucle = asyncio.get_running_loop()
+    # Un cliente de otro bucle (tests, recarga) no sirve: se crea otro
+    if _cliente is None or _bucle is not bucle:
+        _cliente = httpx.AsyncClient(
+            timeout=TIMEOUT_SEGUNDOS,
+            limits=httpx.Limits(
+                max_connections=DESCARGAS_SIMULTANEAS,
+                max_keepalive_connections=DESCARGAS_SIMULTANEAS,
+            ),
+        )
+        _semaforo = asyncio.Semaphore(DESCARGAS_SIMULTANEAS)
+        _bucle = bucle
+    return _cliente, _semaforo
+
+
+async def _descargar(clave: Clave) -> tuple[Optional[bytes], bool]:
+    """(JPEG, False) si se descargó; (None, True) si ARASAAC no lo tiene."""
+    picto_id, tamano = clave
+    cliente, semaforo = _cliente_http()
+    url = f"{ARASAAC_BASE_URL}/{picto_id}/{picto_id}_500.png"
+    try:
+        async with semaforo:
+            response = await cliente.get(url)
+    except httpx.HTTPError:
+        _contadores["errores"] += 1
+        logger.debug("Error descargando pictograma %s", picto_id, exc_info=True)
+        return None, False
+    if response.status_code == 404:
+        return None, True
+    if response.status_code != 200:
+        _contadores["errores"] += 1
+        logger.debug("ARASAAC respondio %s para el pictograma %s", response.status_code, picto_id)
+        return None, False
+    _contadores["descargas"] += 1
+    return await asyncio.to_thread(_comprimir, response.content, tamano), False
+
+
+async def cerrar() -> None:
+    global _cliente, _bucle
+    if _cliente is not None:
+        cliente, _cliente, _bucle = _cliente, None, None
+        await cliente.aclose()
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def _recordar(clave: Clave, datos: bytes) -> None:
+    _lru[clave] = datos
+    _lru.move_to_end(clave)
+    while len(_lru) > LRU_MAX:
+        _lru.popitem(last=False)
+
+
+async def _cargar(clave: Clave) -> Optional[bytes]:
+    datos, caduca = await asyncio.to_thread(_leer_disco, clave)
+    if datos is not None:
+        _contadores["disco"] += 1
+        _recordar(clave, datos)
+        return datos
+    if caduca is not None:
+        _contadores["negativos"] += 1
+        _negativos[clave] = caduca
+        return None
+
+    datos, inexistente = await _descargar(clave)
+    try:
+        if datos is not None:
+            await asyncio.to_thread(_escribir_disco, _ruta(clave, "jpg"), datos)
+        elif inexistente:
+            await asyncio.to_thread(_escribir_disco, _ruta(clave, "404"), b"")
+    except OSError:
+        # Sin disco se sigue sirviendo desde memoria
+        logger.warning("No se pudo guardar el pictograma %s en %s", clave[0], settings.PICTOGRAM_CACHE_DIR)
+    if datos is not None:
+        _recordar(clave, datos)
+    elif inexistente:
+        _negativos[clave] = time.time() + NEGATIVO_TTL_SEGUNDOS
+    return datos
+
+
+async def obtener(picto_id: int, tamano: int = PICTO_TAMANO) -> Optional[bytes]:
+    """JPEG comprimido del pictograma, o None si no existe o no se pudo descargar."""
+    try:
+        clave = (int(picto_id), int(tamano))
+    except (TypeError, ValueError):
+        return None
+
+    datos = _lru.get(clave)
+    if datos is not None:
+        _lru.move_to_end(clave)
+        _contadores["memoria"] += 1
+        return datos
+    caduca = _negativos.get(clave)
+    if caduca is not None:
+        if caduca > time.time():
+            _contadores["negativos"] += 1
+            return None
+        del _negativos[clave]
+
+    en_curso = _en_vuelo.get(clave)
+    if en_curso is not None:
+        return await asyncio.shield(en_curso)
+
+    futuro = asyncio.get_running_loop().create_future()
+    futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _en_vuelo[clave] = futuro
+    try:
+        datos = await _cargar(clave)
+        futuro.set_result(datos)
+        return datos
+    except BaseException as exc:
+        futuro.set_exception(exc if isinstance(exc, Exception) else RuntimeError("carga interrumpida"))
+        raise
+    finally:
+        _en_vuelo.pop(clave, None)
+
+
+async def obtener_varios(ids: Iterable[int], tamano: int = PICTO_TAMANO) -> dict[int, bytes]:
+    """{id: JPEG} de los pictogramas disponibles, en paralelo y sin repetidos."""
+    unicos = list(dict.fromkeys(ids))
+    resultados = await asyncio.gather(*[obtener(pid, tamano) for pid in unicos])
+    return {pid: datos for pid, datos in zip(unicos, resultados) if datos}
+
+
+async def precalentar(ids: Iterable[int]) -> dict[str, int]:
+    """Deja en disco los pictogramas indicados. Resumen para el comando de warm."""
+    unicos = list(dict.fromkeys(ids))
+    disponibles = await obtener_varios(unicos)
+    return {"pedidos": len(unicos), "disponibles": len(disponibles)}
+
+
+def estadisticas() -> dict[str, int]:
+    return {**_contadores, "lru": len(_lru)}
+
+
+def lineas_prometheus() -> list[str]:
+    """Exposición Prometheus de estadisticas() (contadores del proceso)."""
+    datos = estadisticas()
+    return [
+        f'liga_pictogram_cache_hits_total{{tier="memory"}} {datos["memoria"]}',
+        f'liga_pictogram_cache_hits_total{{tier="disk"}} {datos["disco"]}',
+        f"liga_pictogram_downloads_total {datos['descargas']}",
+        f"liga_pictogram_negative_hits_total {datos['negativos']}",
+        f"liga_pictogram_errors_total {datos['errores']}",
+        f"liga_pictogram_cache_memory_entries {datos['lru']}",
+    ]
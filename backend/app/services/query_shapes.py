@@ -0,0 +1,59 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Forma de las consultas de los listados: opciones de carga y subconsultas
+agregadas compartidas por los endpoints.
+
+Un listado debe costar un número fijo de sentencias SQL, tenga 2 filas o
+200: los datos relacionados llegan en la misma consulta (JOIN) o en una
+por relación (selectin), y los recuentos salen de un GROUP BY, nunca de
+una consulta por fila. Los tests lo comprueban con el fixture
+`sentencias_sql` (app/tests/conftest.py).
+"""
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
+
+from app.models import GameSubmission
+
+# Fichas en listados: el deporte en el mismo SELECT; la liga y las
+# taxonomías no se usan, así que no se cargan (y tocarlas es un error)
+FICHA_LISTADO = (
+    joinedload(GameSubmission.sport),
+    raiseload(GameSubmission.liga),
+    raiseload(GameSubmission.taxonomias),
+)
+# Exportaciones (CSV): deporte y liga en el mismo SELECT
+FICHA_EXPORTACION = (
+    joinedload(GameSubmission.sport),
+    joinedload(GameSubmission.liga),
+    raiseload(GameSubmission.taxonomias),
+)
+
+
+def total_por(columna, *criterios):
+    """
+    Subconsulta `(clave, total)` con el número de filas por valor de
+    `columna` (normalmente una FK), para unirla con OUTER JOIN al listado.
+    """
+    return (
+        select(columna.label("clave"), func.count().label("total"))
+        .where(*criterios)
+        .group_by(columna)
+        .subquery()
+    )
+
+
+async def contar_por(db: AsyncSession, columna, ids: list[int]) -> dict[int, int]:
+    """Recuento por valor de `columna` para `ids` en una sola consulta (sin entradas a cero)."""
+    if not ids:
+        return {}
+    result = await db.execute(
+        select(columna, func.count()).where(columna.in_(ids)).group_by(columna)
+    )
+    return {int(clave): int(total or 0) for clave, total in result.all()}
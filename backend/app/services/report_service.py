@@ -23,10 +23,12 @@ from datetime import datetime
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
+from app.services.pdf_assets import logo_flowable
+
 # Rutas de logos (idénticas a pdf_generator.py y team_contract_pdf.py)
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 _BACKEND_DIR = os.path.dirname(os.path.dirname(_CURRENT_DIR))
@@ -40,33 +42,8 @@ if not os.path.exists(_LIGA_LOGO_PATH):
 
 
 def _load_logo(path: str, max_w: float, max_h: float):
-    """Carga y escala un logo con PIL para reducir tamaño del PDF."""
-    if not os.path.exists(path):
-        return None
-    try:
-        from PIL import Image as PILImage
-        buf = io.BytesIO()
-        with PILImage.open(path) as img:
-            aspect = img.width / img.height
-            target_aspect = max_w / max_h
-            if aspect > target_aspect:
-                w_px, h_px = int(max_w * 4.2), int(max_w * 4.2 / aspect)
-            else:
-                w_px, h_px = int(max_h * 4.2 * aspect), int(max_h * 4.2)
-            if img.width > w_px or img.height > h_px:
-                if img.mode not in ("RGB", "RGBA"):
-                    img = img.convert("RGBA")
-                img = img.resize((w_px, h_px), PILImage.Resampling.LANCZOS)
-            img.save(buf, format="PNG", optimize=True)
-        buf.seek(0)
-        rl_img = Image(buf)
-        if aspect > max_w / max_h:
-            rl_img.drawWidth, rl_img.drawHeight = max_w, max_w / aspect
-        else:
-            rl_img.drawWidth, rl_img.drawHeight = max_h * aspect, max_h
-        return rl_img
-    except Exception:
-        return None
+    """Logo escalado para el PDF (caché compartida en app/services/pdf_assets.py)."""
+    return logo_flowable(path, max_w, max_h)
 
 
 # Paleta EDUmind (misma que pdf_generator.py / team_contract_pdf.py)
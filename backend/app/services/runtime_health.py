@@ -0,0 +1,305 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Runtime health of each worker: DB pool, Redis pool and event-loop lag.
+
+- DB pool: size, checked-out connections, overflow, coroutines waiting for
+  a connection, wait-time histogram and timeouts
+  (app/core/pool_instrumentation.py).
+- Redis pool (cache, throttles): connections in use, idle and the limit.
+- Event loop: a sampler sleeps LAG_INTERVAL_SECONDS and records how late
+  it wakes up (lag histogram). A watchdog thread logs a warning with the
+  loop thread's stack when the loop stops ticking for LOOP_BLOCK_WARN_MS:
+  that stack is the blocking callback (PDF/PIL work outside the render
+  pool, sync I/O...).
+
+Every worker publishes its snapshot to Redis with a short TTL and a
+heartbeat in a registry sorted set (WORKERS_KEY, as for the HTTP
+metrics); the Prometheus endpoint renders all live workers (label
+`worker`) without scanning the keyspace. Without
+Redis it renders only the worker that answers. The readiness payload
+carries this worker's snapshot, informational only.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import suppress
+from typing import Any, Optional
+
+import orjson
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.pool_instrumentation import BUCKETS_ESPERA
+from app.database import engine, redis_pool
+from app.services.metrics_service import FLUSH_INTERVAL_SECONDS, live_workers, metrics, register_worker
+
+logger = logging.getLogger(__name__)
+
+LAG_INTERVAL_SECONDS = 0.1
+# Upper bounds (seconds) of the lag histogram; +Inf is implicit
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Samples kept for the recent maximum (~1 minute)
+LAG_RECENT_SAMPLES = 600
+
+SNAPSHOT_KEY_PREFIX = "metrics:runtime:"
+SNAPSHOT_TTL_SECONDS = 3 * FLUSH_INTERVAL_SECONDS
+# Registry of workers with a live snapshot: worker_id -> time of last publish
+WORKERS_KEY = "metrics:runtime:workers"
+
+
+class LoopLagMonitor:
+    """Event-loop lag sampler plus a watchdog thread for long blocks."""
+
+    def __init__(self, interval: float = LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.buckets = [0] * (len(LAG_BUCKETS) + 1)
+        self.sum = 0.0
+        self.recent: deque = deque(maxlen=LAG_RECENT_SAMPLES)
+        self.blocked_total = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def observe(self, lag: float) -> None:
+        index = next((i for i, bound in enumerate(LAG_BUCKETS) if lag <= bound), len(LAG_BUCKETS))
+        self.buckets[index] += 1
+        self.sum += lag
+        self.recent.append(lag)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "lag_buckets": list(self.buckets),
+            "lag_sum": self.sum,
+            "lag_max_recent": max(self.recent, default=0.0),
+            "blocked_total": self.blocked_total,
+        }
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        if settings.LOOP_BLOCK_WARN_MS:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.observe(max(0.0, now - expected))
+            self._heartbeat = now
+
+    def check_blocked(self) -> bool:
+        """Log the loop thread's stack if the loop is blocked past the threshold."""
+        stalled_ms = (time.monotonic() - self._heartbeat - self.interval) * 1000
+        if stalled_ms < settings.LOOP_BLOCK_WARN_MS:
+            return False
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+        logger.warning("Event loop blocked for %.0f ms; loop thread stack:\n%s", stalled_ms, stack)
+        self.blocked_total += 1
+        return True
+
+    def _watch(self) -> None:
+        check_every = max(settings.LOOP_BLOCK_WARN_MS / 4000, 0.01)
+        reported = None
+        while not self._stop.wait(check_every):
+            # One warning per block: the heartbeat moves once the loop recovers
+            heartbeat = self._heartbeat
+            if heartbeat != reported and self.check_blocked():
+                reported = heartbeat
+
+
+loop_monitor = LoopLagMonitor()
+_publish_task: Optional[asyncio.Task] = None
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+def db_pool_stats(pool=None) -> dict[str, Any]:
+    """Gauges of the DB pool (only those the pool class supports)."""
+    pool = pool if pool is not None else engine.sync_engine.pool
+    stats: dict[str, Any] = {"class": type(pool).__name__}
+    for name, method in (("size", "size"), ("checked_out", "checkedout"),
+                         ("checked_in", "checkedin"), ("overflow", "overflow")):
+        value = getattr(pool, method, None)
+        if callable(value):
+            stats[name] = value()
+    max_overflow = getattr(pool, "_max_overflow", None)
+    if isinstance(max_overflow, int) and "size" in stats:
+        stats["max_connections"] = stats["size"] + max(max_overflow, 0)
+    espera = getattr(pool, "espera", None)
+    if espera is not None:
+        stats.update(
+            waiting=espera.esperando,
+            timeouts=espera.timeouts,
+            wait_buckets=list(espera.buckets),
+            wait_sum=espera.suma,
+        )
+    return stats
+
+
+def redis_pool_stats(pool=None) -> dict[str, Any]:
+    pool = pool if pool is not None else redis_pool
+    return {
+        "in_use": len(getattr(pool, "_in_use_connections", ())),
+        "idle": len(getattr(pool, "_available_connections", ())),
+        "max_connections": getattr(pool, "max_connections", None),
+    }
+
+
+def snapshot() -> dict[str, Any]:
+    """This worker's runtime health."""
+    return {
+        "worker": metrics.worker_id,
+        "db_pool": db_pool_stats(),
+        "redis_pool": redis_pool_stats(),
+        "event_loop": loop_monitor.stats(),
+    }
+
+
+def readiness_summary() -> dict[str, Any]:
+    """Compact snapshot for /api/ready (no histograms)."""
+    datos = snapshot()
+    db_pool = {k: v for k, v in datos["db_pool"].items() if not k.startswith("wait_")}
+    loop = datos["event_loop"]
+    return {
+        "worker": datos["worker"],
+        "db_pool": db_pool,
+        "redis_pool": datos["redis_pool"],
+        "event_loop": {
+            "lag_max_recent_ms": round(loop["lag_max_recent"] * 1000, 1),
+            "blocked_total": loop["blocked_total"],
+        },
+    }
+
+
+async def publish() -> bool:
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(
+                    f"{SNAPSHOT_KEY_PREFIX}{metrics.worker_id}",
+                    orjson.dumps(snapshot()),
+                    ex=SNAPSHOT_TTL_SECONDS,
+                )
+                register_worker(pipe, WORKERS_KEY, metrics.worker_id, SNAPSHOT_TTL_SECONDS)
+                await pipe.execute()
+        finally:
+            await redis.aclose()
+    except Exception:
+        logger.debug("Redis unavailable while publishing runtime health", exc_info=True)
+        return False
+    return True
+
+
+async def collect() -> list[dict[str, Any]]:
+    """Snapshots of every live worker, or just this one without Redis."""
+    if not await publish():
+        return [snapshot()]
+    try:
+        redis = aioredis.Redis(connection_pool=redis_pool)
+        try:
+            workers = await live_workers(redis, WORKERS_KEY, SNAPSHOT_TTL_SECONDS)
+            keys = [f"{SNAPSHOT_KEY_PREFIX}{worker}" for worker in workers]
+            payloads = await redis.mget(keys) if keys else []
+            snapshots = [orjson.loads(data) for data in payloads if data]
+        finally:
+            await redis.aclose()
+    except Exception:
+        logger.debug("Redis unavailable while reading runtime health", exc_info=True)
+        return [snapshot()]
+    return sorted(snapshots, key=lambda s: s["worker"]) or [snapshot()]
+
+
+async def _publish_loop() -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        await publish()
+
+
+def start() -> None:
+    """Start the lag sampler, the watchdog and the publisher (app lifespan)."""
+    global _publish_task
+    loop_monitor.start()
+    if _publish_task is None:
+        _publish_task = asyncio.create_task(_publish_loop())
+
+
+async def stop() -> None:
+    global _publish_task
+    if _publish_task is not None:
+        _publish_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _publish_task
+        _publish_task = None
+    await loop_monitor.stop()
+
+
+# ---------------------------------------------------------------------------
+# Prometheus
+# ---------------------------------------------------------------------------
+
+def _histogram(metric: str, labels: str, bounds: tuple, counts: list, total: float) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*bounds, "+Inf"), counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{metric}_sum{{{labels}}} {total:.6f}")
+    lines.append(f"{metric}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+async def lineas_prometheus() -> list[str]:
+    """Pool, Redis and event-loop metrics of every live worker."""
+    lines = []
+    for data in await collect():
+        labels = f'worker="{data["worker"]}"'
+        db_pool = data["db_pool"]
+        for name in ("size", "checked_out", "overflow", "max_connections", "waiting"):
+            if name in db_pool:
+                lines.append(f"liga_db_pool_{name}{{{labels}}} {db_pool[name]}")
+        if "wait_buckets" in db_pool:
+            lines.append(f"liga_db_pool_timeouts_total{{{labels}}} {db_pool['timeouts']}")
+            lines += _histogram(
+                "liga_db_pool_wait_seconds", labels, BUCKETS_ESPERA, db_pool["wait_buckets"], db_pool["wait_sum"]
+            )
+        redis_stats = data["redis_pool"]
+        lines.append(f"liga_redis_pool_in_use{{{labels}}} {redis_stats['in_use']}")
+        lines.append(f"liga_redis_pool_idle{{{labels}}} {redis_stats['idle']}")
+        loop = data["event_loop"]
+        lines += _histogram("liga_event_loop_lag_seconds", labels, LAG_BUCKETS, loop["lag_buckets"], loop["lag_sum"])
+        lines.append(f"liga_event_loop_lag_max_recent_seconds{{{labels}}} {loop['lag_max_recent']:.6f}")
+        lines.append(f"liga_event_loop_blocked_total{{{labels}}} {loop['blocked_total']}")
+    return lines
@@ -0,0 +1,133 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Cola de recálculo de estadísticas de liga (arq).
+
+`encolar_recalculo_liga` programa el job `recompute_league_stats` del
+worker (app/workers/stats_worker.py) con un job_id fijo por liga: arq no
+admite dos jobs con el mismo id, así que una ráfaga de ediciones de
+marcador colapsa en una única ejecución, también entre workers uvicorn.
+
+Los cambios que llegan con el job ya en marcha dejan la liga marcada como
+pendiente y el worker repite el job al terminar. Si Redis no está
+disponible, el llamante degrada a recalcular en el propio proceso.
+"""
+import logging
+
+from arq import create_pool
+from arq.connections import RedisSettings
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATS_QUEUE_NAME = "arq:stats"
+METRICAS_KEY = "arq:stats:metricas"
+
+# Una marca de pendiente huérfana (worker caído) no debe vivir para siempre
+PENDIENTE_TTL_SEGUNDOS = 3600
+
+
+def job_id_liga(liga_id: int) -> str:
+    return f"stats:liga:{liga_id}"
+
+
+def pendiente_key(liga_id: int) -> str:
+    return f"arq:stats:pendiente:{liga_id}"
+
+
+# Pool de conexión a la cola arq, perezoso y compartido por proceso
+_arq_pool = None
+
+
+async def _get_arq_pool():
+    global _arq_pool
+    if _arq_pool is None:
+        redis_settings = RedisSettings.from_dsn(settings.STATS_QUEUE_REDIS_URL)
+        # Se llama desde el camino de la petición: sin reintentos de conexión,
+        # el llamante ya degrada a recalcular en el proceso
+        redis_settings.conn_retries = 0
+        _arq_pool = await create_pool(redis_settings, default_queue_name=STATS_QUEUE_NAME)
+    return _arq_pool
+
+
+async def encolar_recalculo_liga(liga_id: int, espera_segundos: float = 0) -> bool:
+    """
+    Encola (o se suma al ya encolado) el recálculo de una liga.
+    Devuelve False si la cola no está disponible.
+    """
+    global _arq_pool
+    try:
+        pool = await _get_arq_pool()
+        await pool.set(pendiente_key(liga_id), "1", ex=PENDIENTE_TTL_SEGUNDOS)
+        job = await pool.enqueue_job(
+            "recompute_league_stats",
+            liga_id,
+            _job_id=job_id_liga(liga_id),
+            _queue_name=STATS_QUEUE_NAME,
+            _defer_by=espera_segundos or None,
+        )
+        if job is None:
+            logger.debug("Recalculo de liga %s ya encolado; se agrega al existente", liga_id)
+        return True
+    except Exception:
+        logger.warning("Cola de estadisticas no disponible para liga %s", liga_id, exc_info=True)
+        _arq_pool = None  # forzar reconexión en el próximo intento
+        return False
+
+
+async def registrar_ejecucion(redis, espera_s: float, duracion_s: float, exito: bool) -> None:
+    """
+    Acumula las métricas de un job en Redis (las lee cualquier worker
+    uvicorn al servir /api/metrics/prometheus). Fallo = no-op.
+    """
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(METRICAS_KEY, "jobs_total", 1)
+            if not exito:
+                pipe.hincrby(METRICAS_KEY, "jobs_fallidos", 1)
+            pipe.hincrbyfloat(METRICAS_KEY, "espera_segundos_sum", max(espera_s, 0.0))
+            pipe.hincrbyfloat(METRICAS_KEY, "duracion_segundos_sum", duracion_s)
+            await pipe.execute()
+    except Exception:
+        logger.debug("No se pudieron registrar metricas del job de estadisticas", exc_info=True)
+
+
+async def metricas_cola() -> dict[str, float]:
+    """Profundidad de la cola y acumulados de los jobs (vacío si no hay Redis)."""
+    global _arq_pool
+    try:
+        pool = await _get_arq_pool()
+        profundidad = await pool.zcard(STATS_QUEUE_NAME)
+        acumulados = await pool.hgetall(METRICAS_KEY)
+    except Exception:
+        logger.debug("Cola de estadisticas no disponible para metricas", exc_info=True)
+        _arq_pool = None
+        return {}
+
+    metricas = {"profundidad": float(profundidad)}
+    for campo, valor in acumulados.items():
+        clave = campo.decode() if isinstance(campo, bytes) else campo
+        metricas[clave] = float(valor)
+    return metricas
+
+
+def lineas_prometheus(metricas: dict[str, float]) -> list[str]:
+    """Exposición Prometheus de metricas_cola()."""
+    if not metricas:
+        return []
+    total = metricas.get("jobs_total", 0)
+    return [
+        f'liga_stats_queue_depth {int(metricas.get("profundidad", 0))}',
+        f'liga_stats_jobs_total {int(total)}',
+        f'liga_stats_jobs_failed_total {int(metricas.get("jobs_fallidos", 0))}',
+        f'liga_stats_job_wait_seconds_sum {metricas.get("espera_segundos_sum", 0):.6f}',
+        f'liga_stats_job_wait_seconds_count {int(total)}',
+        f'liga_stats_job_duration_seconds_sum {metricas.get("duracion_segundos_sum", 0):.6f}',
+        f'liga_stats_job_duration_seconds_count {int(total)}',
+    ]
@@ -18,6 +18,7 @@ Privacy-first design:
 
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 import hashlib
@@ -27,23 +28,20 @@ import re
 import unicodedata
 
 from fastapi import Request
-from PIL import Image, UnidentifiedImageError
+from PIL import Image, ImageChops, ImageMath, UnidentifiedImageError
 
 
-_DEFAULT_BLOCKED_TERMS = {
-    "gilipollas",
-    "joder",
-    "mierda",
-    "subnormal",
-    "imbecil",
-    "idiota",
-    "tontorron",
-    "cabron",
-    "cabrona",
-    "puto",
-    "puta",
-    "cojones",
-}
+_STRETCH_RE = re.compile(r"(.)\1{2,}")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]")
+_SPACES_RE = re.compile(r"\s+")
+_REPEATS_RE = re.compile(r"(.)\1+")
+# Runs of 3+ single-character tokens: "m i e r d a", "m.i.e.r.d.a"
+_SPELLED_OUT_RE = re.compile(r"\b(?:[a-z0-9] ){2,}[a-z0-9]\b")
+# Common character substitutions used to dodge the filter ("m1erd@")
+_LEET_TABLE = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+    "@": "a", "$": "s", "€": "e",
+})
 
 
 def _remove_accents(value: str) -> str:
@@ -54,12 +52,25 @@ def _remove_accents(value: str) -> str:
 def normalize_policy_text(value: str) -> str:
     lowered = _remove_accents(value.lower())
     # Normalize stretched tokens like "pesaddooooo"
-    lowered = re.sub(r"(.)\1{2,}", r"\1\1", lowered)
-    lowered = re.sub(r"[^a-z0-9\s]", " ", lowered)
-    lowered = re.sub(r"\s+", " ", lowered).strip()
+    lowered = _STRETCH_RE.sub(r"\1\1", lowered)
+    lowered = _NON_ALNUM_RE.sub(" ", lowered)
+    lowered = _SPACES_RE.sub(" ", lowered).strip()
     return lowered
 
 
+def _matching_key(value: str) -> str:
+    """
+    Aggressive normalization used only for matching: undoes character
+    substitutions, collapses any repeated letter and joins spelled-out words.
+    Terms and text go through the same function, so they stay comparable.
+    """
+    lowered = _remove_accents(value.lower()).translate(_LEET_TABLE)
+    lowered = _NON_ALNUM_RE.sub(" ", lowered)
+    lowered = _SPACES_RE.sub(" ", lowered).strip()
+    lowered = _SPELLED_OUT_RE.sub(lambda m: m.group(0).replace(" ", ""), lowered)
+    return _REPEATS_RE.sub(r"\1", lowered)
+
+
 def _parse_custom_terms(raw_terms: str | None) -> set[str]:
     if not raw_terms:
         return set()
@@ -71,6 +82,22 @@ def _parse_custom_terms(raw_terms: str | None) -> set[str]:
     return terms
 
 
+_DEFAULT_BLOCKED_TERMS = frozenset({
+    "gilipollas",
+    "joder",
+    "mierda",
+    "subnormal",
+    "imbecil",
+    "idiota",
+    "tontorron",
+    "cabron",
+    "cabrona",
+    "puto",
+    "puta",
+    "cojones",
+})
+
+
 @dataclass
 class TextPolicyResult:
     blocked: bool
@@ -78,20 +105,100 @@ class TextPolicyResult:
     normalized_text: str = ""
 
 
+class PolicyMatcher:
+    """
+    Aho-Corasick automaton over the blocklist (single words and multi-word
+    phrases). One linear pass over the text finds every term; a match only
+    counts when it starts and ends on a word boundary, so "puta" does not
+    fire inside "disputa".
+    """
+
+    def __init__(self, terms: frozenset[str]):
+        self.terms = terms
+        # Node 0 is the root; each node: transitions, failure link, outputs
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, str]]] = [[]]
+
+        for term in terms:
+            key = _matching_key(term)
+            if not key:
+                continue
+            node = 0
+            for ch in key:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(key), term))
+
+        # Breadth-first failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0) if node else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> list[str]:
+        """Sorted blocklist terms present in `text`."""
+        key = _matching_key(text)
+        found: set[str] = set()
+        node = 0
+        last = len(key) - 1
+        for index, ch in enumerate(key):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if not self._out[node] or (index < last and key[index + 1] != " "):
+                continue
+            for length, term in self._out[node]:
+                start = index - length + 1
+                if start == 0 or key[start - 1] == " ":
+                    found.add(term)
+        return sorted(found)
+
+    def analyze(self, *chunks: str) -> TextPolicyResult:
+        normalized = normalize_policy_text(" ".join(chunks or []))
+        if not normalized:
+            return TextPolicyResult(blocked=False, normalized_text="")
+        found = self.find(" ".join(chunks))
+        return TextPolicyResult(
+            blocked=bool(found),
+            matched_terms=found,
+            normalized_text=normalized,
+        )
+
+
+_MATCHERS_MAX = 8
+_matchers: dict[str, PolicyMatcher] = {}
+
+
+def get_policy_matcher(custom_blocklist: str | None = None) -> PolicyMatcher:
+    """
+    Compiled matcher for the default terms plus `custom_blocklist`, built
+    once per distinct blocklist (keyed by its hash) and reused afterwards.
+    """
+    digest = hashlib.sha256((custom_blocklist or "").encode("utf-8")).hexdigest()
+    matcher = _matchers.get(digest)
+    if matcher is None:
+        if len(_matchers) >= _MATCHERS_MAX:
+            _matchers.clear()
+        terms = frozenset(_DEFAULT_BLOCKED_TERMS | _parse_custom_terms(custom_blocklist))
+        matcher = _matchers[digest] = PolicyMatcher(terms)
+    return matcher
+
+
 def analyze_text_for_policy(*chunks: str, custom_blocklist: str | None = None) -> TextPolicyResult:
-    merged = " ".join(chunks or [])
-    normalized = normalize_policy_text(merged)
-    if not normalized:
-        return TextPolicyResult(blocked=False, normalized_text="")
-
-    terms = _DEFAULT_BLOCKED_TERMS | _parse_custom_terms(custom_blocklist)
-    tokens = normalized.split(" ")
-    found = sorted({token for token in tokens if token in terms})
-    return TextPolicyResult(
-        blocked=bool(found),
-        matched_terms=found,
-        normalized_text=normalized,
-    )
+    return get_policy_matcher(custom_blocklist).analyze(*chunks)
 
 
 @dataclass
@@ -116,6 +223,95 @@ def _is_skin_tone_pixel(r: int, g: int, b: int) -> bool:
     )
 
 
+# Skin-tone bounds of `_is_skin_tone_pixel` scaled by 1e6, so the Cb/Cr
+# planes can be computed exactly in Pillow's int32 arithmetic.
+_CB_COEFFS = (-168_736, -331_364, 500_000)
+_CR_COEFFS = (500_000, -418_688, -81_312)
+_CHROMA_OFFSET = 128_000_000
+_CB_RANGE = (80_000_000, 135_000_000)
+_CR_RANGE = (135_000_000, 180_000_000)
+
+
+def _count_ones(mask: Image.Image) -> int:
+    """Number of pixels set in a 0/1 ImageMath mask."""
+    return mask.convert("L").histogram()[1]
+
+
+def _drawing_counts(sampled: Image.Image) -> tuple[int, int, int, int]:
+    """
+    (skin, red-dominant, dark, colour buckets) counts over the whole buffer
+    using Pillow band operations instead of a per-pixel Python loop.
+    """
+    r, g, b = sampled.split()
+
+    # max(r, g, b) < 45
+    brightest = ImageChops.lighter(ImageChops.lighter(r, g), b)
+    dark_count = brightest.point(lambda v: 1 if v < 45 else 0).histogram()[1]
+
+    # r >= 150 and r > 1.2g and r > 1.2b  (5r > 6g is exact for 8-bit ints)
+    red_count = _count_ones(ImageMath.lambda_eval(
+        lambda a: (a["r"] >= 150) & (a["r"] * 5 > a["g"] * 6) & (a["r"] * 5 > a["b"] * 6),
+        r=r, g=g, b=b,
+    ))
+
+    cb = ImageMath.lambda_eval(
+        lambda a: a["r"] * _CB_COEFFS[0] + a["g"] * _CB_COEFFS[1] + a["b"] * _CB_COEFFS[2] + _CHROMA_OFFSET,
+        r=r, g=g, b=b,
+    )
+    cr = ImageMath.lambda_eval(
+        lambda a: a["r"] * _CR_COEFFS[0] + a["g"] * _CR_COEFFS[1] + a["b"] * _CR_COEFFS[2] + _CHROMA_OFFSET,
+        r=r, g=g, b=b,
+    )
+    # Pixels sitting exactly on a bound: the float version rounds them
+    # either way, so they are settled below with the scalar check.
+    on_bound = ImageMath.lambda_eval(
+        lambda a: (a["cb"] == _CB_RANGE[0]) | (a["cb"] == _CB_RANGE[1])
+        | (a["cr"] == _CR_RANGE[0]) | (a["cr"] == _CR_RANGE[1]),
+        cb=cb, cr=cr,
+    )
+    skin_count = _count_ones(ImageMath.lambda_eval(
+        lambda a: (a["cb"] >= _CB_RANGE[0]) & (a["cb"] <= _CB_RANGE[1])
+        & (a["cr"] >= _CR_RANGE[0]) & (a["cr"] <= _CR_RANGE[1])
+        & (a["r"] > 60) & (a["g"] > 35) & (a["b"] > 20)
+        & (a["r"] > a["g"]) & (a["r"] > a["b"])
+        & (a["on_bound"] == 0),
+        cb=cb, cr=cr, r=r, g=g, b=b, on_bound=on_bound,
+    ))
+    if _count_ones(on_bound):
+        # Black is never on a bound, so it is a safe background
+        candidates = Image.new("RGB", sampled.size)
+        candidates.paste(sampled, mask=on_bound.convert("L").point(lambda v: 255 if v else 0))
+        skin_count += sum(
+            count
+            for count, color in candidates.getcolors(sampled.width * sampled.height)
+            if color != (0, 0, 0) and _is_skin_tone_pixel(*color)
+        )
+
+    quantized = Image.merge("RGB", [band.point(lambda v: v & 0xF0) for band in (r, g, b)])
+    bucket_count = len(quantized.getcolors(4096))
+
+    return skin_count, red_count, dark_count, bucket_count
+
+
+def _drawing_counts_per_pixel(sampled: Image.Image) -> tuple[int, int, int, int]:
+    """Scalar reference for `_drawing_counts` (used by tests and the benchmark)."""
+    skin_count = 0
+    red_dominant_count = 0
+    dark_count = 0
+    buckets: set[tuple[int, int, int]] = set()
+
+    for r, g, b in sampled.get_flattened_data():
+        buckets.add((r // 16, g // 16, b // 16))
+        if _is_skin_tone_pixel(r, g, b):
+            skin_count += 1
+        if r >= 150 and r > (g * 1.2) and r > (b * 1.2):
+            red_dominant_count += 1
+        if max(r, g, b) < 45:
+            dark_count += 1
+
+    return skin_count, red_dominant_count, dark_count, len(buckets)
+
+
 def analyze_drawing_for_policy(image_bytes: bytes) -> DrawingPolicyResult:
     if not image_bytes:
         return DrawingPolicyResult(flagged=False)
@@ -140,29 +336,16 @@ def analyze_drawing_for_policy(image_bytes: bytes) -> DrawingPolicyResult:
 
     sampled = rgb.copy()
     sampled.thumbnail((256, 256))
-    pixels = list(sampled.getdata())
-    total = float(len(pixels))
+    total = float(sampled.width * sampled.height)
     if total == 0:
         return DrawingPolicyResult(flagged=True, reasons=["empty_image"])
 
-    skin_count = 0
-    red_dominant_count = 0
-    dark_count = 0
-    buckets: set[tuple[int, int, int]] = set()
-
-    for r, g, b in pixels:
-        buckets.add((r // 16, g // 16, b // 16))
-        if _is_skin_tone_pixel(r, g, b):
-            skin_count += 1
-        if r >= 150 and r > (g * 1.2) and r > (b * 1.2):
-            red_dominant_count += 1
-        if max(r, g, b) < 45:
-            dark_count += 1
+    skin_count, red_dominant_count, dark_count, bucket_count = _drawing_counts(sampled)
 
     skin_ratio = skin_count / total
     red_ratio = red_dominant_count / total
     dark_ratio = dark_count / total
-    unique_ratio = len(buckets) / 4096.0
+    unique_ratio = bucket_count / 4096.0
     photo_like = unique_ratio >= 0.18
 
     reasons: list[str] = []
@@ -16,7 +16,6 @@ from io import BytesIO
 from datetime import datetime
 from typing import List, Optional
 
-from PIL import Image as PILImage
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm, cm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -25,6 +24,8 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.lib import colors
 
+from app.services.pdf_assets import logo_flowable
+
 # Constant paths (matching pdf_generator.py)
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 BACKEND_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
@@ -41,66 +42,37 @@ if not os.path.exists(LIGA_LOGO_PATH):
 
 def _load_logo_image(path: str, max_width: float, max_height: float) -> Optional[Image]:
     """
-    Carga una imagen de logo, la redimensiona y la escala proporcionalmente.
-    Helper copied from pdf_generator.py for consistency.
+    Scaled logo for ReportLab, shared with pdf_generator.py through the
+    logo cache in app/services/pdf_assets.py.
     """
-    if not os.path.exists(path):
-        return None
-    try:
-        # Abrir con PIL para manipular
-        with PILImage.open(path) as pil_img:
-            # Calcular tamaño objetivo en píxeles (asumiendo 300 DPI para impresión)
-            # 1 punto = 1/72 pulgada. DPI = 300.
-            # Factor de conversión: 300 / 72 ≈ 4.16
-            dpi_factor = 4.2
-            target_w_px = int(max_width * dpi_factor)
-            target_h_px = int(max_height * dpi_factor)
-
-            # Mantener aspecto original
-            img_aspect = pil_img.width / pil_img.height
-            target_aspect = target_w_px / target_h_px
-
-            if img_aspect > target_aspect:
-                # La imagen es más ancha, limitar por ancho
-                final_w_px = target_w_px
-                final_h_px = int(target_w_px / img_aspect)
-            else:
-                # La imagen es más alta, limitar por alto
-                final_h_px = target_h_px
-                final_w_px = int(target_h_px * img_aspect)
-
-            # Redimensionar solo si la original es más grande
-            if pil_img.width > final_w_px or pil_img.height > final_h_px:
-                # Convertir a modo compatible si es necesario (mantener transparencia)
-                if pil_img.mode not in ('RGB', 'RGBA'):
-                    pil_img = pil_img.convert('RGBA')
-                
-                pil_img = pil_img.resize((final_w_px, final_h_px), PILImage.Resampling.LANCZOS)
+    return logo_flowable(path, max_width, max_height)
 
-            # Guardar en buffer optimizado
-            img_buffer = BytesIO()
-            # Usar PNG para preservar transparencia de logos
-            pil_img.save(img_buffer, format='PNG', optimize=True)
-            img_buffer.seek(0)
 
-            # Crear imagen de ReportLab desde el buffer
-            img = Image(img_buffer)
-            
-            # Configurar dimensiones de dibujo (tamaño físico en el PDF)
-            if img_aspect > target_aspect:
-                img.drawWidth = max_width
-                img.drawHeight = max_width / img_aspect
-            else:
-                img.drawHeight = max_height
-                img.drawWidth = max_height * img_aspect
+async def generate_team_contract_pdf(
+    nombre_estudiante: str,
+    equipo_nombre: str,
+    liga_nombre: str,
+    rol: str,
+    compromisos: List[str]
+) -> bytes:
+    """
+    Generate a PDF contract for team membership in the PDF render pool.
+    Same arguments as render_team_contract_pdf.
+    """
+    from app.services import pdf_render_service
 
-            return img
-    except Exception as e:
-        print(f"Error cargando logo {path}: {e}")
-        return None
+    return await pdf_render_service.renderizar(
+        "contrato_equipo",
+        render_team_contract_pdf,
+        nombre_estudiante,
+        equipo_nombre,
+        liga_nombre,
+        rol,
+        list(compromisos),
+    )
 
 
-async def generate_team_contract_pdf(
+def render_team_contract_pdf(
     nombre_estudiante: str,
     equipo_nombre: str,
     liga_nombre: str,
@@ -108,7 +80,7 @@ async def generate_team_contract_pdf(
     compromisos: List[str]
 ) -> bytes:
     """
-    Generate a PDF contract for team membership.
+    Build the team membership contract PDF (synchronous, CPU bound).
     
     Args:
         nombre_estudiante: Student name
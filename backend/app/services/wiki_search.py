@@ -0,0 +1,107 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Búsqueda y paginación de la Wiki de Juegos.
+
+En PostgreSQL la búsqueda usa `game_submissions.search_vector` (tsvector
+con la configuración `wiki_es`, español + unaccent, sobre título,
+materiales y reglas con pesos A/B/C) y su índice GIN; los resultados se
+ordenan por ts_rank_cd. En otros motores (SQLite en los tests) la columna
+guarda el texto normalizado y cada término se busca con LIKE; la
+relevancia cuenta los términos que aparecen en el título.
+
+La paginación es por cursor (keyset): el cursor codifica la clave de orden
+de la última ficha devuelta, así que la página 50 cuesta lo mismo que la
+primera.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional
+
+import orjson
+from sqlalchemy import DateTime, Float, and_, case, func, literal, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.game_submission import CONFIG_BUSQUEDA, GameSubmission
+from app.utils.text import normalize_search_text
+
+# Términos que se tienen en cuenta en el fallback sin tsvector
+MAX_TERMINOS = 8
+
+
+class CursorInvalido(ValueError):
+    """El cursor está corrupto o no corresponde a esta búsqueda."""
+
+
+def terminos(busqueda: str) -> list[str]:
+    """Términos normalizados (minúsculas, sin tildes) de `busqueda`."""
+    return normalize_search_text(busqueda).split()[:MAX_TERMINOS]
+
+
+def _escapar_like(termino: str) -> str:
+    return termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def criterio_busqueda(
+    dialecto: str, busqueda: str
+) -> tuple[Optional[ColumnElement], Optional[ColumnElement]]:
+    """(filtro, relevancia) de `busqueda`; (None, None) si no hay nada que buscar."""
+    palabras = terminos(busqueda)
+    if not palabras:
+        return None, None
+
+    vector = GameSubmission.search_vector
+    if dialecto == "postgresql":
+        consulta = func.websearch_to_tsquery(CONFIG_BUSQUEDA, busqueda)
+        return vector.op("@@")(consulta), func.ts_rank_cd(vector, consulta, type_=Float)
+
+    # El título es la primera línea del texto indexado
+    titulo = func.substr(vector, 1, func.instr(vector, "\n"))
+    filtro = and_(*(vector.like(f"%{_escapar_like(p)}%", escape="\\") for p in palabras))
+    relevancia = sum(
+        (case((func.instr(titulo, p) > 0, 1.0), else_=0.0) for p in palabras),
+        literal(0.0, type_=Float),
+    )
+    return filtro, relevancia
+
+
+def claves_orden(dialecto: str, relevancia: Optional[ColumnElement] = None) -> list[ColumnElement]:
+    """Claves de orden (todas descendentes): relevancia, fecha de publicación e id."""
+    fecha = func.coalesce(GameSubmission.published_at, GameSubmission.created_at)
+    if dialecto == "sqlite":
+        # SQLite guarda fechas como texto con y sin microsegundos;
+        # datetime() las iguala para comparar con el valor del cursor
+        fecha = func.datetime(fecha)
+    claves = [fecha, GameSubmission.id]
+    return claves if relevancia is None else [relevancia, *claves]
+
+
+def codificar_cursor(valores) -> str:
+    """Cursor opaco con los valores de las claves de orden de una fila."""
+    return base64.urlsafe_b64encode(orjson.dumps(list(valores))).decode().rstrip("=")
+
+
+def despues_del_cursor(claves: list[ColumnElement], cursor: str) -> ColumnElement:
+    """Criterio keyset: filas que van detrás de la del cursor."""
+    try:
+        valores = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError) as exc:
+        raise CursorInvalido("Cursor no válido") from exc
+    if not isinstance(valores, list) or len(valores) != len(claves):
+        raise CursorInvalido("Cursor no válido")
+
+    ligados = []
+    for clave, valor in zip(claves, valores):
+        if isinstance(clave.type, DateTime):
+            try:
+                valor = datetime.fromisoformat(valor)
+            except (TypeError, ValueError) as exc:
+                raise CursorInvalido("Cursor no válido") from exc
+        ligados.append(literal(valor, type_=clave.type))
+    return tuple_(*claves) < tuple_(*ligados)
@@ -23,6 +23,8 @@ import os
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 # Test database URL (override via PYTEST_DATABASE_URL when needed)
@@ -38,6 +40,7 @@ else:
     os.environ.setdefault("DEBUG", "false")
 os.environ.setdefault("DISABLE_STATS_UPDATES", "1")
 os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PDF_RENDER_PROCESSES", "0")
 os.environ.setdefault("AUTH_COOKIE_SECURE", "false")
 
 # Safety guard: avoid running tests against non-test databases unless explicitly allowed.
@@ -52,6 +55,7 @@ elif not existing_db_url.startswith("sqlite"):
         )
 
 from app.main import app
+from app.core.sql_instrumentation import instrumentar_engine
 from app.database import Base, get_db
 # Import all models to ensure they are registered in Base.metadata
 from app.models import User, Liga, Equipo, TipoDeporte, Jornada, Partido
@@ -75,10 +79,67 @@ def _email_sin_red(monkeypatch):
     monkeypatch.setattr(email_service, "enviar_email_smtp", _smtp_falso)
 
 
+@pytest.fixture(autouse=True)
+def _cola_stats_sin_red(monkeypatch):
+    """La cola arq de estadísticas tampoco toca Redis en los tests."""
+    from app.services import stats_jobs
+
+    async def _pool_no_disponible():
+        raise ConnectionError("cola de estadisticas deshabilitada en tests")
+
+    monkeypatch.setattr(stats_jobs, "_get_arq_pool", _pool_no_disponible)
+
+
+@pytest.fixture(autouse=True)
+def _cola_fichas_sin_red(monkeypatch):
+    """Ni la cola arq de fichas de juego."""
+    from app.services import game_sheet_jobs
+
+    async def _pool_no_disponible():
+        raise ConnectionError("cola de fichas deshabilitada en tests")
+
+    monkeypatch.setattr(game_sheet_jobs, "_get_arq_pool", _pool_no_disponible)
+
+
+class ContadorSQL:
+    """Sentencias SQL ejecutadas (en cualquier conexión) mientras está activo."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+    async def contar(self, peticion) -> int:
+        """Sentencias que cuesta `await peticion()` (que debe responder sin error)."""
+        self.total = 0
+        respuesta = await peticion()
+        assert respuesta.status_code < 400, respuesta.text
+        return self.total
+
+    async def assert_constante(self, peticion, ampliar) -> None:
+        """Falla si las sentencias de `peticion` crecen tras `await ampliar()` (más filas)."""
+        antes = await self.contar(peticion)
+        await ampliar()
+        despues = await self.contar(peticion)
+        assert despues <= antes, f"N+1: {antes} sentencias -> {despues} con más filas"
+
+
+@pytest.fixture
+def sentencias_sql():
+    """Cuenta las sentencias SQL por petición (detecta consultas N+1)."""
+    contador = ContadorSQL()
+    event.listen(Engine, "before_cursor_execute", contador)
+    yield contador
+    event.remove(Engine, "before_cursor_execute", contador)
+
+
 @pytest_asyncio.fixture
 async def db():
     """Create test database."""
     engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+    # Mismos hooks que el engine de la aplicación (app/database.py)
+    instrumentar_engine(engine.sync_engine)
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
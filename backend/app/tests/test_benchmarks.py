@@ -0,0 +1,94 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Suite de benchmarks (backend/benchmarks): la liga sintética es coherente,
+todos los casos se ejecutan contra la app y la comparación con la
+baseline detecta los empeoramientos.
+"""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import EvaluacionPersonalizada, Partido
+from app.models.partido_participacion import PartidoParticipacion
+from app.services.clasificacion_service import ClasificacionService
+from benchmarks.liga_sintetica import TamanoLiga, crear_liga_sintetica
+from benchmarks.medicion import comparar, diferencias_de_medicion, regresiones
+from benchmarks.run import CASOS, ejecutar, sin_redis
+
+
+@pytest.mark.asyncio
+async def test_liga_sintetica_coherente(session: AsyncSession):
+    tamano = TamanoLiga(equipos=7, jornadas=4, deportes=2, criterios=5, finalizadas=0.5)
+    liga = await crear_liga_sintetica(session, tamano)
+
+    assert liga.partidos == 3 * 4
+    finalizados = await session.scalar(
+        select(func.count()).where(Partido.liga_id == liga.liga_id, Partido.finalizado == True)
+    )
+    assert finalizados == 3 * 2
+    assert len(liga.pines) == 3 * 2
+    participaciones = await session.scalar(
+        select(func.count()).where(PartidoParticipacion.liga_id == liga.liga_id)
+    )
+    assert participaciones == 5 * liga.partidos
+    evaluaciones = await session.scalar(
+        select(func.count()).select_from(EvaluacionPersonalizada)
+        .where(EvaluacionPersonalizada.partido_id.in_(liga.partido_ids))
+    )
+    assert evaluaciones == finalizados * 5
+
+    clasificacion = await ClasificacionService.calcular_clasificacion(liga.liga_id, session, use_cache=False)
+    assert len(clasificacion) == 7
+    # Cada partido finalizado suma un resultado al local y otro al visitante
+    assert sum(e["ganados"] + e["empatados"] + e["perdidos"] for e in clasificacion) == 2 * finalizados
+
+
+@pytest.mark.asyncio
+async def test_ejecuta_todos_los_casos(db):
+    with sin_redis():
+        resultados = await ejecutar(db, TamanoLiga(equipos=6, jornadas=3, deportes=1, criterios=2), 1)
+
+    assert list(resultados["casos"]) == list(CASOS)
+    assert resultados["entorno"]["dialecto"] == "sqlite"
+    assert resultados["entorno"]["repeticiones"] == 1
+    assert resultados["entorno"]["maquina"]["cpus"]
+    assert all(datos["repeticiones"] == 1 and datos["mediana_ms"] > 0 for datos in resultados["casos"].values())
+
+
+def _resultados(tamano: dict, **medianas: float) -> dict:
+    return {
+        "entorno": {"dialecto": "sqlite", "tamano": tamano},
+        "casos": {caso: {"mediana_ms": mediana} for caso, mediana in medianas.items()},
+    }
+
+
+def test_comparacion_con_la_baseline():
+    base = _resultados({"equipos": 12}, clasificacion=10.0, insignias=1.0, export_pines_pdf=400.0)
+    actual = _resultados({"equipos": 12}, clasificacion=14.0, insignias=2.0, export_pines_pdf=410.0, nuevo=5.0)
+
+    comparaciones = comparar(actual, base)
+    assert [c.caso for c in comparaciones] == ["clasificacion", "insignias", "export_pines_pdf"]
+    # insignias duplica pero por debajo del margen absoluto
+    assert [c.caso for c in regresiones(comparaciones, umbral=0.25, margen_ms=2.0)] == ["clasificacion"]
+    assert regresiones(comparaciones, umbral=0.5) == []
+
+    with pytest.raises(ValueError, match="no es comparable"):
+        comparar(_resultados({"equipos": 24}, clasificacion=10.0), base)
+
+
+def test_avisa_si_cambian_maquina_o_repeticiones():
+    base = _resultados({"equipos": 12}, clasificacion=10.0)
+    base["entorno"].update(maquina={"cpus": 8}, repeticiones=10)
+    actual = _resultados({"equipos": 12}, clasificacion=10.0)
+    actual["entorno"].update(maquina={"cpus": 8}, repeticiones=10)
+    assert diferencias_de_medicion(actual, base) == []
+
+    actual["entorno"].update(maquina={"cpus": 2}, repeticiones=1)
+    avisos = diferencias_de_medicion(actual, base)
+    assert len(avisos) == 2 and "maquina" in avisos[0] and "repeticiones" in avisos[1]
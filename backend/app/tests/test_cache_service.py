@@ -0,0 +1,165 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Caché compartida de vistas de liga: generaciones, single-flight,
+refresco anticipado y degradación sin Redis.
+"""
+import asyncio
+
+import pytest
+
+from app.services import cache_service
+
+
+class _RedisMemoria:
+    """Subconjunto de redis.asyncio sobre un dict compartido (sin TTL)."""
+
+    def __init__(self, datos: dict):
+        self.datos = datos
+
+    async def get(self, clave):
+        valor = self.datos.get(clave)
+        return valor.decode() if isinstance(valor, bytes) else valor
+
+    async def set(self, clave, valor, ex=None, px=None, nx=False):
+        if nx and clave in self.datos:
+            return None
+        self.datos[clave] = valor
+        return True
+
+    async def delete(self, clave):
+        self.datos.pop(clave, None)
+
+    async def incr(self, clave):
+        self.datos[clave] = str(int(self.datos.get(clave, 0)) + 1)
+        return int(self.datos[clave])
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def redis_memoria(monkeypatch):
+    datos: dict = {}
+    monkeypatch.setattr(
+        cache_service.aioredis, "Redis", lambda connection_pool=None: _RedisMemoria(datos)
+    )
+    cache_service._contadores.clear()
+    return datos
+
+
+def _contador_llamadas(valor):
+    llamadas = []
+
+    async def calcular():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return valor
+
+    return calcular, llamadas
+
+
+@pytest.mark.asyncio
+async def test_acierto_tras_fallo(redis_memoria):
+    calcular, llamadas = _contador_llamadas({"jornadas": [1, 2]})
+
+    primero = await cache_service.obtener_o_calcular(1, "vista", calcular)
+    segundo = await cache_service.obtener_o_calcular(1, "vista", calcular)
+
+    assert primero == segundo == {"jornadas": [1, 2]}
+    assert len(llamadas) == 1
+    assert cache_service.estadisticas()["vista"]["hits"] == 1
+    assert cache_service.estadisticas()["vista"]["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_generacion_invalida_todas_las_vistas(redis_memoria):
+    calcular, llamadas = _contador_llamadas([1])
+
+    await cache_service.obtener_o_calcular(1, "a", calcular)
+    await cache_service.obtener_o_calcular(1, "b", calcular, clave=7)
+    await cache_service.obtener_o_calcular(2, "a", calcular)
+    assert len(llamadas) == 3
+
+    await cache_service.invalidar_liga(1)
+    assert await cache_service.generacion_liga(1) == 1
+
+    await cache_service.obtener_o_calcular(1, "a", calcular)
+    await cache_service.obtener_o_calcular(1, "b", calcular, clave=7)
+    # La otra liga conserva su caché
+    await cache_service.obtener_o_calcular(2, "a", calcular)
+    assert len(llamadas) == 5
+
+
+@pytest.mark.asyncio
+async def test_single_flight_un_calculo_para_peticiones_simultaneas(redis_memoria):
+    calcular, llamadas = _contador_llamadas({"ok": True})
+
+    resultados = await asyncio.gather(
+        *[cache_service.obtener_o_calcular(1, "vista", calcular) for _ in range(30)]
+    )
+
+    assert all(r == {"ok": True} for r in resultados)
+    assert len(llamadas) == 1
+    # Ningún lock queda colgado
+    assert not [k for k in redis_memoria if k.endswith(":lock")]
+
+
+@pytest.mark.asyncio
+async def test_espera_al_valor_de_otro_worker(redis_memoria, monkeypatch):
+    monkeypatch.setattr(cache_service, "ESPERA_SONDEO_SEGUNDOS", 0.01)
+    calcular, llamadas = _contador_llamadas("propio")
+    clave = cache_service._clave_vista(1, 0, "vista", "")
+    # Otro worker tiene el lock y guarda el valor poco después
+    redis_memoria[f"{clave}:lock"] = "otro"
+
+    async def otro_worker():
+        await asyncio.sleep(0.03)
+        redis_memoria[clave] = cache_service.serializar({"v": "ajeno", "e": 1e12, "c": 0})
+
+    tarea = asyncio.create_task(otro_worker())
+    valor = await cache_service.obtener_o_calcular(1, "vista", calcular)
+    await tarea
+
+    assert valor == "ajeno"
+    assert llamadas == []
+
+
+@pytest.mark.asyncio
+async def test_refresco_anticipado_sirve_copia_si_otro_refresca(redis_memoria, monkeypatch):
+    calcular, llamadas = _contador_llamadas("nuevo")
+    clave = cache_service._clave_vista(1, 0, "vista", "")
+    # Copia a punto de caducar y con coste alto: XFetch decide refrescar
+    redis_memoria[clave] = cache_service.serializar({"v": "viejo", "e": 0, "c": 10.0})
+    monkeypatch.setattr(cache_service.random, "random", lambda: 0.5)
+
+    redis_memoria[f"{clave}:lock"] = "otro"
+    assert await cache_service.obtener_o_calcular(1, "vista", calcular) == "viejo"
+    assert llamadas == []
+
+    del redis_memoria[f"{clave}:lock"]
+    assert await cache_service.obtener_o_calcular(1, "vista", calcular) == "nuevo"
+    assert len(llamadas) == 1
+    assert cache_service.estadisticas()["vista"]["refrescos"] == 2
+
+
+@pytest.mark.asyncio
+async def test_sin_redis_calcula_directamente(monkeypatch):
+    class _RedisCaido(_RedisMemoria):
+        async def get(self, clave):
+            raise ConnectionError("Redis caído")
+
+    monkeypatch.setattr(
+        cache_service.aioredis, "Redis", lambda connection_pool=None: _RedisCaido({})
+    )
+    cache_service._contadores.clear()
+    calcular, llamadas = _contador_llamadas(3)
+
+    assert await cache_service.obtener_o_calcular(1, "vista", calcular) == 3
+    assert cache_service.estadisticas()["vista"]["errores"] == 1
+    assert "liga_cache_errors_total{view=\"vista\"} 1" in cache_service.lineas_prometheus()
@@ -0,0 +1,82 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Escenario de carga de una jornada en clase (benchmarks/carga_jornada.py)
+a escala mínima contra la app en proceso: todas las propuestas llegan,
+el docente las aprueba, los proyectores sondean y el SSE queda abierto.
+
+Usa una BD SQLite en fichero: la de :memory: de los tests comparte una
+única conexión y las peticiones concurrentes mezclarían sus transacciones.
+"""
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, get_db
+from app.main import app
+from app.models import Partido, PendingAction
+from benchmarks.carga_jornada import APROBACION, PASOS, PROPUESTA, Escenario, Parametros, SseAsgi, clase_de_liga
+from benchmarks.liga_sintetica import TamanoLiga, crear_liga_sintetica
+
+
+@pytest_asyncio.fixture
+async def sesiones_fichero(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'carga.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sesiones = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with sesiones() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield sesiones
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_jornada_en_clase(sesiones_fichero):
+    async with sesiones_fichero() as session:
+        ligas = [
+            await crear_liga_sintetica(
+                session, TamanoLiga(equipos=6, jornadas=2, deportes=2, finalizadas=0.5, semilla=n)
+            )
+            for n in range(2)
+        ]
+    clases = [clase_de_liga(liga) for liga in ligas]
+    parametros = Parametros(
+        clases=2, propuestas=2, pestanas=1, ventana=0.2,
+        pausa_alumnos=0.01, pausa_docente=0.05, intervalo_proyector=0.05, timeout=30,
+    )
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as cliente:
+        informe = await Escenario(cliente, SseAsgi(app), clases, parametros).ejecutar()
+
+    assert informe["completo"]
+    assert informe["partidos_aprobados"] == informe["partidos"] == 2 * 3
+    assert set(informe["pasos"]) == set(PASOS)
+    assert all(datos["errores"] == 0 for datos in informe["pasos"].values()), informe["pasos"]
+    assert informe["pasos"][PROPUESTA]["peticiones"] == 2 * 3 * 2
+    assert informe["pasos"][APROBACION]["peticiones"] == 2 * 3
+    assert informe["sse"]["max_abiertos"] == 2
+
+    en_juego = [partido_id for clase in clases for _, partido_id, _ in clase.partidos]
+    async with sesiones_fichero() as session:
+        finalizados = await session.scalar(
+            select(func.count()).where(Partido.id.in_(en_juego), Partido.finalizado == True)
+        )
+        # Las correcciones del alumnado actualizan la propuesta: una por partido
+        propuestas = await session.scalar(
+            select(func.count()).select_from(PendingAction).where(PendingAction.target_id.in_(en_juego))
+        )
+    assert finalizados == len(en_juego)
+    assert propuestas == len(en_juego)
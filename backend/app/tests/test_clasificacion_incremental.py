@@ -0,0 +1,201 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Motor incremental de clasificación: aplicar los cambios de partido como
+deltas debe dar exactamente lo mismo que reconstruir desde cero.
+"""
+import copy
+import random
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Liga, Equipo, Partido, TipoDeporte
+from app.services.clasificacion_incremental import (
+    aplicar_delta,
+    construir_clasificacion,
+    contribucion_partido,
+    diferencia,
+)
+from app.services.clasificacion_service import ClasificacionService
+from app.tests.utils.utils import create_random_user
+
+
+def _equipos(n: int):
+    return [SimpleNamespace(id=i, nombre=f"E{i}", logo_filename=None) for i in range(1, n + 1)]
+
+
+def _partido_aleatorio(rng: random.Random, partido_id: int, n_equipos: int):
+    ids = rng.sample(range(1, n_equipos + 1), 5)
+    resultado = rng.choice(["V", "E", "D"])
+    puntos = {"V": (3, 1), "E": (2, 2), "D": (1, 3)}[resultado]
+    return SimpleNamespace(
+        id=partido_id,
+        finalizado=True,
+        equipo_local_id=ids[0],
+        equipo_visitante_id=ids[1],
+        arbitro_id=ids[2],
+        tutor_grada_local_id=ids[3],
+        tutor_grada_visitante_id=ids[4],
+        resultado=resultado,
+        puntos_local=puntos[0],
+        puntos_visitante=puntos[1],
+        puntos_juego_limpio_local=rng.choice([0, 1]),
+        puntos_juego_limpio_visitante=rng.choice([0, 1]),
+        puntos_arbitro=rng.choice([0, 2]),
+        puntos_grada_local=rng.choice([0, 0.5, 1]),
+        puntos_grada_visitante=rng.choice([0, 0.5, 1]),
+    )
+
+
+def test_partido_no_finalizado_no_contribuye():
+    partido = _partido_aleatorio(random.Random(1), 1, 6)
+    partido.finalizado = False
+    assert contribucion_partido(partido) == {}
+
+
+def test_deltas_equivalen_a_reconstruccion_completa():
+    rng = random.Random(2024)
+    equipos = _equipos(8)
+    partidos = []
+    clasificacion = construir_clasificacion(equipos, partidos)
+
+    for partido_id in range(1, 40):
+        # Alta de un partido finalizado
+        partido = _partido_aleatorio(rng, partido_id, len(equipos))
+        clasificacion = aplicar_delta(clasificacion, diferencia({}, contribucion_partido(partido)))
+        partidos.append(partido)
+
+        # Corrección de un partido ya finalizado (marcador/evaluación)
+        editado = rng.choice(partidos)
+        antes = contribucion_partido(editado)
+        nuevo = _partido_aleatorio(rng, editado.id, len(equipos))
+        editado.__dict__.update(nuevo.__dict__)
+        clasificacion = aplicar_delta(clasificacion, diferencia(antes, contribucion_partido(editado)))
+
+        assert clasificacion == construir_clasificacion(equipos, partidos)
+
+    # Borrado de un partido finalizado
+    borrado = partidos.pop()
+    clasificacion = aplicar_delta(clasificacion, diferencia(contribucion_partido(borrado), {}))
+    assert clasificacion == construir_clasificacion(equipos, partidos)
+
+
+def test_delta_con_equipo_desconocido_pide_reconstruir():
+    equipos = _equipos(5)
+    clasificacion = construir_clasificacion(equipos, [])
+    partido = _partido_aleatorio(random.Random(3), 1, 5)
+    partido.arbitro_id = 99
+    partido.puntos_arbitro = 2
+    delta = diferencia({}, contribucion_partido(partido))
+    assert aplicar_delta(copy.deepcopy(clasificacion), delta) is None
+
+
+@pytest.mark.asyncio
+async def test_reconstruccion_sin_redis_coincide_con_motor(session: AsyncSession):
+    """Sin Redis disponible, la lectura reconstruye desde BD con el mismo motor."""
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga Incremental", usuario_id=user.id)
+    session.add(liga)
+    sport = TipoDeporte(nombre="Futbol Inc", codigo="FI", tipo_marcador="goles")
+    session.add(sport)
+    await session.commit()
+
+    equipos = [Equipo(nombre=f"Eq{i}", liga_id=liga.id) for i in range(5)]
+    session.add_all(equipos)
+    await session.commit()
+
+    partido = Partido(
+        liga_id=liga.id,
+        tipo_deporte=sport,
+        equipo_local_id=equipos[0].id,
+        equipo_visitante_id=equipos[1].id,
+        arbitro_id=equipos[2].id,
+        tutor_grada_local_id=equipos[3].id,
+        tutor_grada_visitante_id=equipos[4].id,
+        finalizado=True,
+        marcador={"goles_local": 1, "goles_visitante": 1},
+        puntos_arbitro=2,
+        puntos_grada_local=0.5,
+        puntos_grada_visitante=1,
+    )
+    partido.calcular_puntos_desde_marcador()
+    session.add(partido)
+    await session.commit()
+
+    clasificacion = await ClasificacionService.calcular_clasificacion(liga.id, session)
+    assert clasificacion == construir_clasificacion(equipos, [partido])
+    por_equipo = {c["equipo_id"]: c for c in clasificacion}
+    assert por_equipo[equipos[0].id]["empatados"] == 1
+    assert por_equipo[equipos[4].id]["puntos_grada"] == 1
+    assert [c["posicion"] for c in clasificacion] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_actualizar_stats_liga_en_bloque(session: AsyncSession):
+    """Las columnas denormalizadas de Equipo salen de una sola consulta agregada por liga."""
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga Stats", usuario_id=user.id)
+    otra = Liga(nombre="Otra Liga", usuario_id=user.id)
+    sport = TipoDeporte(nombre="Futbol Stats", codigo="FS", tipo_marcador="goles")
+    session.add_all([liga, otra, sport])
+    await session.commit()
+
+    equipos = [Equipo(nombre=f"S{i}", liga_id=liga.id) for i in range(6)]
+    ajeno = Equipo(nombre="Ajeno", liga_id=otra.id, puntos_totales=7)
+    session.add_all(equipos + [ajeno])
+    await session.commit()
+    a, b, c, d, e, sin_partidos = equipos
+    sin_partidos.puntos_totales = 99
+    await session.commit()
+
+    partidos = [
+        # a gana a b; c arbitra; d y e en grada
+        Partido(
+            liga_id=liga.id, tipo_deporte=sport,
+            equipo_local_id=a.id, equipo_visitante_id=b.id,
+            arbitro_id=c.id, tutor_grada_local_id=d.id, tutor_grada_visitante_id=e.id,
+            finalizado=True, marcador={"goles_local": 2, "goles_visitante": 0},
+            puntos_juego_limpio_local=1, puntos_arbitro=2,
+            puntos_grada_local=0.5, puntos_grada_visitante=1,
+        ),
+        # b gana a c como visitante; a arbitra
+        Partido(
+            liga_id=liga.id, tipo_deporte=sport,
+            equipo_local_id=c.id, equipo_visitante_id=b.id, arbitro_id=a.id,
+            finalizado=True, marcador={"goles_local": 0, "goles_visitante": 1},
+            puntos_juego_limpio_visitante=1, puntos_arbitro=0,
+        ),
+        # No finalizado: no cuenta
+        Partido(
+            liga_id=liga.id, tipo_deporte=sport,
+            equipo_local_id=d.id, equipo_visitante_id=e.id,
+            finalizado=False, marcador={"goles_local": 5, "goles_visitante": 0},
+        ),
+    ]
+    for partido in partidos:
+        partido.calcular_puntos_desde_marcador()
+    session.add_all(partidos)
+    await session.commit()
+
+    actualizados = await ClasificacionService.actualizar_stats_liga(liga.id, session)
+    assert actualizados == len(equipos)
+
+    for equipo in equipos + [ajeno]:
+        await session.refresh(equipo)
+    # a: victoria (3) + juego limpio (1)
+    assert (a.puntos_totales, a.ganados, a.puntos_juego_limpio, a.puntos_arbitro) == (4, 1, 1, 0)
+    # b: derrota (1) + victoria como visitante (3) + juego limpio (1)
+    assert (b.puntos_totales, b.ganados, b.perdidos) == (5, 1, 1)
+    # c: derrota como local (1) + arbitraje (2)
+    assert (c.puntos_totales, c.perdidos, c.puntos_arbitro) == (3, 1, 2)
+    assert (d.puntos_grada, e.puntos_grada) == (0.5, 1)
+    # Sin partidos finalizados se resetea a cero; otras ligas no se tocan
+    assert sin_partidos.puntos_totales == 0
+    assert ajeno.puntos_totales == 7
@@ -0,0 +1,108 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Listados sin N+1: el número de sentencias SQL por petición no crece con el
+número de filas devueltas (fixture `sentencias_sql`).
+"""
+import itertools
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Equipo, GameSubmission, Jornada, Liga, Partido, TipoDeporte
+from app.tests.utils.utils import authentication_token_from_email, create_random_user
+
+_ids = itertools.count(1)
+
+
+async def _jornadas_con_partidos(session: AsyncSession, liga: Liga, jornadas: int, partidos: int) -> None:
+    equipo_ids = await _equipos(session, liga)
+    for _ in range(jornadas):
+        jornada = Jornada(liga_id=liga.id, numero=next(_ids), nombre="J")
+        session.add(jornada)
+        await session.flush()
+        session.add_all(
+            Partido(
+                liga_id=liga.id, jornada_id=jornada.id, tipo_deporte_id=1,
+                equipo_local_id=equipo_ids[0], equipo_visitante_id=equipo_ids[1], marcador={},
+            )
+            for _ in range(partidos)
+        )
+    await session.commit()
+
+
+async def _equipos(session: AsyncSession, liga: Liga) -> list[int]:
+    ids = (await session.execute(select(Equipo.id).where(Equipo.liga_id == liga.id))).scalars().all()
+    if ids:
+        return list(ids)
+    equipos = [Equipo(nombre=f"E{n}", liga_id=liga.id) for n in range(2)]
+    session.add_all(equipos)
+    await session.flush()
+    return [equipo.id for equipo in equipos]
+
+
+async def _fichas_publicas(session: AsyncSession, n: int) -> None:
+    deportes = (await session.execute(select(TipoDeporte.id))).scalars().all()
+    session.add_all(
+        GameSubmission(
+            token_hash=f"n1-{next(_ids)}", title=f"Juego {i}", is_public=True,
+            sport_id=deportes[i % len(deportes)],
+        )
+        for i in range(n)
+    )
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_listado_de_jornadas(client: AsyncClient, session: AsyncSession, sentencias_sql):
+    user = await create_random_user(session)
+    headers = await authentication_token_from_email(client, user.email, session)
+    liga = Liga(nombre="Liga N+1", usuario_id=user.id)
+    session.add(liga)
+    await session.commit()
+    await _jornadas_con_partidos(session, liga, jornadas=1, partidos=1)
+
+    async def peticion():
+        return await client.get("/api/v1/jornadas/", params={"liga_id": liga.id}, headers=headers)
+
+    await sentencias_sql.assert_constante(
+        peticion, lambda: _jornadas_con_partidos(session, liga, jornadas=5, partidos=3)
+    )
+    jornadas = (await peticion()).json()
+    assert sorted(j["total_partidos"] for j in jornadas) == [1, 3, 3, 3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_listado_de_ligas(client: AsyncClient, session: AsyncSession, sentencias_sql):
+    user = await create_random_user(session)
+    headers = await authentication_token_from_email(client, user.email, session)
+
+    async def mas_ligas(n: int = 4):
+        session.add_all(Liga(nombre=f"Liga {next(_ids)}", usuario_id=user.id) for _ in range(n))
+        await session.commit()
+
+    await mas_ligas(1)
+    await sentencias_sql.assert_constante(
+        lambda: client.get("/api/v1/ligas/", headers=headers), mas_ligas
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ruta", ["/api/v1/game-resources/wiki", "/api/v1/game-resources/repository"])
+async def test_listados_de_fichas(client: AsyncClient, session: AsyncSession, sentencias_sql, ruta):
+    await _fichas_publicas(session, 1)
+
+    await sentencias_sql.assert_constante(
+        lambda: client.get(ruta), lambda: _fichas_publicas(session, 6)
+    )
+    respuesta = (await client.get(ruta)).json()
+    fichas = respuesta["items"] if "items" in respuesta else respuesta
+    assert len(fichas) == 7
+    assert all(ficha["sport_name"] for ficha in fichas)
@@ -107,7 +107,7 @@ async def test_send_email_encola_en_arq(monkeypatch):
     adjuntos = [(b"%PDF", "ficha.pdf")]
     resultado = await email_service.send_email(
         "docente@example.com", "Asunto", "Cuerpo",
-        attachments=adjuntos, submission_id=42,
+        attachments=adjuntos, submission_id=42, job_id="ficha-email:42",
     )
 
     assert resultado is True
@@ -118,6 +118,7 @@ async def test_send_email_encola_en_arq(monkeypatch):
         "Cuerpo",
         attachments=adjuntos,
         submission_id=42,
+        _job_id="ficha-email:42",
     )
 
 
@@ -0,0 +1,80 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Exportación ZIP de fichas: ZIP en streaming válido, orden y nombres
+estables, fichas fallidas listadas y 503 antes de empezar si el pool de
+PDFs está lleno.
+"""
+import io
+import zipfile
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import game_resources as game_resources_api
+from app.models import GameSubmission, Liga
+from app.services import pdf_render_service
+from app.tests.utils.utils import authentication_token_from_email, create_random_user
+
+
+async def _liga_con_fichas(session: AsyncSession, titulos: list[str]):
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga ZIP", usuario_id=user.id, activa=True)
+    session.add(liga)
+    await session.commit()
+    for i, titulo in enumerate(titulos):
+        session.add(GameSubmission(token_hash=f"zip-{i}", title=titulo, liga_id=liga.id, reglas="Correr"))
+    await session.commit()
+    return user, liga
+
+
+@pytest.mark.asyncio
+async def test_zip_en_streaming_con_fichas_fallidas(
+    client: AsyncClient, session: AsyncSession, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    user, liga = await _liga_con_fichas(session, ["Pilla pilla", "Rota", "Pilla pilla", "Balón/tiro"])
+    headers = await authentication_token_from_email(client, user.email, session)
+
+    async def fake_pdf(**kwargs) -> bytes:
+        if kwargs["title"] == "Rota":
+            raise ValueError("imagen corrupta")
+        return f"%PDF {kwargs['title']}".encode()
+
+    monkeypatch.setattr(game_resources_api, "generate_game_sheet_pdf", fake_pdf)
+
+    response = await client.get(f"/api/v1/game-resources/ligas/{liga.id}/fichas/export-zip", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    zf = zipfile.ZipFile(io.BytesIO(response.content))
+    assert zf.testzip() is None
+    assert zf.namelist() == [
+        "Liga ZIP/Pilla pilla.pdf",
+        "Liga ZIP/Pilla pilla_2.pdf",
+        "Liga ZIP/Balón_tiro.pdf",
+        "Liga ZIP/errores.txt",
+    ]
+    assert zf.read("Liga ZIP/Balón_tiro.pdf") == "%PDF Balón/tiro".encode()
+    assert "- Rota" in zf.read("Liga ZIP/errores.txt").decode()
+    fallos = [r for r in caplog.records if r.name == game_resources_api.__name__ and r.levelname == "WARNING"]
+    assert len(fallos) == 1 and fallos[0].exc_info
+
+
+@pytest.mark.asyncio
+async def test_zip_con_pool_lleno_responde_503(
+    client: AsyncClient, session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+):
+    user, liga = await _liga_con_fichas(session, ["Pilla pilla"])
+    headers = await authentication_token_from_email(client, user.email, session)
+    monkeypatch.setattr(pdf_render_service, "_en_curso", pdf_render_service.capacidad())
+
+    response = await client.get(f"/api/v1/game-resources/ligas/{liga.id}/fichas/export-zip", headers=headers)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(pdf_render_service.REINTENTO_SEGUNDOS)
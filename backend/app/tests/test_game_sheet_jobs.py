@@ -0,0 +1,198 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Pipeline asíncrono de /tools/send-game-sheet: 202 con job_id, etapas de
+moderación y PDF/email fuera de la petición, estado consultable y
+reintentos del worker.
+"""
+import io
+
+import pytest
+from arq import Retry
+from fastapi import HTTPException
+from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import tools as tools_api
+from app.models import GameSubmission, Liga
+from app.services import game_sheet_jobs
+from app.tests.utils.utils import create_random_user
+from app.workers import game_sheet_worker
+
+FORMULARIO = {
+    "student_name": "Alumno Test",
+    "game_name": "Juego cooperativo",
+    "materiales": "Balon",
+    "reglas": "Todos participan",
+    "policy_notice_accepted": "true",
+    "community_guidelines_accepted": "true",
+}
+
+
+def _png(lado: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (lado, lado), (255, 255, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _liga(session: AsyncSession) -> Liga:
+    user = await create_random_user(session)
+    liga = Liga(nombre="Quinto A", usuario_id=user.id, activa=True, email_fichas="docente@example.com", config={})
+    session.add(liga)
+    await session.commit()
+    return liga
+
+
+@pytest.mark.asyncio
+async def test_envio_encola_y_estado_avanza(
+    client: AsyncClient, session: AsyncSession, db, monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    liga = await _liga(session)
+    monkeypatch.setattr(tools_api, "GRAPHICS_PATH", str(tmp_path))
+    monkeypatch.setattr(game_sheet_jobs, "AsyncSessionLocal", db)
+    encolados = []
+
+    async def fake_encolar(job_id, datos):
+        encolados.append((job_id, datos))
+        return True
+
+    monkeypatch.setattr(game_sheet_jobs, "encolar_ficha", fake_encolar)
+
+    enviados = []
+
+    async def fake_pdf(**kwargs) -> bytes:
+        assert kwargs["graphics_content"] == _png(20)
+        return b"%PDF-1.4 test"
+
+    async def fake_email(**kwargs) -> bool:
+        enviados.append(kwargs)
+        async with db() as s:
+            submission = await s.get(GameSubmission, kwargs["submission_id"])
+            submission.email_enviado = True
+            await s.commit()
+        return True
+
+    monkeypatch.setattr(game_sheet_jobs, "generate_game_sheet_pdf", fake_pdf)
+    monkeypatch.setattr(game_sheet_jobs, "send_email", fake_email)
+
+    response = await client.post(
+        "/api/v1/tools/send-game-sheet",
+        data={"liga_id": str(liga.id), **FORMULARIO},
+        files={"representacion_grafica": ("dibujo.png", _png(20), "image/png")},
+    )
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["status_url"].endswith(job_id)
+    assert not enviados  # nada pesado dentro de la petición
+
+    # Lo que harían los workers
+    [(_, datos)] = encolados
+    datos = await game_sheet_jobs.moderar(datos)
+    await game_sheet_jobs.generar_y_entregar(datos)
+    assert enviados[0]["job_id"] == game_sheet_jobs.job_id_email(datos["submission_id"])
+
+    async def fake_leer_estado(consultado):
+        assert consultado == job_id
+        return {
+            "estado": game_sheet_jobs.EMAIL_EN_COLA,
+            "submission_id": datos["submission_id"],
+            "moderation_required": True,
+            "error": None,
+            "actualizado": 0,
+        }
+
+    monkeypatch.setattr(game_sheet_jobs, "leer_estado", fake_leer_estado)
+    estado = (await client.get(f"/api/v1/tools/send-game-sheet/{job_id}")).json()
+    assert estado["estado"] == game_sheet_jobs.COMPLETADO
+    assert estado["moderation_required"] is True
+    assert "student_name" not in estado
+
+    submission = await session.get(GameSubmission, datos["submission_id"])
+    await session.refresh(submission)
+    assert submission.moderation_required is True
+    assert submission.moderation_flags["drawing"]["reasons"] == ["image_too_small"]
+    assert "REVISIÓN AUTOMÁTICA" in enviados[0]["body"]
+
+
+@pytest.mark.asyncio
+async def test_sin_cola_responde_con_el_estado_final(
+    client: AsyncClient, session: AsyncSession, db, monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    """Sin Redis las etapas corren en la petición: no queda estado que consultar en otro proceso."""
+    liga = await _liga(session)
+    monkeypatch.setattr(tools_api, "GRAPHICS_PATH", str(tmp_path))
+    monkeypatch.setattr(game_sheet_jobs, "AsyncSessionLocal", db)
+    enviados = []
+
+    async def fake_pdf(**kwargs) -> bytes:
+        return b"%PDF-1.4 test"
+
+    async def fake_email(**kwargs) -> bool:
+        enviados.append(kwargs)
+        return True
+
+    monkeypatch.setattr(game_sheet_jobs, "generate_game_sheet_pdf", fake_pdf)
+    monkeypatch.setattr(game_sheet_jobs, "send_email", fake_email)
+
+    response = await client.post(
+        "/api/v1/tools/send-game-sheet",
+        data={"liga_id": str(liga.id), **FORMULARIO},
+        files={"representacion_grafica": ("dibujo.png", _png(20), "image/png")},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["job_id"] is None and content["status_url"] is None
+    assert content["estado"] == game_sheet_jobs.EMAIL_EN_COLA
+    assert content["moderation_required"] is True
+    assert [e["submission_id"] for e in enviados] == [content["submission_id"]]
+
+
+@pytest.mark.asyncio
+async def test_dibujo_ilegible_400_y_estado_desconocido_404(client: AsyncClient, session: AsyncSession):
+    liga = await _liga(session)
+
+    response = await client.post(
+        "/api/v1/tools/send-game-sheet",
+        data={"liga_id": str(liga.id), **FORMULARIO},
+        files={"representacion_grafica": ("dibujo.png", b"\x89PNG no es imagen", "image/png")},
+    )
+    assert response.status_code == 400
+
+    assert (await client.get("/api/v1/tools/send-game-sheet/no-existe")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_worker_reintenta_y_marca_error(monkeypatch: pytest.MonkeyPatch):
+    errores = [HTTPException(status_code=503, detail="lleno"), RuntimeError("smtp caido")]
+
+    async def falla(datos):
+        raise errores[0]
+
+    monkeypatch.setattr(game_sheet_jobs, "generar_y_entregar", falla)
+    datos = {"submission_id": 1}
+
+    with pytest.raises(Retry) as retry:
+        await game_sheet_worker.generar_ficha({"redis": None, "job_try": 1}, "job-x", datos)
+    assert retry.value.defer_score == game_sheet_worker.REINTENTO_SEGUNDOS * 1000
+
+    errores.pop(0)
+    with pytest.raises(Retry) as retry:
+        await game_sheet_worker.generar_ficha({"redis": None, "job_try": 3}, "job-x", datos)
+    assert retry.value.defer_score == 40_000
+
+    estados = []
+
+    async def fake_guardar_estado(redis, job_id, **campos):
+        estados.append((job_id, campos))
+
+    monkeypatch.setattr(game_sheet_worker, "guardar_estado", fake_guardar_estado)
+    ctx = {"redis": None, "job_try": game_sheet_worker.MAX_INTENTOS}
+    assert await game_sheet_worker.generar_ficha(ctx, "job-x", datos) is False
+    [(job_id, estado)] = estados
+    assert (job_id, estado["estado"], estado["error"]) == ("job-x", game_sheet_jobs.ERROR, "smtp caido")
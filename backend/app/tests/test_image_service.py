@@ -0,0 +1,59 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Logos de equipo: derivados 200/96/48 WebP + PNG de impresión con nombre
+por hash de contenido, y derivado de impresión para los PDFs.
+"""
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.image_service import ImageService
+
+
+def _png(size=(640, 320)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, (30, 64, 175, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_logo_genera_derivados_con_hash_de_contenido(monkeypatch, tmp_path):
+    monkeypatch.setattr(ImageService, "UPLOAD_DIR", tmp_path)
+    data_url = "data:image/png;base64," + base64.b64encode(_png()).decode()
+
+    logo_url = await ImageService.save_team_logo_data_url(data_url, 7)
+    # Mismo contenido -> mismos ficheros
+    assert await ImageService.save_team_logo_data_url(data_url, 7) == logo_url
+
+    base = logo_url.rsplit("/", 1)[-1].removesuffix(".webp")
+    tamanos = {
+        nombre.name: Image.open(nombre).size for nombre in tmp_path.iterdir()
+    }
+    assert tamanos == {
+        f"{base}.webp": (200, 200),
+        f"{base}_96.webp": (96, 96),
+        f"{base}_48.webp": (48, 48),
+        f"{base}_print.png": (300, 150),
+    }
+    assert ImageService.print_logo(str(tmp_path / f"{base}.webp")) == (str(tmp_path / f"{base}_print.png"), 300, 150)
+
+    ImageService.delete_team_logo(logo_url)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_print_logo_de_imagen_estatica_se_genera_una_vez(tmp_path):
+    original = tmp_path / "marca.webp"
+    Image.open(io.BytesIO(_png((1200, 1200)))).save(original, format="WEBP")
+
+    assert ImageService.print_logo(str(original)) == (str(tmp_path / "marca_print.png"), 300, 300)
+    generado = (tmp_path / "marca_print.png").stat().st_mtime_ns
+    assert ImageService.print_logo(str(original))[1:] == (300, 300)
+    assert (tmp_path / "marca_print.png").stat().st_mtime_ns == generado
@@ -0,0 +1,180 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Eventos en directo: reparto desde la suscripción única del proceso a los
+streams abiertos (marcadores y contador de pendientes), filtros por
+partido y control de acceso.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Liga
+from app.services import live_events
+from app.tests.utils.utils import create_random_user
+
+
+@pytest.fixture
+def difusor_sin_redis(monkeypatch):
+    """Difusor aislado cuya suscripción no conecta: los eventos se inyectan a mano."""
+    difusor = live_events.Difusor()
+
+    async def _sin_escuchar(self):
+        return None
+
+    monkeypatch.setattr(live_events.Difusor, "_escuchar", _sin_escuchar)
+    monkeypatch.setattr(live_events, "difusor", difusor)
+    return difusor
+
+
+def _mensaje(evento: str, **datos) -> str:
+    return orjson.dumps({"evento": evento, **datos}).decode()
+
+
+async def _siguiente(stream):
+    return await asyncio.wait_for(stream.__anext__(), 1)
+
+
+@pytest.mark.asyncio
+async def test_un_evento_llega_a_todos_los_streams_de_la_liga(difusor_sin_redis):
+    canal = live_events.canal_liga(1)
+    streams = [live_events.stream_sse(canal) for _ in range(3)]
+    otra_liga = live_events.stream_sse(live_events.canal_liga(2))
+    for stream in streams + [otra_liga]:
+        assert (await _siguiente(stream)).startswith("event: conectado")
+    assert difusor_sin_redis.conexiones == 4
+
+    difusor_sin_redis._repartir(canal, _mensaje("marcador", partido_id=5, marcador_local=2))
+
+    for stream in streams:
+        texto = await _siguiente(stream)
+        assert texto.startswith("event: marcador\n")
+        assert '"marcador_local":2' in texto
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(otra_liga.__anext__(), 0.05)
+
+    for stream in streams + [otra_liga]:
+        await stream.aclose()
+    assert difusor_sin_redis.conexiones == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_de_partido_filtra_por_partido(difusor_sin_redis):
+    canal = live_events.canal_liga(1)
+    stream = live_events.stream_sse(canal, filtro=lambda e: e.get("partido_id") == 7)
+    await _siguiente(stream)
+
+    difusor_sin_redis._repartir(canal, _mensaje("marcador", partido_id=8))
+    difusor_sin_redis._repartir(canal, _mensaje("propuesta", partido_id=7))
+
+    assert (await _siguiente(stream)).startswith("event: propuesta")
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cliente_retrasado_recibe_resync(difusor_sin_redis):
+    canal = live_events.canal_liga(1)
+    async with difusor_sin_redis.suscribir(canal) as cola:
+        for i in range(live_events.COLA_MAX + 5):
+            difusor_sin_redis._repartir(canal, _mensaje("marcador", partido_id=i))
+        datos, texto = cola.get_nowait()
+    assert datos["evento"] == "resync"
+    assert texto.startswith("event: resync")
+
+
+@pytest.mark.asyncio
+async def test_publicar_partido_avisa_de_clasificacion(monkeypatch):
+    publicados = []
+
+    async def _publicar(canal, evento, datos):
+        publicados.append((canal, evento, datos))
+
+    monkeypatch.setattr(live_events, "publicar", _publicar)
+    partido = SimpleNamespace(
+        id=3, liga_id=9, jornada_id=1, finalizado=True,
+        extraer_marcador_deportivo=lambda: (1, 0),
+    )
+
+    await live_events.publicar_partido(partido, "finalizado", clasificacion=True)
+
+    assert [evento for _, evento, _ in publicados] == ["finalizado", "clasificacion"]
+    assert publicados[0][0] == "live:liga:9"
+    assert publicados[0][2]["marcador_local"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_publico_exige_token_de_la_liga(client: AsyncClient, session: AsyncSession):
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga Directo", usuario_id=user.id, public_pin="112233", activa=True)
+    otra = Liga(nombre="Otra Directo", usuario_id=user.id, public_pin="445566", activa=True)
+    session.add_all([liga, otra])
+    await session.commit()
+
+    sin_token = await client.get(f"/api/v1/public/ligas/{liga.id}/stream")
+    assert sin_token.status_code == 401
+
+    login = await client.post("/api/v1/public/login", json={"liga_id": otra.id, "pin": "445566"})
+    token = login.json()["access_token"]
+    ajeno = await client.get(f"/api/v1/public/ligas/{liga.id}/stream", params={"token": token})
+    assert ajeno.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_stream_de_partido_con_pin_desconocido(client: AsyncClient):
+    response = await client.get("/api/v1/public/partido/999999/stream")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_stream_de_pendientes_aplica_deltas_y_recuenta_en_resync(difusor_sin_redis, monkeypatch):
+    from contextlib import asynccontextmanager
+    from unittest.mock import AsyncMock
+
+    from app.api.v1 import pending_actions
+
+    recuentos = iter([3, 10])
+    consultas = []
+
+    async def _contar(db, user_id, liga_id):
+        consultas.append((user_id, liga_id))
+        return next(recuentos)
+
+    @asynccontextmanager
+    async def _sesion():
+        yield None
+
+    monkeypatch.setattr(pending_actions, "_contar_pendientes", _contar)
+    monkeypatch.setattr(pending_actions, "AsyncSessionLocal", _sesion)
+    db = AsyncMock()
+
+    response = await pending_actions.stream_pending_actions(
+        liga_id=4, current_user=SimpleNamespace(id=11), db=db
+    )
+    db.close.assert_awaited_once()
+    stream = response.body_iterator
+    canal = live_events.canal_pendientes(11)
+
+    assert '"count": 3' in await _siguiente(stream)
+
+    difusor_sin_redis._repartir(canal, _mensaje("pendientes", liga_id=4, delta=1))
+    assert '"count": 4' in await _siguiente(stream)
+
+    # Otra liga del mismo docente: no cuenta en este stream
+    difusor_sin_redis._repartir(canal, _mensaje("pendientes", liga_id=5, delta=1))
+    difusor_sin_redis._repartir(canal, _mensaje("pendientes", liga_id=4, delta=-1))
+    assert '"count": 3' in await _siguiente(stream)
+
+    # Tras una reconexión se reconcilia con la BD
+    difusor_sin_redis._repartir_a_todos(live_events.EVENTO_RESYNC)
+    assert '"count": 10' in await _siguiente(stream)
+    assert consultas == [(11, 4), (11, 4)]
+    await stream.aclose()
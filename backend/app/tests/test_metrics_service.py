@@ -0,0 +1,183 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Métricas HTTP: etiquetas por plantilla de ruta, histogramas, agregación
+entre workers vía Redis y degradación sin Redis.
+"""
+import time
+from collections import defaultdict
+
+import pytest
+from httpx import AsyncClient
+
+from app.services import metrics_service
+from app.services.metrics_service import HttpSeries, metrics
+
+
+class _PipelineMemoria:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, nombre):
+        def encolar(*args, **kwargs):
+            self.ops.append((nombre, args, kwargs))
+        return encolar
+
+    async def execute(self):
+        return [await getattr(self.redis, nombre)(*args, **kwargs) for nombre, args, kwargs in self.ops]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _RedisMemoria:
+    """Subconjunto de redis.asyncio (hashes y sorted sets) sobre un dict compartido."""
+
+    def __init__(self, datos: dict):
+        self.datos = datos
+
+    def pipeline(self, transaction=True):
+        return _PipelineMemoria(self)
+
+    async def hincrby(self, clave, campo, valor):
+        hash_ = self.datos.setdefault(clave, {})
+        hash_[campo] = str(int(hash_.get(campo, 0)) + valor)
+
+    async def hincrbyfloat(self, clave, campo, valor):
+        hash_ = self.datos.setdefault(clave, {})
+        hash_[campo] = str(float(hash_.get(campo, 0)) + valor)
+
+    async def hset(self, clave, mapping):
+        self.datos.setdefault(clave, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, clave):
+        return dict(self.datos.get(clave, {}))
+
+    async def expire(self, clave, segundos):
+        pass
+
+    async def zadd(self, clave, mapping):
+        self.datos.setdefault(clave, {}).update(mapping)
+
+    async def zremrangebyscore(self, clave, minimo, maximo):
+        zset = self.datos.get(clave, {})
+        for miembro, puntos in list(zset.items()):
+            if float(minimo) <= puntos <= float(maximo):
+                del zset[miembro]
+
+    async def zrangebyscore(self, clave, minimo, maximo):
+        zset = self.datos.get(clave, {})
+        return sorted((m for m, p in zset.items() if float(minimo) <= p <= float(maximo)), key=zset.get)
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def metricas_limpias(monkeypatch):
+    monkeypatch.setattr(metrics, "http", HttpSeries())
+    monkeypatch.setattr(metrics, "_pending", HttpSeries())
+    monkeypatch.setattr(metrics, "in_flight", defaultdict(int))
+    return metrics
+
+
+@pytest.fixture
+def redis_memoria(monkeypatch):
+    datos: dict = {}
+    monkeypatch.setattr(
+        metrics_service.aioredis, "Redis", lambda connection_pool=None: _RedisMemoria(datos)
+    )
+    return datos
+
+
+@pytest.mark.asyncio
+async def test_middleware_etiqueta_por_plantilla_de_ruta(client: AsyncClient, metricas_limpias):
+    await client.get("/api/live")
+    await client.get("/api/v1/game-resources/wiki/987654")
+    await client.get("/api/v1/game-resources/wiki/123456")
+    await client.get("/no-existe/42")
+
+    statuses = metricas_limpias.http.statuses
+    assert statuses[("GET", "/api/live", "2xx")] == 1
+    assert statuses[("GET", "/api/v1/game-resources/wiki/{ficha_id}", "4xx")] == 2
+    assert statuses[("GET", metrics_service.UNMATCHED_ROUTE, "4xx")] == 1
+    assert not any("987654" in route for _, route, _ in statuses)
+    assert metricas_limpias.in_flight["GET"] == 0
+
+
+@pytest.mark.asyncio
+async def test_prometheus_suma_todos_los_workers(metricas_limpias, redis_memoria):
+    # Otro worker ya ha volcado sus datos
+    otro = HttpSeries()
+    otro.observe("GET", "/api/v1/ligas/", 200, {metrics_service.DURATION: 0.02})
+    otro.observe("GET", "/api/v1/ligas/", 503, {metrics_service.DURATION: 3.0})
+    redis = _RedisMemoria(redis_memoria)
+    for campo, valor in otro.to_fields().items():
+        incrementar = redis.hincrbyfloat if isinstance(valor, float) else redis.hincrby
+        await incrementar(metrics_service.REDIS_KEY, campo, valor)
+    assert HttpSeries.from_fields(redis_memoria[metrics_service.REDIS_KEY]).to_fields() == otro.to_fields()
+    redis_memoria[f"{metrics_service.IN_FLIGHT_KEY_PREFIX}otro:1"] = {"GET": "3"}
+    # Un worker muerto: su último volcado es más viejo que el TTL
+    redis_memoria[f"{metrics_service.IN_FLIGHT_KEY_PREFIX}muerto:2"] = {"GET": "5"}
+    await redis.zadd(metrics_service.WORKERS_KEY, {
+        "otro:1": time.time(),
+        "muerto:2": time.time() - 2 * metrics_service.IN_FLIGHT_TTL_SECONDS,
+    })
+
+    metricas_limpias.record_request("/api/v1/ligas/", 40, 200, "GET")
+    metricas_limpias.request_started("POST")
+    texto = await metricas_limpias.get_prometheus_metrics()
+
+    etiquetas = 'method="GET",route="/api/v1/ligas/"'
+    assert f'liga_http_request_duration_seconds_bucket{{{etiquetas},le="0.025"}} 1' in texto
+    assert f'liga_http_request_duration_seconds_bucket{{{etiquetas},le="0.05"}} 2' in texto
+    assert f'liga_http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} 3' in texto
+    assert f'liga_http_request_duration_seconds_count{{{etiquetas}}} 3' in texto
+    assert f'liga_http_requests_total{{{etiquetas},status="2xx"}} 2' in texto
+    assert f'liga_http_requests_total{{{etiquetas},status="5xx"}} 1' in texto
+    assert 'liga_http_requests_in_flight{method="GET"} 3' in texto
+    assert 'liga_http_requests_in_flight{method="POST"} 1' in texto
+    assert "liga_http_workers 2" in texto
+    # El volcado de este worker poda del registro al muerto
+    assert set(redis_memoria[metrics_service.WORKERS_KEY]) == {"otro:1", metrics_service.metrics.worker_id}
+
+    # Lo volcado no se vuelve a sumar en el siguiente scrape
+    assert f'liga_http_request_duration_seconds_count{{{etiquetas}}} 3' in await metricas_limpias.get_prometheus_metrics()
+
+
+@pytest.mark.asyncio
+async def test_sin_redis_conserva_los_deltas(metricas_limpias, monkeypatch):
+    def sin_redis(connection_pool=None):
+        raise ConnectionError("redis caído")
+
+    monkeypatch.setattr(metrics_service.aioredis, "Redis", sin_redis)
+    metricas_limpias.record_request("/api/live", 3, 200, "GET")
+
+    assert not await metricas_limpias.flush()
+    assert metricas_limpias._pending.statuses[("GET", "/api/live", "2xx")] == 1
+    # El scrape sirve los datos del propio worker
+    datos = await metricas_limpias.get_metrics()
+    assert datos["requests"] == {"GET /api/live": 1}
+    assert datos["workers"] == 1
+
+
+def test_cuantiles_del_histograma():
+    series = HttpSeries()
+    for _ in range(90):
+        series.observe("GET", "/r", 200, {metrics_service.DURATION: 0.007})
+    for _ in range(10):
+        series.observe("GET", "/r", 200, {metrics_service.DURATION: 0.4})
+
+    clave = (metrics_service.DURATION, "GET", "/r")
+    assert 0.005 < series.quantile(clave, 0.5) <= 0.01
+    assert 0.25 < series.quantile(clave, 0.95) <= 0.5
+    assert series.quantile((metrics_service.DURATION, "GET", "/otra"), 0.5) is None
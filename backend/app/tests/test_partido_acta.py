@@ -12,14 +12,33 @@
 Tests del acta en un solo paso: PUT /partidos/{id}/acta
 (marcador + evaluación educativa + finalización en una transacción).
 """
+import orjson
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Liga, Equipo, Partido, TipoDeporte
+from app.services import live_events
 from app.tests.utils.utils import create_random_user, authentication_token_from_email
 
 
+@pytest.fixture
+def difusor_local(monkeypatch):
+    """Difusor sin Redis: publicar() reparte directamente a las colas del proceso."""
+    difusor = live_events.Difusor()
+
+    async def _sin_escuchar(self):
+        return None
+
+    async def _publicar(canal, evento, datos):
+        difusor._repartir(canal, orjson.dumps({"evento": evento, **datos}))
+
+    monkeypatch.setattr(live_events.Difusor, "_escuchar", _sin_escuchar)
+    monkeypatch.setattr(live_events, "difusor", difusor)
+    monkeypatch.setattr(live_events, "publicar", _publicar)
+    return difusor
+
+
 async def _setup_partido(session: AsyncSession, user, **liga_kwargs):
     liga = Liga(nombre="Liga Acta", usuario_id=user.id, **liga_kwargs)
     session.add(liga)
@@ -177,3 +196,46 @@ async def test_acta_rechaza_partido_finalizado(client: AsyncClient, session: Asy
     )
     assert response.status_code == 400
     assert "finalizado" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_acta_avisa_en_directo(client: AsyncClient, session: AsyncSession, difusor_local):
+    """Los marcadores y la clasificación en directo se enteran del acta."""
+    user = await create_random_user(session)
+    headers = await authentication_token_from_email(client, user.email, session)
+    liga, partido = await _setup_partido(session, user)
+
+    acta = {
+        "marcador": {"goles_local": 3, "goles_visitante": 1},
+        "expected_marcador_version": partido.marcador_version,
+        "puntos_juego_limpio_local": 1,
+        "puntos_juego_limpio_visitante": 1,
+        "expected_version": partido.evaluacion_version,
+    }
+    async with difusor_local.suscribir(live_events.canal_liga(liga.id)) as cola:
+        response = await client.put(
+            f"/api/v1/partidos/{partido.id}/acta", json=acta, headers=headers
+        )
+        assert response.status_code == 200
+        eventos = [cola.get_nowait()[0] for _ in range(cola.qsize())]
+
+    assert [e["evento"] for e in eventos] == ["finalizado", "clasificacion"]
+    assert eventos[0]["partido_id"] == partido.id
+    assert eventos[0]["finalizado"] is True
+    assert (eventos[0]["marcador_local"], eventos[0]["marcador_visitante"]) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_eliminar_partido_avisa_en_directo(client: AsyncClient, session: AsyncSession, difusor_local):
+    user = await create_random_user(session)
+    headers = await authentication_token_from_email(client, user.email, session)
+    liga, partido = await _setup_partido(session, user)
+    partido_id = partido.id
+
+    async with difusor_local.suscribir(live_events.canal_liga(liga.id)) as cola:
+        response = await client.delete(f"/api/v1/partidos/{partido_id}", headers=headers)
+        assert response.status_code == 204
+        eventos = [cola.get_nowait()[0] for _ in range(cola.qsize())]
+
+    # Sin finalizar no aportaba a la clasificación: solo el aviso del partido
+    assert [(e["evento"], e["partido_id"]) for e in eventos] == [("eliminado", partido_id)]
@@ -0,0 +1,105 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Proyección partido_participaciones: se mantiene al crear, evaluar, cambiar
+roles y borrar partidos por el ORM, y al regenerar jornadas con el
+generador de calendario (DELETE en bloque).
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Equipo, Jornada, Liga, Partido, PartidoParticipacion, TipoDeporte
+from app.services.badges_service import BadgesService
+from app.services.calendar_generator import generar_calendario_jornada
+from app.tests.utils.utils import create_random_user
+
+
+async def _filas(session: AsyncSession, *criterios) -> dict:
+    result = await session.execute(
+        select(PartidoParticipacion.rol, PartidoParticipacion.equipo_id, PartidoParticipacion.finalizado,
+               PartidoParticipacion.resultado, PartidoParticipacion.puntos)
+        .where(*criterios)
+    )
+    return {rol: tuple(resto) for rol, *resto in result.all()}
+
+
+async def _liga(session: AsyncSession, n_equipos: int) -> tuple[Liga, TipoDeporte, list[Equipo]]:
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga Roles", usuario_id=user.id)
+    sport = TipoDeporte(nombre="Futbol Roles", codigo="FR", tipo_marcador="goles")
+    session.add_all([liga, sport])
+    await session.commit()
+    equipos = [Equipo(nombre=f"R{i}", liga_id=liga.id) for i in range(n_equipos)]
+    session.add_all(equipos)
+    await session.commit()
+    return liga, sport, equipos
+
+
+@pytest.mark.asyncio
+async def test_proyeccion_sigue_los_cambios_del_partido(session: AsyncSession):
+    liga, sport, (a, b, c, d) = await _liga(session, 4)
+    partido = Partido(
+        liga_id=liga.id, tipo_deporte=sport,
+        equipo_local_id=a.id, equipo_visitante_id=b.id, arbitro_id=c.id,
+        marcador={},
+    )
+    session.add(partido)
+    await session.commit()
+    assert await _filas(session, PartidoParticipacion.partido_id == partido.id) == {
+        "local": (a.id, False, None, 0),
+        "visitante": (b.id, False, None, 0),
+        "arbitro": (c.id, False, None, 0),
+    }
+
+    # Acta: marcador, finalización y cambio de árbitro a grada
+    partido.marcador = {"goles_local": 2, "goles_visitante": 1}
+    partido.calcular_puntos_desde_marcador()
+    partido.finalizado = True
+    partido.arbitro_id = None
+    partido.tutor_grada_local_id = d.id
+    partido.puntos_juego_limpio_local = 5
+    await session.commit()
+    assert await _filas(session, PartidoParticipacion.partido_id == partido.id) == {
+        "local": (a.id, True, "V", 3),
+        "visitante": (b.id, True, "D", 1),
+        "grada_local": (d.id, True, None, 0),
+    }
+    badges = await BadgesService.calculate_badges(a.id, session)
+    assert [badge["id"] for badge in badges] == ["fair_play_gold"]
+
+    await session.delete(partido)
+    await session.commit()
+    assert await _filas(session, PartidoParticipacion.liga_id == liga.id) == {}
+
+
+@pytest.mark.asyncio
+async def test_regenerar_jornada_rehace_la_proyeccion(session: AsyncSession):
+    liga, sport, equipos = await _liga(session, 6)
+    jornada = Jornada(liga_id=liga.id, numero=1, nombre="Jornada 1")
+    session.add(jornada)
+    await session.commit()
+
+    for _ in range(2):
+        partidos = await generar_calendario_jornada(session, jornada.id, liga.id, sport.id)
+        await session.commit()
+
+    result = await session.execute(
+        select(PartidoParticipacion.partido_id, PartidoParticipacion.equipo_id)
+        .where(PartidoParticipacion.liga_id == liga.id)
+    )
+    esperado = {
+        (partido.id, equipo_id)
+        for partido in partidos
+        for equipo_id in (
+            partido.equipo_local_id, partido.equipo_visitante_id, partido.arbitro_id,
+            partido.tutor_grada_local_id, partido.tutor_grada_visitante_id,
+        )
+        if equipo_id is not None
+    }
+    assert set(result.all()) == esperado
@@ -100,10 +100,10 @@ async def test_update_evaluacion_personalizada_refreshes_all_role_teams(
     for criterio in criterios:
         await session.refresh(criterio)
 
-    captured_calls: list[tuple[list[int | None], int, bool]] = []
+    captured_calls: list[tuple[int | None, int, bool]] = []
 
-    async def fake_schedule_stats_updates(equipo_ids, throttle_seconds=5, force=False):
-        captured_calls.append((list(equipo_ids), throttle_seconds, force))
+    async def fake_schedule_stats_updates(liga_id, throttle_seconds=5, force=False):
+        captured_calls.append((liga_id, throttle_seconds, force))
 
     monkeypatch.setattr(partidos_api.ClasificacionService, "schedule_stats_updates", fake_schedule_stats_updates)
 
@@ -124,10 +124,4 @@ async def test_update_evaluacion_personalizada_refreshes_all_role_teams(
         headers=headers,
     )
     assert response.status_code == 200
-    assert captured_calls == [
-        (
-            [local.id, visitante.id, arbitro.id, grada_local.id, grada_visitante.id],
-            5,
-            False,
-        )
-    ]
+    assert captured_calls == [(partido.liga_id, 5, False)]
@@ -0,0 +1,39 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Caché de logos de los PDFs: una preparación por (ruta, mtime, caja),
+flowables nuevos en cada llamada e invalidación al cambiar el fichero.
+"""
+import os
+
+from PIL import Image as PILImage
+
+from app.services import pdf_assets
+
+
+def test_logo_se_prepara_una_vez_por_caja(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_assets, "_lru", pdf_assets.OrderedDict())
+    monkeypatch.setattr(pdf_assets, "_contadores", {"aciertos": 0, "fallos": 0})
+    ruta = tmp_path / "escudo.png"
+    PILImage.new("RGBA", (900, 450), (5, 150, 105, 255)).save(ruta)
+
+    primero = pdf_assets.logo_flowable(str(ruta), 50, 50)
+    segundo = pdf_assets.logo_flowable(str(ruta), 50, 50)
+    assert primero is not segundo
+    assert (segundo.drawWidth, segundo.drawHeight) == (50, 25)
+
+    pdf_assets.logo_flowable(str(ruta), 20, 20)
+    assert pdf_assets.estadisticas() == {"aciertos": 1, "fallos": 2, "entradas": 2}
+
+    # Fichero nuevo (otro mtime): se vuelve a preparar
+    PILImage.new("RGBA", (300, 900), (5, 150, 105, 255)).save(ruta)
+    os.utime(ruta, ns=(0, os.stat(tmp_path / "escudo_print.png").st_mtime_ns + 1_000_000_000))
+    nuevo = pdf_assets.logo_flowable(str(ruta), 50, 50)
+    assert (round(nuevo.drawWidth, 3), nuevo.drawHeight) == (16.667, 50)
+
+    assert pdf_assets.logo_flowable(str(tmp_path / "no-existe.png"), 50, 50) is None
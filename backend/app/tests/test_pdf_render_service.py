@@ -0,0 +1,122 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Pool de render de PDFs: cola acotada con 503, métricas por documento,
+pictogramas descargados antes de renderizar y render real en procesos.
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services import pdf_generator, pdf_render_service
+from app.services.report_service import ReportService
+
+CLASIFICACION = [
+    {
+        "posicion": 1, "equipo_nombre": "Halcones", "partidos_jugados": 3, "ganados": 2,
+        "empatados": 1, "perdidos": 0, "puntos_deportivos": 7, "puntos_juego_limpio": 3,
+        "puntos_arbitro": 2, "puntos_grada": 2, "puntos_educativos_total": 7, "puntos_totales": 14,
+    }
+]
+
+
+@pytest.fixture(autouse=True)
+def metricas_limpias():
+    pdf_render_service._metricas.clear()
+    yield
+    pdf_render_service._metricas.clear()
+
+
+def _bloquear(evento: threading.Event) -> bytes:
+    evento.wait(5)
+    return b"%PDF-bloqueado"
+
+
+@pytest.mark.asyncio
+async def test_pool_lleno_responde_503(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_RENDER_QUEUE_MAX", 0)
+    liberar = threading.Event()
+
+    primero = asyncio.create_task(pdf_render_service.renderizar("acta_partido", _bloquear, liberar))
+    await asyncio.sleep(0.05)
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await pdf_render_service.renderizar("acta_partido", _bloquear, liberar)
+    finally:
+        liberar.set()
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == str(pdf_render_service.REINTENTO_SEGUNDOS)
+    assert await primero == b"%PDF-bloqueado"
+    assert pdf_render_service._en_curso == 0
+    assert 'liga_pdf_render_rejected_total{document="acta_partido"} 1' in pdf_render_service.lineas_prometheus()
+
+
+@pytest.mark.asyncio
+async def test_metricas_por_documento():
+    contenido = await pdf_render_service.renderizar(
+        "clasificacion", ReportService.generate_clasificacion_pdf, "Liga Test", CLASIFICACION
+    )
+
+    assert contenido.startswith(b"%PDF")
+    metricas = pdf_render_service.estadisticas()["documentos"]["clasificacion"]
+    assert metricas["total"] == 1
+    assert metricas["render_segundos"] > 0
+    assert 'liga_pdf_render_seconds_count{document="clasificacion"} 1' in pdf_render_service.lineas_prometheus()
+
+
+@pytest.mark.asyncio
+async def test_error_de_render_cuenta_y_libera_hueco():
+    def _fallar():
+        raise ValueError("plantilla rota")
+
+    with pytest.raises(ValueError):
+        await pdf_render_service.renderizar("pines", _fallar)
+
+    assert pdf_render_service._en_curso == 0
+    assert pdf_render_service.estadisticas()["documentos"]["pines"]["errores"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ficha_descarga_solo_los_pictogramas_que_faltan(monkeypatch):
+    pedidos = []
+
+    async def _descargar(ids):
+        pedidos.append(list(ids))
+        return {}
+
+    monkeypatch.setattr(pdf_generator, "fetch_pictograms_bulk", _descargar)
+
+    contenido = await pdf_generator.generate_game_sheet_pdf(
+        title="Pilla pilla",
+        materiales="Conos",
+        reglas="Correr",
+        pictos_materiales=[1, 2],
+        pictos_reglas=[2, 3],
+        picto_cache={1: b"no-es-imagen"},
+    )
+
+    assert contenido.startswith(b"%PDF")
+    assert pedidos == [[2, 3]]
+    assert pdf_render_service.estadisticas()["documentos"]["ficha_juego"]["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_render_en_pool_de_procesos(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_RENDER_PROCESSES", 1)
+    try:
+        contenido = await pdf_render_service.renderizar(
+            "clasificacion", ReportService.generate_clasificacion_pdf, "Liga Test", CLASIFICACION
+        )
+    finally:
+        pdf_render_service.cerrar()
+
+    assert contenido.startswith(b"%PDF")
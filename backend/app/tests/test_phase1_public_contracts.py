@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1 import game_resources as game_resources_api
 from app.models import Equipo, GameSubmission, Liga, PendingAction, TipoDeporte
+from app.services.image_service import ImageService
 from app.tests.utils.utils import authentication_token_from_email, create_random_user
 
 
@@ -98,7 +99,10 @@ async def test_repository_compatibility_endpoints(
 async def test_public_logo_proposal_creates_pending_action(
     client: AsyncClient,
     session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path,
 ) -> None:
+    monkeypatch.setattr(ImageService, "UPLOAD_DIR", tmp_path)
     user = await create_random_user(session)
     liga = Liga(
         nombre="Liga Logo",
@@ -138,6 +142,7 @@ async def test_public_logo_proposal_creates_pending_action(
     assert pending.status == "pending"
     assert pending.data_json["submitted_via"] == "public_team_portal"
     assert pending.data_json["logo_filename"].endswith(".webp")
+    assert (tmp_path / pending.data_json["logo_filename"].rsplit("/", 1)[-1]).exists()
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,134 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Almacén local de pictogramas contra un servidor HTTP local que hace de
+ARASAAC: una descarga por pictograma, lecturas posteriores sin red desde
+memoria o disco, caché negativa de 404 y single-flight.
+"""
+import asyncio
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_asyncio
+from PIL import Image
+
+from app.config import settings
+from app.services import pictogram_cache
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (500, 500), (30, 64, 175, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _Arasaac:
+    """Servidor local: sirve los ids de `existentes` y cuenta las peticiones."""
+
+    def __init__(self, existentes: set[int]):
+        self.existentes = existentes
+        self.peticiones: list[str] = []
+        png = _png()
+        arasaac = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                arasaac.peticiones.append(self.path)
+                picto_id = int(self.path.strip("/").split("/")[0])
+                if picto_id not in arasaac.existentes:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(png)))
+                self.end_headers()
+                self.wfile.write(png)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+
+@pytest_asyncio.fixture
+async def arasaac(monkeypatch, tmp_path):
+    servidor = _Arasaac({100, 200, 300})
+    monkeypatch.setattr(pictogram_cache, "ARASAAC_BASE_URL", servidor.url)
+    monkeypatch.setattr(settings, "PICTOGRAM_CACHE_DIR", str(tmp_path))
+    pictogram_cache._lru.clear()
+    pictogram_cache._negativos.clear()
+    for evento in pictogram_cache._contadores:
+        pictogram_cache._contadores[evento] = 0
+    yield servidor
+    await pictogram_cache.cerrar()
+    servidor.servidor.shutdown()
+    servidor.servidor.server_close()
+
+
+@pytest.mark.asyncio
+async def test_segunda_lectura_sin_red_ni_recompresion(arasaac, tmp_path):
+    primero = await pictogram_cache.obtener(100)
+    assert primero.startswith(b"\xff\xd8")  # JPEG
+    assert (tmp_path / f"100_{pictogram_cache.PICTO_TAMANO}.jpg").read_bytes() == primero
+
+    assert await pictogram_cache.obtener(100) == primero
+    # Otro proceso (LRU vacía) lo lee de disco
+    pictogram_cache._lru.clear()
+    assert await pictogram_cache.obtener(100) == primero
+
+    assert len(arasaac.peticiones) == 1
+    estadisticas = pictogram_cache.estadisticas()
+    assert (estadisticas["descargas"], estadisticas["memoria"], estadisticas["disco"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_404_se_recuerda(arasaac, tmp_path):
+    assert await pictogram_cache.obtener(999) is None
+    assert (tmp_path / f"999_{pictogram_cache.PICTO_TAMANO}.404").exists()
+
+    assert await pictogram_cache.obtener(999) is None
+    pictogram_cache._negativos.clear()
+    assert await pictogram_cache.obtener(999) is None
+
+    assert len(arasaac.peticiones) == 1
+    assert pictogram_cache.estadisticas()["negativos"] == 2
+
+
+@pytest.mark.asyncio
+async def test_peticiones_simultaneas_descargan_una_vez(arasaac):
+    resultados = await asyncio.gather(*[pictogram_cache.obtener(200) for _ in range(10)])
+
+    assert len({r for r in resultados}) == 1
+    assert len(arasaac.peticiones) == 1
+
+
+@pytest.mark.asyncio
+async def test_obtener_varios_y_precalentar(arasaac):
+    resumen = await pictogram_cache.precalentar([100, 200, 200, 404404, "no-es-id"])
+    assert resumen == {"pedidos": 4, "disponibles": 2}
+
+    pictos = await pictogram_cache.obtener_varios([100, 200, 300])
+    assert set(pictos) == {100, 200, 300}
+    # Solo el 300 era nuevo
+    assert sorted(arasaac.peticiones) == [
+        "/100/100_500.png", "/200/200_500.png", "/300/300_500.png", "/404404/404404_500.png",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_error_de_red_no_se_recuerda(arasaac, monkeypatch):
+    monkeypatch.setattr(pictogram_cache, "ARASAAC_BASE_URL", "http://127.0.0.1:1")
+
+    assert await pictogram_cache.obtener(100) is None
+    assert pictogram_cache._negativos == {}
+    assert pictogram_cache.estadisticas()["errores"] == 1
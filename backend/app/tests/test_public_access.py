@@ -6,9 +6,9 @@
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
-from app.models import Equipo, Liga, Partido, PendingAction, TipoDeporte
+from app.models import Equipo, Jornada, Liga, Partido, PendingAction, TipoDeporte
 from app.tests.utils.utils import authentication_token_from_email, create_random_user
 
 
@@ -168,3 +168,133 @@ async def test_approve_public_match_submission_applies_score_and_evaluation(
     assert partido.puntos_arbitro == 2  # media 8 >= 5, arbitro_points=2
     assert partido.finalizado is True
     assert partido.evaluacion_completa is True
+
+
+@pytest.mark.asyncio
+async def test_public_views_answer_304_while_league_version_is_unchanged(
+    client: AsyncClient,
+    session: AsyncSession,
+    monkeypatch,
+):
+    from app.services import cache_service
+
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga ETag", usuario_id=user.id, public_pin="246810", activa=True)
+    session.add(liga)
+    await session.commit()
+    await session.refresh(liga)
+
+    version = {"actual": "epoca.1"}
+
+    async def fake_version_liga(liga_id):
+        return version["actual"]
+
+    monkeypatch.setattr(cache_service, "version_liga", fake_version_liga)
+
+    login = await client.post(
+        "/api/v1/public/login",
+        json={"liga_id": liga.id, "pin": "246810"},
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    for path in ("", "/clasificacion", "/jornadas"):
+        url = f"/api/v1/public/ligas/{liga.id}{path}"
+        first = await client.get(url, headers=headers)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert "s-maxage" in first.headers["cache-control"]
+
+        cached = await client.get(url, headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+    # Un cambio en la liga (nueva generación) invalida los ETags emitidos
+    version["actual"] = "epoca.2"
+    changed = await client.get(
+        f"/api/v1/public/ligas/{liga.id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.json()["nombre"] == "Liga ETag"
+
+
+@pytest.mark.asyncio
+async def test_public_views_without_redis_skip_etag(client: AsyncClient, session: AsyncSession):
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga Sin ETag", usuario_id=user.id, public_pin="135791", activa=True)
+    session.add(liga)
+    await session.commit()
+    await session.refresh(liga)
+
+    login = await client.post(
+        "/api/v1/public/login",
+        json={"liga_id": liga.id, "pin": "135791"},
+    )
+    response = await client.get(
+        f"/api/v1/public/ligas/{liga.id}/jornadas",
+        headers={"Authorization": f"Bearer {login.json()['access_token']}", "If-None-Match": "*"},
+    )
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_public_jornadas_agrupadas_por_rango_y_paginadas(
+    client: AsyncClient, session: AsyncSession, sentencias_sql
+):
+    user = await create_random_user(session)
+    liga = Liga(nombre="Liga Temporada", usuario_id=user.id, public_pin="975310", activa=True)
+    session.add(liga)
+    await session.commit()
+    local, visitante = Equipo(nombre="Local", liga_id=liga.id), Equipo(nombre="Visitante", liga_id=liga.id)
+    session.add_all([local, visitante])
+    await session.commit()
+
+    async def jornada(numero: int, partidos: int) -> None:
+        nueva = Jornada(liga_id=liga.id, numero=numero, nombre=f"Jornada {numero}")
+        session.add(nueva)
+        await session.flush()
+        session.add_all(
+            Partido(
+                liga_id=liga.id, jornada_id=nueva.id, tipo_deporte_id=1,
+                equipo_local_id=local.id, equipo_visitante_id=visitante.id,
+                marcador={"goles_local": numero, "goles_visitante": 0},
+            )
+            for _ in range(partidos)
+        )
+        await session.commit()
+
+    await jornada(1, 2)
+    login = await client.post("/api/v1/public/login", json={"liga_id": liga.id, "pin": "975310"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    url = f"/api/v1/public/ligas/{liga.id}/jornadas"
+
+    async def mas_jornadas():
+        for numero, partidos in ((2, 0), (3, 3), (4, 1)):
+            await jornada(numero, partidos)
+
+    # Una consulta para toda la temporada, sin importar jornadas ni partidos
+    await sentencias_sql.assert_constante(lambda: client.get(url, headers=headers), mas_jornadas)
+
+    completa = await client.get(url, headers=headers)
+    assert [(j["numero"], len(j["partidos"])) for j in completa.json()] == [(1, 2), (2, 0), (3, 3), (4, 1)]
+    assert completa.json()[2]["partidos"][0]["marcador_local"] == 3
+    assert completa.headers["x-total-count"] == "4"
+
+    rango = await client.get(url, params={"desde": 2, "hasta": 3}, headers=headers)
+    assert [j["numero"] for j in rango.json()] == [2, 3]
+
+    pagina = await client.get(url, params={"desde": 2, "skip": 1, "limit": 1}, headers=headers)
+    assert [j["numero"] for j in pagina.json()] == [3]
+    assert pagina.headers["x-total-count"] == "3"
+
+    # Ventana alrededor de la jornada en curso: la 1 ya se jugó y la 2 no tiene partidos
+    await session.execute(
+        update(Partido)
+        .where(Partido.jornada_id.in_(select(Jornada.id).where(Jornada.liga_id == liga.id, Jornada.numero == 1)))
+        .values(finalizado=True)
+    )
+    await session.commit()
+    ventana = await client.get(url, params={"alrededor": 1}, headers=headers)
+    assert [j["numero"] for j in ventana.json()] == [2, 3, 4]
+    assert ventana.headers["x-total-count"] == "3"
@@ -0,0 +1,185 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Planes de las consultas calientes sobre partidos finalizados: clasificación
+por liga y partidos de un equipo en cualquier rol (directos sobre partidos
+o a través de partido_participaciones). Con datos del tamaño de producción
+(decenas de ligas, miles de partidos) y estadísticas del planner al día,
+ninguna debe recorrer la tabla entera.
+
+Funciona en SQLite (EXPLAIN QUERY PLAN) y en Postgres (EXPLAIN JSON) si
+se lanza con PYTEST_DATABASE_URL apuntando a una BD de pruebas.
+"""
+import random
+import re
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.equipos import _query_historial
+from app.models import Equipo, Jornada, Liga, Partido, PendingAction
+from app.models.partido_participacion import proyectar_participaciones
+from app.services.badges_service import BadgesService
+from app.services.clasificacion_service import ClasificacionService
+from app.tests.utils.utils import create_random_user
+
+LIGAS = 40
+EQUIPOS_POR_LIGA = 12
+JORNADAS_POR_LIGA = 25
+PARTIDOS_POR_JORNADA = 20
+
+INDICES_FINALIZADOS = {
+    "ix_partidos_liga_finalizados",
+    "ix_partidos_local_finalizados",
+    "ix_partidos_visitante_finalizados",
+    "ix_partidos_arbitro_finalizados",
+    "ix_partidos_grada_local_finalizados",
+    "ix_partidos_grada_visitante_finalizados",
+}
+INDICES_PARTICIPACIONES = {"ix_partido_participaciones_equipo", "ix_partido_participaciones_liga"}
+
+
+@pytest_asyncio.fixture
+async def liga_grande(session: AsyncSession) -> tuple[int, int]:
+    """~20.000 partidos en 40 ligas (60 % finalizados). Devuelve (liga_id, equipo_id)."""
+    rng = random.Random(16)
+    user = await create_random_user(session)
+    ligas = (
+        await session.execute(
+            insert(Liga).returning(Liga.id),
+            [{"nombre": f"Liga {n}", "usuario_id": user.id, "config": {}} for n in range(LIGAS)],
+        )
+    ).scalars().all()
+
+    partidos = []
+    for liga_id in ligas:
+        equipos = (
+            await session.execute(
+                insert(Equipo).returning(Equipo.id),
+                [{"nombre": f"Equipo {liga_id}-{n}", "liga_id": liga_id} for n in range(EQUIPOS_POR_LIGA)],
+            )
+        ).scalars().all()
+        jornadas = (
+            await session.execute(
+                insert(Jornada).returning(Jornada.id),
+                [{"liga_id": liga_id, "numero": n + 1, "nombre": f"J{n + 1}"} for n in range(JORNADAS_POR_LIGA)],
+            )
+        ).scalars().all()
+        for jornada_id in jornadas:
+            for _ in range(PARTIDOS_POR_JORNADA):
+                local, visitante, arbitro, grada_l, grada_v = rng.sample(equipos, 5)
+                partidos.append({
+                    "liga_id": liga_id,
+                    "jornada_id": jornada_id,
+                    "tipo_deporte_id": 1,
+                    "equipo_local_id": local,
+                    "equipo_visitante_id": visitante,
+                    "arbitro_id": arbitro,
+                    "tutor_grada_local_id": grada_l,
+                    "tutor_grada_visitante_id": grada_v,
+                    "marcador": {},
+                    "finalizado": rng.random() < 0.6,
+                    "puntos_local": 3,
+                    "puntos_visitante": 1,
+                    "resultado": "V",
+                })
+    await session.execute(insert(Partido), partidos)
+    # INSERT en bloque: la proyección no la mantiene el ORM
+    await session.execute(proyectar_participaciones())
+    await session.commit()
+
+    await session.execute(text("ANALYZE"))
+    await session.commit()
+    return ligas[len(ligas) // 2], partidos[len(partidos) // 2]["equipo_local_id"]
+
+
+async def _plan(session: AsyncSession, stmt, tabla: str = "partidos") -> list[tuple[str, str]]:
+    """Pasos del plan que leen `tabla`: (tipo de acceso, índice o '')."""
+    sql = str(stmt.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}))
+    if session.bind.dialect.name == "postgresql":
+        [[raiz]] = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).one()
+        pendientes, pasos = [raiz["Plan"]], []
+        while pendientes:
+            nodo = pendientes.pop()
+            pendientes.extend(nodo.get("Plans", []))
+            if nodo.get("Relation Name") == tabla or nodo.get("Index Name", "").startswith(f"ix_{tabla}"):
+                pasos.append((nodo["Node Type"], nodo.get("Index Name", "")))
+        return pasos
+
+    pasos = []
+    for *_, detalle in (await session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all():
+        acceso = re.match(rf"(SCAN|SEARCH) {tabla}(?: USING (?:COVERING )?INDEX (\w+))?", detalle)
+        if acceso:
+            pasos.append((acceso.group(1), acceso.group(2) or ""))
+    return pasos
+
+
+def _assert_usa_indices(pasos: list[tuple[str, str]], indices: set[str] = INDICES_FINALIZADOS) -> None:
+    assert pasos, "la consulta no lee la tabla"
+    for acceso, indice in pasos:
+        assert acceso not in ("Seq Scan", "SCAN") or indice, f"recorrido completo de la tabla: {pasos}"
+    assert {indice for _, indice in pasos} & indices, pasos
+
+
+def _en_algun_rol(equipo_id: int):
+    return (
+        (Partido.equipo_local_id == equipo_id)
+        | (Partido.equipo_visitante_id == equipo_id)
+        | (Partido.arbitro_id == equipo_id)
+        | (Partido.tutor_grada_local_id == equipo_id)
+        | (Partido.tutor_grada_visitante_id == equipo_id)
+    )
+
+
+@pytest.mark.asyncio
+async def test_clasificacion_usa_indices_de_liga(session: AsyncSession, liga_grande):
+    liga_id, _ = liga_grande
+
+    # Reconstrucción de la clasificación (partidos finalizados de la liga)
+    _assert_usa_indices(
+        await _plan(session, select(Partido).where(Partido.liga_id == liga_id, Partido.finalizado == True))
+    )
+    # Estadísticas denormalizadas: GROUP BY sobre las participaciones
+    _assert_usa_indices(
+        await _plan(session, ClasificacionService._query_stats_liga(liga_id), "partido_participaciones"),
+        INDICES_PARTICIPACIONES,
+    )
+
+
+@pytest.mark.asyncio
+async def test_partidos_de_equipo_en_cualquier_rol_usan_indices(session: AsyncSession, liga_grande):
+    liga_id, equipo_id = liga_grande
+
+    # OR sobre los cinco roles directamente en partidos
+    en_algun_rol = select(Partido).where(
+        (Partido.liga_id == liga_id) & (Partido.finalizado == True) & _en_algun_rol(equipo_id)
+    )
+    _assert_usa_indices(await _plan(session, en_algun_rol))
+
+    # Medallas e historial del equipo: búsqueda por equipo_id en las participaciones
+    for consulta in (BadgesService._query_badges(equipo_id), _query_historial(liga_id, equipo_id)):
+        _assert_usa_indices(await _plan(session, consulta, "partido_participaciones"), INDICES_PARTICIPACIONES)
+
+
+def test_metadata_declara_los_indices_de_produccion():
+    """Base.metadata (lo que crean los tests) coincide con las migraciones 024 y 031."""
+    partidos = {indice.name for indice in Partido.__table__.indexes}
+    assert INDICES_FINALIZADOS | {
+        "uq_partidos_pin_not_null",
+        "ix_partidos_arbitro_id",
+        "ix_partidos_tipo_deporte_id",
+        "ix_partidos_tutor_grada_local_id",
+        "ix_partidos_tutor_grada_visitante_id",
+    } <= partidos
+    assert "ix_ligas_usuario_id" in {indice.name for indice in Liga.__table__.indexes}
+    assert "ix_jornadas_liga_id" in {indice.name for indice in Jornada.__table__.indexes}
+    assert {"ix_pending_actions_type_status", "ix_pending_actions_target_id"} <= {
+        indice.name for indice in PendingAction.__table__.indexes
+    }
@@ -0,0 +1,178 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Salud del runtime: espera en el pool de BD, lag del bucle de eventos con
+aviso y pila del bloqueo, y exposición en Prometheus y /api/ready.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import orjson
+import pytest
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.core.pool_instrumentation import PoolInstrumentado
+from app.services import health_service, runtime_health
+
+
+@pytest.mark.asyncio
+async def test_pool_mide_esperas_y_timeouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=PoolInstrumentado, pool_size=1, max_overflow=0, pool_timeout=0.3,
+    )
+    pool = engine.sync_engine.pool
+    try:
+        async def consulta():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        async with engine.connect() as ocupada:
+            await ocupada.execute(text("SELECT 1"))
+            esperando = asyncio.create_task(consulta())
+            await asyncio.sleep(0.1)
+            stats = runtime_health.db_pool_stats(pool)
+            assert (stats["checked_out"], stats["waiting"], stats["max_connections"]) == (1, 1, 1)
+        await esperando
+
+        stats = runtime_health.db_pool_stats(pool)
+        assert stats["waiting"] == 0
+        assert sum(stats["wait_buckets"]) == 2
+        assert stats["wait_sum"] >= 0.1
+
+        async with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                await consulta()
+        assert runtime_health.db_pool_stats(pool)["timeouts"] == 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_con_hueco_no_cuenta_como_espera(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=PoolInstrumentado, pool_size=2, max_overflow=0,
+    )
+    pool = engine.sync_engine.pool
+    # Durante el checkout (al abrir la conexión) el gauge no debe contarlo
+    durante_checkout = []
+    event.listen(pool, "connect", lambda *args: durante_checkout.append(pool.espera.esperando))
+    try:
+        async with engine.connect() as uno, engine.connect() as dos:
+            await uno.execute(text("SELECT 1"))
+            await dos.execute(text("SELECT 1"))
+        assert durante_checkout == [0, 0]
+        assert sum(pool.espera.buckets) == 2
+    finally:
+        await engine.dispose()
+
+
+def _bloquear_el_bucle(segundos: float) -> None:
+    time.sleep(segundos)
+
+
+@pytest.mark.asyncio
+async def test_bucle_bloqueado_avisa_con_la_pila(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "LOOP_BLOCK_WARN_MS", 100)
+    monitor = runtime_health.LoopLagMonitor(interval=0.02)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        with caplog.at_level(logging.WARNING, logger="app.services.runtime_health"):
+            _bloquear_el_bucle(0.4)
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    avisos = [r.getMessage() for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert len(avisos) == 1
+    assert "_bloquear_el_bucle" in avisos[0]
+    assert monitor.blocked_total == 1
+    assert monitor.stats()["lag_max_recent"] >= 0.3
+
+
+@pytest.mark.asyncio
+async def test_exposicion_en_prometheus_y_readiness():
+    runtime_health.loop_monitor.observe(0.003)
+
+    lineas = await runtime_health.lineas_prometheus()
+    trabajador = f'worker="{runtime_health.metrics.worker_id}"'
+    assert f"liga_event_loop_lag_seconds_count{{{trabajador}}} " in "\n".join(lineas)
+    assert any(linea.startswith(f"liga_redis_pool_in_use{{{trabajador}}}") for linea in lineas)
+
+    payload, _ = await health_service.build_readiness_payload()
+    assert payload["runtime"]["db_pool"]["class"]
+    assert "lag_max_recent_ms" in payload["runtime"]["event_loop"]
+
+
+class _RedisRegistro:
+    """Lo justo de redis.asyncio para publish()/collect(): strings y sorted sets."""
+
+    def __init__(self, datos: dict):
+        self.datos = datos
+
+    @asynccontextmanager
+    async def pipeline(self, transaction=True):
+        ops = []
+
+        class _Pipe:
+            def __getattr__(_, nombre):
+                return lambda *args, **kwargs: ops.append((nombre, args, kwargs))
+
+            async def execute(_):
+                return [await getattr(self, nombre)(*args, **kwargs) for nombre, args, kwargs in ops]
+
+        yield _Pipe()
+
+    async def set(self, clave, valor, ex=None):
+        self.datos[clave] = valor
+
+    async def mget(self, claves):
+        return [self.datos.get(clave) for clave in claves]
+
+    async def zadd(self, clave, mapping):
+        self.datos.setdefault(clave, {}).update(mapping)
+
+    async def zremrangebyscore(self, clave, minimo, maximo):
+        zset = self.datos.get(clave, {})
+        for miembro in [m for m, p in zset.items() if float(minimo) <= p <= float(maximo)]:
+            del zset[miembro]
+
+    async def zrangebyscore(self, clave, minimo, maximo):
+        return [m for m, p in self.datos.get(clave, {}).items() if float(minimo) <= p <= float(maximo)]
+
+    async def expire(self, clave, segundos):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_collect_lee_los_workers_del_registro(monkeypatch):
+    datos: dict = {}
+    monkeypatch.setattr(runtime_health.aioredis, "Redis", lambda connection_pool=None: _RedisRegistro(datos))
+    otro = {**runtime_health.snapshot(), "worker": "otro:1"}
+    datos[f"{runtime_health.SNAPSHOT_KEY_PREFIX}otro:1"] = orjson.dumps(otro)
+    # Snapshot huérfano (su worker ya no late): no se lee aunque la clave siga
+    datos[f"{runtime_health.SNAPSHOT_KEY_PREFIX}muerto:2"] = orjson.dumps({**otro, "worker": "muerto:2"})
+    datos[runtime_health.WORKERS_KEY] = {
+        "otro:1": time.time(),
+        "muerto:2": time.time() - 2 * runtime_health.SNAPSHOT_TTL_SECONDS,
+    }
+
+    snapshots = await runtime_health.collect()
+
+    propio = runtime_health.metrics.worker_id
+    assert [s["worker"] for s in snapshots] == sorted(["otro:1", propio])
+    assert set(datos[runtime_health.WORKERS_KEY]) == {"otro:1", propio}
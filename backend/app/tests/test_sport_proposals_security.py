@@ -153,3 +153,19 @@ async def test_upload_proposal_logo_rejects_invalid_mime(client: AsyncClient, se
     )
     assert response.status_code == 400
 
+
+
+@pytest.mark.asyncio
+async def test_create_proposal_blocks_offensive_text(client: AsyncClient) -> None:
+    response = await client.post(
+        "/api/v1/sport-proposals/",
+        json={
+            "nombre": "Deporte Test",
+            "tipo_marcador": "puntos",
+            "descripcion": "Un juego de m1erd@",
+            "email_contacto": "contacto@example.com",
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("POLICY_BLOCKED_LANGUAGE:")
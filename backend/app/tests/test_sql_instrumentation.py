@@ -0,0 +1,82 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Instrumentación SQL por petición: cabeceras en DEBUG, histogramas por ruta
+y log de consultas lentas con SQL normalizado y forma de los parámetros.
+"""
+import logging
+from collections import defaultdict
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.sql_instrumentation import forma_parametros, normalizar_sql
+from app.services import metrics_service
+from app.services.metrics_service import HttpSeries, metrics
+
+
+def test_normalizar_sql():
+    sql = """
+        SELECT partidos.id FROM partidos
+        WHERE partidos.liga_id = $1 AND partidos.id IN ($2, $3, $4) AND resultado = 'V' LIMIT 20
+    """
+    assert normalizar_sql(sql) == (
+        "SELECT partidos.id FROM partidos WHERE partidos.liga_id = ? "
+        "AND partidos.id IN (?, ...) AND resultado = ? LIMIT ?"
+    )
+
+
+def test_forma_parametros_sin_valores():
+    assert forma_parametros((7, "Ana López", None)) == "(int, str, None)"
+    assert forma_parametros({"email": "a@b.es", "id": 3}) == "{email: str, id: int}"
+    assert forma_parametros([(1, "x"), (2, "y")], executemany=True) == "2 x (int, str)"
+
+
+@pytest.mark.asyncio
+async def test_cabeceras_debug_e_histograma_por_ruta(client: AsyncClient, sentencias_sql, monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG", True)
+    monkeypatch.setattr(metrics, "http", HttpSeries())
+    monkeypatch.setattr(metrics, "_pending", HttpSeries())
+    monkeypatch.setattr(metrics, "in_flight", defaultdict(int))
+    respuestas = []
+
+    async def peticion():
+        respuestas.append(await client.get("/api/v1/game-resources/wiki"))
+        return respuestas[-1]
+
+    total = await sentencias_sql.contar(peticion)
+
+    assert total > 0
+    assert int(respuestas[-1].headers["x-db-query-count"]) == total
+    assert float(respuestas[-1].headers["x-db-time-ms"]) >= 0
+    clave = (metrics_service.DB_QUERIES, "GET", "/api/v1/game-resources/wiki")
+    assert metrics.http.sums[clave] == total
+
+    monkeypatch.setattr(settings, "DEBUG", False)
+    assert "x-db-query-count" not in (await client.get("/api/v1/game-resources/wiki")).headers
+
+
+@pytest.mark.asyncio
+async def test_log_de_consultas_lentas(session: AsyncSession, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 1)
+    lenta = text(
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 300000) "
+        "SELECT count(*) FROM c WHERE x > :minimo"
+    )
+
+    with caplog.at_level(logging.WARNING, logger="app.core.sql_instrumentation"):
+        await session.execute(lenta, {"minimo": 10})
+
+    avisos = [r.getMessage() for r in caplog.records if "Consulta lenta" in r.getMessage()]
+    assert len(avisos) == 1
+    assert "WHERE x < ?" in avisos[0] and "x > ?" in avisos[0]
+    assert "(int)" in avisos[0] or "{minimo: int}" in avisos[0]
+    assert "300000" not in avisos[0]
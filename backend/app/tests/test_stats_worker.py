@@ -0,0 +1,121 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Tests del worker arq de estadísticas: repetición cuando llegan cambios
+durante el job, métricas y degradación sin cola.
+"""
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from arq import Retry
+
+from app.services import stats_jobs
+from app.services.clasificacion_service import ClasificacionService
+from app.workers import stats_worker
+
+
+class _RedisFalso:
+    """Lo justo de redis.asyncio para el job: claves sueltas."""
+
+    def __init__(self, pendientes_tras_job=()):
+        self.claves = set()
+        self._pendientes_tras_job = set(pendientes_tras_job)
+
+    async def delete(self, clave):
+        self.claves.discard(clave)
+
+    async def exists(self, clave):
+        return int(clave in self.claves or clave in self._pendientes_tras_job)
+
+
+@pytest.fixture
+def job_sin_bd(monkeypatch):
+    @asynccontextmanager
+    async def _sesion():
+        yield MagicMock()
+
+    actualizar = AsyncMock(return_value=6)
+    reconstruir = AsyncMock()
+    registro = AsyncMock()
+    monkeypatch.setattr(stats_worker, "AsyncSessionLocal", _sesion)
+    monkeypatch.setattr(ClasificacionService, "actualizar_stats_liga", actualizar)
+    monkeypatch.setattr(ClasificacionService, "reconstruir_clasificacion", reconstruir)
+    monkeypatch.setattr(stats_worker, "registrar_ejecucion", registro)
+    return actualizar, reconstruir, registro
+
+
+@pytest.mark.asyncio
+async def test_job_recalcula_y_limpia_pendiente(job_sin_bd):
+    actualizar, reconstruir, registro = job_sin_bd
+    redis = _RedisFalso()
+    redis.claves.add(stats_jobs.pendiente_key(3))
+
+    resultado = await stats_worker.recompute_league_stats({"redis": redis}, 3)
+
+    assert resultado == 6
+    assert stats_jobs.pendiente_key(3) not in redis.claves
+    assert actualizar.await_args.args[0] == 3
+    assert reconstruir.await_args.args[0] == 3
+    assert registro.await_args.args[3] is True
+
+
+@pytest.mark.asyncio
+async def test_job_se_repite_si_llegan_cambios_durante_la_ejecucion(job_sin_bd):
+    redis = _RedisFalso(pendientes_tras_job={stats_jobs.pendiente_key(3)})
+
+    with pytest.raises(Retry) as exc_info:
+        await stats_worker.recompute_league_stats({"redis": redis}, 3)
+
+    assert exc_info.value.defer_score == stats_worker.REPETICION_SEGUNDOS * 1000
+
+
+@pytest.mark.asyncio
+async def test_job_fallido_registra_metricas(job_sin_bd):
+    actualizar, _, registro = job_sin_bd
+    actualizar.side_effect = RuntimeError("BD caída")
+
+    with pytest.raises(RuntimeError):
+        await stats_worker.recompute_league_stats({"redis": _RedisFalso()}, 3)
+
+    assert registro.await_args.args[3] is False
+
+
+@pytest.mark.asyncio
+async def test_sin_cola_se_recalcula_en_proceso(monkeypatch):
+    """Sin Redis (conftest), schedule_stats_updates degrada al recálculo local."""
+    monkeypatch.setenv("DISABLE_STATS_UPDATES", "0")
+    lanzados = []
+
+    def _crear_tarea(coro):
+        lanzados.append(coro)
+        coro.close()
+
+    monkeypatch.setattr("app.services.clasificacion_service.asyncio.create_task", _crear_tarea)
+    ClasificacionService._ligas_programadas.clear()
+
+    await ClasificacionService.schedule_stats_updates(7)
+    await ClasificacionService.schedule_stats_updates(7)
+
+    # Coalescido: una sola tarea local por liga
+    assert len(lanzados) == 1
+    ClasificacionService._ligas_programadas.clear()
+
+
+def test_lineas_prometheus():
+    lineas = stats_jobs.lineas_prometheus({
+        "profundidad": 2,
+        "jobs_total": 4,
+        "jobs_fallidos": 1,
+        "espera_segundos_sum": 1.5,
+        "duracion_segundos_sum": 0.25,
+    })
+    assert "liga_stats_queue_depth 2" in lineas
+    assert "liga_stats_jobs_failed_total 1" in lineas
+    assert "liga_stats_job_duration_seconds_count 4" in lineas
+    assert stats_jobs.lineas_prometheus({}) == []
@@ -4,13 +4,17 @@
 #
 
 import io
+import random
 
 from PIL import Image
 
 from app.services.submission_policy_service import (
+    _drawing_counts,
+    _drawing_counts_per_pixel,
     analyze_drawing_for_policy,
     analyze_text_for_policy,
     build_daily_fingerprint,
+    get_policy_matcher,
 )
 
 
@@ -41,6 +45,22 @@ def test_analyze_text_for_policy_detects_custom_blocked_terms() -> None:
     assert "infracciongrave" in result.matched_terms
 
 
+def test_analyze_text_for_policy_matches_phrases_and_obfuscations() -> None:
+    blocklist = "hijo de perra"
+    for text in ("M1ERD@", "m.i.e.r.d.a", "mieeeerda", "Eres un HIJO  de perra!"):
+        assert analyze_text_for_policy(text, custom_blocklist=blocklist).blocked is True, text
+
+    # Whole words only: no false positives inside longer words
+    result = analyze_text_for_policy("La disputa por el balón", "de perra", custom_blocklist=blocklist)
+    assert result.blocked is False
+
+
+def test_policy_matcher_is_cached_per_blocklist() -> None:
+    assert get_policy_matcher("uno,dos") is get_policy_matcher("uno,dos")
+    assert get_policy_matcher("uno,dos") is not get_policy_matcher("uno")
+    assert "uno" in get_policy_matcher("uno").terms
+
+
 def test_analyze_drawing_for_policy_flags_aggressive_pattern() -> None:
     image_bytes = _build_png(
         120,
@@ -71,3 +91,17 @@ def test_build_daily_fingerprint_is_stable_for_same_inputs() -> None:
     assert first == second
     assert first is not None
     assert len(first) == 64
+
+
+def test_drawing_counts_match_per_pixel_reference() -> None:
+    rng = random.Random(7)
+    # Colours whose Cb/Cr fall exactly on a skin-tone bound
+    on_bound = [(56, 42, 42), (94, 80, 80), (127, 23, 23), (150, 136, 136)]
+    for width, height in [(48, 48), (97, 131), (256, 200)]:
+        image = Image.new("RGB", (width, height))
+        image.putdata([
+            rng.choice(on_bound) if rng.random() < 0.1
+            else (rng.randint(60, 255), rng.randint(30, 220), rng.randint(0, 200))
+            for _ in range(width * height)
+        ])
+        assert _drawing_counts(image) == _drawing_counts_per_pixel(image)
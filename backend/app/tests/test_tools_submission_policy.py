@@ -80,14 +80,13 @@ async def test_send_game_sheet_persists_policy_metadata(
     await session.commit()
     await session.refresh(liga)
 
-    async def fake_pdf(**kwargs) -> bytes:
-        return b"%PDF-1.4 test"
+    encolados = []
 
-    async def fake_email(*args, **kwargs) -> bool:
+    async def fake_encolar(job_id, datos):
+        encolados.append((job_id, datos))
         return True
 
-    monkeypatch.setattr(tools_api, "generate_game_sheet_pdf", fake_pdf)
-    monkeypatch.setattr(tools_api, "send_email", fake_email)
+    monkeypatch.setattr(tools_api.game_sheet_jobs, "encolar_ficha", fake_encolar)
     monkeypatch.setattr(
         tools_api.settings,
         "SUBMISSION_FINGERPRINT_SECRET",
@@ -111,7 +110,9 @@ async def test_send_game_sheet_persists_policy_metadata(
 
     assert response.status_code == 202
     payload = response.json()
-    assert payload["moderation_required"] is False
+    assert payload["estado"] == "en_cola"
+    assert payload["status_url"] == f"/api/v1/tools/send-game-sheet/{payload['job_id']}"
+    assert [job_id for job_id, _ in encolados] == [payload["job_id"]]
 
     result = await session.execute(
         select(GameSubmission).where(GameSubmission.id == payload["submission_id"])
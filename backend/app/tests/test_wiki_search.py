@@ -0,0 +1,97 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Búsqueda de la Wiki de Juegos: índice mantenido al publicar, búsqueda sin
+tildes en título, materiales y reglas, orden por relevancia y paginación
+por cursor.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import GameSubmission
+
+WIKI = "/api/v1/game-resources/wiki"
+_AHORA = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+async def _ficha(session: AsyncSession, title: str, *, materiales=None, reglas=None,
+                 is_public=True, horas=0) -> GameSubmission:
+    ficha = GameSubmission(
+        token_hash=f"busqueda-{title}", title=title, materiales=materiales, reglas=reglas,
+        is_public=is_public, published_at=_AHORA + timedelta(hours=horas) if is_public else None,
+    )
+    session.add(ficha)
+    await session.commit()
+    return ficha
+
+
+async def _titulos(client: AsyncClient, **params) -> list[str]:
+    respuesta = await client.get(WIKI, params=params)
+    assert respuesta.status_code == 200
+    return [item["title"] for item in respuesta.json()["items"]]
+
+
+@pytest.mark.asyncio
+async def test_busqueda_sin_tildes_en_todo_el_texto_y_por_relevancia(client: AsyncClient, session: AsyncSession):
+    await _ficha(session, "Pañuelo", reglas="Se juega con un balón de espuma", horas=2)
+    await _ficha(session, "Balón prisionero", materiales="Conos", horas=1)
+    await _ficha(session, "Balón tiro", is_public=False)
+    await _ficha(session, "Comba", materiales="Cuerda larga")
+
+    # El título pesa más que las reglas, aunque la otra ficha sea más reciente
+    assert await _titulos(client, search="BALON") == ["Balón prisionero", "Pañuelo"]
+    assert await _titulos(client, search="cuerda") == ["Comba"]
+    assert await _titulos(client, search="espuma balón") == ["Pañuelo"]
+    assert await _titulos(client, search="100%") == []
+
+
+@pytest.mark.asyncio
+async def test_publicar_y_editar_actualiza_el_indice(client: AsyncClient, session: AsyncSession):
+    ficha = await _ficha(session, "Cementerio", reglas="Dos equipos", is_public=False)
+    assert await _titulos(client, search="cementerio") == []
+
+    ficha.is_public = True
+    ficha.published_at = _AHORA
+    await session.commit()
+    assert await _titulos(client, search="cementerio") == ["Cementerio"]
+
+    ficha.reglas = "Dos equipos y una pelota de goma"
+    await session.commit()
+    assert await _titulos(client, search="goma") == ["Cementerio"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search", [None, "juego"])
+async def test_paginacion_por_cursor(client: AsyncClient, session: AsyncSession, search):
+    for n in range(7):
+        # Dos fichas con la misma fecha: el id desempata
+        await _ficha(session, f"Juego {n}", horas=n // 2)
+    params = {"limit": 3, **({"search": search} if search else {})}
+
+    esperado = await _titulos(client, **{**params, "limit": 100})
+    vistos, cursor = [], None
+    while True:
+        respuesta = (await client.get(WIKI, params={**params, **({"cursor": cursor} if cursor else {})})).json()
+        assert respuesta["total"] == 7
+        vistos += [item["title"] for item in respuesta["items"]]
+        cursor = respuesta["next_cursor"]
+        if cursor is None:
+            break
+
+    assert vistos == esperado
+    assert len(vistos) == 7
+
+
+@pytest.mark.asyncio
+async def test_cursor_no_valido(client: AsyncClient):
+    for cursor in ["no-es-un-cursor", "WzFd"]:
+        respuesta = await client.get(WIKI, params={"cursor": cursor})
+        assert respuesta.status_code == 400
@@ -16,3 +16,13 @@ def slugify(value: str, allow_unicode: bool = False) -> str:
     
     value = re.sub(r'[^\w\s-]', '', value.lower())
     return re.sub(r'[-\s]+', '-', value).strip('-_')
+
+
+def normalize_search_text(value: str) -> str:
+    """
+    Lowercase `value`, strip accents and collapse whitespace. Used to
+    compare search terms accent-insensitively ("balón" == "balon").
+    """
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.lower().split())
@@ -9,3 +9,27 @@ def stable_hash(data: Any) -> str:
     """
     payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def strong_etag(*parts: Any) -> str:
+    """
+    Strong ETag (quoted) derived from stable_hash of the given parts.
+    """
+    return f'"{stable_hash(list(parts))[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match evaluation (RFC 9110: weak comparison, "*" matches any).
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
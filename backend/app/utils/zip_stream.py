@@ -0,0 +1,43 @@
+import zipfile
+
+
+class _Buffer:
+    """
+    Destination without seek/tell: zipfile falls back to streaming mode
+    (data descriptors after each entry) and never rewinds.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class StreamingZipWriter:
+    """
+    Incremental ZIP writer: each add() returns the bytes of that entry, so
+    the archive can be sent while it is being built. Memory holds one entry.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED) -> None:
+        self._buffer = _Buffer()
+        self._zip = zipfile.ZipFile(self._buffer, mode="w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        self._zip.writestr(name, data)
+        return self._buffer.drain()
+
+    def close(self) -> bytes:
+        """Central directory; the archive is complete after this."""
+        self._zip.close()
+        return self._buffer.drain()
@@ -86,5 +86,6 @@ class WorkerSettings:
     max_jobs = 5                # concurrencia limitada (cortesía con SMTP2GO)
     max_tries = MAX_INTENTOS
     job_timeout = 90
+    keep_result = 3600          # el resultado guardado deduplica los job_id fijos (fichas)
     health_check_interval = 30  # habilita `arq --check` para el healthcheck
     on_shutdown = on_shutdown
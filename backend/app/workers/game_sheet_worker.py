@@ -0,0 +1,121 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Worker arq para las fichas de juego enviadas desde /tools/send-game-sheet.
+
+Arranque (mismo contenedor/imagen que el backend):
+
+    arq app.workers.game_sheet_worker.WorkerSettings
+
+Dos etapas encadenadas sobre la cola arq:fichas:
+
+1. `moderar_ficha`: análisis del dibujo y marca de revisión en la ficha.
+2. `generar_ficha`: PDF, email con adjunto (cola de emails) y Nextcloud.
+
+Cada etapa reintenta por separado con backoff exponencial: un fallo del
+PDF no repite la moderación. Si el pool de PDFs está lleno (503) el
+reintento es corto (Retry-After del pool). Un reintento de la etapa 2
+después de encolar el email no lo duplica: el job del email tiene un
+job_id fijo por ficha. El progreso queda en el hash de estado que lee
+GET /tools/send-game-sheet/{job_id}.
+"""
+import logging
+
+from arq import Retry
+from arq.connections import RedisSettings
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services import game_sheet_jobs
+from app.services.game_sheet_jobs import (
+    EMAIL_EN_COLA,
+    ERROR,
+    FICHAS_QUEUE_NAME,
+    GENERANDO_PDF,
+    MODERANDO,
+    guardar_estado,
+    job_id_etapa,
+)
+from app.services.pdf_render_service import REINTENTO_SEGUNDOS
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 8
+
+
+async def _reintentar_o_fallar(ctx: dict, job_id: str, etapa: str, exc: Exception) -> None:
+    """Lanza Retry con backoff (10s, 20s, 40s...) o marca el envío como error."""
+    intento = ctx.get("job_try", 1)
+    if intento < MAX_INTENTOS:
+        if isinstance(exc, HTTPException) and exc.status_code == 503:
+            # Pool de PDFs lleno: no es un fallo de la ficha
+            raise Retry(defer=REINTENTO_SEGUNDOS)
+        defer = 10 * 2 ** (intento - 1)
+        logger.warning(
+            "Fallo en %s de la ficha %s (intento %s/%s), reintento en %ss: %s",
+            etapa, job_id, intento, MAX_INTENTOS, defer, exc,
+        )
+        raise Retry(defer=defer)
+    logger.error("Ficha %s descartada en %s tras %s intentos: %s", job_id, etapa, MAX_INTENTOS, exc)
+    await guardar_estado(ctx["redis"], job_id, estado=ERROR, error=str(exc)[:200])
+
+
+async def moderar_ficha(ctx: dict, job_id: str, datos: dict) -> bool:
+    """Etapa 1. Devuelve si la ficha queda marcada para revisión."""
+    redis = ctx["redis"]
+    await guardar_estado(redis, job_id, estado=MODERANDO)
+    try:
+        datos = await game_sheet_jobs.moderar(datos)
+    except Exception as exc:
+        await _reintentar_o_fallar(ctx, job_id, "moderación", exc)
+        return False
+
+    await guardar_estado(
+        redis, job_id, estado=GENERANDO_PDF, moderation_required=datos["moderation_required"]
+    )
+    await redis.enqueue_job(
+        "generar_ficha",
+        job_id,
+        datos,
+        _job_id=job_id_etapa(job_id, "pdf"),
+        _queue_name=FICHAS_QUEUE_NAME,
+    )
+    return datos["moderation_required"]
+
+
+async def generar_ficha(ctx: dict, job_id: str, datos: dict) -> bool:
+    """Etapa 2. PDF, email y evidencia en Nextcloud."""
+    try:
+        await game_sheet_jobs.generar_y_entregar(datos)
+    except Exception as exc:
+        await _reintentar_o_fallar(ctx, job_id, "generación", exc)
+        return False
+    await guardar_estado(ctx["redis"], job_id, estado=EMAIL_EN_COLA)
+    logger.info("Ficha %s generada y email encolado", datos["submission_id"])
+    return True
+
+
+async def on_shutdown(ctx: dict) -> None:
+    """Libera el pool de BD del proceso worker al parar."""
+    from app.database import engine
+
+    await engine.dispose()
+
+
+class WorkerSettings:
+    """Configuración del worker (comando: arq app.workers.game_sheet_worker.WorkerSettings)."""
+
+    functions = [moderar_ficha, generar_ficha]
+    queue_name = FICHAS_QUEUE_NAME
+    redis_settings = RedisSettings.from_dsn(settings.GAME_SHEET_QUEUE_REDIS_URL)
+    max_jobs = 4                # el render de PDFs ya tiene su propio pool
+    max_tries = MAX_INTENTOS
+    job_timeout = 120
+    keep_result = 0             # sin resultado guardado: el job_id queda libre al terminar
+    health_check_interval = 30  # habilita `arq --check` para el healthcheck
+    on_shutdown = on_shutdown
@@ -0,0 +1,86 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Worker arq para el recálculo de estadísticas de liga.
+
+Arranque (mismo contenedor/imagen que el backend):
+
+    arq app.workers.stats_worker.WorkerSettings
+
+Saca el recálculo del proceso web: las tareas sobreviven a los reinicios
+graceful de gunicorn, no compiten con las peticiones por el pool de BD de
+los workers uvicorn y la concurrencia (max_jobs) es global, no por proceso.
+Cada job actualiza las columnas denormalizadas de Equipo y reconcilia la
+clasificación incremental guardada en Redis.
+"""
+import logging
+import time
+
+from arq import Retry
+from arq.connections import RedisSettings
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.clasificacion_service import ClasificacionService
+from app.services.stats_jobs import (
+    STATS_QUEUE_NAME,
+    pendiente_key,
+    registrar_ejecucion,
+)
+
+logger = logging.getLogger(__name__)
+
+# Si llegan cambios durante el job, se repite tras esta espera
+REPETICION_SEGUNDOS = 2
+MAX_INTENTOS = 20
+
+
+async def recompute_league_stats(ctx: dict, liga_id: int) -> int:
+    """Job de recálculo de una liga. Devuelve el número de equipos actualizados."""
+    redis = ctx["redis"]
+    inicio = time.time()
+    # score = instante programado (ms): la espera excluye el defer intencionado
+    espera = inicio - ctx.get("score", inicio * 1000) / 1000
+
+    # Lo que llegue a partir de aquí vuelve a marcar la liga
+    await redis.delete(pendiente_key(liga_id))
+    exito = False
+    try:
+        async with AsyncSessionLocal() as session:
+            actualizados = await ClasificacionService.actualizar_stats_liga(liga_id, session)
+            await ClasificacionService.reconstruir_clasificacion(liga_id, session)
+        exito = True
+    finally:
+        await registrar_ejecucion(redis, espera, time.time() - inicio, exito)
+
+    logger.info("Estadisticas de liga %s recalculadas (%s equipos)", liga_id, actualizados)
+    if await redis.exists(pendiente_key(liga_id)):
+        # Cambios durante la ejecución: mismo job_id, así que se repite este
+        raise Retry(defer=REPETICION_SEGUNDOS)
+    return actualizados
+
+
+async def on_shutdown(ctx: dict) -> None:
+    """Libera el pool de BD del proceso worker al parar."""
+    from app.database import engine
+
+    await engine.dispose()
+
+
+class WorkerSettings:
+    """Configuración del worker (comando: arq app.workers.stats_worker.WorkerSettings)."""
+
+    functions = [recompute_league_stats]
+    queue_name = STATS_QUEUE_NAME
+    redis_settings = RedisSettings.from_dsn(settings.STATS_QUEUE_REDIS_URL)
+    max_jobs = 4                # pool de BD pequeño (ver presupuesto en app/database.py)
+    max_tries = MAX_INTENTOS
+    job_timeout = 120
+    keep_result = 0             # sin resultado guardado: el job_id queda libre al terminar
+    health_check_interval = 30  # habilita `arq --check` para el healthcheck
+    on_shutdown = on_shutdown
@@ -0,0 +1,25 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Benchmarks de los caminos calientes sobre ligas sintéticas.
+
+- liga_sintetica.py: genera una liga del tamaño pedido (equipos, jornadas,
+  deportes, criterios personalizados) en cualquier BD con el esquema.
+- medicion.py: tiempos por repetición, resumen y comparación con una
+  baseline guardada.
+- run.py: los casos (clasificación, jornadas públicas, calendario,
+  insignias, historial de estadísticas y todas las exportaciones) y la CLI.
+- carga_jornada.py: prueba de carga de una jornada en clase (propuestas de
+  marcador, aprobaciones, proyectores y SSE) en proceso o contra un
+  servidor.
+
+Uso (desde backend/):
+    PYTHONPATH=. python -m benchmarks.run
+    PYTHONPATH=. python -m benchmarks.run --baseline benchmarks/baseline_sqlite.json
+    PYTHONPATH=. python -m benchmarks.carga_jornada --clases 30
+"""
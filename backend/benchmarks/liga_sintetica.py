@@ -0,0 +1,316 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Generador de ligas sintéticas para los benchmarks.
+
+Crea con INSERT en bloque una liga completa: docente, deportes, equipos,
+jornadas, partidos con los cinco roles (local, visitante, árbitro y dos
+tutores de grada), marcador y puntos educativos, las participaciones
+(proyección de partidos) y, si se piden criterios, la liga en modo
+personalizado con sus evaluaciones. Las primeras jornadas quedan
+finalizadas y el resto pendientes con PIN, como a mitad de temporada.
+
+Es determinista para una misma semilla (salvo los nombres únicos de
+deportes y docente, que llevan un sufijo aleatorio, y los PIN, que evitan
+los ya usados: se pueden generar varias ligas en la misma BD).
+"""
+import random
+import uuid
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    CriterioEvaluacion,
+    Equipo,
+    EvaluacionPersonalizada,
+    Jornada,
+    Liga,
+    Partido,
+    TipoDeporte,
+    User,
+)
+from app.models.partido_participacion import proyectar_participaciones
+from app.utils.security import get_password_hash
+
+PASSWORD = "benchmark"
+ROLES_POR_PARTIDO = 5
+TIPOS_MARCADOR = ("goles", "sets", "puntos")
+CATEGORIAS_CRITERIO = ("arbitro", "grada_local", "grada_visitante", "jugador", "general")
+
+# Columnas de un partido aún sin jugar (el INSERT en bloque necesita las
+# mismas claves en todas las filas)
+_PENDIENTE = {
+    "marcador": {},
+    "resultado": None,
+    "puntos_local": 0,
+    "puntos_visitante": 0,
+    "finalizado": False,
+    "evaluacion_completa": False,
+    "puntos_juego_limpio_local": 0,
+    "puntos_juego_limpio_visitante": 0,
+    "arbitro_conocimiento": None,
+    "arbitro_gestion": None,
+    "arbitro_apoyo": None,
+    "arbitro_media": None,
+    "puntos_arbitro": 0,
+    "grada_animar_local": None,
+    "grada_respeto_local": None,
+    "grada_participacion_local": None,
+    "grada_animar_visitante": None,
+    "grada_respeto_visitante": None,
+    "grada_participacion_visitante": None,
+    "puntos_grada_local": 0.0,
+    "puntos_grada_visitante": 0.0,
+    "pin": None,
+}
+
+
+@dataclass
+class TamanoLiga:
+    """Parámetros de la liga sintética."""
+
+    equipos: int = 12
+    jornadas: int = 20
+    deportes: int = 3
+    # Con criterios > 0 la liga usa evaluación personalizada; seis cubren las
+    # cinco categorías y son los que mide la baseline
+    criterios: int = 6
+    # Fracción de jornadas ya jugadas (las primeras)
+    finalizadas: float = 0.75
+    semilla: int = 24
+
+    def __post_init__(self):
+        if self.equipos < ROLES_POR_PARTIDO:
+            raise ValueError(f"Hacen falta al menos {ROLES_POR_PARTIDO} equipos (un partido ocupa cinco roles)")
+        if self.jornadas < 1 or self.deportes < 1 or self.criterios < 0:
+            raise ValueError("Jornadas y deportes deben ser >= 1 y criterios >= 0")
+        if not 0 <= self.finalizadas <= 1:
+            raise ValueError("finalizadas debe estar entre 0 y 1")
+
+
+@dataclass
+class LigaSintetica:
+    """Identificadores de lo generado."""
+
+    liga_id: int
+    usuario_id: int
+    usuario_codigo: str
+    public_pin: str
+    equipo_ids: list[int]
+    jornada_ids: list[int]
+    deporte_ids: list[int]
+    criterio_ids: list[int] = field(default_factory=list)
+    partido_ids: list[int] = field(default_factory=list)
+    # Partidos pendientes: PIN -> partido_id
+    pines: dict[str, int] = field(default_factory=dict)
+    # Primera jornada sin jugar: (PIN, partido_id, tipo de marcador)
+    en_juego: list[tuple[str, int, str]] = field(default_factory=list)
+
+    @property
+    def partidos(self) -> int:
+        return len(self.partido_ids)
+
+
+def _marcador(tipo: str, rng: random.Random) -> tuple[dict, int, int]:
+    if tipo == "sets":
+        local = rng.randint(0, 2)
+        visitante = 2 if local < 2 else rng.randint(0, 1)
+    else:
+        tope = 6 if tipo == "goles" else 40
+        local, visitante = rng.randint(0, tope), rng.randint(0, tope)
+    return {f"{tipo}_local": local, f"{tipo}_visitante": visitante}, local, visitante
+
+
+def _partido_jugado(fila: dict, tipo: str, rng: random.Random) -> None:
+    """Marcador, resultado 3-2-1 y evaluación clásica de un partido finalizado."""
+    marcador, local, visitante = _marcador(tipo, rng)
+    if local > visitante:
+        resultado, puntos = "V", (3, 1)
+    elif local < visitante:
+        resultado, puntos = "D", (1, 3)
+    else:
+        resultado, puntos = "E", (2, 2)
+    conocimiento, gestion, apoyo = (rng.randint(1, 4) for _ in range(3))
+    fila.update(
+        marcador=marcador,
+        resultado=resultado,
+        puntos_local=puntos[0],
+        puntos_visitante=puntos[1],
+        finalizado=True,
+        evaluacion_completa=True,
+        puntos_juego_limpio_local=rng.randint(0, 3),
+        puntos_juego_limpio_visitante=rng.randint(0, 3),
+        arbitro_conocimiento=conocimiento,
+        arbitro_gestion=gestion,
+        arbitro_apoyo=apoyo,
+        arbitro_media=(conocimiento + gestion + apoyo) / 3,
+        puntos_arbitro=rng.randint(0, 3),
+        grada_animar_local=rng.randint(0, 1),
+        grada_respeto_local=rng.randint(0, 1),
+        grada_participacion_local=rng.randint(0, 1),
+        grada_animar_visitante=rng.randint(0, 1),
+        grada_respeto_visitante=rng.randint(0, 1),
+        grada_participacion_visitante=rng.randint(0, 1),
+        puntos_grada_local=rng.choice((0.0, 0.5, 1.0)),
+        puntos_grada_visitante=rng.choice((0.0, 0.5, 1.0)),
+    )
+
+
+async def crear_liga_sintetica(session: AsyncSession, tamano: TamanoLiga) -> LigaSintetica:
+    """Genera y confirma (commit) una liga del tamaño pedido."""
+    rng = random.Random(tamano.semilla)
+    sufijo = uuid.uuid4().hex[:8]
+
+    usuario = User(
+        codigo=f"BENCH{sufijo}".upper(),
+        email=f"bench-{sufijo}@example.com",
+        hashed_password=get_password_hash(PASSWORD),
+    )
+    session.add(usuario)
+    await session.flush()
+
+    deportes = (
+        await session.execute(
+            insert(TipoDeporte).returning(TipoDeporte.id, TipoDeporte.tipo_marcador, sort_by_parameter_order=True),
+            [
+                {
+                    "nombre": f"Deporte {n + 1} {sufijo}",
+                    "codigo": f"b{sufijo}{n}",
+                    "tipo_marcador": TIPOS_MARCADOR[n % len(TIPOS_MARCADOR)],
+                }
+                for n in range(tamano.deportes)
+            ],
+        )
+    ).all()
+
+    public_pin = f"{rng.randrange(10**6):06d}"
+    liga = Liga(
+        nombre=f"Liga sintética {tamano.equipos}x{tamano.jornadas}",
+        temporada="2024-2025",
+        usuario_id=usuario.id,
+        config={},
+        public_pin=public_pin,
+        modo_competicion="multi_deporte" if tamano.deportes > 1 else "unico_deporte",
+        modo_evaluacion="personalizado" if tamano.criterios else "clasico",
+    )
+    session.add(liga)
+    await session.flush()
+
+    equipo_ids = (
+        await session.execute(
+            insert(Equipo).returning(Equipo.id, sort_by_parameter_order=True),
+            [{"nombre": f"Equipo {n + 1}", "liga_id": liga.id} for n in range(tamano.equipos)],
+        )
+    ).scalars().all()
+    jornada_ids = (
+        await session.execute(
+            insert(Jornada).returning(Jornada.id, sort_by_parameter_order=True),
+            [
+                {"liga_id": liga.id, "numero": n + 1, "nombre": f"Jornada {n + 1}"}
+                for n in range(tamano.jornadas)
+            ],
+        )
+    ).scalars().all()
+
+    criterios = []
+    if tamano.criterios:
+        criterios = (
+            await session.execute(
+                insert(CriterioEvaluacion).returning(
+                    CriterioEvaluacion.id, CriterioEvaluacion.categoria, sort_by_parameter_order=True
+                ),
+                [
+                    {
+                        "liga_id": liga.id,
+                        "nombre": f"Criterio {n + 1}",
+                        "codigo": f"criterio_{n + 1}",
+                        "categoria": CATEGORIAS_CRITERIO[n % len(CATEGORIAS_CRITERIO)],
+                        "escala_min": 0,
+                        "escala_max": 10,
+                        "orden": n,
+                    }
+                    for n in range(tamano.criterios)
+                ],
+            )
+        ).all()
+
+    # Jornadas: todos los equipos juegan (N // 2 partidos) y los roles de
+    # árbitro y grada salen del resto, como en liga_grande de test_query_plans
+    jugadas = round(tamano.jornadas * tamano.finalizadas)
+    # El PIN identifica el partido en toda la BD: sin repetir los de otras ligas
+    pines = set((await session.execute(select(Partido.pin).where(Partido.pin.is_not(None)))).scalars())
+    filas = []
+    en_juego = []
+    for indice, jornada_id in enumerate(jornada_ids):
+        deporte_id, tipo = deportes[indice % len(deportes)]
+        for _ in range(tamano.equipos // 2):
+            local, visitante, arbitro, grada_l, grada_v = rng.sample(equipo_ids, ROLES_POR_PARTIDO)
+            fila = {
+                "liga_id": liga.id,
+                "jornada_id": jornada_id,
+                "tipo_deporte_id": deporte_id,
+                "equipo_local_id": local,
+                "equipo_visitante_id": visitante,
+                "arbitro_id": arbitro,
+                "tutor_grada_local_id": grada_l,
+                "tutor_grada_visitante_id": grada_v,
+                **_PENDIENTE,
+            }
+            if indice < jugadas:
+                _partido_jugado(fila, tipo, rng)
+            else:
+                pin = f"{rng.randrange(10**6):06d}"
+                while pin in pines:
+                    pin = f"{rng.randrange(10**6):06d}"
+                pines.add(pin)
+                fila["pin"] = pin
+                if indice == jugadas:
+                    en_juego.append((pin, len(filas), tipo))
+            filas.append(fila)
+
+    partido_ids = (
+        await session.execute(insert(Partido).returning(Partido.id, sort_by_parameter_order=True), filas)
+    ).scalars().all()
+    # INSERT en bloque: la proyección no la mantiene el ORM
+    await session.execute(proyectar_participaciones(Partido.liga_id == liga.id))
+
+    if criterios:
+        evaluaciones = []
+        for partido_id, fila in zip(partido_ids, filas):
+            if not fila["finalizado"]:
+                continue
+            for criterio_id, categoria in criterios:
+                equipo_id = {
+                    "grada_local": fila["equipo_local_id"],
+                    "grada_visitante": fila["equipo_visitante_id"],
+                }.get(categoria)
+                evaluaciones.append({
+                    "partido_id": partido_id,
+                    "criterio_id": criterio_id,
+                    "equipo_id": equipo_id,
+                    "valor": rng.randint(0, 10),
+                })
+        if evaluaciones:
+            await session.execute(insert(EvaluacionPersonalizada), evaluaciones)
+
+    await session.commit()
+    return LigaSintetica(
+        liga_id=liga.id,
+        usuario_id=usuario.id,
+        usuario_codigo=usuario.codigo,
+        public_pin=public_pin,
+        equipo_ids=list(equipo_ids),
+        jornada_ids=list(jornada_ids),
+        deporte_ids=[deporte_id for deporte_id, _ in deportes],
+        criterio_ids=[criterio_id for criterio_id, _ in criterios],
+        partido_ids=list(partido_ids),
+        pines={fila["pin"]: partido_id for partido_id, fila in zip(partido_ids, filas) if fila["pin"]},
+        en_juego=[(pin, partido_ids[indice], tipo) for pin, indice, tipo in en_juego],
+    )
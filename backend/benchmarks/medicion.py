@@ -0,0 +1,102 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Medición y comparación con la baseline.
+
+Cada caso se ejecuta una vez de calentamiento y luego `repeticiones`
+veces; se guarda el resumen en ms (mediana, p95, mínimo y máximo). La
+comparación usa la mediana: un caso empeora si supera la de la baseline
+en más de `umbral` (fracción) y además en más de `margen_ms`, para que
+el ruido de los casos de pocos milisegundos no dé falsos positivos. Otra
+máquina u otro número de repeticiones no impiden comparar, pero se avisa.
+"""
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+UMBRAL = 0.25
+MARGEN_MS = 2.0
+
+
+async def medir(funcion: Callable[[], Awaitable[Any]], repeticiones: int, calentamiento: int = 1) -> list[float]:
+    """Tiempos (ms) de `repeticiones` llamadas tras `calentamiento` descartadas."""
+    for _ in range(calentamiento):
+        await funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def percentil(ordenados: list[float], fraccion: float) -> float:
+    """Percentil (por rango más cercano) de una lista ya ordenada."""
+    return ordenados[min(len(ordenados) - 1, round(fraccion * (len(ordenados) - 1)))]
+
+
+def resumen(tiempos: list[float]) -> dict[str, float]:
+    ordenados = sorted(tiempos)
+    return {
+        "mediana_ms": round(statistics.median(ordenados), 3),
+        "p95_ms": round(percentil(ordenados, 0.95), 3),
+        "min_ms": round(ordenados[0], 3),
+        "max_ms": round(ordenados[-1], 3),
+        "repeticiones": len(ordenados),
+    }
+
+
+@dataclass
+class Comparacion:
+    caso: str
+    base_ms: float
+    actual_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.actual_ms / self.base_ms if self.base_ms else float("inf")
+
+    def empeora(self, umbral: float, margen_ms: float) -> bool:
+        return self.ratio > 1 + umbral and self.actual_ms - self.base_ms > margen_ms
+
+
+def comparables(actual: dict, base: dict) -> None:
+    """ValueError si la baseline se midió con otro tamaño de liga o de BD."""
+    for clave in ("dialecto", "tamano"):
+        if actual["entorno"][clave] != base["entorno"][clave]:
+            raise ValueError(
+                f"La baseline no es comparable: {clave} {base['entorno'][clave]!r} "
+                f"frente a {actual['entorno'][clave]!r}"
+            )
+
+
+def diferencias_de_medicion(actual: dict, base: dict) -> list[str]:
+    """Diferencias que no impiden comparar pero restan fiabilidad (máquina, repeticiones)."""
+    avisos = []
+    for clave in ("maquina", "repeticiones"):
+        previo, ahora = base["entorno"].get(clave), actual["entorno"].get(clave)
+        if previo != ahora:
+            avisos.append(f"la baseline se midió con {clave} {previo!r} y ahora es {ahora!r}")
+    return avisos
+
+
+def comparar(actual: dict, base: dict) -> list[Comparacion]:
+    """Casos presentes en ambos resultados, en el orden de `actual`."""
+    comparables(actual, base)
+    return [
+        Comparacion(caso, base["casos"][caso]["mediana_ms"], datos["mediana_ms"])
+        for caso, datos in actual["casos"].items()
+        if caso in base["casos"]
+    ]
+
+
+def regresiones(
+    comparaciones: list[Comparacion], umbral: float = UMBRAL, margen_ms: float = MARGEN_MS
+) -> list[Comparacion]:
+    return [c for c in comparaciones if c.empeora(umbral, margen_ms)]
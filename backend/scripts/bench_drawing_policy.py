@@ -0,0 +1,73 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Compara el análisis de dibujos vectorizado (bandas de Pillow) con el bucle
+por píxel anterior, para varios tamaños de imagen, y comprueba que ambos
+dan los mismos recuentos.
+
+Uso (desde backend/):
+    PYTHONPATH=. python scripts/bench_drawing_policy.py
+    PYTHONPATH=. python scripts/bench_drawing_policy.py --repeticiones 50 --lados 128 256
+"""
+import argparse
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from app.services.submission_policy_service import _drawing_counts, _drawing_counts_per_pixel
+
+
+def dibujo(lado: int) -> Image.Image:
+    """Trazos sobre fondo blanco, como los del canvas del generador."""
+    random.seed(lado)
+    imagen = Image.new("RGB", (lado, lado), (255, 255, 255))
+    lapiz = ImageDraw.Draw(imagen)
+    for _ in range(40):
+        puntos = [(random.randrange(lado), random.randrange(lado)) for _ in range(4)]
+        color = tuple(random.randrange(256) for _ in range(3))
+        lapiz.line(puntos, fill=color, width=max(lado // 64, 2))
+    return imagen
+
+
+def foto(lado: int) -> Image.Image:
+    """Ruido de colores: el peor caso para los cubos de color."""
+    return Image.merge("RGB", [Image.effect_noise((lado, lado), 60 + 20 * i) for i in range(3)])
+
+
+def medir(funcion, imagen: Image.Image, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(imagen)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--lados", type=int, nargs="+", default=[64, 128, 256])
+    args = parser.parse_args()
+
+    print(f"{'imagen':<14}{'por píxel (ms)':>16}{'vectorizado (ms)':>18}{'mejora':>9}")
+    for lado in args.lados:
+        for nombre, generador in (("dibujo", dibujo), ("foto", foto)):
+            # analyze_drawing_for_policy reduce a 256px antes de contar
+            imagen = generador(lado)
+            imagen.thumbnail((256, 256))
+            assert _drawing_counts(imagen) == _drawing_counts_per_pixel(imagen), (nombre, lado)
+            escalar = medir(_drawing_counts_per_pixel, imagen, max(args.repeticiones // 4, 1))
+            vectorial = medir(_drawing_counts, imagen, args.repeticiones)
+            etiqueta = f"{nombre} {lado}px"
+            print(f"{etiqueta:<14}{escalar:>16.2f}{vectorial:>18.2f}{escalar / vectorial:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#
+# Copyright (C) 2024-2025 EDUmind - Los Mundos Edufis
+# Author: Luis Vilela Acuña
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+
+"""
+Precarga en PICTOGRAM_CACHE_DIR los pictogramas ARASAAC de las fichas.
+
+Uso (desde backend/):
+    PYTHONPATH=. python scripts/warm_pictogram_cache.py            # los usados en todas las fichas
+    PYTHONPATH=. python scripts/warm_pictogram_cache.py 2349 7233  # además, estos ids
+    PYTHONPATH=. python scripts/warm_pictogram_cache.py --solo-ids 2349 7233
+"""
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.game_submission import GameSubmission
+from app.services import pictogram_cache
+from app.utils.db_guard import get_database_url
+
+load_dotenv()
+
+
+async def ids_de_fichas() -> set[int]:
+    engine = create_async_engine(get_database_url())
+    ids: set[int] = set()
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(GameSubmission.pictogramas_materiales, GameSubmission.pictogramas_reglas)
+            )
+            for materiales, reglas in result:
+                for lista in (materiales, reglas):
+                    for picto_id in lista or []:
+                        try:
+                            ids.add(int(picto_id))
+                        except (TypeError, ValueError):
+                            continue
+    finally:
+        await engine.dispose()
+    return ids
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ids", nargs="*", type=int, help="ids de pictograma adicionales")
+    parser.add_argument("--solo-ids", action="store_true", help="no leer las fichas de la base de datos")
+    args = parser.parse_args()
+
+    ids = set(args.ids)
+    if not args.solo_ids:
+        ids |= await ids_de_fichas()
+
+    print(f"Precargando {len(ids)} pictogramas...")
+    try:
+        resumen = await pictogram_cache.precalentar(sorted(ids))
+    finally:
+        await pictogram_cache.cerrar()
+    estadisticas = pictogram_cache.estadisticas()
+    print(
+        f"Disponibles {resumen['disponibles']}/{resumen['pedidos']} "
+        f"(ya en disco: {estadisticas['disco']}, descargados: {estadisticas['descargas']}, "
+        f"errores de red: {estadisticas['errores']})"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
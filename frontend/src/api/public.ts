@@ -44,9 +44,16 @@ export const publicApi = {
         return response.data;
     },
 
-    getJornadas: async (ligaId: number, token: string) => {
+    // Sin `rango` devuelve la temporada completa; X-Total-Count = jornadas del rango.
+    // `alrededor` pide la jornada en curso y N jornadas a cada lado.
+    getJornadas: async (
+        ligaId: number,
+        token: string,
+        rango?: { desde?: number; hasta?: number; alrededor?: number; skip?: number; limit?: number }
+    ) => {
         const response = await apiClient.client.get(`/public/ligas/${ligaId}/jornadas`, {
-            headers: { Authorization: `Bearer ${token}` }
+            headers: { Authorization: `Bearer ${token}` },
+            params: rango
         });
         return response.data;
     }
@@ -34,6 +34,26 @@ interface Sport {
 const SUBMISSION_POLICY_NOTICE_VERSION =
     import.meta.env.VITE_SUBMISSION_POLICY_NOTICE_VERSION || '2026-04-02';
 
+// El envío se procesa en segundo plano (202 + job_id): se consulta el estado
+// hasta que termina la moderación para avisar si quedó en revisión
+const MAX_CONSULTAS_ESTADO = 15;
+const ESPERA_ESTADO_MS = 2000;
+
+async function esperarModeracion(jobId: string): Promise<boolean> {
+    for (let i = 0; i < MAX_CONSULTAS_ESTADO; i++) {
+        await new Promise((resolve) => setTimeout(resolve, ESPERA_ESTADO_MS));
+        try {
+            const { data } = await axios.get(buildApiUrl(`/tools/send-game-sheet/${jobId}`));
+            if (data?.estado !== 'en_cola' && data?.estado !== 'moderando') {
+                return Boolean(data?.moderation_required);
+            }
+        } catch {
+            return false;
+        }
+    }
+    return false;
+}
+
 export default function GeneradorFichas() {
     const { ligaId } = useParams();
     const [formData, setFormData] = useState({
@@ -310,9 +330,15 @@ export default function GeneradorFichas() {
             setNombreJuegoEnviado(formData.nombreJuego);
             setEnviado(true);
             setShowLanguageWarning(false);
-            if (response.data?.moderation_required) {
-                toast.warning("La ficha se ha enviado con revisión preventiva de contenido visual.");
-            }
+            // Sin cola el servidor responde ya con el estado final (sin job_id)
+            const moderacion = response.data?.job_id
+                ? esperarModeracion(response.data.job_id)
+                : Promise.resolve(Boolean(response.data?.moderation_required));
+            void moderacion.then((moderada) => {
+                if (moderada) {
+                    toast.warning("La ficha se ha enviado con revisión preventiva de contenido visual.");
+                }
+            });
         } catch (error: unknown) {
             console.error("Error sending ficha:", error);
 
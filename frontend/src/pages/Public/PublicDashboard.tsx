@@ -44,12 +44,18 @@ interface PartidoPublic {
 interface JornadaPublic {
     id: number;
     nombre: string;
+    numero: number | null;
     fecha_inicio: string;
     partidos: PartidoPublic[];
 }
 
 const FALLBACK_DESCRIPTION = 'Consulta clasificacion, calendario y resultados de esta liga escolar.';
 
+// El calendario se pide por tramos: la jornada en curso con VENTANA_JORNADAS
+// a cada lado (unas dos semanas de clase) y luego bloques bajo demanda
+const VENTANA_JORNADAS = 2;
+const BLOQUE_JORNADAS = 5;
+
 function formatPublicDate(value?: string) {
     if (!value) return 'Sin fecha';
 
@@ -70,6 +76,8 @@ export default function PublicDashboard() {
     const [liga, setLiga] = useState<Liga | null>(null);
     const [clasificacion, setClasificacion] = useState<ClasificacionItem[]>([]);
     const [jornadas, setJornadas] = useState<JornadaPublic[]>([]);
+    const [haySiguientes, setHaySiguientes] = useState(true);
+    const [cargandoTramo, setCargandoTramo] = useState(false);
     const [isLoading, setIsLoading] = useState(true);
 
     const numericLigaId = ligaId ? Number.parseInt(ligaId, 10) : NaN;
@@ -85,11 +93,12 @@ export default function PublicDashboard() {
             const [ligaData, clasData, jornadasData] = await Promise.all([
                 publicApi.getLiga(id, token),
                 publicApi.getClasificacion(id, token),
-                publicApi.getJornadas(id, token),
+                publicApi.getJornadas(id, token, { alrededor: VENTANA_JORNADAS }),
             ]);
             setLiga(ligaData);
             setClasificacion(clasData.clasificacion);
             setJornadas(jornadasData);
+            setHaySiguientes(jornadasData.length > 0);
         } catch {
             clearStoredPublicToken(id);
             navigate(`/public/${id}/login`);
@@ -98,6 +107,33 @@ export default function PublicDashboard() {
         }
     }, [navigate]);
 
+    const primeraNumero = jornadas[0]?.numero ?? null;
+    const ultimaNumero = jornadas[jornadas.length - 1]?.numero ?? null;
+    const hayAnteriores = primeraNumero !== null && primeraNumero > 1;
+
+    const cargarTramo = useCallback(async (direccion: 'anteriores' | 'siguientes') => {
+        const token = getStoredPublicToken(numericLigaId);
+        if (!token || primeraNumero === null || ultimaNumero === null) return;
+
+        const rango = direccion === 'anteriores'
+            ? { desde: Math.max(1, primeraNumero - BLOQUE_JORNADAS), hasta: primeraNumero - 1 }
+            : { desde: ultimaNumero + 1, hasta: ultimaNumero + BLOQUE_JORNADAS };
+        setCargandoTramo(true);
+        try {
+            const tramo: JornadaPublic[] = await publicApi.getJornadas(numericLigaId, token, rango);
+            if (direccion === 'anteriores') {
+                setJornadas((actuales) => [...tramo, ...actuales]);
+            } else {
+                setJornadas((actuales) => [...actuales, ...tramo]);
+                if (tramo.length < BLOQUE_JORNADAS) setHaySiguientes(false);
+            }
+        } catch {
+            // El tramo ya mostrado sigue siendo válido: se puede reintentar
+        } finally {
+            setCargandoTramo(false);
+        }
+    }, [numericLigaId, primeraNumero, ultimaNumero]);
+
     useEffect(() => {
         if (!Number.isFinite(numericLigaId) || numericLigaId <= 0) {
             setIsLoading(false);
@@ -136,13 +172,13 @@ export default function PublicDashboard() {
         {
             label: 'Jornadas',
             value: jornadas.length,
-            description: 'Bloques de calendario',
+            description: 'Del calendario mostrado',
             icon: Calendar,
         },
         {
             label: 'Partidos',
             value: totalPartidos,
-            description: 'Encuentros registrados',
+            description: 'En las jornadas mostradas',
             icon: ListChecks,
         },
         {
@@ -318,6 +354,18 @@ export default function PublicDashboard() {
                 </TabsContent>
 
                 <TabsContent value="jornadas" className="space-y-4">
+                    {hayAnteriores && (
+                        <div className="flex justify-center">
+                            <Button
+                                variant="editorialOutline"
+                                size="sm"
+                                disabled={cargandoTramo}
+                                onClick={() => void cargarTramo('anteriores')}
+                            >
+                                Ver jornadas anteriores
+                            </Button>
+                        </div>
+                    )}
                     {jornadas.length === 0 ? (
                         <Card variant="editorial" className="editorial-card">
                             <CardContent className="pt-6">
@@ -393,6 +441,18 @@ export default function PublicDashboard() {
                             })}
                         </div>
                     )}
+                    {jornadas.length > 0 && haySiguientes && (
+                        <div className="flex justify-center">
+                            <Button
+                                variant="editorialOutline"
+                                size="sm"
+                                disabled={cargandoTramo}
+                                onClick={() => void cargarTramo('siguientes')}
+                            >
+                                Ver jornadas siguientes
+                            </Button>
+                        </div>
+                    )}
                 </TabsContent>
             </Tabs>
 
@@ -1,4 +1,4 @@
-import { useCallback, useEffect, useMemo, useState } from 'react';
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 import { Link, useSearchParams } from 'react-router-dom';
 import axios from 'axios';
 import { toast } from 'sonner';
@@ -113,6 +113,14 @@ export default function WikiJuegos() {
     const [page, setPage] = useState(1);
     const [totalPages, setTotalPages] = useState(1);
     const [total, setTotal] = useState(0);
+    // Cursor de cada página (keyset): la página N se pide con el next_cursor de la N-1
+    const cursores = useRef<Record<number, string | null>>({});
+
+    // Los cursores solo valen para la búsqueda y los filtros que los generaron
+    const reiniciarPaginacion = () => {
+        cursores.current = {};
+        setPage(1);
+    };
 
     const fetchCategories = useCallback(async () => {
         try {
@@ -145,6 +153,10 @@ export default function WikiJuegos() {
         setLoading(true);
         try {
             const params: Record<string, string | number> = { page, limit: 12 };
+            // Una respuesta que llega tras cambiar los filtros escribe en el mapa viejo
+            const mapaCursores = cursores.current;
+            const cursor = page > 1 ? mapaCursores[page] : null;
+            if (cursor) params.cursor = cursor;
             if (selectedCategory !== 'all') params.categoria = selectedCategory;
             if (selectedSport !== 'all') params.sport_id = selectedSport;
             if (selectedTaxonomia !== 'all') params.taxonomia_id = selectedTaxonomia;
@@ -152,6 +164,7 @@ export default function WikiJuegos() {
 
             const res = await axios.get(buildApiUrl('/game-resources/wiki'), { params });
             setGames(res.data.items);
+            mapaCursores[page + 1] = res.data.next_cursor ?? null;
             setTotalPages(res.data.pages);
             setTotal(res.data.total);
         } catch {
@@ -211,7 +224,7 @@ export default function WikiJuegos() {
         setSelectedCategory('all');
         setSelectedSport('all');
         setSelectedTaxonomia('all');
-        setPage(1);
+        reiniciarPaginacion();
     };
 
     const statItems = [
@@ -291,7 +304,7 @@ export default function WikiJuegos() {
                                 value={search}
                                 onChange={(event) => {
                                     setSearch(event.target.value);
-                                    setPage(1);
+                                    reiniciarPaginacion();
                                 }}
                                 className="pl-10"
                             />
@@ -301,7 +314,7 @@ export default function WikiJuegos() {
                             value={selectedCategory}
                             onValueChange={(value) => {
                                 setSelectedCategory(value);
-                                setPage(1);
+                                reiniciarPaginacion();
                             }}
                         >
                             <SelectTrigger variant="editorial">
@@ -322,7 +335,7 @@ export default function WikiJuegos() {
                             value={selectedSport === 'all' ? '' : selectedSport}
                             onValueChange={(value) => {
                                 setSelectedSport(value || 'all');
-                                setPage(1);
+                                reiniciarPaginacion();
                             }}
                             options={sportOptions}
                             placeholder="Filtrar por deporte"
@@ -339,7 +352,7 @@ export default function WikiJuegos() {
                             value={selectedTaxonomia === 'all' ? '' : selectedTaxonomia}
                             onValueChange={(value) => {
                                 setSelectedTaxonomia(value || 'all');
-                                setPage(1);
+                                reiniciarPaginacion();
                             }}
                             options={taxonomiaOptions}
                             placeholder="Filtrar por taxonomía"